@@ -0,0 +1,159 @@
+"""add voice_session_participants table
+
+Revision ID: 011_add_voice_session_participants
+Revises: 010_recreate_analysis_tables
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "011_add_voice_session_participants"
+down_revision = "010_recreate_analysis_tables"
+branch_labels = None
+depends_on = None
+
+
+voice_sessions = sa.table(
+    "voice_sessions",
+    sa.column("id", sa.Integer),
+    sa.column("participants", sa.Text),
+)
+users = sa.table("users", sa.column("id", sa.Integer))
+
+
+def _parse_joined_at(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def upgrade():
+    # 1. 参加者テーブルを作成
+    participants = op.create_table(
+        "voice_session_participants",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("voice_session_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("role", sa.String(50), nullable=True, server_default="participant"),
+        sa.Column(
+            "joined_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("left_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True, server_default="true"),
+        sa.ForeignKeyConstraint(
+            ["voice_session_id"], ["voice_sessions.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "voice_session_id",
+            "user_id",
+            name="uq_voice_session_participants_session_user",
+        ),
+    )
+    op.create_index(
+        "ix_voice_session_participants_id", "voice_session_participants", ["id"]
+    )
+    op.create_index(
+        "ix_voice_session_participants_user_id",
+        "voice_session_participants",
+        ["user_id"],
+    )
+
+    # 2. voice_sessions.participants のJSONリストを行に移す
+    connection = op.get_bind()
+    existing_users = {row.id for row in connection.execute(sa.select(users.c.id))}
+    migrated_sessions = []
+    rows = []
+    for session in connection.execute(
+        sa.select(voice_sessions.c.id, voice_sessions.c.participants).where(
+            voice_sessions.c.participants.isnot(None)
+        )
+    ):
+        try:
+            data = json.loads(session.participants)
+        except (TypeError, ValueError):
+            continue
+        # 録音状態（dict）が入っている行はそのまま残す
+        if not isinstance(data, list):
+            continue
+        migrated_sessions.append(session.id)
+        seen = set()
+        for participant in data:
+            user_id = participant.get("user_id") if isinstance(participant, dict) else None
+            if user_id not in existing_users or user_id in seen:
+                continue
+            seen.add(user_id)
+            rows.append(
+                {
+                    "voice_session_id": session.id,
+                    "user_id": user_id,
+                    "role": participant.get("role", "participant"),
+                    "joined_at": _parse_joined_at(participant.get("joined_at")),
+                    "is_active": participant.get("is_active", True),
+                }
+            )
+
+    if rows:
+        op.bulk_insert(participants, rows)
+    if migrated_sessions:
+        op.execute(
+            voice_sessions.update()
+            .where(voice_sessions.c.id.in_(migrated_sessions))
+            .values(participants=None)
+        )
+
+
+def downgrade():
+    # 参加者をJSONリストに戻す（録音状態が入っている行は上書きしない）
+    connection = op.get_bind()
+    participants = sa.table(
+        "voice_session_participants",
+        sa.column("voice_session_id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("role", sa.String),
+        sa.column("joined_at", sa.DateTime(timezone=True)),
+        sa.column("is_active", sa.Boolean),
+    )
+    by_session = {}
+    for row in connection.execute(sa.select(participants)):
+        by_session.setdefault(row.voice_session_id, []).append(
+            {
+                "user_id": row.user_id,
+                "role": row.role,
+                "joined_at": row.joined_at.isoformat() if row.joined_at else None,
+                "is_active": row.is_active,
+            }
+        )
+    for voice_session_id, data in by_session.items():
+        op.execute(
+            voice_sessions.update()
+            .where(
+                sa.and_(
+                    voice_sessions.c.id == voice_session_id,
+                    voice_sessions.c.participants.is_(None),
+                )
+            )
+            .values(participants=json.dumps(data))
+        )
+
+    op.drop_index(
+        "ix_voice_session_participants_user_id",
+        table_name="voice_session_participants",
+    )
+    op.drop_index(
+        "ix_voice_session_participants_id", table_name="voice_session_participants"
+    )
+    op.drop_table("voice_session_participants")
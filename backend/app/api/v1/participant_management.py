@@ -326,7 +326,12 @@ async def get_session_stats(
             speaking_participants=stats.get("speaking_participants", 0),
             muted_participants=stats.get("muted_participants", 0),
             total_speak_time=stats.get("total_speak_time", 0.0),
-            session_duration=stats.get("session_duration", 0.0)
+            session_duration=stats.get("session_duration", 0.0),
+            total_turns=stats.get("total_turns", 0),
+            overlap_time=stats.get("overlap_time", 0.0),
+            silence_time=stats.get("silence_time", 0.0),
+            silence_count=stats.get("silence_count", 0),
+            participation=stats.get("participation", {})
         )
         
     except Exception as e:
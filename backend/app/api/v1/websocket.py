@@ -5,6 +5,14 @@ import structlog
 from datetime import datetime
 
 from app.core.websocket import manager, WebSocketAuth, WebSocketMessageHandler
+from app.core.message_handlers import (
+    WebSocketMessageHandler as SessionMessageHandler,
+)
+from app.core.audio_frames import (
+    AUDIO_FRAME_VERSION,
+    AUDIO_TRANSPORT_JSON,
+    AUDIO_TRANSPORTS,
+)
 from app.services.voice_session_service import VoiceSessionService
 from app.core.exceptions import AuthenticationException
 
@@ -129,8 +137,17 @@ async def _handle_voice_session_connection(websocket: WebSocket, session_id: str
                 f"WebSocket accept() completed for session {session_id}, user_id={user.id}"
             )
 
+            # 音声転送形式のネゴシエーション（未指定・不明な値はJSON）
+            audio_transport = websocket.query_params.get(
+                "audio_transport", AUDIO_TRANSPORT_JSON
+            )
+            if audio_transport not in AUDIO_TRANSPORTS:
+                audio_transport = AUDIO_TRANSPORT_JSON
+
             # 接続を確立
-            connection_id = await manager.connect(websocket, session_id, user)
+            connection_id = await manager.connect(
+                websocket, session_id, user, audio_transport=audio_transport
+            )
             connection_established = True
             logger.info(
                 f"WebSocket connection established: {connection_id} for session {session_id}, user_id={user.id}"
@@ -151,6 +168,8 @@ async def _handle_voice_session_connection(websocket: WebSocket, session_id: str
                     "type": "connection_established",
                     "session_id": session_id,
                     "user_id": user.id,
+                    "audio_transport": audio_transport,
+                    "audio_frame_version": AUDIO_FRAME_VERSION,
                     "timestamp": manager.connection_info[connection_id][
                         "connected_at"
                     ].isoformat(),
@@ -182,9 +201,25 @@ async def _handle_voice_session_connection(websocket: WebSocket, session_id: str
         # メッセージ受信ループ
         while True:
             try:
-                # メッセージを受信
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                # メッセージを受信（音声はバイナリフレーム、それ以外はJSONテキスト）
+                data = await websocket.receive()
+                if data["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(data.get("code", 1000))
+
+                if data.get("bytes") is not None:
+                    await SessionMessageHandler.handle_audio_frame(
+                        session_id, connection_id, user, data["bytes"]
+                    )
+                    continue
+
+                message = json.loads(data.get("text") or "")
+
+                # JSONトランスポートの音声は音声処理側のハンドラーへ（この接続のセッションに限る）
+                if isinstance(message, dict) and message.get("type") == "audio_data":
+                    await SessionMessageHandler.handle_message(
+                        websocket, {**message, "session_id": session_id}, connection_id, user
+                    )
+                    continue
 
                 # メッセージを処理
                 await WebSocketMessageHandler.handle_message(
@@ -0,0 +1,114 @@
+"""
+音声中継用のバイナリWebSocketフレーム
+
+Base64+JSONの代わりに、固定長ヘッダーと生の音声バイト列を1フレームで送る。
+
+フレーム構成（ネットワークバイトオーダー）:
+
+    version      B   フレームフォーマットのバージョン
+    codec        B   0=PCM16LE, 1=Opus
+    session_len  H   セッションIDのバイト長
+    user_id      I   送信者のユーザーID
+    seq          I   送信者ごとのシーケンス番号
+    timestamp_ms Q   送信時刻（UNIXエポックからのミリ秒）
+    sample_rate  I   サンプルレート（Hz）
+    level        H   音声レベル（0.0-1.0 を 0-65535 に量子化）
+    session_id   セッションID（UTF-8, session_len バイト）
+    payload      音声データ（残り全部）
+"""
+
+import struct
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Tuple
+
+AUDIO_FRAME_VERSION = 1
+AUDIO_TRANSPORT_BINARY = "binary"
+AUDIO_TRANSPORT_JSON = "json"
+AUDIO_TRANSPORTS = (AUDIO_TRANSPORT_BINARY, AUDIO_TRANSPORT_JSON)
+
+_HEADER = struct.Struct("!BBHIIQIH")
+HEADER_SIZE = _HEADER.size
+_LEVEL_SCALE = 65535
+
+
+class AudioCodec(IntEnum):
+    """音声コーデック"""
+
+    PCM16 = 0
+    OPUS = 1
+
+
+@dataclass
+class AudioFrameHeader:
+    """バイナリ音声フレームのヘッダー"""
+
+    session_id: str
+    user_id: int
+    seq: int
+    timestamp_ms: int
+    sample_rate: int
+    codec: AudioCodec = AudioCodec.PCM16
+    level: float = 0.0
+
+
+def encode_audio_frame(header: AudioFrameHeader, audio: bytes) -> bytes:
+    """ヘッダーと音声データからバイナリフレームを組み立てる"""
+    session_bytes = header.session_id.encode("utf-8")
+    level = int(round(min(1.0, max(0.0, header.level)) * _LEVEL_SCALE))
+    return b"".join(
+        (
+            _HEADER.pack(
+                AUDIO_FRAME_VERSION,
+                int(header.codec),
+                len(session_bytes),
+                header.user_id,
+                header.seq & 0xFFFFFFFF,
+                header.timestamp_ms,
+                header.sample_rate,
+                level,
+            ),
+            session_bytes,
+            audio,
+        )
+    )
+
+
+def decode_audio_frame(frame: bytes) -> Tuple[AudioFrameHeader, memoryview]:
+    """バイナリフレームを解析し、ヘッダーと音声データのビュー（コピーなし）を返す"""
+    if len(frame) < HEADER_SIZE:
+        raise ValueError("Audio frame too short")
+
+    (
+        version,
+        codec,
+        session_len,
+        user_id,
+        seq,
+        timestamp_ms,
+        sample_rate,
+        level,
+    ) = _HEADER.unpack_from(frame)
+
+    if version != AUDIO_FRAME_VERSION:
+        raise ValueError(f"Unsupported audio frame version: {version}")
+    try:
+        codec = AudioCodec(codec)
+    except ValueError:
+        raise ValueError(f"Unsupported audio codec: {codec}")
+
+    payload_offset = HEADER_SIZE + session_len
+    if len(frame) < payload_offset:
+        raise ValueError("Audio frame truncated")
+
+    view = memoryview(frame)
+    header = AudioFrameHeader(
+        session_id=str(view[HEADER_SIZE:payload_offset], "utf-8"),
+        user_id=user_id,
+        seq=seq,
+        timestamp_ms=timestamp_ms,
+        sample_rate=sample_rate,
+        codec=codec,
+        level=level / _LEVEL_SCALE,
+    )
+    return header, view[payload_offset:]
@@ -1,5 +1,9 @@
+import asyncio
+import base64
+import json
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
@@ -11,8 +15,9 @@ from jose import JWTError, jwt
 from app.config import settings
 from app.models.user import User
 from app.core.database import get_db, AsyncSessionLocal
+from app.core.token_cache import VerifiedTokenCache
+from app.core.user_cache import get_user_by_firebase_uid, get_user_by_id
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 logger = structlog.get_logger()
 
@@ -97,9 +102,29 @@ def verify_jwt_token(token: str) -> Optional[dict]:
         return None
 
 
+# 検証済みトークンのキャッシュ
+token_cache = VerifiedTokenCache(
+    max_size=settings.FIREBASE_TOKEN_CACHE_SIZE,
+    revocation_check_interval=settings.FIREBASE_REVOCATION_CHECK_INTERVAL,
+)
+_revocation_refresh_task: Optional[asyncio.Task] = None
+
+# get_users() に一度に渡せる識別子の上限
+_GET_USERS_BATCH_SIZE = 100
+
+
 async def verify_firebase_token(id_token: str) -> Optional[dict]:
-    """Firebaseトークン検証"""
+    """Firebaseトークン検証
+
+    検証済みトークンはexpまでキャッシュする。署名検証はイベントループを
+    ブロックしないようスレッドで行い、失効チェックはユーザーごとに
+    FIREBASE_REVOCATION_CHECK_INTERVAL 秒に1回だけFirebaseへ問い合わせる。
+    """
     try:
+        cached = token_cache.get(id_token)
+        if cached is not None:
+            return cached
+
         # Firebaseアプリケーションを取得（必要に応じて初期化）
         firebase_app = get_firebase_app()
         if not firebase_app:
@@ -107,15 +132,121 @@ async def verify_firebase_token(id_token: str) -> Optional[dict]:
             return None
 
         # 時刻の許容範囲を設定（60秒）
-        decoded_token = auth.verify_id_token(
-            id_token, check_revoked=True, clock_skew_seconds=60
+        decoded_token = await asyncio.to_thread(
+            auth.verify_id_token, id_token, check_revoked=False, clock_skew_seconds=60
         )
+
+        uid = decoded_token.get("uid")
+        if token_cache.needs_revocation_check(uid):
+            await refresh_revocation_states([uid], purge=False)
+        if token_cache.is_revoked(decoded_token):
+            logger.warning("Firebase token has been revoked or user disabled", uid=uid)
+            return None
+
+        token_cache.put(id_token, decoded_token)
+        _ensure_revocation_refresher()
         return decoded_token
     except Exception as e:
         logger.error(f"Firebase token verification failed: {e}")
         return None
 
 
+def _fetch_revocation_states(uids: List[str]) -> Dict[str, Tuple[float, bool]]:
+    """Firebaseからユーザーの失効状態をまとめて取得（同期・スレッドで実行）"""
+    states: Dict[str, Tuple[float, bool]] = {}
+    for i in range(0, len(uids), _GET_USERS_BATCH_SIZE):
+        batch = uids[i : i + _GET_USERS_BATCH_SIZE]
+        result = auth.get_users([auth.UidIdentifier(uid) for uid in batch])
+        for user in result.users:
+            valid_after_ms = user.tokens_valid_after_timestamp or 0
+            states[user.uid] = (valid_after_ms / 1000, user.disabled)
+        # 削除済みユーザーは無効化扱い
+        for identifier in result.not_found:
+            states[identifier.uid] = (0.0, True)
+    return states
+
+
+async def refresh_revocation_states(uids: List[str], purge: bool = True) -> None:
+    """ユーザーの失効状態を更新し、失効したトークンをキャッシュから除く"""
+    if not uids:
+        return
+    states = await asyncio.to_thread(_fetch_revocation_states, uids)
+    for uid, (valid_after, disabled) in states.items():
+        token_cache.update_revocation(uid, valid_after, disabled)
+    if purge:
+        token_cache.purge()
+
+
+def _prefetch_token(project_id: str) -> str:
+    """署名だけが不正なIDトークン（クレームの検査は通り、公開鍵の取得まで進む）"""
+    now = int(time.time())
+    parts = [
+        {"alg": "RS256", "kid": "prefetch", "typ": "JWT"},
+        {
+            "aud": project_id,
+            "iss": f"https://securetoken.google.com/{project_id}",
+            "sub": "prefetch",
+            "iat": now,
+            "exp": now + 60,
+        },
+    ]
+    encoded = [
+        base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+        for part in parts
+    ]
+    return ".".join(encoded + ["c2lnbmF0dXJl"])
+
+
+def prefetch_firebase_certs() -> bool:
+    """IDトークン検証用の公開鍵（JWKS）を事前取得してHTTPキャッシュを温める
+
+    公開APIだけで取得するため、ダミーのトークンを verify_id_token() に渡す。
+    公開鍵を取得したあと署名の検証で失敗するので、その例外は想定どおりとして扱う。
+    """
+    try:
+        firebase_app = get_firebase_app()
+        if not firebase_app or not firebase_app.project_id:
+            return False
+
+        try:
+            auth.verify_id_token(_prefetch_token(firebase_app.project_id), app=firebase_app)
+        except auth.InvalidIdTokenError:
+            pass
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to prefetch Firebase public keys: {e}")
+        return False
+
+
+async def _revocation_refresher() -> None:
+    """キャッシュ中のユーザーの失効状態と公開鍵を定期的に更新"""
+    while True:
+        try:
+            await asyncio.sleep(settings.FIREBASE_REVOCATION_CHECK_INTERVAL)
+            await refresh_revocation_states(token_cache.stale_uids())
+            await asyncio.to_thread(prefetch_firebase_certs)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Failed to refresh Firebase revocation states: {e}")
+
+
+def _ensure_revocation_refresher() -> None:
+    """定期更新タスクを（未起動なら）起動"""
+    global _revocation_refresh_task
+    if _revocation_refresh_task is None or _revocation_refresh_task.done():
+        _revocation_refresh_task = asyncio.create_task(_revocation_refresher())
+
+
+async def stop_revocation_refresher() -> None:
+    """定期更新タスクを停止"""
+    global _revocation_refresh_task
+    if _revocation_refresh_task is not None:
+        _revocation_refresh_task.cancel()
+        await asyncio.gather(_revocation_refresh_task, return_exceptions=True)
+        _revocation_refresh_task = None
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
     db: AsyncSession = Depends(get_db),
@@ -138,10 +269,7 @@ async def get_current_user(
                 try:
                     # JWTのsubフィールドからユーザーIDを取得（int型として処理）
                     user_id_int = int(user_id) if isinstance(user_id, str) else user_id
-                    result = await db.execute(
-                        select(User).where(User.id == user_id_int)
-                    )
-                    user = result.scalar_one_or_none()
+                    user = await get_user_by_id(db, user_id_int)
                     if user:
                         return user
                 except (ValueError, TypeError) as e:
@@ -171,8 +299,7 @@ async def get_current_user(
 
             try:
                 # Firebase UIDでユーザーを検索
-                result = await db.execute(select(User).where(User.firebase_uid == uid))
-                user = result.scalar_one_or_none()
+                user = await get_user_by_firebase_uid(db, uid)
 
                 if user is None:
                     raise credentials_exception
@@ -240,11 +367,7 @@ async def get_current_user_from_token(token: str) -> Optional[User]:
                     # JWTのsubフィールドからユーザーIDを取得（int型として処理）
                     user_id_int = int(user_id) if isinstance(user_id, str) else user_id
                     async with AsyncSessionLocal() as db:
-                        result = await db.execute(
-                            select(User).where(User.id == user_id_int)
-                        )
-                        user = result.scalar_one_or_none()
-                        return user
+                        return await get_user_by_id(db, user_id_int, attach=False)
                 except (ValueError, TypeError) as e:
                     logger.error(
                         f"Invalid user ID format in JWT from token: {user_id}, error: {e}"
@@ -267,11 +390,7 @@ async def get_current_user_from_token(token: str) -> Optional[User]:
 
             try:
                 async with AsyncSessionLocal() as db:
-                    result = await db.execute(
-                        select(User).where(User.firebase_uid == uid)
-                    )
-                    user = result.scalar_one_or_none()
-                    return user
+                    return await get_user_by_firebase_uid(db, uid, attach=False)
             except Exception as db_error:
                 logger.error(
                     f"Database error during Firebase user lookup from token: {db_error}"
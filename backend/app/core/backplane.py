@@ -0,0 +1,288 @@
+"""
+WebSocket配信のバックプレーン（ワーカー・ノード間のPub/Sub）
+
+セッション宛て・ユーザー宛てのブロードキャストをバックプレーンに流すことで、
+他のワーカー（プロセス）やノードが保持しているソケットにも届ける。
+各ワーカーは自分が接続を持っているセッション・ユーザーのチャネルだけを購読する。
+
+自ワーカー内の配信はバックプレーンを経由せずに直接行い、バックプレーンは
+他ワーカーへの転送だけを担う（自分が発行したメッセージは受信時に捨てる）。
+"""
+
+import asyncio
+import base64
+import json
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Union
+
+import structlog
+
+from app.config import settings
+from app.core.outbound_queue import Payload
+
+logger = structlog.get_logger()
+
+TARGET_SESSION = "session"
+TARGET_USER = "user"
+
+CHANNEL_PREFIX = "ws"
+
+
+def session_channel(session_id: str) -> str:
+    """セッション宛てメッセージのチャネル名"""
+    return f"{CHANNEL_PREFIX}:{TARGET_SESSION}:{session_id}"
+
+
+def user_channel(user_id: int) -> str:
+    """ユーザー宛てメッセージのチャネル名"""
+    return f"{CHANNEL_PREFIX}:{TARGET_USER}:{user_id}"
+
+
+@dataclass
+class BackplaneMessage:
+    """バックプレーンを流れるメッセージ"""
+
+    origin: str  # 発行したワーカーのノードID
+    target: str  # TARGET_SESSION または TARGET_USER
+    key: str  # セッションID または ユーザーID
+    payload: Payload  # エンコード済みのペイロード（そのままソケットへ送る）
+    message_class: str
+    coalesce_key: Optional[str] = None
+    exclude_connection: Optional[str] = None
+
+    @property
+    def channel(self) -> str:
+        return f"{CHANNEL_PREFIX}:{self.target}:{self.key}"
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        if isinstance(self.payload, bytes):
+            data["payload"] = base64.b64encode(self.payload).decode("ascii")
+            data["binary"] = True
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: Union[str, bytes]) -> "BackplaneMessage":
+        data = json.loads(raw)
+        if data.pop("binary", False):
+            data["payload"] = base64.b64decode(data["payload"])
+        return cls(**data)
+
+
+MessageHandler = Callable[[BackplaneMessage], Awaitable[Any]]
+
+
+class Backplane(ABC):
+    """バックプレーンの基底クラス"""
+
+    backend = "base"
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self.handler: Optional[MessageHandler] = None
+        self.channels: Set[str] = set()
+
+        # 統計情報
+        self.stats = {
+            "published": 0,
+            "received": 0,
+            "ignored_own": 0,
+            "errors": 0,
+        }
+
+    async def start(self, handler: MessageHandler):
+        """受信したメッセージの配信先を登録して開始"""
+        self.handler = handler
+
+    async def stop(self):
+        """停止"""
+        self.handler = None
+
+    def subscribe(self, channel: str):
+        """チャネルを購読（このワーカーに該当する接続ができたとき）"""
+        self.channels.add(channel)
+
+    def unsubscribe(self, channel: str):
+        """チャネルの購読を解除（このワーカーの該当接続がなくなったとき）"""
+        self.channels.discard(channel)
+
+    @abstractmethod
+    async def publish(self, message: BackplaneMessage):
+        """他のワーカーへメッセージを発行"""
+
+    async def _receive(self, message: BackplaneMessage):
+        """受信したメッセージをハンドラへ渡す"""
+        if message.origin == self.node_id:
+            self.stats["ignored_own"] += 1
+            return
+        if self.handler is None or message.channel not in self.channels:
+            return
+        self.stats["received"] += 1
+        try:
+            await self.handler(message)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Backplane message delivery failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "backend": self.backend,
+            "node_id": self.node_id,
+            "subscribed_channels": len(self.channels),
+        }
+
+
+class InMemoryBackplane(Backplane):
+    """プロセス内のバックプレーン
+
+    同じハブを共有するインスタンス間でメッセージを転送する。ハブを共有しない
+    既定の構成では他のワーカーは存在しないため、発行は何もしない（単一ワーカー用）。
+    """
+
+    backend = "memory"
+
+    def __init__(self, hub: Optional[Dict[str, Set["InMemoryBackplane"]]] = None):
+        super().__init__()
+        # チャネル -> 購読しているバックプレーン
+        self.hub = hub if hub is not None else {}
+
+    def subscribe(self, channel: str):
+        super().subscribe(channel)
+        self.hub.setdefault(channel, set()).add(self)
+
+    def unsubscribe(self, channel: str):
+        super().unsubscribe(channel)
+        subscribers = self.hub.get(channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.hub[channel]
+
+    async def publish(self, message: BackplaneMessage):
+        peers = [peer for peer in self.hub.get(message.channel, ()) if peer is not self]
+        self.stats["published"] += 1
+        if peers:
+            await asyncio.gather(*(peer._receive(message) for peer in peers))
+
+
+class RedisBackplane(Backplane):
+    """Redis Pub/Sub を使ったバックプレーン
+
+    購読・解除はコントロールキューで順番に処理し、受信は単一のリスナータスクで行う。
+    Redisに接続できない間も自ワーカー内の配信は影響を受けない。
+    """
+
+    backend = "redis"
+
+    def __init__(self, redis_client=None, redis_url: Optional[str] = None):
+        super().__init__()
+        if redis_client is None:
+            from redis import asyncio as aioredis
+
+            redis_client = aioredis.from_url(
+                redis_url or settings.WS_MESSAGE_QUEUE_URL, decode_responses=True
+            )
+        self.redis = redis_client
+        self.pubsub = None
+        self._control: Optional[asyncio.Queue] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def node_channel(self) -> str:
+        # 購読対象が空でもPub/Sub接続を維持するためのノード専用チャネル
+        return f"{CHANNEL_PREFIX}:node:{self.node_id}"
+
+    async def start(self, handler: MessageHandler):
+        await super().start(handler)
+        self.pubsub = self.redis.pubsub()
+        await self.pubsub.subscribe(self.node_channel)
+        if self.channels:
+            await self.pubsub.subscribe(*self.channels)
+        self._control = asyncio.Queue()
+        self._tasks = {
+            asyncio.create_task(self._run_control()),
+            asyncio.create_task(self._listen()),
+        }
+        logger.info("Redis backplane started", node_id=self.node_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = set()
+        self._control = None
+        if self.pubsub is not None:
+            try:
+                await self.pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close backplane pubsub: {e}")
+            self.pubsub = None
+        await super().stop()
+
+    def subscribe(self, channel: str):
+        if channel in self.channels:
+            return
+        super().subscribe(channel)
+        if self._control is not None:
+            self._control.put_nowait(("subscribe", channel))
+
+    def unsubscribe(self, channel: str):
+        if channel not in self.channels:
+            return
+        super().unsubscribe(channel)
+        if self._control is not None:
+            self._control.put_nowait(("unsubscribe", channel))
+
+    async def publish(self, message: BackplaneMessage):
+        try:
+            await self.redis.publish(message.channel, message.to_json())
+            self.stats["published"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Backplane publish failed: {e}")
+
+    async def _run_control(self):
+        """購読・解除を発行順に処理"""
+        while True:
+            action, channel = await self._control.get()
+            try:
+                if action == "subscribe":
+                    await self.pubsub.subscribe(channel)
+                else:
+                    await self.pubsub.unsubscribe(channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Backplane {action} failed for {channel}: {e}")
+
+    async def _listen(self):
+        """Pub/Subからメッセージを受信して配信"""
+        while True:
+            try:
+                raw = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if raw is None or raw.get("type") != "message":
+                    continue
+                await self._receive(BackplaneMessage.from_json(raw["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Backplane listener error: {e}")
+                await asyncio.sleep(1.0)
+
+
+def create_backplane() -> Backplane:
+    """設定に応じたバックプレーンを生成"""
+    if settings.WS_BACKPLANE_BACKEND == "redis":
+        try:
+            return RedisBackplane()
+        except Exception as e:
+            logger.warning(f"Failed to initialize Redis backplane: {e}")
+    return InMemoryBackplane()
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy import event, text
+from typing import Any, Dict
 import structlog
 import os
 from fastapi import HTTPException, status
@@ -28,6 +29,87 @@ def get_database_url():
     return DATABASE_URL
 
 
+def get_engine_options(database_url: str) -> Dict[str, Any]:
+    """設定に応じたエンジンのオプションを取得
+
+    DB_POOL_MODE="queue"（デフォルト）では接続プールを使い、HTTPとWebSocketの
+    両経路で接続を共有する。"null" では従来どおり毎回接続を張る
+    （PgBouncerのトランザクションモード配下などで使用）。
+    """
+    options: Dict[str, Any] = {
+        "echo": settings.DEBUG,
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if settings.DB_POOL_MODE == "null":
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    # asyncpgのプリペアドステートメントキャッシュ
+    if database_url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+
+    return options
+
+
+# プールのイベント統計
+pool_events: Dict[str, int] = {
+    "connects": 0,
+    "checkouts": 0,
+    "checkins": 0,
+    "invalidations": 0,
+}
+
+
+def _register_pool_listeners(async_engine) -> None:
+    """プールのイベントを統計に記録"""
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_events["connects"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_events["checkouts"] += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_events["checkins"] += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_events["invalidations"] += 1
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """接続プールの統計を取得"""
+    if engine is None:
+        return {"mode": "uninitialized"}
+
+    pool = engine.pool
+    stats: Dict[str, Any] = {"mode": settings.DB_POOL_MODE, **pool_events}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+    return stats
+
+
 # 事前定義（Alembic実行時に未定義参照を避ける）
 engine = None
 AsyncSessionLocal = None  # type: ignore
@@ -37,14 +119,9 @@ async_session = None  # type: ignore
 if not os.environ.get("ALEMBIC_RUNNING"):
     # 非同期エンジン作成
     engine = create_async_engine(
-        get_database_url(),
-        echo=settings.DEBUG,
-        poolclass=NullPool,
-        future=True,
-        # 接続プールの設定
-        pool_pre_ping=True,
-        pool_recycle=3600,
+        get_database_url(), **get_engine_options(get_database_url())
     )
+    _register_pool_listeners(engine)
 
     # セッションファクトリー作成
     AsyncSessionLocal = async_sessionmaker(
@@ -55,6 +132,12 @@ if not os.environ.get("ALEMBIC_RUNNING"):
     async_session = AsyncSessionLocal
 
 
+async def dispose_engine() -> None:
+    """接続プールを閉じる（シャットダウン時）"""
+    if engine is not None:
+        await engine.dispose()
+
+
 # ベースクラスは後で import（循環import回避）
 
 
@@ -2,19 +2,49 @@
 WebSocketメッセージハンドラーの初期化とルーター登録
 """
 
+import base64
 import json
 import asyncio
-from typing import Dict, Any, Optional
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional
 from datetime import datetime
 import structlog
+from pydantic import ValidationError as PydanticValidationError
 
 from app.core.websocket import manager
+from app.core.outbound_queue import MessageClass
+from app.core.message_router import (
+    DispatchEntry,
+    QueuedMessage,
+    message_router,
+)
+from app.core.audio_frames import (
+    AUDIO_TRANSPORT_BINARY,
+    AudioCodec,
+    AudioFrameHeader,
+    decode_audio_frame,
+    encode_audio_frame,
+)
+from app.schemas.websocket import (
+    AudioDataPayload,
+    ChatMessagePayload,
+    JoinSessionPayload,
+    LeaveSessionPayload,
+    ParticipantActionPayload,
+    SessionControlPayload,
+    SetAudioLevelRatePayload,
+)
 from app.services.participant_management_service import (
     participant_management_service,
     ParticipantRole,
     ParticipantStatus
 )
 from app.services.voice_session_service import VoiceSessionService
+from app.services.audio_forwarding import ForwardingMode, audio_forwarder
+from app.services.transcription_service import (
+    TranscriptionChunk,
+    realtime_transcription_manager,
+)
 from app.core.database import get_db
 from app.core.exceptions import (
     BridgeLineException,
@@ -26,6 +56,15 @@ from app.core.exceptions import (
 logger = structlog.get_logger()
 
 
+def _is_audio_recipient(participant: Any, sender_id: int) -> bool:
+    """音声の中継先か（送信者本人・未接続・ミュート中の参加者は除く）"""
+    return (
+        participant.user_id != sender_id
+        and bool(participant.connection_id)
+        and participant.status != ParticipantStatus.MUTED
+    )
+
+
 class WebSocketMessageHandler:
     """WebSocketメッセージハンドラー"""
     
@@ -39,68 +78,35 @@ class WebSocketMessageHandler:
         """WebSocketメッセージを処理"""
         try:
             message_type = message.get("type")
+            entry = _dispatch_table.get(message_type)
             
-            if message_type == "join_session":
-                await WebSocketMessageHandler.handle_join_session(
-                    message.get("session_id"),
-                    connection_id,
-                    user,
-                    message.get("role", "participant")
-                )
-                
-            elif message_type == "leave_session":
-                await WebSocketMessageHandler.handle_leave_session(
-                    message.get("session_id"),
-                    connection_id,
-                    user
-                )
-                
-            elif message_type == "audio_data":
-                await WebSocketMessageHandler.handle_audio_data(
-                    message.get("session_id"),
-                    connection_id,
-                    user,
-                    message.get("audio_data"),
-                    message.get("audio_level", 0.0)
-                )
-                
-            elif message_type == "chat_message":
-                await WebSocketMessageHandler.handle_chat_message(
-                    message.get("session_id"),
-                    connection_id,
-                    user,
-                    message.get("message"),
-                    message.get("message_type", "text")
-                )
-                
-            elif message_type == "participant_action":
-                await WebSocketMessageHandler.handle_participant_action(
-                    message.get("session_id"),
-                    connection_id,
-                    user,
-                    message.get("action"),
-                    message.get("target_user_id"),
-                    message.get("action_data", {})
-                )
-                
-            elif message_type == "session_control":
-                await WebSocketMessageHandler.handle_session_control(
-                    message.get("session_id"),
-                    connection_id,
-                    user,
-                    message.get("control_type"),
-                    message.get("control_data", {})
-                )
-                
-            elif message_type == "ping":
-                await WebSocketMessageHandler.handle_ping(connection_id)
-                
-            else:
+            if entry is None:
                 logger.warning(f"Unknown message type: {message_type}")
                 await manager.send_personal_message(
                     {"type": "error", "message": f"Unknown message type: {message_type}"},
                     connection_id
                 )
+                return
+            
+            if entry.schema is not None:
+                try:
+                    entry.schema.model_validate(message)
+                except PydanticValidationError as e:
+                    logger.warning(
+                        f"Invalid {message_type} message: {e.error_count()} errors",
+                        connection_id=connection_id
+                    )
+                    await manager.send_personal_message(
+                        {"type": "error", "message": f"Invalid message: {message_type}"},
+                        connection_id
+                    )
+                    return
+            
+            start_time = time.perf_counter()
+            try:
+                await entry.handler(message, connection_id, user)
+            finally:
+                entry.latency.observe((time.perf_counter() - start_time) * 1000)
                 
         except Exception as e:
             logger.error(f"Message handling error: {e}", connection_id=connection_id)
@@ -235,37 +241,182 @@ class WebSocketMessageHandler:
         audio_data: str,
         audio_level: float
     ) -> None:
-        """音声データ処理"""
+        """音声データ処理（JSONフォールバック）"""
         try:
             # 音声レベルを更新
             await participant_management_service.update_audio_level(
                 session_id, user.id, audio_level
             )
             
-            # 音声データを他の参加者に転送
-            participants = await participant_management_service.get_session_participants(session_id)
+            await WebSocketMessageHandler._relay_audio(
+                session_id, user, audio_level, audio_b64=audio_data
+            )
             
-            for participant in participants:
-                if (participant.user_id != user.id and 
-                    participant.connection_id and 
-                    participant.status != ParticipantStatus.MUTED):
-                    
-                    await manager.send_personal_message(
-                        {
-                            "type": "audio_data",
-                            "session_id": session_id,
-                            "user_id": user.id,
-                            "display_name": user.display_name,
-                            "audio_data": audio_data,
-                            "audio_level": audio_level,
-                            "timestamp": datetime.now().isoformat()
-                        },
-                        participant.connection_id
-                    )
+            if realtime_transcription_manager.is_session_active(session_id):
+                # audio_level はクライアントが計算したRMS（省略時の0.0は未計算として扱う）
+                await WebSocketMessageHandler._feed_transcription(
+                    session_id, user, base64.b64decode(audio_data), rms=audio_level or None
+                )
                     
         except Exception as e:
             logger.error(f"音声データ処理に失敗: {e}", session_id=session_id, user_id=user.id)
     
+    @staticmethod
+    async def handle_audio_frame(
+        session_id: str,
+        connection_id: str,
+        user: Any,
+        frame: bytes
+    ) -> None:
+        """バイナリ音声フレーム処理"""
+        try:
+            header, audio = decode_audio_frame(frame)
+        except ValueError as e:
+            await manager.send_personal_message(
+                {"type": "error", "message": f"Invalid audio frame: {e}"},
+                connection_id
+            )
+            return
+        
+        # 他人・他セッションになりすましたフレームは中継しない
+        if header.session_id != session_id or header.user_id != user.id:
+            await manager.send_personal_message(
+                {"type": "error", "message": "Audio frame header mismatch"},
+                connection_id
+            )
+            return
+        
+        try:
+            await participant_management_service.update_audio_level(
+                session_id,
+                user.id,
+                header.level,
+                timestamp=header.timestamp_ms / 1000,
+                duration=(
+                    len(audio) / (2 * header.sample_rate)
+                    if header.codec == AudioCodec.PCM16 and header.sample_rate
+                    else None
+                ),
+            )
+            
+            await WebSocketMessageHandler._relay_audio(
+                session_id, user, header.level, frame=frame, header=header, audio=audio
+            )
+            
+            if (
+                header.codec == AudioCodec.PCM16
+                and realtime_transcription_manager.is_session_active(session_id)
+            ):
+                await WebSocketMessageHandler._feed_transcription(
+                    session_id,
+                    user,
+                    bytes(audio),
+                    sample_rate=header.sample_rate,
+                    timestamp=datetime.fromtimestamp(header.timestamp_ms / 1000),
+                    rms=header.level
+                )
+            
+        except Exception as e:
+            logger.error(f"音声フレーム処理に失敗: {e}", session_id=session_id, user_id=user.id)
+    
+    @staticmethod
+    async def _feed_transcription(
+        session_id: str,
+        user: Any,
+        audio: bytes,
+        sample_rate: int = 16000,
+        timestamp: Optional[datetime] = None,
+        rms: Optional[float] = None
+    ) -> None:
+        """転写中のセッションの音声を発話区間検出へ渡す
+
+        rms には受信した音声レベルを渡し、発話区間検出での再計算を省く。
+        転写はスケジューラーで実行され、結果は _broadcast_transcription で
+        セッションへ配信されるため、ここでは転写を待たない。
+        """
+        await realtime_transcription_manager.process_audio_chunk(
+            session_id, user.id, audio, timestamp or datetime.now(), sample_rate, rms=rms
+        )
+    
+    @staticmethod
+    async def _relay_audio(
+        session_id: str,
+        user: Any,
+        audio_level: float,
+        audio_b64: Optional[str] = None,
+        frame: Optional[bytes] = None,
+        header: Optional[AudioFrameHeader] = None,
+        audio: Optional[memoryview] = None
+    ) -> None:
+        """音声を他の参加者に中継する
+
+        受信者ごとにネゴシエーション済みの形式（バイナリ/JSON）で送る。
+        各形式のペイロードは高々一度だけ生成し、受信したバイナリフレームは
+        そのまま（コピーせず）全バイナリ受信者の送信キューへ積む。
+        """
+        participants = await participant_management_service.get_session_participants(session_id)
+        
+        # SFU/MCUでは上位K人の話者だけを扱い、MCUではミックスに回す
+        if audio_forwarder.mode != ForwardingMode.RELAY:
+            if audio is None and audio_b64 is not None and audio_forwarder.mode == ForwardingMode.MCU:
+                audio = memoryview(base64.b64decode(audio_b64))
+            if not audio_forwarder.accept(
+                session_id,
+                user.id,
+                participants,
+                audio=audio,
+                sample_rate=header.sample_rate if header is not None else 16000,
+                codec=header.codec if header is not None else AudioCodec.PCM16,
+            ):
+                return
+        
+        binary_recipients = []
+        json_recipients = []
+        for participant in participants:
+            if not _is_audio_recipient(participant, user.id):
+                continue
+            
+            if manager.get_audio_transport(participant.connection_id) == AUDIO_TRANSPORT_BINARY:
+                binary_recipients.append(participant.connection_id)
+            else:
+                json_recipients.append(participant.connection_id)
+        
+        if binary_recipients:
+            if frame is None:
+                frame = encode_audio_frame(
+                    AudioFrameHeader(
+                        session_id=session_id,
+                        user_id=user.id,
+                        seq=0,
+                        timestamp_ms=int(time.time() * 1000),
+                        sample_rate=16000,
+                        level=audio_level
+                    ),
+                    base64.b64decode(audio_b64)
+                )
+            await manager.fan_out(frame, binary_recipients, MessageClass.AUDIO)
+        
+        if json_recipients:
+            if audio_b64 is None:
+                audio_b64 = base64.b64encode(audio).decode("ascii")
+            timestamp = (
+                datetime.fromtimestamp(header.timestamp_ms / 1000)
+                if header is not None
+                else datetime.now()
+            )
+            payload = json.dumps(
+                {
+                    "type": "audio_data",
+                    "session_id": session_id,
+                    "user_id": user.id,
+                    "display_name": user.display_name,
+                    "audio_data": audio_b64,
+                    "audio_level": audio_level,
+                    "timestamp": timestamp.isoformat()
+                }
+            )
+            await manager.fan_out(payload, json_recipients, MessageClass.AUDIO)
+    
     @staticmethod
     async def handle_chat_message(
         session_id: str,
@@ -302,9 +453,11 @@ class WebSocketMessageHandler:
                 "timestamp": datetime.now().isoformat()
             }
             
-            for p in participants:
-                if p.connection_id:
-                    await manager.send_personal_message(chat_message, p.connection_id)
+            await manager.fan_out(
+                json.dumps(chat_message),
+                [p.connection_id for p in participants if p.connection_id],
+                MessageClass.CHAT
+            )
                     
             logger.info(
                 "チャットメッセージを送信",
@@ -456,17 +609,17 @@ class WebSocketMessageHandler:
                 
                 # 全参加者にセッション終了通知
                 participants = await participant_management_service.get_session_participants(session_id)
-                for p in participants:
-                    if p.connection_id:
-                        await manager.send_personal_message(
-                            {
-                                "type": "session_ended",
-                                "session_id": session_id,
-                                "ended_by": user.id,
-                                "message": "セッションが終了されました"
-                            },
-                            p.connection_id
-                        )
+                await manager.fan_out(
+                    json.dumps(
+                        {
+                            "type": "session_ended",
+                            "session_id": session_id,
+                            "ended_by": user.id,
+                            "message": "セッションが終了されました"
+                        }
+                    ),
+                    [p.connection_id for p in participants if p.connection_id]
+                )
                         
             else:
                 await manager.send_personal_message(
@@ -481,6 +634,40 @@ class WebSocketMessageHandler:
                 connection_id
             )
     
+    @staticmethod
+    async def handle_set_audio_level_rate(
+        session_id: str,
+        connection_id: str,
+        user: Any,
+        tick_hz: Optional[float]
+    ) -> None:
+        """音声レベル配信レートの変更処理"""
+        try:
+            tick_hz = await participant_management_service.set_audio_level_rate(
+                session_id, tick_hz, user.id
+            )
+            await manager.broadcast_to_session(
+                {
+                    "type": "audio_level_rate_updated",
+                    "session_id": session_id,
+                    "tick_hz": tick_hz,
+                    "changed_by": user.id
+                },
+                session_id
+            )
+
+        except (PermissionException, ValidationException) as e:
+            await manager.send_personal_message(
+                {"type": "control_error", "message": str(e)},
+                connection_id
+            )
+        except Exception as e:
+            logger.error(f"音声レベル配信レートの変更に失敗: {e}", session_id=session_id, user_id=user.id)
+            await manager.send_personal_message(
+                {"type": "control_error", "message": "音声レベル配信レートの変更に失敗しました"},
+                connection_id
+            )
+
     @staticmethod
     async def handle_ping(connection_id: str) -> None:
         """ping応答"""
@@ -506,8 +693,145 @@ class WebSocketMessageHandler:
         pass
 
 
+# メッセージタイプ → (message, connection_id, user) を受け取るディスパッチ関数・
+# 受信ペイロードのスキーマ・ハンドラー処理時間
+_dispatch_table: Dict[str, DispatchEntry] = {}
+
+# MessageRouter経由で処理するAI分析メッセージ → app.core.websocket.WebSocketMessageHandler のメソッド名
+AI_ANALYSIS_HANDLERS = {
+    "ai_analysis_subscribe": "handle_ai_analysis_subscribe",
+    "ai_analysis_unsubscribe": "handle_ai_analysis_unsubscribe",
+    "ai_analysis_request": "handle_ai_analysis_request",
+    "ai_analysis_progress_request": "handle_ai_analysis_progress_request",
+    "ai_analysis_cancel": "handle_ai_analysis_cancel",
+}
+
+
+def _build_dispatch_table() -> None:
+    """handle_message用のディスパッチテーブルを構築"""
+    handler = WebSocketMessageHandler
+    handlers = {
+        "join_session": (
+            lambda m, c, u: handler.handle_join_session(
+                m.get("session_id"), c, u, m.get("role", "participant")
+            ),
+            JoinSessionPayload,
+        ),
+        "leave_session": (
+            lambda m, c, u: handler.handle_leave_session(m.get("session_id"), c, u),
+            LeaveSessionPayload,
+        ),
+        "audio_data": (
+            lambda m, c, u: handler.handle_audio_data(
+                m.get("session_id"), c, u, m.get("audio_data"), m.get("audio_level", 0.0)
+            ),
+            AudioDataPayload,
+        ),
+        "chat_message": (
+            lambda m, c, u: handler.handle_chat_message(
+                m.get("session_id"), c, u, m.get("message"), m.get("message_type", "text")
+            ),
+            ChatMessagePayload,
+        ),
+        "participant_action": (
+            lambda m, c, u: handler.handle_participant_action(
+                m.get("session_id"), c, u, m.get("action"), m.get("target_user_id"), m.get("action_data", {})
+            ),
+            ParticipantActionPayload,
+        ),
+        "session_control": (
+            lambda m, c, u: handler.handle_session_control(
+                m.get("session_id"), c, u, m.get("control_type"), m.get("control_data", {})
+            ),
+            SessionControlPayload,
+        ),
+        "set_audio_level_rate": (
+            lambda m, c, u: handler.handle_set_audio_level_rate(
+                m.get("session_id"), c, u, m.get("tick_hz")
+            ),
+            SetAudioLevelRatePayload,
+        ),
+        "ping": (lambda m, c, u: handler.handle_ping(c), None),
+    }
+    for message_type, (dispatch, schema) in handlers.items():
+        # 再構築しても処理時間の統計は引き継ぐ
+        if message_type not in _dispatch_table:
+            _dispatch_table[message_type] = DispatchEntry(handler=dispatch, schema=schema)
+
+
+def _queued_message_adapter(handler: Callable) -> Callable[[QueuedMessage], Awaitable[None]]:
+    """(session_id, connection_id, user_id, message) 形式のハンドラーをMessageRouter用に変換"""
+    async def dispatch(queued_message: QueuedMessage) -> None:
+        await handler(
+            queued_message.message.get("session_id", "default"),
+            queued_message.metadata.get("connection_id"),
+            queued_message.user_id,
+            queued_message.message
+        )
+    return dispatch
+
+
+def _register_router_handlers() -> None:
+    """MessageRouterのディスパッチテーブルにハンドラーを登録"""
+    from app.core.websocket import WebSocketMessageHandler as ConnectionMessageHandler
+    
+    for message_type, method_name in AI_ANALYSIS_HANDLERS.items():
+        handler = getattr(ConnectionMessageHandler, method_name, None)
+        if handler is None:
+            # 実装されていないハンドラーは起動時に一度だけ警告する
+            logger.warning(f"AI分析ハンドラーが見つかりません: {method_name}")
+            continue
+        message_router.register_handler(message_type, _queued_message_adapter(handler))
+
+
+async def _broadcast_transcription(session_id: str, chunk: TranscriptionChunk) -> None:
+    """非同期に得られた転写結果をセッションへ配信
+
+    部分転写は話者ごとに最新のものだけが送信キューに残るようにする。
+    """
+    message = {
+        "type": "transcription",
+        "session_id": session_id,
+        "speaker_id": chunk.speaker_id,
+        "text": chunk.text,
+        "is_final": chunk.is_final,
+        "start_time": chunk.start_time,
+        "end_time": chunk.end_time,
+        "confidence": chunk.confidence,
+        "language": chunk.language,
+    }
+    if chunk.is_final:
+        await manager.broadcast_to_session(message, session_id, message_class=MessageClass.CHAT)
+    else:
+        await manager.broadcast_to_session(
+            message,
+            session_id,
+            message_class=MessageClass.NOTIFICATION,
+            coalesce_key=f"transcription_partial:{session_id}:{chunk.speaker_id}"
+        )
+
+
+def get_handler_latency_stats() -> Dict[str, Any]:
+    """メッセージタイプごとのハンドラー処理時間を取得"""
+    return {
+        message_type: entry.latency.to_dict()
+        for message_type, entry in _dispatch_table.items()
+        if entry.latency.total
+    }
+
+
 def initialize_message_handlers():
     """WebSocketメッセージハンドラーを初期化"""
-    logger.info("WebSocketメッセージハンドラーを初期化しました")
-    # 現在は何もしない（必要に応じて初期化処理を追加）
+    _build_dispatch_table()
+    _register_router_handlers()
+    realtime_transcription_manager.add_result_listener(_broadcast_transcription)
+    logger.info(
+        "WebSocketメッセージハンドラーを初期化しました",
+        message_types=len(_dispatch_table),
+        router_handlers=len(message_router.dispatch_table)
+    )
     return True
+
+
+# インポート時にテーブルを構築しておく（initialize_message_handlers() は冪等）
+_build_dispatch_table()
@@ -1,12 +1,15 @@
 import asyncio
+import heapq
 import time
-from typing import Dict, List, Optional, Set, Any, Callable
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Any, Callable, Tuple, Type, Union
 from dataclasses import dataclass, field
 from enum import Enum
 import structlog
 from datetime import datetime, timedelta
 import json
 import bleach
+from pydantic import BaseModel, ValidationError as PydanticValidationError
 
 from app.schemas.websocket import (
     WebSocketMessageType,
@@ -15,6 +18,8 @@ from app.schemas.websocket import (
     WebSocketBaseMessage,
 )
 from app.models.user import User
+from app.config import settings
+from app.core.metrics import QUEUE_DEPTH_BOUNDS, Histogram
 
 logger = structlog.get_logger()
 
@@ -200,56 +205,245 @@ class MessageValidator:
         return False
 
 
-class RateLimiter:
-    """レート制限器"""
+@dataclass
+class TokenBucket:
+    """トークンバケット（ユーザー×優先度ごと）"""
 
-    def __init__(self):
-        self.user_requests: Dict[int, List[float]] = {}
+    tokens: float
+    updated_at: float
+
+
+class RateLimiter:
+    """レート制限器（トークンバケット方式）
+
+    バケットはユーザーと優先度の組ごとに持ち、判定はO(1)。
+    満タンまで回復するだけの時間アクセスのないバケットは、
+    再作成しても結果が変わらないため古い順に破棄する。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # 最終アクセス順に並ぶ（先頭が最も古い）
+        self.buckets: "OrderedDict[Tuple[int, MessagePriority], TokenBucket]" = (
+            OrderedDict()
+        )
         self.limits = {
             MessagePriority.LOW: (10, 60),  # 10回/分
             MessagePriority.NORMAL: (30, 60),  # 30回/分
             MessagePriority.HIGH: (60, 60),  # 60回/分
             MessagePriority.URGENT: (100, 60),  # 100回/分
         }
+        self.idle_ttl = max(window for _, window in self.limits.values())
+
+        # 統計情報
+        self.stats = {
+            "allowed": 0,
+            "rejected": 0,
+            "evicted": 0,
+        }
 
     async def is_allowed(self, user_id: int, priority: MessagePriority) -> bool:
         """レート制限チェック"""
-        current_time = time.time()
+        if self._consume(user_id, priority):
+            self.stats["allowed"] += 1
+            return True
 
-        if user_id not in self.user_requests:
-            self.user_requests[user_id] = []
+        self.stats["rejected"] += 1
+        logger.warning(
+            "Rate limit exceeded", user_id=user_id, priority=priority.value
+        )
+        return False
 
-        # 古いリクエストを削除
-        window_size = self.limits[priority][1]
-        self.user_requests[user_id] = [
-            req_time
-            for req_time in self.user_requests[user_id]
-            if current_time - req_time < window_size
-        ]
+    def _consume(self, user_id: int, priority: MessagePriority) -> bool:
+        """トークンを1つ消費する。不足していればFalse"""
+        current_time = self.clock()
+        max_requests, window_size = self.limits[priority]
+        key = (user_id, priority)
 
-        # 制限チェック
-        max_requests = self.limits[priority][0]
-        if len(self.user_requests[user_id]) >= max_requests:
-            logger.warning(
-                f"Rate limit exceeded", user_id=user_id, priority=priority.value
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(tokens=float(max_requests), updated_at=current_time)
+            self.buckets[key] = bucket
+        else:
+            # 経過時間分のトークンを補充
+            elapsed = current_time - bucket.updated_at
+            bucket.tokens = min(
+                float(max_requests),
+                bucket.tokens + elapsed * max_requests / window_size,
             )
+            bucket.updated_at = current_time
+            self.buckets.move_to_end(key)
+
+        self._evict_idle(current_time)
+
+        if bucket.tokens < 1.0:
             return False
 
-        # リクエストを記録
-        self.user_requests[user_id].append(current_time)
+        bucket.tokens -= 1.0
         return True
 
+    def _evict_idle(self, current_time: float):
+        """アイドル状態のバケットを古い順に破棄（償却O(1)）"""
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if current_time - bucket.updated_at < self.idle_ttl:
+                break
+            del self.buckets[key]
+            self.stats["evicted"] += 1
 
-class MessageRouter:
-    """メッセージルーター"""
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "backend": "memory",
+            "tracked_buckets": len(self.buckets),
+        }
 
-    def __init__(self):
-        self.message_queues: Dict[MessagePriority, asyncio.Queue] = {
-            priority: asyncio.Queue() for priority in MessagePriority
+
+class RedisRateLimiter(RateLimiter):
+    """Redisを使ったレート制限器
+
+    複数ワーカー間で同じ制限を共有する。アルゴリズムはインメモリ版と同じ
+    トークンバケットで、Luaスクリプトにより原子的に判定する。時刻にはRedisの
+    TIMEを使うためワーカー間の時計のずれの影響を受けない。
+    Redisに接続できない場合はインメモリ版にフォールバックする。
+    """
+
+    KEY_PREFIX = "ratelimit"
+
+    # KEYS[1]: バケットキー
+    # ARGV[1]: 容量, ARGV[2]: ウィンドウ（ミリ秒）
+    TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + (now - ts) * capacity / window_ms)
+end
+
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window_ms)
+return allowed
+"""
+
+    def __init__(self, redis_client=None, redis_url: Optional[str] = None):
+        super().__init__()
+        if redis_client is None:
+            from redis import asyncio as aioredis
+
+            redis_client = aioredis.from_url(redis_url or settings.REDIS_URL)
+        self.redis = redis_client
+        self._script = self.redis.register_script(self.TOKEN_BUCKET_SCRIPT)
+        self.stats["fallbacks"] = 0
+
+    async def is_allowed(self, user_id: int, priority: MessagePriority) -> bool:
+        """レート制限チェック"""
+        max_requests, window_size = self.limits[priority]
+        key = f"{self.KEY_PREFIX}:{user_id}:{priority.value}"
+
+        try:
+            allowed = bool(
+                await self._script(
+                    keys=[key], args=[max_requests, int(window_size * 1000)]
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limit check failed, using local limiter: {e}")
+            self.stats["fallbacks"] += 1
+            return await super().is_allowed(user_id, priority)
+
+        if allowed:
+            self.stats["allowed"] += 1
+            return True
+
+        self.stats["rejected"] += 1
+        logger.warning(
+            "Rate limit exceeded", user_id=user_id, priority=priority.value
+        )
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {**super().get_stats(), "backend": "redis"}
+
+
+def create_rate_limiter() -> RateLimiter:
+    """設定に応じたレート制限器を生成"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            return RedisRateLimiter()
+        except Exception as e:
+            logger.warning(f"Failed to initialize Redis rate limiter: {e}")
+    return RateLimiter()
+
+
+HANDLER_LATENCY_BOUNDS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000]
+
+
+@dataclass
+class DispatchEntry:
+    """ディスパッチテーブルのエントリ"""
+
+    handler: Callable
+    # ルーティング時に検証するスキーマ（Noneなら検証しない）
+    schema: Optional[Type[BaseModel]] = None
+    latency: Histogram = field(default_factory=lambda: Histogram(HANDLER_LATENCY_BOUNDS_MS))
+
+
+# 優先度の順位（小さいほど先に処理）
+PRIORITY_RANK: Dict[MessagePriority, int] = {
+    MessagePriority.URGENT: 0,
+    MessagePriority.HIGH: 1,
+    MessagePriority.NORMAL: 2,
+    MessagePriority.LOW: 3,
+}
+
+# 受信した priority 文字列 → (優先度, 順位)。未知の値は NORMAL として扱う
+PRIORITY_LOOKUP: Dict[str, Tuple[MessagePriority, int]] = {
+    priority.value: (priority, rank) for priority, rank in PRIORITY_RANK.items()
+}
+DEFAULT_PRIORITY = PRIORITY_LOOKUP[MessagePriority.NORMAL.value]
+
+WAIT_TIME_BOUNDS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+
+class MessageRouter:
+    """メッセージルーター
+
+    全優先度のメッセージを1つの優先度ヒープに積み、ワーカープールが
+    優先度順（同一優先度内はFIFO）に取り出して処理する。
+    リトライは遅延キューに積み、期限が来たらヒープに戻す。
+    """
+
+    def __init__(self, worker_count: int = 4):
+        self.worker_count = worker_count
+        # (優先度順位, 連番, メッセージ) のヒープ
+        self._heap: List[Tuple[int, int, QueuedMessage]] = []
+        # (実行可能時刻, 連番, メッセージ) のヒープ
+        self._delayed: List[Tuple[float, int, QueuedMessage]] = []
+        self._sequence = 0
+        self._ready = asyncio.Event()
+        self._delay_changed = asyncio.Event()
+        self.queue_depths: Dict[MessagePriority, int] = {
+            priority: 0 for priority in MessagePriority
         }
-        self.handlers: Dict[WebSocketMessageType, Callable] = {}
+        # メッセージタイプ（文字列）→ ハンドラー
+        self.dispatch_table: Dict[str, DispatchEntry] = {}
         self.validator = MessageValidator()
-        self.rate_limiter = RateLimiter()
+        self.rate_limiter = create_rate_limiter()
         self.processing_tasks: Set[asyncio.Task] = set()
         self.message_counter = 0
         self.active_sessions: Set[str] = set()
@@ -259,13 +453,33 @@ class MessageRouter:
             "messages_processed": 0,
             "messages_failed": 0,
             "messages_rejected": 0,
+            "messages_expired": 0,
+            "messages_retried": 0,
             "avg_processing_time": 0.0,
         }
-
-    def register_handler(self, message_type: WebSocketMessageType, handler: Callable):
-        """メッセージハンドラーの登録"""
-        self.handlers[message_type] = handler
-        logger.info(f"Registered handler for {message_type.value}")
+        self.wait_time_histograms: Dict[MessagePriority, Histogram] = {
+            priority: Histogram(WAIT_TIME_BOUNDS_MS) for priority in MessagePriority
+        }
+        self.queue_depth_histogram = Histogram(QUEUE_DEPTH_BOUNDS)
+
+    def register_handler(
+        self,
+        message_type: Union[WebSocketMessageType, str],
+        handler: Callable,
+        schema: Optional[Type[BaseModel]] = None,
+    ):
+        """メッセージハンドラーの登録
+
+        テーブルのキーは生の文字列なので、受信メッセージの "type" で
+        そのまま引ける（Enumの生成は不要）。
+        """
+        key = (
+            message_type.value
+            if isinstance(message_type, WebSocketMessageType)
+            else message_type
+        )
+        self.dispatch_table[key] = DispatchEntry(handler=handler, schema=schema)
+        logger.info(f"Registered handler for {key}")
 
     async def route_message(
         self, message: dict, user: User, session_id: str, connection_id: str
@@ -279,9 +493,21 @@ class MessageRouter:
                 self.stats["messages_rejected"] += 1
                 return False
 
+            # スキーマ検証（登録されている場合のみ）
+            entry = self.dispatch_table.get(message["type"])
+            if entry is not None and entry.schema is not None:
+                try:
+                    entry.schema.model_validate(message)
+                except PydanticValidationError as e:
+                    logger.warning(
+                        f"Message schema validation failed: {e}", user_id=user.id
+                    )
+                    self.stats["messages_rejected"] += 1
+                    return False
+
             # 優先度の決定
-            priority = MessagePriority(
-                message.get("priority", MessagePriority.NORMAL.value)
+            priority, rank = PRIORITY_LOOKUP.get(
+                message.get("priority"), DEFAULT_PRIORITY
             )
 
             # レート制限チェック
@@ -301,7 +527,7 @@ class MessageRouter:
                 metadata={"connection_id": connection_id},
             )
 
-            await self.message_queues[priority].put(queued_message)
+            self._enqueue(queued_message, rank)
 
             # 処理時間の更新
             processing_time = time.time() - start_time
@@ -314,13 +540,62 @@ class MessageRouter:
             self.stats["messages_failed"] += 1
             return False
 
+    def _enqueue(self, queued_message: QueuedMessage, rank: Optional[int] = None):
+        """メッセージを優先度ヒープに積む"""
+        if rank is None:
+            rank = PRIORITY_RANK[queued_message.priority]
+        self.queue_depth_histogram.observe(len(self._heap))
+        self._sequence += 1
+        queued_message.metadata["enqueued_at"] = time.monotonic()
+        heapq.heappush(
+            self._heap,
+            (rank, self._sequence, queued_message),
+        )
+        self.queue_depths[queued_message.priority] += 1
+        self._ready.set()
+
+    def _schedule_retry(self, queued_message: QueuedMessage, delay: float):
+        """リトライを遅延キューに積む（ワーカーはブロックしない）"""
+        self._sequence += 1
+        ready_at = time.monotonic() + delay
+        heapq.heappush(self._delayed, (ready_at, self._sequence, queued_message))
+        self.stats["messages_retried"] += 1
+        # 先頭が変わった場合はスケジューラーを起こして待ち時間を再計算させる
+        if self._delayed[0][2] is queued_message:
+            self._delay_changed.set()
+
+    async def _dequeue(self) -> QueuedMessage:
+        """最も優先度の高い有効なメッセージを取り出す（期限切れは破棄）"""
+        while True:
+            while not self._heap:
+                self._ready.clear()
+                await self._ready.wait()
+
+            _, _, queued_message = heapq.heappop(self._heap)
+            self.queue_depths[queued_message.priority] -= 1
+
+            # メッセージの有効期限チェック
+            if queued_message.expires_at and datetime.now() > queued_message.expires_at:
+                logger.warning(f"Message expired: {queued_message.id}")
+                self.stats["messages_expired"] += 1
+                continue
+
+            wait_ms = (
+                time.monotonic() - queued_message.metadata["enqueued_at"]
+            ) * 1000
+            self.wait_time_histograms[queued_message.priority].observe(wait_ms)
+            return queued_message
+
     async def start_processing(self):
         """メッセージ処理の開始"""
-        logger.info("Starting message processing")
+        logger.info("Starting message processing", workers=self.worker_count)
 
-        # 各優先度キューの処理タスクを開始
-        for priority in MessagePriority:
-            task = asyncio.create_task(self._process_queue(priority))
+        tasks = [
+            asyncio.create_task(self._worker(worker_id))
+            for worker_id in range(self.worker_count)
+        ]
+        tasks.append(asyncio.create_task(self._run_delay_queue()))
+        for task in tasks:
             self.processing_tasks.add(task)
             task.add_done_callback(self.processing_tasks.discard)
 
@@ -329,42 +604,42 @@ class MessageRouter:
         logger.info("Stopping message processing")
 
         # 全ての処理タスクをキャンセル
-        for task in self.processing_tasks:
+        tasks = list(self.processing_tasks)
+        for task in tasks:
             task.cancel()
 
         # タスクの完了を待機
-        if self.processing_tasks:
-            await asyncio.gather(*self.processing_tasks, return_exceptions=True)
-
-    async def _process_queue(self, priority: MessagePriority):
-        """キューの処理"""
-        queue = self.message_queues[priority]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
 
+    async def _worker(self, worker_id: int):
+        """ワーカー：ヒープからメッセージを取り出して処理"""
         while True:
             try:
-                # メッセージを取得（優先度の高いキューから優先的に処理）
-                timeout = 1.0 if priority == MessagePriority.URGENT else 5.0
-                queued_message = await asyncio.wait_for(queue.get(), timeout=timeout)
-
-                # メッセージの有効期限チェック
-                if (
-                    queued_message.expires_at
-                    and datetime.now() > queued_message.expires_at
-                ):
-                    logger.warning(f"Message expired: {queued_message.id}")
-                    continue
-
-                # メッセージを処理
+                queued_message = await self._dequeue()
                 await self._process_message(queued_message)
-
-            except asyncio.TimeoutError:
-                # タイムアウトは正常（高優先度キューを定期的にチェックするため）
-                continue
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"Error processing queue {priority.value}: {e}")
-                await asyncio.sleep(1)
+                logger.error(f"Error in message worker {worker_id}: {e}")
+
+    async def _run_delay_queue(self):
+        """遅延キュー：実行可能時刻になったリトライをヒープに戻す"""
+        while True:
+            try:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, queued_message = heapq.heappop(self._delayed)
+                    self._enqueue(queued_message)
+
+                self._delay_changed.clear()
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._delay_changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
 
     async def _process_message(self, queued_message: QueuedMessage):
         """個別メッセージの処理"""
@@ -372,69 +647,32 @@ class MessageRouter:
             queued_message.status = MessageStatus.PROCESSING
 
             message_type = queued_message.message.get("type")
+            entry = self.dispatch_table.get(message_type)
 
-            # AI分析関連のメッセージを直接処理
-            if message_type in [
-                "ai_analysis_subscribe",
-                "ai_analysis_unsubscribe",
-                "ai_analysis_request",
-                "ai_analysis_progress_request",
-                "ai_analysis_cancel"
-            ]:
-                # WebSocketメッセージハンドラーで直接処理
-                from app.core.websocket import WebSocketMessageHandler
-
-                session_id = queued_message.message.get("session_id", "default")
-                connection_id = queued_message.metadata.get("connection_id")
-
-                if message_type == "ai_analysis_subscribe":
-                    await WebSocketMessageHandler.handle_ai_analysis_subscribe(
-                        session_id, connection_id, queued_message.user_id, queued_message.message
-                    )
-                elif message_type == "ai_analysis_unsubscribe":
-                    await WebSocketMessageHandler.handle_ai_analysis_unsubscribe(
-                        session_id, connection_id, queued_message.user_id, queued_message.message
-                    )
-                elif message_type == "ai_analysis_request":
-                    await WebSocketMessageHandler.handle_ai_analysis_request(
-                        session_id, connection_id, queued_message.user_id, queued_message.message
-                    )
-                elif message_type == "ai_analysis_progress_request":
-                    await WebSocketMessageHandler.handle_ai_analysis_progress_request(
-                        session_id, connection_id, queued_message.user_id, queued_message.message
-                    )
-                elif message_type == "ai_analysis_cancel":
-                    await WebSocketMessageHandler.handle_ai_analysis_cancel(
-                        session_id, connection_id, queued_message.user_id, queued_message.message
-                    )
-
-                queued_message.status = MessageStatus.DELIVERED
-                self.stats["messages_processed"] += 1
-                return
-
-            # 通常のメッセージ処理
-            message_type_enum = WebSocketMessageType(message_type)
-
-            # ハンドラーの実行
-            if message_type_enum in self.handlers:
-                handler = self.handlers[message_type_enum]
-                await handler(queued_message)
-                queued_message.status = MessageStatus.DELIVERED
-                self.stats["messages_processed"] += 1
-            else:
+            if entry is None:
                 logger.warning(f"No handler for message type: {message_type}")
                 queued_message.status = MessageStatus.FAILED
                 self.stats["messages_failed"] += 1
+                return
+
+            # ハンドラーの実行
+            start_time = time.perf_counter()
+            try:
+                await entry.handler(queued_message)
+            finally:
+                entry.latency.observe((time.perf_counter() - start_time) * 1000)
+
+            queued_message.status = MessageStatus.DELIVERED
+            self.stats["messages_processed"] += 1
 
         except Exception as e:
             logger.error(f"Failed to process message {queued_message.id}: {e}")
             queued_message.status = MessageStatus.FAILED
             queued_message.retry_count += 1
 
-            # リトライ処理
+            # リトライ処理（指数バックオフ）
             if queued_message.retry_count < queued_message.max_retries:
-                await asyncio.sleep(2**queued_message.retry_count)  # 指数バックオフ
-                await self.message_queues[queued_message.priority].put(queued_message)
+                self._schedule_retry(queued_message, 2**queued_message.retry_count)
             else:
                 self.stats["messages_failed"] += 1
 
@@ -457,11 +695,23 @@ class MessageRouter:
         return {
             **self.stats,
             "queue_sizes": {
-                priority.value: queue.qsize()
-                for priority, queue in self.message_queues.items()
+                priority.value: depth for priority, depth in self.queue_depths.items()
+            },
+            "delayed_retries": len(self._delayed),
+            "workers": self.worker_count,
+            "queue_depth_histogram": self.queue_depth_histogram.to_dict(),
+            "wait_time_ms_histograms": {
+                priority.value: histogram.to_dict()
+                for priority, histogram in self.wait_time_histograms.items()
             },
             "active_sessions": len(self.active_sessions),
-            "active_handlers": len(self.handlers),
+            "active_handlers": len(self.dispatch_table),
+            "handler_latency_ms": {
+                message_type: entry.latency.to_dict()
+                for message_type, entry in self.dispatch_table.items()
+                if entry.latency.total
+            },
+            "rate_limiter": self.rate_limiter.get_stats(),
         }
 
 
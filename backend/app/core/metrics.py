@@ -0,0 +1,41 @@
+"""
+処理時間・キュー長などの統計用ヒストグラム
+
+/health やサービスの get_stats() でそのまま返せる dict に変換できる。
+"""
+
+import bisect
+from typing import Any, Dict, List
+
+# キュー長のバケット（メッセージルーター・転写スケジューラー共通）
+QUEUE_DEPTH_BOUNDS = [0, 1, 5, 10, 50, 100, 500, 1000]
+
+
+class Histogram:
+    """累積しない固定バケットのヒストグラム"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """値を記録"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """バケットごとの件数を取得（キーは上限値、"+Inf"は上限なし）"""
+        buckets = {f"le_{bound:g}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "buckets": buckets,
+            "count": self.total,
+            "avg": self.sum / self.total if self.total else 0.0,
+            "max": self.max,
+        }
@@ -0,0 +1,215 @@
+"""
+WebSocket接続ごとの送信キュー
+
+各接続はメッセージクラス（音声・チャット・制御・通知）ごとに上限付きの
+キューを持ち、専用のライタータスクがそれを排出する。プロデューサーは
+enqueue() で即座に戻り、低速なピアに引きずられることはない。
+キューがあふれた場合はクラスごとのオーバーフローポリシーに従う。
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Deque, Dict, List, Optional, Union
+
+import structlog
+
+logger = structlog.get_logger()
+
+Payload = Union[str, bytes]
+
+
+class MessageClass(str, Enum):
+    """送信メッセージのクラス"""
+
+    CONTROL = "control"
+    AUDIO = "audio"
+    CHAT = "chat"
+    NOTIFICATION = "notification"
+
+
+class OverflowPolicy(str, Enum):
+    """キューあふれ時のポリシー"""
+
+    DROP_OLDEST = "drop_oldest"  # 最も古いメッセージを捨てる
+    COALESCE_LATEST = "coalesce_latest"  # 同じキーのメッセージは最新のみ残す
+    DISCONNECT = "disconnect"  # 接続を切断する
+
+
+@dataclass
+class OutboundClassConfig:
+    """メッセージクラスごとのキュー設定"""
+
+    max_items: int
+    policy: OverflowPolicy
+
+
+# 排出順（先頭ほど優先）
+DRAIN_ORDER: List[MessageClass] = [
+    MessageClass.CONTROL,
+    MessageClass.AUDIO,
+    MessageClass.CHAT,
+    MessageClass.NOTIFICATION,
+]
+
+DEFAULT_CLASS_CONFIGS: Dict[MessageClass, OutboundClassConfig] = {
+    MessageClass.CONTROL: OutboundClassConfig(256, OverflowPolicy.DISCONNECT),
+    MessageClass.AUDIO: OutboundClassConfig(50, OverflowPolicy.DROP_OLDEST),
+    MessageClass.CHAT: OutboundClassConfig(200, OverflowPolicy.DISCONNECT),
+    MessageClass.NOTIFICATION: OutboundClassConfig(100, OverflowPolicy.COALESCE_LATEST),
+}
+
+
+class OutboundQueue:
+    """1接続分の上限付き送信キュー
+
+    件数はクラスごとに、バイト数は接続全体で上限を持つ。バイト数があふれた場合は
+    積もうとしたクラスと優先度の低いクラスのうち、破棄できる（DISCONNECT以外の）
+    クラスから古い順に捨てる。優先度の高いクラスのメッセージは捨てない。
+    DISCONNECTポリシーで切断するのはそのクラス自身のキューがあふれた場合だけで、
+    他のクラスが埋めたバイト数のために切断はしない（その分だけバイト数の上限を
+    超えることがあるが、クラスごとの件数上限で抑えられる）。
+    """
+
+    def __init__(
+        self,
+        class_configs: Optional[Dict[MessageClass, OutboundClassConfig]] = None,
+        max_bytes: int = 1024 * 1024,
+    ):
+        self.class_configs = {**DEFAULT_CLASS_CONFIGS, **(class_configs or {})}
+        self.max_bytes = max_bytes
+        # 各エントリは [coalesce_key, payload] の可変リスト
+        self._queues: Dict[MessageClass, Deque[list]] = {
+            message_class: deque() for message_class in DRAIN_ORDER
+        }
+        self._coalesce_index: Dict[MessageClass, Dict[str, list]] = {
+            message_class: {} for message_class in DRAIN_ORDER
+        }
+        self._class_bytes: Dict[MessageClass, int] = {
+            message_class: 0 for message_class in DRAIN_ORDER
+        }
+        self._ready = asyncio.Event()
+        self.queued_bytes = 0
+        self.closed = False
+        # 統計
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def enqueue(
+        self,
+        payload: Payload,
+        message_class: MessageClass = MessageClass.CONTROL,
+        coalesce_key: Optional[str] = None,
+    ) -> bool:
+        """メッセージを積む。DISCONNECTポリシーであふれた場合はFalseを返す"""
+        if self.closed:
+            return False
+
+        config = self.class_configs[message_class]
+        queue = self._queues[message_class]
+        index = self._coalesce_index[message_class]
+        size = len(payload)
+
+        # 同じキーの未送信メッセージは最新の内容で置き換える
+        if config.policy == OverflowPolicy.COALESCE_LATEST and coalesce_key:
+            entry = index.get(coalesce_key)
+            if entry is not None:
+                self.queued_bytes += size - len(entry[1])
+                self._class_bytes[message_class] += size - len(entry[1])
+                entry[1] = payload
+                self.coalesced += 1
+                return True
+
+        # 件数の上限チェック（自クラスのキューがあふれた場合）
+        if len(queue) >= config.max_items:
+            if config.policy == OverflowPolicy.DISCONNECT:
+                return False
+            self._drop_oldest(message_class)
+
+        # バイト数の上限チェック
+        while self.queued_bytes + size > self.max_bytes:
+            victim = self._drop_candidate(message_class)
+            if victim is not None:
+                self._drop_oldest(victim)
+                continue
+            if config.policy != OverflowPolicy.DISCONNECT:
+                # 優先度の高いクラスが埋めているので、積もうとしたメッセージを捨てる
+                self.dropped += 1
+                return True
+            if self._class_bytes[message_class] + size > self.max_bytes:
+                return False
+            break
+
+        entry = [coalesce_key, payload]
+        queue.append(entry)
+        if coalesce_key and config.policy == OverflowPolicy.COALESCE_LATEST:
+            index[coalesce_key] = entry
+        self.queued_bytes += size
+        self._class_bytes[message_class] += size
+        self.enqueued += 1
+        self._ready.set()
+        return True
+
+    def _drop_candidate(self, message_class: MessageClass) -> Optional[MessageClass]:
+        """バイト数を空けるために捨てるクラスを選ぶ（優先度の低い順、自クラスまで）"""
+        for candidate in reversed(DRAIN_ORDER):
+            if (
+                self._queues[candidate]
+                and self.class_configs[candidate].policy != OverflowPolicy.DISCONNECT
+            ):
+                return candidate
+            if candidate == message_class:
+                break
+        return None
+
+    def _drop_oldest(self, message_class: MessageClass):
+        """指定クラスの最も古いメッセージを捨てる"""
+        self._pop(message_class)
+        self.dropped += 1
+
+    def _pop(self, message_class: MessageClass) -> Payload:
+        entry = self._queues[message_class].popleft()
+        key, payload = entry
+        index = self._coalesce_index[message_class]
+        if key is not None and index.get(key) is entry:
+            del index[key]
+        self.queued_bytes -= len(payload)
+        self._class_bytes[message_class] -= len(payload)
+        return payload
+
+    async def get(self) -> Optional[Payload]:
+        """次に送信するメッセージを待つ。キューが閉じられたらNoneを返す"""
+        while not self.closed:
+            for message_class in DRAIN_ORDER:
+                if self._queues[message_class]:
+                    return self._pop(message_class)
+            self._ready.clear()
+            await self._ready.wait()
+        return None
+
+    def close(self):
+        """キューを閉じてライタータスクを終了させる"""
+        self.closed = True
+        for message_class in DRAIN_ORDER:
+            self._queues[message_class].clear()
+            self._coalesce_index[message_class].clear()
+            self._class_bytes[message_class] = 0
+        self.queued_bytes = 0
+        self._ready.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        """キュー統計を取得"""
+        return {
+            "depth": len(self),
+            "queued_bytes": self.queued_bytes,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,159 @@
+"""
+検証済みFirebase IDトークンのキャッシュ
+
+トークンはSHA-256ハッシュをキーに保持し、トークン自身の exp を過ぎたら破棄する。
+失効（revoke）・無効化の状態はユーザー（uid）ごとに保持し、リクエストごとではなく
+一定間隔でまとめて更新する。
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class CachedToken:
+    """キャッシュされた検証済みトークン"""
+
+    claims: Dict[str, Any]
+    expires_at: float  # トークンの exp（UNIX秒）
+
+
+@dataclass
+class RevocationState:
+    """ユーザーごとのトークン失効状態"""
+
+    valid_after: float  # これより前に発行（iat）されたトークンは無効（UNIX秒）
+    disabled: bool
+    checked_at: float
+
+
+class VerifiedTokenCache:
+    """検証済みトークンのLRU+TTLキャッシュ"""
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        revocation_check_interval: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_size = max_size
+        self.revocation_check_interval = revocation_check_interval
+        self.clock = clock
+        self._tokens: "OrderedDict[str, CachedToken]" = OrderedDict()
+        self._revocations: Dict[str, RevocationState] = {}
+
+        # 統計情報
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "revoked": 0,
+            "evicted": 0,
+        }
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのクレームを取得（期限切れ・失効済みならNone）"""
+        key = self._key(token)
+        entry = self._tokens.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        if entry.expires_at <= self.clock():
+            del self._tokens[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        if self.is_revoked(entry.claims):
+            del self._tokens[key]
+            self.stats["revoked"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._tokens.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry.claims
+
+    def put(self, token: str, claims: Dict[str, Any]):
+        """検証済みのクレームを保存"""
+        expires_at = claims.get("exp")
+        if not expires_at or expires_at <= self.clock():
+            return
+
+        key = self._key(token)
+        self._tokens[key] = CachedToken(claims=claims, expires_at=float(expires_at))
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_size:
+            self._tokens.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def needs_revocation_check(self, uid: str) -> bool:
+        """ユーザーの失効状態が未取得または古いか"""
+        state = self._revocations.get(uid)
+        return (
+            state is None
+            or self.clock() - state.checked_at >= self.revocation_check_interval
+        )
+
+    def update_revocation(self, uid: str, valid_after: float, disabled: bool):
+        """ユーザーの失効状態を更新"""
+        self._revocations[uid] = RevocationState(
+            valid_after=valid_after, disabled=disabled, checked_at=self.clock()
+        )
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        """トークンが失効済み、またはユーザーが無効化されているか"""
+        state = self._revocations.get(claims.get("uid"))
+        if state is None:
+            return False
+        # check_revoked=True と同じく発行時刻（iat）で比較する
+        return state.disabled or claims.get("iat", 0) < state.valid_after
+
+    def stale_uids(self) -> List[str]:
+        """キャッシュ中のトークンのうち、失効状態の再確認が必要なユーザー"""
+        uids = {entry.claims.get("uid") for entry in self._tokens.values()}
+        return [uid for uid in uids if uid and self.needs_revocation_check(uid)]
+
+    def purge(self):
+        """期限切れ・失効済みのトークンと、古くなった失効状態を削除"""
+        now = self.clock()
+        for key, entry in list(self._tokens.items()):
+            if entry.expires_at <= now:
+                del self._tokens[key]
+                self.stats["expired"] += 1
+            elif self.is_revoked(entry.claims):
+                del self._tokens[key]
+                self.stats["revoked"] += 1
+
+        # トークンが残っておらず、確認からも時間が経った失効状態は不要
+        live_uids = {entry.claims.get("uid") for entry in self._tokens.values()}
+        for uid in list(self._revocations):
+            if uid not in live_uids and self.needs_revocation_check(uid):
+                del self._revocations[uid]
+
+    def clear(self):
+        """キャッシュを空にする"""
+        self._tokens.clear()
+        self._revocations.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._tokens),
+            "tracked_users": len(self._revocations),
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+        }
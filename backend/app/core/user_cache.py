@@ -0,0 +1,360 @@
+"""
+認証済みユーザーのアイデンティティキャッシュ
+
+トークン検証後の User 取得（ID または Firebase UID による検索）を
+プロセス内のLRU+TTLキャッシュ（任意でRedisの2段目）で肩代わりする。
+
+キャッシュにはORMオブジェクトではなくカラム値のスナップショットを保持し、
+取り出すたびに新しいデタッチ済み User を組み立てる。リクエストのセッションが
+渡された場合は merge(load=False) でSQLを発行せずにセッションへ載せるため、
+呼び出し側は従来どおり current_user を更新してコミットできる。
+
+User の更新・削除はセッションのフラッシュ時に自動で無効化される。
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import structlog
+from sqlalchemy import Date, DateTime, event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models.user import User
+
+logger = structlog.get_logger()
+
+UserSnapshot = Dict[str, Any]
+
+# マッパーの設定（リレーション解決）を import 時に走らせないようテーブル定義から取得する
+_COLUMN_KEYS = [column.key for column in User.__table__.columns]
+_DATE_KEYS = {
+    column.key for column in User.__table__.columns if isinstance(column.type, Date)
+}
+_DATETIME_KEYS = {
+    column.key for column in User.__table__.columns if isinstance(column.type, DateTime)
+}
+
+
+def snapshot_user(user: User) -> UserSnapshot:
+    """User のカラム値をスナップショットとして取り出す"""
+    return {key: getattr(user, key) for key in _COLUMN_KEYS}
+
+
+def user_from_snapshot(snapshot: UserSnapshot) -> User:
+    """スナップショットからデタッチ済みの User を組み立てる"""
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def _encode_snapshot(snapshot: UserSnapshot) -> str:
+    return json.dumps(
+        {
+            key: value.isoformat() if isinstance(value, (date, datetime)) else value
+            for key, value in snapshot.items()
+        }
+    )
+
+
+def _decode_snapshot(data: str) -> UserSnapshot:
+    snapshot = json.loads(data)
+    for key in _DATETIME_KEYS:
+        if snapshot.get(key):
+            snapshot[key] = datetime.fromisoformat(snapshot[key])
+    for key in _DATE_KEYS:
+        if snapshot.get(key):
+            snapshot[key] = date.fromisoformat(snapshot[key])
+    return snapshot
+
+
+class UserIdentityCache:
+    """ユーザーのスナップショットを保持するLRU+TTLキャッシュ
+
+    1段目はプロセス内、2段目は（設定されていれば）Redis。Redisの障害時は
+    1段目とデータベースだけで動作を続ける。
+    """
+
+    KEY_PREFIX = "user_identity"
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: float = 60.0,
+        redis_client=None,
+        redis_ttl: int = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.redis = redis_client
+        self.redis_ttl = redis_ttl
+        self.clock = clock
+        # user_id -> (保存時刻, スナップショット)
+        self._entries: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        # firebase_uid -> user_id
+        self._uid_index: Dict[str, int] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+        # 統計情報
+        self.stats = {
+            "hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "evicted": 0,
+            "redis_errors": 0,
+        }
+
+    # --- 1段目（プロセス内） ---
+
+    def _get_local(self, user_id: int) -> Optional[UserSnapshot]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        stored_at, snapshot = entry
+        if self.clock() - stored_at >= self.ttl:
+            self._remove_local(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return snapshot
+
+    def _put_local(self, snapshot: UserSnapshot):
+        user_id = snapshot["id"]
+        self._remove_local(user_id)
+        self._entries[user_id] = (self.clock(), snapshot)
+        if snapshot.get("firebase_uid"):
+            self._uid_index[snapshot["firebase_uid"]] = user_id
+        while len(self._entries) > self.max_size:
+            oldest_id = next(iter(self._entries))
+            self._remove_local(oldest_id)
+            self.stats["evicted"] += 1
+
+    def _remove_local(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            uid = entry[1].get("firebase_uid")
+            if uid and self._uid_index.get(uid) == user_id:
+                del self._uid_index[uid]
+
+    # --- 2段目（Redis） ---
+
+    def _id_key(self, user_id: int) -> str:
+        return f"{self.KEY_PREFIX}:id:{user_id}"
+
+    def _uid_key(self, firebase_uid: str) -> str:
+        return f"{self.KEY_PREFIX}:uid:{firebase_uid}"
+
+    async def _get_redis(self, user_id: int) -> Optional[UserSnapshot]:
+        try:
+            data = await self.redis.get(self._id_key(user_id))
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"Redis user cache read failed: {e}")
+            return None
+        return _decode_snapshot(data) if data else None
+
+    async def _get_redis_uid(self, firebase_uid: str) -> Optional[int]:
+        try:
+            user_id = await self.redis.get(self._uid_key(firebase_uid))
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"Redis user cache read failed: {e}")
+            return None
+        return int(user_id) if user_id else None
+
+    async def _put_redis(self, snapshot: UserSnapshot):
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(
+                self._id_key(snapshot["id"]),
+                _encode_snapshot(snapshot),
+                ex=self.redis_ttl,
+            )
+            if snapshot.get("firebase_uid"):
+                pipe.set(
+                    self._uid_key(snapshot["firebase_uid"]),
+                    snapshot["id"],
+                    ex=self.redis_ttl,
+                )
+            await pipe.execute()
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"Redis user cache write failed: {e}")
+
+    async def _delete_redis(self, user_id: int, firebase_uid: Optional[str]):
+        keys = [self._id_key(user_id)]
+        if firebase_uid:
+            keys.append(self._uid_key(firebase_uid))
+        try:
+            await self.redis.delete(*keys)
+        except Exception as e:
+            self.stats["redis_errors"] += 1
+            logger.warning(f"Redis user cache invalidation failed: {e}")
+
+    # --- 公開API ---
+
+    async def get_by_id(self, user_id: int) -> Optional[UserSnapshot]:
+        """IDでスナップショットを取得"""
+        snapshot = self._get_local(user_id)
+        if snapshot is not None:
+            self.stats["hits"] += 1
+            return snapshot
+
+        if self.redis is not None:
+            snapshot = await self._get_redis(user_id)
+            if snapshot is not None:
+                self._put_local(snapshot)
+                self.stats["redis_hits"] += 1
+                return snapshot
+
+        self.stats["misses"] += 1
+        return None
+
+    async def get_by_firebase_uid(self, firebase_uid: str) -> Optional[UserSnapshot]:
+        """Firebase UIDでスナップショットを取得"""
+        user_id = self._uid_index.get(firebase_uid)
+        if user_id is not None:
+            snapshot = self._get_local(user_id)
+            if snapshot is not None and snapshot.get("firebase_uid") == firebase_uid:
+                self.stats["hits"] += 1
+                return snapshot
+
+        if self.redis is not None:
+            user_id = await self._get_redis_uid(firebase_uid)
+            if user_id is not None:
+                snapshot = await self._get_redis(user_id)
+                if (
+                    snapshot is not None
+                    and snapshot.get("firebase_uid") == firebase_uid
+                ):
+                    self._put_local(snapshot)
+                    self.stats["redis_hits"] += 1
+                    return snapshot
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, user: User):
+        """User をキャッシュに保存"""
+        snapshot = snapshot_user(user)
+        self._put_local(snapshot)
+        if self.redis is not None:
+            await self._put_redis(snapshot)
+
+    def invalidate(self, user_id: int, firebase_uid: Optional[str] = None):
+        """ユーザーをキャッシュから削除（Redisの削除はバックグラウンドで行う）"""
+        entry = self._entries.get(user_id)
+        if firebase_uid is None and entry is not None:
+            firebase_uid = entry[1].get("firebase_uid")
+        self._remove_local(user_id)
+        self.stats["invalidations"] += 1
+
+        if self.redis is not None:
+            try:
+                task = asyncio.get_running_loop().create_task(
+                    self._delete_redis(user_id, firebase_uid)
+                )
+            except RuntimeError:
+                # イベントループ外（スクリプト等）ではRedis側はTTLに任せる
+                return
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def clear(self):
+        """プロセス内キャッシュを空にする"""
+        self._entries.clear()
+        self._uid_index.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        lookups = self.stats["hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "backend": "redis" if self.redis is not None else "memory",
+            "hit_ratio": (
+                (self.stats["hits"] + self.stats["redis_hits"]) / lookups
+                if lookups
+                else 0.0
+            ),
+        }
+
+
+def _create_user_identity_cache() -> UserIdentityCache:
+    """設定に応じたキャッシュを生成"""
+    redis_client = None
+    if settings.USER_CACHE_BACKEND == "redis":
+        try:
+            from redis import asyncio as aioredis
+
+            redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Failed to initialize Redis user cache: {e}")
+    return UserIdentityCache(
+        max_size=settings.USER_CACHE_SIZE,
+        ttl=settings.USER_CACHE_TTL,
+        redis_client=redis_client,
+        redis_ttl=settings.USER_CACHE_REDIS_TTL,
+    )
+
+
+user_identity_cache = _create_user_identity_cache()
+
+
+async def _attach(snapshot: UserSnapshot, db: Optional[AsyncSession]) -> User:
+    user = user_from_snapshot(snapshot)
+    if db is None:
+        return user
+    # SQLを発行せずにリクエストのセッションへ載せる
+    return await db.merge(user, load=False)
+
+
+async def get_user_by_id(
+    db: AsyncSession, user_id: int, attach: bool = True
+) -> Optional[User]:
+    """IDでユーザーを取得（キャッシュ経由）
+
+    attach=False の場合は db をキャッシュミス時の検索にだけ使い、
+    デタッチ済みの User を返す（セッションを閉じた後も使う場合）。
+    """
+    snapshot = await user_identity_cache.get_by_id(user_id)
+    if snapshot is not None:
+        return await _attach(snapshot, db if attach else None)
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        await user_identity_cache.put(user)
+    return user
+
+
+async def get_user_by_firebase_uid(
+    db: AsyncSession, firebase_uid: str, attach: bool = True
+) -> Optional[User]:
+    """Firebase UIDでユーザーを取得（キャッシュ経由）"""
+    snapshot = await user_identity_cache.get_by_firebase_uid(firebase_uid)
+    if snapshot is not None:
+        return await _attach(snapshot, db if attach else None)
+
+    result = await db.execute(select(User).where(User.firebase_uid == firebase_uid))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        await user_identity_cache.put(user)
+    return user
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_users(session, flush_context):
+    """User の更新・削除がフラッシュされたらキャッシュを無効化"""
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            # UIDが変更された場合に備えて変更前の値も無効化する
+            history = inspect(instance).attrs.firebase_uid.history
+            for uid in set(history.deleted or ()) | {instance.firebase_uid}:
+                user_identity_cache.invalidate(instance.id, uid)
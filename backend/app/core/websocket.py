@@ -3,15 +3,33 @@ import asyncio
 import time
 from typing import Dict, Set, Optional, Any
 from fastapi import WebSocket, HTTPException, status
+from starlette.websockets import WebSocketState
 import structlog
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 
+from app.config import settings
 from app.core.auth import verify_firebase_token
+from app.core.audio_frames import AUDIO_TRANSPORT_JSON
+from app.core.backplane import (
+    TARGET_SESSION,
+    TARGET_USER,
+    Backplane,
+    BackplaneMessage,
+    create_backplane,
+    session_channel,
+    user_channel,
+)
+from app.core.outbound_queue import (
+    MessageClass,
+    OutboundClassConfig,
+    OutboundQueue,
+    Payload,
+)
 from app.models.user import User
 from app.core.exceptions import AuthenticationException
 from app.core.database import AsyncSessionLocal
-from sqlalchemy import select
+from app.core.user_cache import get_user_by_firebase_uid
 
 logger = structlog.get_logger()
 
@@ -22,12 +40,15 @@ class WebSocketPerformanceMonitor:
     def __init__(self):
         self.connection_times = deque(maxlen=1000)  # 接続時間の履歴
         self.message_processing_times = deque(maxlen=1000)  # メッセージ処理時間の履歴
+        self.broadcast_times = deque(maxlen=1000)  # ブロードキャスト所要時間の履歴
         self.error_counts = defaultdict(int)  # エラー種別別カウント
         self.message_counts = defaultdict(int)  # メッセージ種別別カウント
         self.peak_connections = 0  # ピーク接続数
         self.total_connections = 0  # 総接続数
         self.total_messages = 0  # 総メッセージ数
         self.total_errors = 0  # 総エラー数
+        self.total_broadcasts = 0  # 総ブロードキャスト数
+        self.total_evictions = 0  # 低速クライアントの切断数
         self.start_time = time.time()  # 監視開始時刻
 
     def record_connection_time(self, connection_time: float):
@@ -38,6 +59,16 @@ class WebSocketPerformanceMonitor:
         """メッセージ処理時間を記録"""
         self.message_processing_times.append(processing_time)
 
+    def record_broadcast(self, broadcast_time: float, evicted: int = 0):
+        """ブロードキャスト所要時間と切断数を記録"""
+        self.broadcast_times.append(broadcast_time)
+        self.total_broadcasts += 1
+        self.total_evictions += evicted
+
+    def record_eviction(self):
+        """切断数だけを記録（所要時間のサンプルは追加しない）"""
+        self.total_evictions += 1
+
     def record_error(self, error_type: str):
         """エラーを記録"""
         self.error_counts[error_type] += 1
@@ -74,6 +105,16 @@ class WebSocketPerformanceMonitor:
         max_processing_time = max(processing_times) if processing_times else 0
         min_processing_time = min(processing_times) if processing_times else 0
 
+        # ブロードキャスト所要時間の統計
+        broadcast_times = sorted(self.broadcast_times)
+        if broadcast_times:
+            p50_broadcast_time = broadcast_times[len(broadcast_times) // 2]
+            p99_broadcast_time = broadcast_times[
+                min(len(broadcast_times) - 1, int(len(broadcast_times) * 0.99))
+            ]
+        else:
+            p50_broadcast_time = p99_broadcast_time = 0
+
         # エラー率の計算
         error_rate = (
             (self.total_errors / self.total_messages * 100)
@@ -104,6 +145,13 @@ class WebSocketPerformanceMonitor:
                 "minimum_ms": round(min_processing_time * 1000, 2),
                 "sample_count": len(processing_times),
             },
+            "broadcast_times": {
+                "p50_ms": round(p50_broadcast_time * 1000, 2),
+                "p99_ms": round(p99_broadcast_time * 1000, 2),
+                "total_broadcasts": self.total_broadcasts,
+                "total_evictions": self.total_evictions,
+                "sample_count": len(broadcast_times),
+            },
             "error_breakdown": dict(self.error_counts),
             "message_breakdown": dict(self.message_counts),
         }
@@ -112,12 +160,15 @@ class WebSocketPerformanceMonitor:
         """統計をリセット"""
         self.connection_times.clear()
         self.message_processing_times.clear()
+        self.broadcast_times.clear()
         self.error_counts.clear()
         self.message_counts.clear()
         self.peak_connections = 0
         self.total_connections = 0
         self.total_messages = 0
         self.total_errors = 0
+        self.total_broadcasts = 0
+        self.total_evictions = 0
         self.start_time = time.time()
 
 
@@ -138,12 +189,82 @@ class ConnectionManager:
         self.max_connections_per_session = 50
         # 接続タイムアウト
         self.connection_timeout = timedelta(hours=24)
+        # 送信タイムアウト（これを超えた低速クライアントは切断する）
+        self.send_timeout = settings.WS_SEND_TIMEOUT  # 秒
+        # 接続ごとの送信キューとライタータスク
+        self.outbound_queues: Dict[str, OutboundQueue] = {}
+        self.writer_tasks: Dict[str, asyncio.Task] = {}
+        self.outbound_class_configs: Dict[MessageClass, OutboundClassConfig] = {}
+        self.outbound_max_bytes = settings.WS_OUTBOUND_MAX_BYTES
+        # 切断処理中のタスク（GCによる回収を防ぐため参照を保持）
+        self._eviction_tasks: Set[asyncio.Task] = set()
         # ハートビート管理
         self.last_heartbeat: Dict[str, datetime] = {}
         # パフォーマンス監視
         self.performance_monitor = WebSocketPerformanceMonitor()
+        # 他ワーカー・ノードへのブロードキャスト転送
+        self.backplane: Backplane = create_backplane()
+
+    async def start_backplane(self):
+        """バックプレーンを開始（他ワーカーからのメッセージ受信）"""
+        await self.backplane.start(self._deliver_from_backplane)
+
+    async def stop_backplane(self):
+        """バックプレーンを停止"""
+        await self.backplane.stop()
+
+    async def _deliver_from_backplane(self, message: BackplaneMessage):
+        """他ワーカーから届いたメッセージを自ワーカーの接続へ配信"""
+        if message.target == TARGET_SESSION:
+            connection_ids = [
+                connection_id
+                for connection_id in self.session_connections.get(message.key, ())
+                if connection_id != message.exclude_connection
+            ]
+        elif message.target == TARGET_USER:
+            connection_ids = list(self.user_connections.get(int(message.key), ()))
+        else:
+            return
+        await self.fan_out(
+            message.payload,
+            connection_ids,
+            MessageClass(message.message_class),
+            message.coalesce_key,
+        )
 
-    async def connect(self, websocket: WebSocket, session_id: str, user: User) -> str:
+    async def _publish_to_backplane(
+        self,
+        target: str,
+        key,
+        payload: Payload,
+        message_class: MessageClass,
+        coalesce_key: Optional[str] = None,
+        exclude_connection: Optional[str] = None,
+    ):
+        """他ワーカーの接続向けにメッセージを発行（失敗しても自ワーカーの配信には影響しない）"""
+        try:
+            await self.backplane.publish(
+                BackplaneMessage(
+                    origin=self.backplane.node_id,
+                    target=target,
+                    key=str(key),
+                    payload=payload,
+                    message_class=message_class.value,
+                    coalesce_key=coalesce_key,
+                    exclude_connection=exclude_connection,
+                )
+            )
+        except Exception as e:
+            self.performance_monitor.record_error("backplane_publish_failed")
+            logger.error(f"Failed to publish to backplane: {e}")
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        user: User,
+        audio_transport: str = AUDIO_TRANSPORT_JSON,
+    ) -> str:
         """WebSocket接続を確立"""
         start_time = time.time()
 
@@ -163,21 +284,31 @@ class ConnectionManager:
                 "user": user,
                 "last_activity": datetime.now(),
                 "status": "connected",
+                "audio_transport": audio_transport,
             }
 
             # セッション別接続管理
             if session_id not in self.session_connections:
                 self.session_connections[session_id] = set()
+                self.backplane.subscribe(session_channel(session_id))
             self.session_connections[session_id].add(connection_id)
 
             # ユーザー別接続管理
             if user.id not in self.user_connections:
                 self.user_connections[user.id] = set()
+                self.backplane.subscribe(user_channel(user.id))
             self.user_connections[user.id].add(connection_id)
 
             # ハートビート初期化
             self.last_heartbeat[connection_id] = datetime.now()
 
+            # 送信キューとライタータスクを開始
+            queue = OutboundQueue(self.outbound_class_configs, self.outbound_max_bytes)
+            self.outbound_queues[connection_id] = queue
+            self.writer_tasks[connection_id] = asyncio.create_task(
+                self._writer(connection_id, websocket, queue)
+            )
+
             # パフォーマンス監視
             connection_time = time.time() - start_time
             self.performance_monitor.record_connection_time(connection_time)
@@ -262,166 +393,364 @@ class ConnectionManager:
 
         logger.info("接続制限チェック完了: 接続可能")
 
+    def _unregister(self, connection_id: str) -> Optional[WebSocket]:
+        """接続を管理テーブルから取り除き、対応するWebSocketを返す"""
+        websocket = self.active_connections.pop(connection_id, None)
+
+        connection_info = self.connection_info.pop(connection_id, None)
+        if connection_info:
+            session_id = connection_info.get("session_id")
+            user_id = connection_info.get("user_id")
+
+            # セッション別接続管理から削除
+            if session_id and session_id in self.session_connections:
+                self.session_connections[session_id].discard(connection_id)
+                if not self.session_connections[session_id]:
+                    del self.session_connections[session_id]
+                    self.backplane.unsubscribe(session_channel(session_id))
+
+            # ユーザー別接続管理から削除
+            if user_id and user_id in self.user_connections:
+                self.user_connections[user_id].discard(connection_id)
+                if not self.user_connections[user_id]:
+                    del self.user_connections[user_id]
+                    self.backplane.unsubscribe(user_channel(user_id))
+
+        # ハートビート情報を削除
+        self.last_heartbeat.pop(connection_id, None)
+
+        # 送信キューを閉じてライタータスクを止める
+        queue = self.outbound_queues.pop(connection_id, None)
+        if queue is not None:
+            queue.close()
+        writer_task = self.writer_tasks.pop(connection_id, None)
+        if writer_task is not None and writer_task is not asyncio.current_task():
+            writer_task.cancel()
+        return websocket
+
+    async def _close_websocket(
+        self, websocket: WebSocket, code: int = status.WS_1000_NORMAL_CLOSURE
+    ):
+        """WebSocketを送信タイムアウト付きで閉じる"""
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=code), timeout=self.send_timeout
+            )
+        except Exception as e:
+            logger.debug(f"WebSocket close failed: {e}")
+
     async def disconnect(self, connection_id: str):
         """WebSocket接続を切断"""
         try:
-            if connection_id in self.active_connections:
-                websocket = self.active_connections[connection_id]
-                await websocket.close()
-                del self.active_connections[connection_id]
-
-            # 接続情報をクリーンアップ
-            if connection_id in self.connection_info:
-                connection_info = self.connection_info[connection_id]
-                session_id = connection_info.get("session_id")
-                user_id = connection_info.get("user_id")
-
-                # セッション別接続管理から削除
-                if session_id and session_id in self.session_connections:
-                    self.session_connections[session_id].discard(connection_id)
-                    if not self.session_connections[session_id]:
-                        del self.session_connections[session_id]
-
-                # ユーザー別接続管理から削除
-                if user_id and user_id in self.user_connections:
-                    self.user_connections[user_id].discard(connection_id)
-                    if not self.user_connections[user_id]:
-                        del self.user_connections[user_id]
-
-                # 接続情報を削除
-                del self.connection_info[connection_id]
-
-                # ハートビート情報を削除
-                if connection_id in self.last_heartbeat:
-                    del self.last_heartbeat[connection_id]
-
+            websocket = self._unregister(connection_id)
+            if websocket is not None:
+                await self._close_websocket(websocket)
                 logger.info(f"WebSocket disconnected: {connection_id}")
 
         except Exception as e:
             self.performance_monitor.record_error("disconnect_error")
             logger.error(f"Error during disconnect: {e}")
 
-    async def send_personal_message(self, message: dict, connection_id: str):
-        """特定の接続にメッセージを送信"""
-        start_time = time.time()
+    def _evict(self, connection_id: str):
+        """低速・切断済みクライアントを即座に登録解除し、クローズは裏で行う"""
+        websocket = self._unregister(connection_id)
+        if websocket is None:
+            return
 
+        task = asyncio.create_task(
+            self._close_websocket(websocket, code=status.WS_1008_POLICY_VIOLATION)
+        )
+        self._eviction_tasks.add(task)
+        task.add_done_callback(self._eviction_tasks.discard)
+        logger.warning(f"Slow or closed WebSocket evicted: {connection_id}")
+
+    async def _send_payload(self, websocket: WebSocket, payload: Payload) -> str:
+        """エンコード済みペイロードを送信し、結果（delivered/timed_out/failed）を返す"""
+        if websocket.client_state == WebSocketState.DISCONNECTED:
+            return "failed"
         try:
-            if connection_id in self.active_connections:
-                websocket = self.active_connections[connection_id]
-
-                # WebSocketの状態をチェック
-                if websocket.client_state.value >= 3:  # WebSocket.OPEN以上
-                    await websocket.send_text(json.dumps(message))
+            if isinstance(payload, bytes):
+                send = websocket.send_bytes(payload)
+            else:
+                send = websocket.send_text(payload)
+            await asyncio.wait_for(send, timeout=self.send_timeout)
+            return "delivered"
+        except asyncio.TimeoutError:
+            return "timed_out"
+        except Exception as e:
+            logger.debug(f"WebSocket send failed: {e}")
+            return "failed"
 
-                    # パフォーマンス監視
-                    processing_time = time.time() - start_time
-                    self.performance_monitor.record_message_processing_time(
-                        processing_time
+    async def _writer(
+        self, connection_id: str, websocket: WebSocket, queue: OutboundQueue
+    ):
+        """送信キューを排出するライタータスク"""
+        try:
+            while True:
+                payload = await queue.get()
+                if payload is None:
+                    return
+
+                result = await self._send_payload(websocket, payload)
+                if result != "delivered":
+                    self.performance_monitor.record_error(
+                        "send_timeout"
+                        if result == "timed_out"
+                        else "send_message_failed"
                     )
+                    self.performance_monitor.record_eviction()
+                    self._evict(connection_id)
+                    return
+                queue.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket writer task failed for {connection_id}: {e}")
+            self._evict(connection_id)
+
+    def enqueue(
+        self,
+        payload: Payload,
+        connection_id: str,
+        message_class: MessageClass = MessageClass.CONTROL,
+        coalesce_key: Optional[str] = None,
+    ) -> bool:
+        """エンコード済みペイロードを接続の送信キューに積む（ブロックしない）
+
+        オーバーフローポリシーがDISCONNECTのクラスであふれた場合は接続を切断し、
+        Falseを返す。
+        """
+        queue = self.outbound_queues.get(connection_id)
+        if queue is None:
+            return False
+        if queue.enqueue(payload, message_class, coalesce_key):
+            return True
 
-                    logger.debug(f"Personal message sent to {connection_id}")
+        self.performance_monitor.record_error("outbound_queue_overflow")
+        self._evict(connection_id)
+        return False
+
+    async def fan_out(
+        self,
+        payload: Payload,
+        connection_ids,
+        message_class: MessageClass = MessageClass.CONTROL,
+        coalesce_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """エンコード済みペイロードを複数接続へ配信し、配信統計を返す
+
+        送信キューを持つ接続には積むだけで即座に戻る。キューを持たない接続へは
+        受信者ごとの送信タイムアウト付きで並行送信し、失敗した接続は切断する。
+        """
+        start_time = time.perf_counter()
+        stats = {
+            "recipients": 0,
+            "queued": 0,
+            "delivered": 0,
+            "timed_out": 0,
+            "failed": 0,
+            "evicted": 0,
+        }
+
+        direct_targets = []
+        for connection_id in list(connection_ids):
+            if connection_id not in self.active_connections:
+                continue
+            stats["recipients"] += 1
+
+            if connection_id in self.outbound_queues:
+                if self.enqueue(payload, connection_id, message_class, coalesce_key):
+                    stats["queued"] += 1
                 else:
-                    logger.warning(
-                        f"WebSocket not in OPEN state for {connection_id}, state: {websocket.client_state.value}"
-                    )
-                    # 接続が開いていない場合は切断
-                    await self.disconnect(connection_id)
+                    stats["evicted"] += 1
             else:
-                logger.warning(
-                    f"Connection {connection_id} not found in active connections"
+                direct_targets.append(
+                    (connection_id, self.active_connections[connection_id])
                 )
-        except Exception as e:
-            self.performance_monitor.record_error("send_message_failed")
-            logger.error(f"Failed to send personal message to {connection_id}: {e}")
-            # エラーが発生した場合は接続を切断
-            try:
-                await self.disconnect(connection_id)
-            except Exception as disconnect_error:
-                logger.error(
-                    f"Failed to disconnect {connection_id} after send error: {disconnect_error}"
+
+        if direct_targets:
+            results = await asyncio.gather(
+                *(
+                    self._send_payload(websocket, payload)
+                    for _, websocket in direct_targets
                 )
+            )
+            for (connection_id, _), result in zip(direct_targets, results):
+                stats[result] += 1
+                if result != "delivered":
+                    self._evict(connection_id)
+                    stats["evicted"] += 1
+
+        broadcast_time = time.perf_counter() - start_time
+        stats["duration_ms"] = round(broadcast_time * 1000, 3)
+        self.performance_monitor.record_broadcast(broadcast_time, stats["evicted"])
+        if stats["timed_out"]:
+            self.performance_monitor.record_error("send_timeout")
+        if stats["failed"]:
+            self.performance_monitor.record_error("send_message_failed")
+        return stats
 
-    async def broadcast_to_session(
-        self, message: dict, session_id: str, exclude_connection: Optional[str] = None
+    async def send_personal_message(
+        self,
+        message: dict,
+        connection_id: str,
+        message_class: MessageClass = MessageClass.CONTROL,
     ):
-        """セッション内の全接続にメッセージをブロードキャスト"""
+        """特定の接続にメッセージを送信（送信キュー経由）"""
         start_time = time.time()
 
         try:
-            if session_id in self.session_connections:
-                for connection_id in self.session_connections[session_id]:
-                    if (
-                        connection_id != exclude_connection
-                        and connection_id in self.active_connections
-                    ):
-                        await self.send_personal_message(message, connection_id)
+            websocket = self.active_connections.get(connection_id)
+            if websocket is None:
+                logger.warning(
+                    f"Connection {connection_id} not found in active connections"
+                )
+                return
 
+            payload = json.dumps(message)
+            if connection_id in self.outbound_queues:
+                delivered = self.enqueue(payload, connection_id, message_class)
+            else:
+                delivered = await self._send_payload(websocket, payload) == "delivered"
+                if not delivered:
+                    self._evict(connection_id)
+
+            if delivered:
                 # パフォーマンス監視
                 processing_time = time.time() - start_time
                 self.performance_monitor.record_message_processing_time(processing_time)
+                logger.debug(f"Personal message sent to {connection_id}")
+            else:
+                self.performance_monitor.record_error("send_message_failed")
+                logger.warning(f"Failed to send personal message to {connection_id}")
+        except Exception as e:
+            self.performance_monitor.record_error("send_message_failed")
+            logger.error(f"Failed to send personal message to {connection_id}: {e}")
 
-                logger.debug(f"Broadcast message sent to session {session_id}")
+    async def broadcast_to_session(
+        self,
+        message: dict,
+        session_id: str,
+        exclude_connection: Optional[str] = None,
+        message_class: MessageClass = MessageClass.CONTROL,
+        coalesce_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """セッション内の全接続にメッセージをブロードキャスト
+
+        ペイロードは一度だけエンコードし、各接続の送信キューへ積む。
+        他ワーカーが保持する接続へはバックプレーン経由で届ける。
+        戻り値は自ワーカー分の配信統計（recipients/queued/delivered/timed_out/failed/evicted/duration_ms）。
+        """
+        connection_ids = [
+            connection_id
+            for connection_id in self.session_connections.get(session_id, ())
+            if connection_id != exclude_connection
+        ]
+
+        try:
+            payload = json.dumps(message)
+            stats = await self.fan_out(
+                payload, connection_ids, message_class, coalesce_key
+            )
+            await self._publish_to_backplane(
+                TARGET_SESSION,
+                session_id,
+                payload,
+                message_class,
+                coalesce_key,
+                exclude_connection,
+            )
+            logger.debug(
+                f"Broadcast message sent to session {session_id}",
+                **stats,
+            )
+            return stats
         except Exception as e:
             self.performance_monitor.record_error("broadcast_failed")
             logger.error(f"Failed to broadcast to session {session_id}: {e}")
+            return {"recipients": len(connection_ids), "delivered": 0}
+
+    async def broadcast_to_user(
+        self,
+        message: dict,
+        user_id: int,
+        message_class: MessageClass = MessageClass.NOTIFICATION,
+        coalesce_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """ユーザーの全接続にメッセージを送信（他ワーカーの接続へはバックプレーン経由）"""
+        connection_ids = list(self.user_connections.get(user_id, ()))
+
+        try:
+            payload = json.dumps(message)
+            stats = await self.fan_out(
+                payload, connection_ids, message_class, coalesce_key
+            )
+            await self._publish_to_backplane(
+                TARGET_USER, user_id, payload, message_class, coalesce_key
+            )
+            return stats
+        except Exception as e:
+            self.performance_monitor.record_error("broadcast_failed")
+            logger.error(f"Failed to broadcast to user {user_id}: {e}")
+            return {"recipients": len(connection_ids), "delivered": 0}
+
+    def get_audio_transport(self, connection_id: str) -> str:
+        """接続がネゴシエーションした音声転送形式を取得"""
+        info = self.connection_info.get(connection_id)
+        if info is None:
+            return AUDIO_TRANSPORT_JSON
+        return info.get("audio_transport", AUDIO_TRANSPORT_JSON)
 
     async def get_session_participants(self, session_id: str) -> list:
         """セッションの参加者一覧を取得"""
         participants = []
 
         try:
-            # まずデータベースから参加者情報を取得
+            # まずデータベースから参加者情報を取得（参加者テーブルとユーザーを1クエリで結合）
             from app.core.database import AsyncSessionLocal
-            from app.services.voice_session_service import VoiceSessionService
+            from app.repositories.voice_session_participant_repository import (
+                voice_session_participant_repository,
+            )
+            from app.repositories.voice_session_repository import (
+                voice_session_repository,
+            )
 
             async with AsyncSessionLocal() as db:
-                voice_session_service = VoiceSessionService(db)
-                session = await voice_session_service.get_session_by_session_id(
-                    session_id
+                session = await voice_session_repository.get_by_session_id(db, session_id)
+                rows = (
+                    await voice_session_participant_repository.get_with_users(
+                        db, session.id
+                    )
+                    if session
+                    else []
                 )
 
-                if session and session.participants:
-                    try:
-                        # participantsフィールドをJSONとしてパース
-                        participants_data = (
-                            json.loads(session.participants)
-                            if isinstance(session.participants, str)
-                            else session.participants
-                        )
-
-                        for participant in participants_data:
-                            participants.append(
-                                {
-                                    "id": str(participant.get("user_id")),
-                                    "username": participant.get("username", "Unknown"),
-                                    "display_name": participant.get(
-                                        "username", "Unknown"
-                                    ),
-                                    "email": participant.get("email", ""),
-                                    "role": participant.get(
-                                        "role", "participant"
-                                    ).upper(),
-                                    "status": "online"
-                                    if participant.get("is_active", True)
-                                    else "offline",
-                                    "is_active": participant.get("is_active", True),
-                                    "is_muted": False,
-                                    "joinedAt": participant.get(
-                                        "joined_at", datetime.now().isoformat()
-                                    ),
-                                    "lastActivity": datetime.now().isoformat(),
-                                }
-                            )
-
-                        logger.info(
-                            f"Retrieved {len(participants)} participants from database for session {session_id}"
-                        )
-                        return participants
+            if rows:
+                now = datetime.now().isoformat()
+                for participant, user in rows:
+                    participants.append(
+                        {
+                            "id": str(participant.user_id),
+                            "username": user.username,
+                            "display_name": user.display_name or user.username,
+                            "email": user.email,
+                            "role": (participant.role or "participant").upper(),
+                            "status": "online" if participant.is_active else "offline",
+                            "is_active": participant.is_active,
+                            "is_muted": False,
+                            "joinedAt": (
+                                participant.joined_at.isoformat()
+                                if participant.joined_at
+                                else now
+                            ),
+                            "lastActivity": now,
+                        }
+                    )
 
-                    except (json.JSONDecodeError, TypeError) as e:
-                        logger.error(
-                            f"Failed to parse participants data for session {session_id}: {e}"
-                        )
+                logger.info(
+                    f"Retrieved {len(participants)} participants from database for session {session_id}"
+                )
+                return participants
 
             # データベースからの取得に失敗した場合、現在のWebSocket接続から取得
             logger.warning(
@@ -481,10 +810,19 @@ class ConnectionManager:
 
     async def get_connection_stats(self) -> dict:
         """接続統計を取得"""
+        queue_stats = [queue.get_stats() for queue in self.outbound_queues.values()]
         return {
+            "outbound_queues": {
+                "total_depth": sum(q["depth"] for q in queue_stats),
+                "max_depth": max((q["depth"] for q in queue_stats), default=0),
+                "total_queued_bytes": sum(q["queued_bytes"] for q in queue_stats),
+                "total_dropped": sum(q["dropped"] for q in queue_stats),
+                "total_coalesced": sum(q["coalesced"] for q in queue_stats),
+            },
             "total_connections": len(self.active_connections),
             "total_sessions": len(self.session_connections),
             "total_users": len(self.user_connections),
+            "backplane": self.backplane.get_stats(),
             "connections_per_session": {
                 session_id: len(connections)
                 for session_id, connections in self.session_connections.items()
@@ -568,10 +906,7 @@ class WebSocketAuth:
                 )
                 async with AsyncSessionLocal() as db:
                     try:
-                        result = await db.execute(
-                            select(User).where(User.firebase_uid == uid)
-                        )
-                        user = result.scalar_one_or_none()
+                        user = await get_user_by_firebase_uid(db, uid, attach=False)
 
                         if not user:
                             logger.warning(
@@ -0,0 +1,418 @@
+"""
+音声転写のバックエンド
+
+RealtimeTranscriptionManager / TranscriptionService から使う転写処理を差し替え可能にする。
+OpenAI Whisper API を使うバックエンドと、faster-whisper をプロセスプールで動かす
+ローカルCPUバックエンドを用意する。どちらも OpenAI の verbose_json と同じ形
+（text, words, language など）の辞書を返す。
+"""
+
+import asyncio
+import io
+import math
+import time
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.core.metrics import Histogram
+from app.integrations.openai_client import get_openai_client
+
+logger = structlog.get_logger()
+
+# 転写処理時間（ミリ秒）のバケット
+BACKEND_LATENCY_BOUNDS_MS = [50, 100, 250, 500, 1000, 2000, 5000, 10000]
+
+
+class TranscriptionBackend(ABC):
+    """転写バックエンドの基底クラス"""
+
+    backend = "base"
+
+    def __init__(self):
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+        }
+        self.latency_histogram = Histogram(BACKEND_LATENCY_BOUNDS_MS)
+
+    async def start(self):
+        """開始（モデルの読み込みなど）"""
+
+    async def stop(self):
+        """停止"""
+
+    @abstractmethod
+    async def _transcribe(
+        self, audio_data: bytes, language: str, partial: bool
+    ) -> Dict[str, Any]:
+        """音声データを転写（バックエンド固有の処理）"""
+
+    async def transcribe_audio_data(
+        self, audio_data: bytes, language: str = "ja"
+    ) -> Dict[str, Any]:
+        """音声データを転写（失敗時は例外）"""
+        return await self._timed(audio_data, language, partial=False)
+
+    async def transcribe_chunk(
+        self, audio_chunk: bytes, language: str = "ja"
+    ) -> Optional[Dict[str, Any]]:
+        """音声チャンクを転写（短時間用、失敗時はNone）"""
+        try:
+            return await self._timed(audio_chunk, language, partial=True)
+        except Exception as e:
+            logger.error(f"Failed to transcribe audio chunk: {e}", backend=self.backend)
+            return None
+
+    async def _timed(
+        self, audio_data: bytes, language: str, partial: bool
+    ) -> Dict[str, Any]:
+        started = time.monotonic()
+        self.stats["requests"] += 1
+        try:
+            return await self._transcribe(audio_data, language, partial)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.latency_histogram.observe((time.monotonic() - started) * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "backend": self.backend,
+            "latency_ms_histogram": self.latency_histogram.to_dict(),
+        }
+
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    """OpenAI Whisper API を使う転写バックエンド"""
+
+    backend = "openai"
+
+    def __init__(self, client=None):
+        super().__init__()
+        self._client = client
+
+    @property
+    def client(self):
+        # APIキーの検証はクライアント取得時まで遅延する
+        return self._client if self._client is not None else get_openai_client()
+
+    async def _transcribe(
+        self, audio_data: bytes, language: str, partial: bool
+    ) -> Dict[str, Any]:
+        if partial:
+            result = await self.client.transcribe_chunk(audio_data, language)
+            if result is None:
+                raise RuntimeError("OpenAI chunk transcription failed")
+            return result
+        return await self.client.transcribe_audio_data(audio_data, language)
+
+
+def decode_audio(audio_data: bytes) -> np.ndarray:
+    """PCM16（またはWAV）の音声を -1.0〜1.0 の float32 配列に変換"""
+    if audio_data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(audio_data), "rb") as wav_file:
+            audio_data = wav_file.readframes(wav_file.getnframes())
+    usable = len(audio_data) - len(audio_data) % 2
+    return np.frombuffer(audio_data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+
+
+# ワーカープロセスごとに読み込んだモデル（プロセスの寿命の間は保持する）
+_worker_model = None
+
+
+def _init_local_worker(model_size: str, compute_type: str, cpu_threads: int):
+    """ワーカープロセスの初期化（モデルを一度だけ読み込む）"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    _worker_model = WhisperModel(
+        model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads
+    )
+
+
+def _transcribe_one(audio_data: bytes, language: str, partial: bool) -> Dict[str, Any]:
+    segments, info = _worker_model.transcribe(
+        decode_audio(audio_data),
+        language=language,
+        beam_size=1 if partial else 5,
+        word_timestamps=not partial,
+        vad_filter=False,
+    )
+
+    texts: List[str] = []
+    words: List[Dict[str, Any]] = []
+    result_segments: List[Dict[str, Any]] = []
+    logprobs: List[float] = []
+    for segment in segments:
+        texts.append(segment.text)
+        logprobs.append(segment.avg_logprob)
+        result_segments.append(
+            {
+                "id": segment.id,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+        )
+        for word in segment.words or []:
+            words.append(
+                {
+                    "word": word.word,
+                    "start": word.start,
+                    "end": word.end,
+                    "probability": word.probability,
+                }
+            )
+
+    return {
+        "text": "".join(texts).strip(),
+        "language": info.language,
+        "duration": info.duration,
+        "words": words,
+        "segments": result_segments,
+        "confidence": math.exp(sum(logprobs) / len(logprobs)) if logprobs else 0.0,
+    }
+
+
+def transcribe_local_batch(
+    requests: List[Tuple[bytes, str, bool]]
+) -> List[Dict[str, Any]]:
+    """ワーカープロセスでまとめて転写（1件の失敗は他の結果に影響させない）"""
+    results: List[Dict[str, Any]] = []
+    for audio_data, language, partial in requests:
+        try:
+            results.append(_transcribe_one(audio_data, language, partial))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def _warm_up_worker() -> bool:
+    """モデルの読み込みを済ませる（初期化はワーカーの起動時に行われる）"""
+    return _worker_model is not None
+
+
+@dataclass
+class _LocalRequest:
+    audio_data: bytes
+    language: str
+    partial: bool
+    future: asyncio.Future = field(repr=False)
+
+
+class LocalTranscriptionBackend(TranscriptionBackend):
+    """faster-whisper をCPUで動かす転写バックエンド
+
+    モデルはワーカープロセスごとに一度だけ読み込んで保持し、同時に届いた
+    リクエストは短い待ち時間の間にまとめて1回のプロセス間呼び出しで処理する。
+    同時に処理するバッチ数はワーカー数まで。
+    """
+
+    backend = "local"
+
+    def __init__(
+        self,
+        model_size: str = "small",
+        compute_type: str = "int8",
+        workers: int = 1,
+        cpu_threads: int = 4,
+        max_batch_size: int = 8,
+        batch_window: float = 0.02,
+        executor: Optional[Executor] = None,
+        batch_fn: Callable[
+            [List[Tuple[bytes, str, bool]]], List[Dict[str, Any]]
+        ] = transcribe_local_batch,
+    ):
+        super().__init__()
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.batch_fn = batch_fn
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        self.stats.update({"batches": 0, "batched_requests": 0})
+        self.batch_size_histogram = Histogram([1, 2, 4, 8, 16, 32])
+
+    @property
+    def is_running(self) -> bool:
+        return self._batcher is not None and not self._batcher.done()
+
+    async def start(self):
+        """ワーカープールを起動し、各ワーカーでモデルを読み込んでおく"""
+        if self.is_running:
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_local_worker,
+                initargs=(self.model_size, self.compute_type, self.cpu_threads),
+            )
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._batcher = asyncio.create_task(self._run_batcher())
+
+        if self._owns_executor:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._executor, _warm_up_worker)
+                    for _ in range(self.workers)
+                )
+            )
+        logger.info(
+            "Local transcription backend started",
+            model=self.model_size,
+            workers=self.workers,
+        )
+
+    async def stop(self):
+        """ワーカープールを停止（待機中のリクエストは失敗させる）"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                request = self._queue.get_nowait()
+                if not request.future.done():
+                    request.future.set_exception(
+                        RuntimeError("Local transcription backend stopped")
+                    )
+            self._queue = None
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _transcribe(
+        self, audio_data: bytes, language: str, partial: bool
+    ) -> Dict[str, Any]:
+        if not self.is_running:
+            await self.start()
+        request = _LocalRequest(
+            audio_data, language, partial, asyncio.get_running_loop().create_future()
+        )
+        self._queue.put_nowait(request)
+        result = await request.future
+        if "error" in result:
+            raise RuntimeError(f"Local transcription failed: {result['error']}")
+        return result
+
+    async def _run_batcher(self):
+        """リクエストをまとめてワーカーへ渡す
+
+        ワーカーの空きを待ってからキューを取り出すので、ワーカーが埋まっている間に
+        届いたリクエストは次のバッチにまとまる。
+        """
+        while True:
+            batch: List[_LocalRequest] = []
+            try:
+                await self._slots.acquire()
+                batch.append(await self._queue.get())
+                deadline = time.monotonic() + self.batch_window
+                while len(batch) < self.max_batch_size:
+                    if self._queue.empty():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        try:
+                            batch.append(
+                                await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                            )
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        batch.append(self._queue.get_nowait())
+
+                task = asyncio.create_task(self._run_batch(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+            except asyncio.CancelledError:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(
+                            RuntimeError("Local transcription backend stopped")
+                        )
+                break
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Error in local transcription batcher: {e}")
+
+    async def _run_batch(self, batch: List[_LocalRequest]):
+        """1バッチをワーカーで実行し、結果を各リクエストへ返す"""
+        self.stats["batches"] += 1
+        self.stats["batched_requests"] += len(batch)
+        self.batch_size_histogram.observe(len(batch))
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                self._executor,
+                self.batch_fn,
+                [(r.audio_data, r.language, r.partial) for r in batch],
+            )
+            for request, result in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(result)
+        except Exception as e:
+            logger.error(f"Local transcription batch failed: {e}", size=len(batch))
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "model": self.model_size,
+            "workers": self.workers,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size_histogram": self.batch_size_histogram.to_dict(),
+        }
+
+
+def create_transcription_backend() -> TranscriptionBackend:
+    """設定に応じた転写バックエンドを作成"""
+    if settings.TRANSCRIPTION_BACKEND == "local":
+        try:
+            import faster_whisper  # noqa: F401
+
+            return LocalTranscriptionBackend(
+                model_size=settings.TRANSCRIPTION_LOCAL_MODEL,
+                compute_type=settings.TRANSCRIPTION_LOCAL_COMPUTE_TYPE,
+                workers=settings.TRANSCRIPTION_LOCAL_WORKERS,
+                cpu_threads=settings.TRANSCRIPTION_LOCAL_CPU_THREADS,
+                max_batch_size=settings.TRANSCRIPTION_LOCAL_MAX_BATCH,
+                batch_window=settings.TRANSCRIPTION_LOCAL_BATCH_WINDOW,
+            )
+        except ImportError as e:
+            logger.warning(f"faster-whisper is not available, using OpenAI: {e}")
+    return OpenAITranscriptionBackend()
+
+
+# グローバルバックエンド
+transcription_backend = create_transcription_backend()
@@ -5,6 +5,7 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 import structlog
+import asyncio
 import os
 
 from app.config import settings
@@ -43,16 +44,71 @@ async def lifespan(app: FastAPI):
 
     # Firebase初期化を確実に実行
     try:
-        from app.core.auth import get_firebase_app
+        from app.core.auth import get_firebase_app, prefetch_firebase_certs
 
         firebase_app = get_firebase_app()
         if firebase_app:
             logger.info("Firebase initialized successfully during startup")
+            # IDトークン検証用の公開鍵を事前取得
+            await asyncio.to_thread(prefetch_firebase_certs)
         else:
             logger.warning("Firebase initialization failed during startup")
     except Exception as e:
         logger.error(f"Firebase initialization error during startup: {e}")
 
+    # WebSocketメッセージのディスパッチテーブルを構築
+    initialize_message_handlers()
+
+    # ワーカー間ブロードキャストのバックプレーンを開始
+    try:
+        from app.core.websocket import manager
+
+        await manager.start_backplane()
+    except Exception as e:
+        logger.error(f"Failed to start WebSocket backplane: {e}")
+
+    # 転写バックエンドを開始（ローカルモデルはここで読み込んでおく）
+    try:
+        from app.integrations.transcription_backend import transcription_backend
+
+        await transcription_backend.start()
+    except Exception as e:
+        logger.error(f"Failed to start transcription backend: {e}")
+
+    # 確定転写の書き込みバッファを開始
+    try:
+        from app.services.transcription_writer import transcription_write_buffer
+
+        await transcription_write_buffer.start()
+    except Exception as e:
+        logger.error(f"Failed to start transcription write buffer: {e}")
+
+    # 転写ジョブのスケジューラーを開始（転写をメッセージ処理から切り離す）
+    try:
+        from app.services.transcription_scheduler import transcription_scheduler
+        from app.services.transcription_service import realtime_transcription_manager
+
+        await transcription_scheduler.start()
+        realtime_transcription_manager.attach_scheduler(transcription_scheduler)
+    except Exception as e:
+        logger.error(f"Failed to start transcription scheduler: {e}")
+
+    # 音声ミックス（AUDIO_FORWARDING_MODE=mcu の場合のみ動作）を開始
+    try:
+        from app.services.audio_forwarding import audio_forwarder
+
+        await audio_forwarder.start()
+    except Exception as e:
+        logger.error(f"Failed to start audio forwarder: {e}")
+
+    # 音声レベル・発言者の通知の集約を開始
+    try:
+        from app.services.audio_level_aggregator import audio_level_aggregator
+
+        await audio_level_aggregator.start()
+    except Exception as e:
+        logger.error(f"Failed to start audio level aggregator: {e}")
+
     # データベースマイグレーションは Alembic を使用（自動作成は行わない）
     logger.info("Skipping automatic table creation. Use Alembic migrations instead.")
 
@@ -69,6 +125,88 @@ async def lifespan(app: FastAPI):
     # シャットダウン時
     logger.info("Shutting down Bridge Line API server")
 
+    # 音声ミックスを停止
+    try:
+        from app.services.audio_forwarding import audio_forwarder
+
+        await audio_forwarder.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop audio forwarder: {e}")
+
+    # 音声レベル・発言者の通知の集約を停止
+    try:
+        from app.services.audio_level_aggregator import audio_level_aggregator
+
+        await audio_level_aggregator.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop audio level aggregator: {e}")
+
+    # 転写ジョブのスケジューラーを停止
+    try:
+        from app.services.transcription_scheduler import transcription_scheduler
+        from app.services.transcription_service import realtime_transcription_manager
+
+        realtime_transcription_manager.attach_scheduler(None)
+        await transcription_scheduler.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop transcription scheduler: {e}")
+
+    # 書き込みバッファに残った転写を保存
+    try:
+        from app.services.transcription_writer import transcription_write_buffer
+
+        await transcription_write_buffer.stop()
+    except Exception as e:
+        logger.error(f"Failed to flush transcription write buffer: {e}")
+
+    # 配信済みチャットメッセージの書き込みを待つ
+    try:
+        from app.services.messaging_service import messaging_service
+
+        await messaging_service.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush chat message writes: {e}")
+
+    # 録音中のファイルを確定
+    try:
+        from app.services.audio_recorder import audio_recorder
+
+        await audio_recorder.close()
+    except Exception as e:
+        logger.error(f"Failed to close audio recordings: {e}")
+
+    # 転写バックエンドを停止
+    try:
+        from app.integrations.transcription_backend import transcription_backend
+
+        await transcription_backend.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop transcription backend: {e}")
+
+    # バックプレーンを停止
+    try:
+        from app.core.websocket import manager
+
+        await manager.stop_backplane()
+    except Exception as e:
+        logger.error(f"Failed to stop WebSocket backplane: {e}")
+
+    # トークン失効チェックの定期タスクを停止
+    try:
+        from app.core.auth import stop_revocation_refresher
+
+        await stop_revocation_refresher()
+    except Exception as e:
+        logger.error(f"Failed to stop token revocation refresher: {e}")
+
+    # 接続プールを閉じる
+    try:
+        from app.core.database import dispose_engine
+
+        await dispose_engine()
+    except Exception as e:
+        logger.error(f"Failed to dispose database engine: {e}")
+
 
 # FastAPIアプリケーション作成
 app = FastAPI(
@@ -142,12 +280,35 @@ async def validation_exception_handler(request, exc: RequestValidationError):
 async def health_check():
     """ヘルスチェック"""
     try:
-        from app.core.database import test_database_connection
+        from app.core.database import get_pool_stats, test_database_connection
+        from app.core.user_cache import user_identity_cache
+        from app.integrations.transcription_backend import transcription_backend
+        from app.services.announcement_service import announcement_service
+        from app.services.audio_forwarding import audio_forwarder
+        from app.services.audio_level_aggregator import audio_level_aggregator
+        from app.services.audio_recorder import audio_recorder
+        from app.services.messaging_service import messaging_service
+        from app.services.notification_service import notification_service
+        from app.services.participation_tracker import participation_tracker
+        from app.services.transcription_scheduler import transcription_scheduler
+        from app.services.transcription_writer import transcription_write_buffer
 
         db_status = await test_database_connection()
         return {
             "status": "healthy" if db_status else "unhealthy",
             "database": "connected" if db_status else "disconnected",
+            "database_pool": get_pool_stats(),
+            "user_cache": user_identity_cache.get_stats(),
+            "transcription_scheduler": transcription_scheduler.get_stats(),
+            "transcription_backend": transcription_backend.get_stats(),
+            "transcription_writes": transcription_write_buffer.get_stats(),
+            "audio_recorder": audio_recorder.get_stats(),
+            "audio_forwarding": audio_forwarder.get_stats(),
+            "audio_levels": audio_level_aggregator.get_stats(),
+            "participation": participation_tracker.get_stats(),
+            "messages": messaging_service.get_stats(),
+            "notifications": notification_service.get_stats(),
+            "announcements": announcement_service.get_stats(),
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
     except Exception as e:
@@ -13,6 +13,7 @@ from .organization_member import OrganizationMember
 
 # 音声セッション関連
 from .voice_session import VoiceSession
+from .voice_session_participant import VoiceSessionParticipant
 
 # 文字起こし関連
 from .transcription import Transcription
@@ -60,6 +61,7 @@ __all__ = [
     "Organization",
     "OrganizationMember",
     "VoiceSession",
+    "VoiceSessionParticipant",
     "Transcription",
     "Analysis",
     "ChatRoom",
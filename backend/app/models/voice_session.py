@@ -61,12 +61,14 @@ class VoiceSession(Base):
     analyses = relationship("Analysis", back_populates="voice_session")
     transcriptions = relationship("Transcription", back_populates="voice_session")
 
-    # 参加者管理（新しい設計）- 一時的に無効化
-    # participants = relationship(
-    #     "VoiceSessionParticipant",
-    #     back_populates="voice_session",
-    #     cascade="all, delete-orphan",
-    # )
+    # 参加者（voice_session_participants テーブル）
+    # participants カラムは旧形式のJSONで、現在は録音状態の保存にのみ使われる
+    participants_rel = relationship(
+        "VoiceSessionParticipant",
+        back_populates="voice_session",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
     def __repr__(self) -> str:
         return f"<VoiceSession(id={self.id}, session_id='{self.session_id}', title='{self.title}')>"
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Boolean,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -9,11 +18,20 @@ class VoiceSessionParticipant(Base):
     """音声セッション参加者モデル"""
 
     __tablename__ = "voice_session_participants"
+    __table_args__ = (
+        # 同じセッションに同じユーザーは1行のみ（同時参加の重複はDBで弾く）
+        UniqueConstraint(
+            "voice_session_id", "user_id", name="uq_voice_session_participants_session_user"
+        ),
+        Index("ix_voice_session_participants_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
     # 外部キー
-    voice_session_id = Column(Integer, ForeignKey("voice_sessions.id"), nullable=False)
+    voice_session_id = Column(
+        Integer, ForeignKey("voice_sessions.id", ondelete="CASCADE"), nullable=False
+    )
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     # 参加者情報
@@ -22,9 +40,9 @@ class VoiceSessionParticipant(Base):
     left_at = Column(DateTime(timezone=True), nullable=True)
     is_active = Column(Boolean, default=True)
 
-    # リレーションシップ
-    voice_session = relationship("VoiceSession", back_populates="participants")
-    user = relationship("User", back_populates="voice_session_participations")
+    # リレーションシップ（循環参照を避けるため、Userとはback_populatesを使用しない）
+    voice_session = relationship("VoiceSession", back_populates="participants_rel")
+    user = relationship("User", foreign_keys=[user_id])
 
     def __repr__(self) -> str:
         return f"<VoiceSessionParticipant(session_id={self.voice_session_id}, user_id={self.user_id}, role='{self.role}')>"
@@ -3,6 +3,10 @@ from .base import BaseRepository
 
 # 音声セッション関連
 from .voice_session_repository import VoiceSessionRepository, voice_session_repository
+from .voice_session_participant_repository import (
+    VoiceSessionParticipantRepository,
+    voice_session_participant_repository,
+)
 
 # ユーザー関連
 from .user_repository import UserRepository, user_repository
@@ -46,6 +50,8 @@ __all__ = [
     "BaseRepository",
     "VoiceSessionRepository",
     "voice_session_repository",
+    "VoiceSessionParticipantRepository",
+    "voice_session_participant_repository",
     "UserRepository",
     "user_repository",
     "OrganizationRepository",
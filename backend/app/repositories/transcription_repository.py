@@ -1,6 +1,7 @@
+import uuid
 from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import insert, select, func
 from sqlalchemy.orm import selectinload
 
 from app.repositories.base import BaseRepository
@@ -39,6 +40,23 @@ class TranscriptionRepository(BaseRepository[Transcription, TranscriptionCreate,
         await db.refresh(db_obj)
         return db_obj
 
+    async def create_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: List[TranscriptionCreate],
+    ) -> int:
+        """文字起こしをまとめて作成（複数行INSERTとコミットを1回ずつ）"""
+        if not objs_in:
+            return 0
+        rows = [
+            {**obj_in.model_dump(mode="json"), "transcription_id": uuid.uuid4().hex}
+            for obj_in in objs_in
+        ]
+        await db.execute(insert(self.model), rows)
+        await db.commit()
+        return len(rows)
+
     async def get_multi(
         self,
         db: AsyncSession,
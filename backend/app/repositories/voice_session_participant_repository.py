@@ -0,0 +1,181 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, and_, func
+from sqlalchemy.exc import IntegrityError
+import structlog
+
+from app.models.voice_session import VoiceSession
+from app.models.voice_session_participant import VoiceSessionParticipant
+from app.models.user import User
+from app.repositories.base import BaseRepository
+
+logger = structlog.get_logger()
+
+
+class VoiceSessionParticipantRepository(
+    BaseRepository[VoiceSessionParticipant, Any, Any]
+):
+    """音声セッション参加者リポジトリ
+
+    参加者の追加・削除・役割変更は1行単位で行い、セッションの participant_count は
+    同じトランザクション内で参加者テーブルから数え直す。
+    """
+
+    def __init__(self):
+        super().__init__(VoiceSessionParticipant)
+
+    async def get_by_session_and_user(
+        self, db: AsyncSession, voice_session_id: int, user_id: int
+    ) -> Optional[VoiceSessionParticipant]:
+        """セッションとユーザーIDで参加者を取得"""
+        result = await db.execute(
+            select(VoiceSessionParticipant).where(
+                and_(
+                    VoiceSessionParticipant.voice_session_id == voice_session_id,
+                    VoiceSessionParticipant.user_id == user_id,
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get_role(
+        self, db: AsyncSession, voice_session_id: int, user_id: int
+    ) -> Optional[str]:
+        """参加者の役割を取得（参加していなければNone）"""
+        result = await db.execute(
+            select(VoiceSessionParticipant.role).where(
+                and_(
+                    VoiceSessionParticipant.voice_session_id == voice_session_id,
+                    VoiceSessionParticipant.user_id == user_id,
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get_with_users(
+        self, db: AsyncSession, voice_session_id: int
+    ) -> List[Tuple[VoiceSessionParticipant, User]]:
+        """セッションの参加者とユーザーを参加順に取得"""
+        result = await db.execute(
+            select(VoiceSessionParticipant, User)
+            .join(User, User.id == VoiceSessionParticipant.user_id)
+            .where(VoiceSessionParticipant.voice_session_id == voice_session_id)
+            .order_by(VoiceSessionParticipant.joined_at, VoiceSessionParticipant.id)
+        )
+        return list(result.tuples().all())
+
+    async def get_with_users_for_sessions(
+        self, db: AsyncSession, voice_session_ids: Sequence[int]
+    ) -> Dict[int, List[Tuple[VoiceSessionParticipant, User]]]:
+        """複数セッションの参加者とユーザーを1クエリで取得（セッションIDごと・参加順）"""
+        by_session: Dict[int, List[Tuple[VoiceSessionParticipant, User]]] = {
+            voice_session_id: [] for voice_session_id in voice_session_ids
+        }
+        if not by_session:
+            return by_session
+        result = await db.execute(
+            select(VoiceSessionParticipant, User)
+            .join(User, User.id == VoiceSessionParticipant.user_id)
+            .where(VoiceSessionParticipant.voice_session_id.in_(list(by_session)))
+            .order_by(VoiceSessionParticipant.joined_at, VoiceSessionParticipant.id)
+        )
+        for participant, user in result.tuples().all():
+            by_session[participant.voice_session_id].append((participant, user))
+        return by_session
+
+    async def count_active(self, db: AsyncSession, voice_session_id: int) -> int:
+        """アクティブな参加者数を取得"""
+        result = await db.execute(
+            select(func.count(VoiceSessionParticipant.id)).where(
+                and_(
+                    VoiceSessionParticipant.voice_session_id == voice_session_id,
+                    VoiceSessionParticipant.is_active.is_(True),
+                )
+            )
+        )
+        return result.scalar_one()
+
+    async def add_participant(
+        self, db: AsyncSession, voice_session_id: int, user_id: int, role: str
+    ) -> Optional[VoiceSessionParticipant]:
+        """参加者を追加（既に参加している場合はNone）"""
+        participant = VoiceSessionParticipant(
+            voice_session_id=voice_session_id, user_id=user_id, role=role, is_active=True
+        )
+        try:
+            db.add(participant)
+            await db.flush()
+            await self._refresh_participant_count(db, voice_session_id)
+            await db.commit()
+        except IntegrityError:
+            # 一意制約（セッション, ユーザー）違反 = 同時に参加した重複
+            await db.rollback()
+            return None
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error adding participant {user_id} to session {voice_session_id}: {e}")
+            raise
+        await db.refresh(participant)
+        return participant
+
+    async def remove_participant(
+        self, db: AsyncSession, voice_session_id: int, user_id: int
+    ) -> bool:
+        """参加者を削除"""
+        try:
+            result = await db.execute(
+                delete(VoiceSessionParticipant).where(
+                    and_(
+                        VoiceSessionParticipant.voice_session_id == voice_session_id,
+                        VoiceSessionParticipant.user_id == user_id,
+                    )
+                )
+            )
+            if result.rowcount:
+                await self._refresh_participant_count(db, voice_session_id)
+            await db.commit()
+            return bool(result.rowcount)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error removing participant {user_id} from session {voice_session_id}: {e}")
+            raise
+
+    async def update_role(
+        self, db: AsyncSession, voice_session_id: int, user_id: int, role: str
+    ) -> bool:
+        """参加者の役割を更新（参加していなければFalse）"""
+        try:
+            result = await db.execute(
+                update(VoiceSessionParticipant)
+                .where(
+                    and_(
+                        VoiceSessionParticipant.voice_session_id == voice_session_id,
+                        VoiceSessionParticipant.user_id == user_id,
+                    )
+                )
+                .values(role=role)
+            )
+            await db.commit()
+            return bool(result.rowcount)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error updating participant role {user_id} in session {voice_session_id}: {e}")
+            raise
+
+    async def _refresh_participant_count(self, db: AsyncSession, voice_session_id: int):
+        """participant_count を参加者テーブルから数え直す（読み込み→書き戻しをしない）"""
+        count = (
+            select(func.count(VoiceSessionParticipant.id))
+            .where(VoiceSessionParticipant.voice_session_id == voice_session_id)
+            .scalar_subquery()
+        )
+        await db.execute(
+            update(VoiceSession)
+            .where(VoiceSession.id == voice_session_id)
+            .values(participant_count=count)
+            .execution_options(synchronize_session=False)
+        )
+
+
+# シングルトンインスタンス
+voice_session_participant_repository = VoiceSessionParticipantRepository()
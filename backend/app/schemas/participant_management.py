@@ -104,6 +104,11 @@ class SessionStatsResponse(BaseModel):
     muted_participants: int = Field(..., description="ミュート中参加者数")
     total_speak_time: float = Field(..., description="総発言時間")
     session_duration: float = Field(..., description="セッション継続時間")
+    total_turns: int = Field(default=0, description="総ターン数")
+    overlap_time: float = Field(default=0.0, description="発言が重なった時間")
+    silence_time: float = Field(default=0.0, description="誰も話していない時間")
+    silence_count: int = Field(default=0, description="無音区間の数")
+    participation: Dict[int, Dict[str, Any]] = Field(default_factory=dict, description="参加者ごとの発言時間・ターン・重なり")
 
 
 class ParticipantActionRequest(BaseModel):
@@ -285,6 +285,11 @@ class RealtimeStatsResponse(BaseModel):
     key_topics_count: int
     last_activity: datetime
     is_live: bool
+    total_speak_time: float = 0.0  # 発言時間の合計（秒）
+    total_turns: int = 0
+    overlap_time: float = 0.0  # 発言が重なった時間（秒）
+    silence_time: float = 0.0  # 誰も話していない時間（秒）
+    participation: Dict[int, Dict[str, Any]] = {}  # 参加者ごとの発言時間・ターン・重なり
 
     class Config:
         from_attributes = True
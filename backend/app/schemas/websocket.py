@@ -38,6 +38,8 @@ class WebSocketMessageType(str, Enum):
     AUDIO_LEVEL = "audio_level"
     AUDIO_QUALITY_REQUEST = "audio_quality_request"
     AUDIO_QUALITY_INFO = "audio_quality_info"
+    SET_AUDIO_LEVEL_RATE = "set_audio_level_rate"
+    AUDIO_LEVEL_RATE_UPDATED = "audio_level_rate_updated"
     NETWORK_METRICS_UPDATE = "network_metrics_update"
 
     # 文字起こし関連
@@ -1078,3 +1080,60 @@ WebSocketMessage = (
     | ErrorMessage
     | WarningMessage
 )
+
+
+# 受信メッセージのペイロード（handle_message のディスパッチ前に検証する）
+# 未知のフィールドは無視し、ハンドラーが読むフィールドだけを検証する
+
+
+class JoinSessionPayload(BaseModel):
+    """join_session の受信ペイロード"""
+
+    session_id: str = Field(..., min_length=1)
+    role: str = "participant"
+
+
+class LeaveSessionPayload(BaseModel):
+    """leave_session の受信ペイロード"""
+
+    session_id: str = Field(..., min_length=1)
+
+
+class AudioDataPayload(BaseModel):
+    """audio_data の受信ペイロード"""
+
+    session_id: str = Field(..., min_length=1)
+    audio_data: str  # Base64エンコードされた音声データ
+    audio_level: float = 0.0
+
+
+class ChatMessagePayload(BaseModel):
+    """chat_message の受信ペイロード"""
+
+    session_id: str = Field(..., min_length=1)
+    message: str
+    message_type: str = "text"
+
+
+class ParticipantActionPayload(BaseModel):
+    """participant_action の受信ペイロード"""
+
+    session_id: str = Field(..., min_length=1)
+    action: str
+    target_user_id: Optional[int] = None
+    action_data: Dict[str, Any] = Field(default_factory=dict)
+
+
+class SessionControlPayload(BaseModel):
+    """session_control の受信ペイロード"""
+
+    session_id: str = Field(..., min_length=1)
+    control_type: str
+    control_data: Dict[str, Any] = Field(default_factory=dict)
+
+
+class SetAudioLevelRatePayload(BaseModel):
+    """set_audio_level_rate の受信ペイロード（tick_hz が None なら既定値に戻す）"""
+
+    session_id: str = Field(..., min_length=1)
+    tick_hz: Optional[float] = Field(None, gt=0)
@@ -5,9 +5,12 @@ import structlog
 from dataclasses import dataclass
 import json
 import uuid
+from itertools import islice
 
+from app.core.outbound_queue import MessageClass
 from app.core.websocket import manager
 from app.models.user import User
+from app.services.expiring_store import ExpiringItemStore
 
 logger = structlog.get_logger()
 
@@ -64,14 +67,8 @@ class AnnouncementService:
     """アナウンスメントサービス"""
 
     def __init__(self):
-        # アナウンスメント履歴
-        self.announcements: Dict[str, List[Announcement]] = {}
-        # セッション別アナウンスメント
-        self.session_announcements: Dict[str, List[Announcement]] = {}
-        # ユーザー別アナウンスメント
-        self.user_announcements: Dict[int, List[Announcement]] = {}
-        # アクティブなアナウンスメント
-        self.active_announcements: List[Announcement] = []
+        # アナウンスメント（ID・セッション・ユーザー・有効期限・優先度で索引付け）
+        self.store = ExpiringItemStore(on_expire=self._forget_delivery_status)
         # 配信状態管理
         self.delivery_status: Dict[str, Dict[str, bool]] = {}
 
@@ -104,13 +101,9 @@ class AnnouncementService:
                 expires_at=expires_at,
             )
 
-            # アナウンスメントを保存
+            # アナウンスメントを保存（期限切れのものはアクティブにならない）
             await self._save_announcement(announcement)
 
-            # アクティブなアナウンスメントに追加
-            if not expires_at or expires_at > datetime.now():
-                self.active_announcements.append(announcement)
-
             logger.info(
                 f"Announcement created: {announcement.id}",
                 type=announcement_type.value,
@@ -204,7 +197,7 @@ class AnnouncementService:
                 return False
 
             # 却下ユーザーリストに追加
-            if user_id not in announcement.dismissed_by:
+            if self.store.dismiss(announcement_id, user_id):
                 announcement.dismissed_by.append(user_id)
 
             # 配信状態を更新
@@ -226,42 +219,18 @@ class AnnouncementService:
     ) -> List[Announcement]:
         """アクティブなアナウンスメントを取得"""
         try:
-            current_time = datetime.now()
-
-            # 期限切れのアナウンスメントを除外
-            active_announcements = [
-                a
-                for a in self.active_announcements
-                if a.expires_at is None or a.expires_at > current_time
-            ]
+            # 期限切れのものは除外済み・優先度の高い順（同じ優先度は新しい順）
+            # session_id を指定した場合はそのセッションとセッションなしのもののみ
+            active_announcements = self.store.ranked(session_id or None)
 
             # ユーザーが却下したアナウンスメントを除外
             if user_id:
-                active_announcements = [
-                    a for a in active_announcements if user_id not in a.dismissed_by
-                ]
-
-            # セッション別フィルタリング
-            if session_id:
-                active_announcements = [
-                    a
-                    for a in active_announcements
-                    if a.session_id == session_id or a.session_id is None
-                ]
-
-            # 優先度でソート（高い順）
-            active_announcements.sort(
-                key=lambda x: (
-                    x.priority.value == "urgent",
-                    x.priority.value == "high",
-                    x.priority.value == "normal",
-                    x.priority.value == "low",
-                    x.created_at,
-                ),
-                reverse=True,
-            )
+                dismissed = self.store.dismissed(user_id)
+                active_announcements = (
+                    a for a in active_announcements if a.id not in dismissed
+                )
 
-            return active_announcements
+            return list(active_announcements)
 
         except Exception as e:
             logger.error(f"Failed to get active announcements: {e}")
@@ -272,20 +241,8 @@ class AnnouncementService:
     ) -> List[Announcement]:
         """ユーザーのアナウンスメントを取得"""
         try:
-            announcements = self.user_announcements.get(user_id, [])
-
-            # 期限切れのアナウンスメントを除外
-            current_time = datetime.now()
-            announcements = [
-                a
-                for a in announcements
-                if a.expires_at is None or a.expires_at > current_time
-            ]
-
-            # 作成日時でソート（新しい順）
-            announcements.sort(key=lambda x: x.created_at, reverse=True)
-
-            return announcements[:limit]
+            # 期限切れのものは除外済み・新しい順
+            return list(islice(self.store.for_user(user_id), limit))
 
         except Exception as e:
             logger.error(f"Failed to get user announcements: {e}")
@@ -296,20 +253,8 @@ class AnnouncementService:
     ) -> List[Announcement]:
         """セッションのアナウンスメントを取得"""
         try:
-            announcements = self.session_announcements.get(session_id, [])
-
-            # 期限切れのアナウンスメントを除外
-            current_time = datetime.now()
-            announcements = [
-                a
-                for a in announcements
-                if a.expires_at is None or a.expires_at > current_time
-            ]
-
-            # 作成日時でソート（新しい順）
-            announcements.sort(key=lambda x: x.created_at, reverse=True)
-
-            return announcements[:limit]
+            # 期限切れのものは除外済み・新しい順
+            return list(islice(self.store.for_session(session_id), limit))
 
         except Exception as e:
             logger.error(f"Failed to get session announcements: {e}")
@@ -318,70 +263,35 @@ class AnnouncementService:
     async def cleanup_expired_announcements(self):
         """期限切れのアナウンスメントをクリーンアップ"""
         try:
-            current_time = datetime.now()
-
-            # アクティブなアナウンスメントから期限切れのものを削除
-            self.active_announcements[:] = [
-                a
-                for a in self.active_announcements
-                if a.expires_at is None or a.expires_at > current_time
-            ]
-
-            # 全アナウンスメントから期限切れのものを削除
-            for announcement_list in self.announcements.values():
-                announcement_list[:] = [
-                    a
-                    for a in announcement_list
-                    if a.expires_at is None or a.expires_at > current_time
-                ]
-
-            # セッション別アナウンスメントから期限切れのものを削除
-            for announcement_list in self.session_announcements.values():
-                announcement_list[:] = [
-                    a
-                    for a in announcement_list
-                    if a.expires_at is None or a.expires_at > current_time
-                ]
-
-            # ユーザー別アナウンスメントから期限切れのものを削除
-            for announcement_list in self.user_announcements.values():
-                announcement_list[:] = [
-                    a
-                    for a in announcement_list
-                    if a.expires_at is None or a.expires_at > current_time
-                ]
-
-            logger.info("Expired announcements cleaned up")
+            # 期限の早い順に期限切れのものだけを取り出して削除
+            expired = self.store.expire()
+
+            logger.info("Expired announcements cleaned up", count=len(expired))
 
         except Exception as e:
             logger.error(f"Failed to cleanup expired announcements: {e}")
 
     async def _save_announcement(self, announcement: Announcement):
         """アナウンスメントを保存"""
-        # 全アナウンスメントに追加
-        if announcement.id not in self.announcements:
-            self.announcements[announcement.id] = []
-        self.announcements[announcement.id].append(announcement)
-
-        # セッション別アナウンスメントに追加
-        if announcement.session_id:
-            if announcement.session_id not in self.session_announcements:
-                self.session_announcements[announcement.session_id] = []
-            self.session_announcements[announcement.session_id].append(announcement)
-
-        # ターゲットユーザー別アナウンスメントに追加
-        if announcement.target_user_ids:
-            for user_id in announcement.target_user_ids:
-                if user_id not in self.user_announcements:
-                    self.user_announcements[user_id] = []
-                self.user_announcements[user_id].append(announcement)
+        # ターゲットユーザー・セッション・優先度で索引付け
+        self.store.add(
+            announcement,
+            user_ids=announcement.target_user_ids or [],
+            session_id=announcement.session_id,
+            priority=announcement.priority.value,
+        )
 
     async def _find_announcement(self, announcement_id: str) -> Optional[Announcement]:
         """アナウンスメントを検索"""
-        if announcement_id in self.announcements:
-            for announcement in self.announcements[announcement_id]:
-                return announcement
-        return None
+        return self.store.get(announcement_id)
+
+    def _forget_delivery_status(self, announcement: Announcement):
+        """期限切れのアナウンスメントの配信状態を破棄"""
+        self.delivery_status.pop(announcement.id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {**self.store.get_stats(), "delivery_status": len(self.delivery_status)}
 
     async def _broadcast_announcement(self, announcement: Announcement):
         """アナウンスメントをブロードキャスト"""
@@ -407,7 +317,12 @@ class AnnouncementService:
             },
         }
 
-        await manager.broadcast_to_session(announcement_data, announcement.session_id)
+        await manager.broadcast_to_session(
+            announcement_data,
+            announcement.session_id,
+            message_class=MessageClass.NOTIFICATION,
+            coalesce_key=announcement.id,
+        )
 
         # 配信状態を更新
         announcement.delivered_at = datetime.now()
@@ -433,7 +348,9 @@ class AnnouncementService:
             },
         }
 
-        await manager.broadcast_to_user(announcement_data, user_id)
+        await manager.broadcast_to_user(
+            announcement_data, user_id, coalesce_key=announcement.id
+        )
 
         # 配信状態を更新
         announcement.delivered_at = datetime.now()
@@ -460,8 +377,10 @@ class AnnouncementService:
         }
 
         # 全アクティブユーザーに配信
-        for user_id in manager.user_connections.keys():
-            await manager.broadcast_to_user(announcement_data, user_id)
+        for user_id in list(manager.user_connections.keys()):
+            await manager.broadcast_to_user(
+                announcement_data, user_id, coalesce_key=announcement.id
+            )
 
         # 配信状態を更新
         announcement.delivered_at = datetime.now()
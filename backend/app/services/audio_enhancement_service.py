@@ -1,14 +1,38 @@
 import numpy as np
-import librosa
-from typing import Optional, Tuple, Dict, Any
+from typing import Callable, Deque, Optional, Tuple, Dict, Any, List
 import structlog
 from datetime import datetime
 import asyncio
-from dataclasses import dataclass
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from enum import Enum
 
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.core.metrics import Histogram
+
 logger = structlog.get_logger()
 
+# STFTの設定（75%重なり）
+N_FFT = 1024
+HOP_LENGTH = 256
+
+# ノイズ推定
+NOISE_WARMUP_FRAMES = 8  # 開始直後のフレームは雑音として平均する
+NOISE_FRAME_RATIO = 2.0  # 平均振幅が雑音のこの倍以下のフレームで推定を更新
+NOISE_SMOOTHING = 0.9  # 指数移動平均の係数（フレームごと）
+NOISE_FLOOR_RISE = 1.001  # 発話中もわずかに引き上げ、雑音の増加に追従する
+SPECTRAL_FLOOR = 0.1  # 減算後に残す元の振幅の割合
+
+# ゲイン制御
+TARGET_RMS = 0.25  # 目標レベル（-12dB）
+GAIN_RMS_SMOOTHING = 0.8  # チャンクごとのRMSの平滑化
+
+# リアルタイム係数（処理時間 / 音声の長さ）のバケット
+RTF_BOUNDS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0]
+
 
 class EnhancementType(str, Enum):
     """音声品質向上の種類"""
@@ -28,72 +52,393 @@ class EnhancementResult:
     timestamp: datetime
 
 
-class AudioEnhancementService:
-    """音声品質向上サービス"""
-    
-    def __init__(self):
+def calculate_snr(audio: np.ndarray) -> float:
+    """SNR（Signal-to-Noise Ratio）を計算"""
+    try:
+        # 簡易的なSNR計算
+        signal_power = np.mean(audio**2)
+        noise_power = np.var(audio) * 0.1  # 簡易ノイズ推定
+
+        if noise_power > 0:
+            snr = 10 * np.log10(signal_power / noise_power)
+            return float(max(snr, -20))  # -20dB以下は制限
+        else:
+            return 0.0
+
+    except Exception:
+        return 0.0
+
+
+class _SampleFifo:
+    """事前確保した配列を使うサンプルのFIFO（足りない場合だけ拡張する）"""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def view(self) -> np.ndarray:
+        return self._data[self._start:self._end]
+
+    def push(self, samples: np.ndarray):
+        count = len(samples)
+        if self._end + count > len(self._data):
+            size = len(self)
+            if size + count > len(self._data):
+                grown = np.zeros(max(2 * len(self._data), size + count), dtype=np.float32)
+                grown[:size] = self.view()
+                self._data = grown
+            else:
+                self._data[:size] = self._data[self._start:self._end]
+            self._start, self._end = 0, size
+        self._data[self._end:self._end + count] = samples
+        self._end += count
+
+    def discard(self, count: int):
+        self._start += count
+        if self._start >= self._end:
+            self._start = self._end = 0
+
+    def pop(self, count: int) -> np.ndarray:
+        samples = self._data[self._start:self._start + count].copy()
+        self.discard(count)
+        return samples
+
+
+class _SpectralStage:
+    """呼び出しをまたいで重畳加算の状態を保持するSTFT処理
+
+    入力と重畳加算の途中結果を次の呼び出しに持ち越すため、チャンクの境界で
+    不連続が生じない。出力は入力と同じ長さで、N_FFTサンプル遅れる。
+    """
+
+    def __init__(self, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.latency = n_fft
+
+        # 分析・合成とも平方根ハン窓（積がハン窓になり、75%重なりで和が一定）
+        window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft))
+        self.window = window.astype(np.float32)
+        self.synthesis_window = (window * hop_length / np.sum(window**2)).astype(np.float32)
+        # 正規化周波数（0〜1、1がナイキスト周波数）
+        self.frequencies = np.fft.rfftfreq(n_fft) * 2.0
+
+        self._input = _SampleFifo(4 * n_fft)
+        self._input.push(np.zeros(n_fft - hop_length, dtype=np.float32))
+        self._overlap = np.zeros(n_fft, dtype=np.float32)
+        self._output = _SampleFifo(4 * n_fft)
+        self._output.push(np.zeros(hop_length, dtype=np.float32))
+
+    def process(self, samples: np.ndarray, gain_fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """サンプルを追加し、同じ長さの処理済みサンプルを返す
+
+        gain_fn は振幅スペクトル（フレーム数 × ビン数）を受け取り、掛けるゲインを返す。
+        """
+        self._input.push(samples)
+        available = len(self._input)
+        if available >= self.n_fft:
+            n_frames = (available - self.n_fft) // self.hop_length + 1
+            data = self._input.view()[: (n_frames - 1) * self.hop_length + self.n_fft]
+            frames = sliding_window_view(data, self.n_fft)[:: self.hop_length]
+
+            spectra = np.fft.rfft(frames * self.window, axis=1)
+            spectra *= gain_fn(np.abs(spectra))
+            blocks = np.fft.irfft(spectra, n=self.n_fft, axis=1) * self.synthesis_window
+
+            hop = self.hop_length
+            for block in blocks:
+                self._overlap += block
+                self._output.push(self._overlap[:hop])
+                self._overlap[:-hop] = self._overlap[hop:]
+                self._overlap[-hop:] = 0.0
+            self._input.discard(n_frames * hop)
+
+        return self._output.pop(len(samples))
+
+    def process_all(self, samples: np.ndarray, gain_fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """1回で完結する音声を処理（遅延分を流し出して切り詰める）"""
+        padded = np.concatenate([samples, np.zeros(self.latency, dtype=np.float32)])
+        return self.process(padded, gain_fn)[self.latency:]
+
+
+class StreamingEnhancer:
+    """1ストリーム分の音声品質向上（状態を呼び出しをまたいで保持する）
+
+    ノイズ除去とスペクトル強調はそれぞれ専用のSTFT段で処理し、ノイズプロファイルは
+    処理のために計算した振幅スペクトルから逐次更新する（追加のSTFTは行わない）。
+    同じストリームの呼び出しは並行させないこと。
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
         self.noise_profile: Optional[np.ndarray] = None
+        self._noise_frames = 0
+        self._stages: Dict[EnhancementType, _SpectralStage] = {}
+        self._smoothed_rms: Optional[float] = None
+        self._gain: Optional[float] = None
+
+    def _stage(self, enhancement_type: EnhancementType) -> _SpectralStage:
+        stage = self._stages.get(enhancement_type)
+        if stage is None:
+            stage = self._stages[enhancement_type] = _SpectralStage()
+        return stage
+
+    def process(
+        self,
+        audio: np.ndarray,
+        enhancement_types: List[EnhancementType],
+        params: Dict[str, Any],
+        streaming: bool = True,
+    ) -> Tuple[np.ndarray, Dict[str, float], Dict[EnhancementType, float]]:
+        """品質向上を順に適用し、音声・メトリクス・種類ごとの処理時間（秒）を返す"""
+        enhanced = audio
+        quality_metrics: Dict[str, float] = {}
+        stage_seconds: Dict[EnhancementType, float] = {}
+
+        for enhancement_type in enhancement_types:
+            start = time.perf_counter()
+            if enhancement_type == EnhancementType.NOISE_REDUCTION:
+                enhanced, metrics = self._remove_noise(enhanced, params["noise_reduction_strength"], streaming)
+            elif enhancement_type == EnhancementType.ECHO_CANCELLATION:
+                enhanced, metrics = self._cancel_echo(
+                    enhanced, params["echo_profile"], params["echo_cancellation_strength"]
+                )
+            elif enhancement_type == EnhancementType.GAIN_CONTROL:
+                enhanced, metrics = self._apply_gain_control(enhanced, params["gain_boost_factor"])
+            elif enhancement_type == EnhancementType.SPECTRAL_ENHANCEMENT:
+                enhanced, metrics = self._enhance_spectrum(enhanced, streaming)
+            else:
+                continue
+            stage_seconds[enhancement_type] = stage_seconds.get(enhancement_type, 0.0) + (
+                time.perf_counter() - start
+            )
+            quality_metrics.update(metrics)
+
+        return enhanced, quality_metrics, stage_seconds
+
+    def _run_stage(self, enhancement_type: EnhancementType, audio: np.ndarray,
+                   gain_fn: Callable[[np.ndarray], np.ndarray], streaming: bool) -> np.ndarray:
+        stage = self._stage(enhancement_type)
+        if streaming:
+            return stage.process(audio, gain_fn)
+        return stage.process_all(audio, gain_fn)
+
+    def _update_noise_profile(self, magnitudes: np.ndarray) -> bool:
+        """フレームごとにノイズプロファイルを更新（更新したフレームがあればTrue）"""
+        updated = False
+        for frame in magnitudes:
+            if self._noise_frames < NOISE_WARMUP_FRAMES:
+                self._noise_frames += 1
+                if self.noise_profile is None:
+                    self.noise_profile = frame.astype(np.float32)
+                else:
+                    self.noise_profile += (frame - self.noise_profile) / self._noise_frames
+                updated = True
+            elif frame.mean() <= NOISE_FRAME_RATIO * self.noise_profile.mean():
+                self.noise_profile *= NOISE_SMOOTHING
+                self.noise_profile += (1 - NOISE_SMOOTHING) * frame
+                updated = True
+            else:
+                self.noise_profile *= NOISE_FLOOR_RISE
+        return updated
+
+    def _remove_noise(self, audio: np.ndarray, strength: float,
+                      streaming: bool) -> Tuple[np.ndarray, Dict[str, float]]:
+        """ノイズ除去（スペクトルサブトラクション）"""
+        updated = [False]
+
+        def gain_fn(magnitudes: np.ndarray) -> np.ndarray:
+            updated[0] = self._update_noise_profile(magnitudes)
+            gain = 1.0 - strength * self.noise_profile / (magnitudes + 1e-10)
+            return np.maximum(gain, SPECTRAL_FLOOR)
+
+        enhanced = self._run_stage(EnhancementType.NOISE_REDUCTION, audio, gain_fn, streaming)
+
+        # 品質メトリクスを計算
+        snr_before = calculate_snr(audio)
+        snr_after = calculate_snr(enhanced)
+        metrics = {
+            "snr_before": snr_before,
+            "snr_after": snr_after,
+            "noise_reduction_ratio": (snr_after - snr_before) / max(snr_before, 1e-10),
+            "noise_profile_updated": updated[0],
+        }
+        return enhanced, metrics
+
+    def _enhance_spectrum(self, audio: np.ndarray, streaming: bool) -> Tuple[np.ndarray, Dict[str, float]]:
+        """スペクトル強調（高周波成分を少し強調）"""
+        stage = self._stage(EnhancementType.SPECTRAL_ENHANCEMENT)
+        enhancement_filter = np.clip(1.0 + 0.3 * stage.frequencies, 0.5, 2.0)
+
+        enhanced = self._run_stage(
+            EnhancementType.SPECTRAL_ENHANCEMENT, audio, lambda _: enhancement_filter, streaming
+        )
+        metrics = {
+            "spectral_enhancement_factor": float(np.mean(enhancement_filter)),
+            "spectral_enhancement_applied": True,
+        }
+        return enhanced, metrics
+
+    def _cancel_echo(self, audio: np.ndarray, echo_profile: Optional[np.ndarray],
+                     strength: float) -> Tuple[np.ndarray, Dict[str, float]]:
+        """エコーキャンセル処理（簡易版）"""
+        if echo_profile is None:
+            # エコープロファイルがない場合は元の音声を返す
+            return audio, {"echo_cancellation_applied": False}
+
+        length = min(len(audio), len(echo_profile))
+        echo_cancelled = audio.copy()
+        echo_cancelled[:length] -= strength * echo_profile[:length]
+        echo_cancelled = np.clip(echo_cancelled, -1.0, 1.0)
+
+        metrics = {
+            "echo_reduction": float(np.mean(np.abs(audio - echo_cancelled))),
+            "echo_cancellation_applied": True,
+        }
+        return echo_cancelled, metrics
+
+    def _apply_gain_control(self, audio: np.ndarray, boost_factor: float) -> Tuple[np.ndarray, Dict[str, float]]:
+        """ゲイン制御（RMSをチャンク間で平滑化し、ゲインはチャンク内で滑らかに変える）"""
+        current_rms = float(np.sqrt(np.mean(audio**2))) if len(audio) else 0.0
+        if self._smoothed_rms is None:
+            if current_rms <= 0:
+                return audio, {"gain_control_applied": False}
+            self._smoothed_rms = current_rms
+        else:
+            self._smoothed_rms = (
+                GAIN_RMS_SMOOTHING * self._smoothed_rms + (1 - GAIN_RMS_SMOOTHING) * current_rms
+            )
+
+        gain_factor = min(boost_factor, TARGET_RMS / max(self._smoothed_rms, 1e-10))
+        previous = self._gain if self._gain is not None else gain_factor
+        self._gain = gain_factor
+        enhanced_audio = audio * np.linspace(previous, gain_factor, len(audio), dtype=np.float32)
+
+        metrics = {
+            "original_rms": current_rms,
+            "target_rms": TARGET_RMS,
+            "gain_factor": gain_factor,
+            "final_rms": float(np.sqrt(np.mean(enhanced_audio**2))) if len(audio) else 0.0,
+        }
+        return enhanced_audio, metrics
+
+
+class AudioEnhancementService:
+    """音声品質向上サービス
+
+    stream_id を指定した呼び出しはストリームごとの StreamingEnhancer で状態を
+    引き継いで処理し、指定しない呼び出しはその音声だけで完結させる。
+    計算はワーカースレッドで行い、イベントループをブロックしない。
+    """
+
+    def __init__(
+        self,
+        max_streams: int = 256,
+        history_size: int = 1000,
+        workers: int = 2,
+        executor: Optional[Executor] = None,
+    ):
         self.echo_profile: Optional[np.ndarray] = None
-        self.enhancement_history: Dict[str, EnhancementResult] = {}
-        
+        # 処理履歴（音声データは保持しない）
+        self.enhancement_history: Deque[EnhancementResult] = deque(maxlen=history_size)
+
         # 音声処理パラメータ
         self.noise_reduction_strength = 2.0
         self.echo_cancellation_strength = 0.8
         self.gain_boost_factor = 1.2
-        
-        # ノイズプロファイルの更新頻度
-        self.noise_profile_update_interval = 10  # 秒
-        self.last_noise_profile_update = datetime.now()
-        
+
+        # ストリームごとの状態（古いものから破棄）
+        self.max_streams = max_streams
+        self.streams: "OrderedDict[str, StreamingEnhancer]" = OrderedDict()
+        self._stream_locks: Dict[str, asyncio.Lock] = {}
+
+        self.workers = workers
+        self._executor = executor
+
+        # 種類ごとのリアルタイム係数
+        self.type_stats: Dict[EnhancementType, Dict[str, Any]] = {}
+
         logger.info("音声品質向上サービスを初期化しました")
-    
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="enhancement"
+            )
+        return self._executor
+
+    def _get_stream(self, stream_id: str, sample_rate: int) -> StreamingEnhancer:
+        enhancer = self.streams.get(stream_id)
+        if enhancer is None or enhancer.sample_rate != sample_rate:
+            enhancer = StreamingEnhancer(sample_rate)
+            self.streams[stream_id] = enhancer
+        self.streams.move_to_end(stream_id)
+
+        while len(self.streams) > self.max_streams:
+            evicted, _ = self.streams.popitem(last=False)
+            self._stream_locks.pop(evicted, None)
+        return enhancer
+
+    def _params(self) -> Dict[str, Any]:
+        return {
+            "noise_reduction_strength": self.noise_reduction_strength,
+            "echo_cancellation_strength": self.echo_cancellation_strength,
+            "gain_boost_factor": self.gain_boost_factor,
+            "echo_profile": self.echo_profile,
+        }
+
     async def enhance_audio(
-        self, 
-        audio_data: bytes, 
+        self,
+        audio_data: bytes,
         sample_rate: int = 16000,
-        enhancement_types: list[EnhancementType] = None
+        enhancement_types: list[EnhancementType] = None,
+        stream_id: Optional[str] = None,
     ) -> EnhancementResult:
         """音声品質向上のメイン処理"""
-        start_time = datetime.now()
-        
+        start_time = time.perf_counter()
+
         if enhancement_types is None:
             enhancement_types = [EnhancementType.NOISE_REDUCTION, EnhancementType.ECHO_CANCELLATION]
-        
+
         try:
             # バイトデータをnumpy配列に変換
-            audio_array = np.frombuffer(audio_data, dtype=np.int16)
+            audio_array = np.frombuffer(audio_data[: len(audio_data) // 2 * 2], dtype=np.int16)
             audio_float = audio_array.astype(np.float32) / 32768.0
-            
-            enhanced_audio = audio_float.copy()
-            quality_metrics = {}
-            
-            # 各品質向上処理を適用
-            for enhancement_type in enhancement_types:
-                if enhancement_type == EnhancementType.NOISE_REDUCTION:
-                    enhanced_audio, noise_metrics = await self._remove_noise(enhanced_audio, sample_rate)
-                    quality_metrics.update(noise_metrics)
-                    
-                elif enhancement_type == EnhancementType.ECHO_CANCELLATION:
-                    enhanced_audio, echo_metrics = await self._cancel_echo(enhanced_audio, sample_rate)
-                    quality_metrics.update(echo_metrics)
-                    
-                elif enhancement_type == EnhancementType.GAIN_CONTROL:
-                    enhanced_audio, gain_metrics = await self._apply_gain_control(enhanced_audio)
-                    quality_metrics.update(gain_metrics)
-                    
-                elif enhancement_type == EnhancementType.SPECTRAL_ENHANCEMENT:
-                    enhanced_audio, spectral_metrics = await self._enhance_spectrum(enhanced_audio, sample_rate)
-                    quality_metrics.update(spectral_metrics)
-            
-            # 音声レベルを正規化
-            enhanced_audio = np.clip(enhanced_audio, -1.0, 1.0)
-            
-            # バイトデータに戻す
+
+            loop = asyncio.get_running_loop()
+            if stream_id is None:
+                enhanced_audio, quality_metrics, stage_seconds = await loop.run_in_executor(
+                    self._get_executor(),
+                    StreamingEnhancer(sample_rate).process,
+                    audio_float,
+                    enhancement_types,
+                    self._params(),
+                    False,
+                )
+            else:
+                # 同じストリームは到着順に1つずつ処理する
+                lock = self._stream_locks.setdefault(stream_id, asyncio.Lock())
+                async with lock:
+                    enhancer = self._get_stream(stream_id, sample_rate)
+                    enhanced_audio, quality_metrics, stage_seconds = await loop.run_in_executor(
+                        self._get_executor(),
+                        enhancer.process,
+                        audio_float,
+                        enhancement_types,
+                        self._params(),
+                    )
+
+            # 音声レベルを正規化してバイトデータに戻す
+            enhanced_audio = np.clip(enhanced_audio, -1.0, 1.0 - 1.0 / 32768)
             enhanced_bytes = (enhanced_audio * 32768).astype(np.int16).tobytes()
-            
-            # 処理時間を計算
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
-            
+
+            processing_time = (time.perf_counter() - start_time) * 1000
+            self._record_real_time_factor(stage_seconds, len(audio_float) / sample_rate)
+
             # 結果を作成
             result = EnhancementResult(
                 enhanced_audio=enhanced_bytes,
@@ -102,20 +447,19 @@ class AudioEnhancementService:
                 processing_time_ms=processing_time,
                 timestamp=datetime.now()
             )
-            
-            # 履歴に保存
-            chunk_id = f"enhanced_{int(datetime.now().timestamp() * 1000)}"
-            self.enhancement_history[chunk_id] = result
-            
-            logger.info(
+
+            # 履歴に保存（件数は上限あり）
+            self.enhancement_history.append(replace(result, enhanced_audio=b""))
+
+            logger.debug(
                 "音声品質向上完了",
                 enhancement_types=[et.value for et in enhancement_types],
                 processing_time_ms=processing_time,
                 quality_metrics=quality_metrics
             )
-            
+
             return result
-            
+
         except Exception as e:
             logger.error(f"音声品質向上に失敗: {e}")
             # エラーの場合は元の音声データを返す
@@ -126,221 +470,100 @@ class AudioEnhancementService:
                 processing_time_ms=0.0,
                 timestamp=datetime.now()
             )
-    
-    async def _remove_noise(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, Dict[str, float]]:
-        """ノイズ除去処理"""
-        try:
-            # STFT（短時間フーリエ変換）
-            stft = librosa.stft(audio, n_fft=1024, hop_length=256)
-            
-            # ノイズプロファイルの更新（定期的に）
-            await self._update_noise_profile(audio, sample_rate)
-            
-            if self.noise_profile is not None:
-                # スペクトルサブトラクションによるノイズ除去
-                noise_subtracted = stft - self.noise_reduction_strength * self.noise_profile
-                noise_subtracted = np.maximum(noise_subtracted, 0.1 * np.abs(stft))
-                
-                # ISTFT（逆短時間フーリエ変換）
-                enhanced_audio = librosa.istft(noise_subtracted, hop_length=256)
-                
-                # 品質メトリクスを計算
-                snr_before = self._calculate_snr(audio)
-                snr_after = self._calculate_snr(enhanced_audio)
-                noise_reduction_ratio = (snr_after - snr_before) / max(snr_before, 1e-10)
-                
-                metrics = {
-                    "snr_before": snr_before,
-                    "snr_after": snr_after,
-                    "noise_reduction_ratio": noise_reduction_ratio,
-                    "noise_profile_updated": self.noise_profile is not None
-                }
-                
-                return enhanced_audio, metrics
-            else:
-                # ノイズプロファイルがない場合は元の音声を返す
-                return audio, {"snr": self._calculate_snr(audio), "noise_reduction_applied": False}
-                
-        except Exception as e:
-            logger.error(f"ノイズ除去に失敗: {e}")
-            return audio, {"error": 1.0}
-    
-    async def _cancel_echo(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, Dict[str, float]]:
-        """エコーキャンセル処理"""
-        try:
-            if self.echo_profile is not None:
-                # エコー除去（簡易版）
-                echo_cancelled = audio - self.echo_cancellation_strength * self.echo_profile[:len(audio)]
-                echo_cancelled = np.clip(echo_cancelled, -1.0, 1.0)
-                
-                # 品質メトリクスを計算
-                echo_reduction = np.mean(np.abs(audio - echo_cancelled))
-                
-                metrics = {
-                    "echo_reduction": echo_reduction,
-                    "echo_cancellation_applied": True
-                }
-                
-                return echo_cancelled, metrics
-            else:
-                # エコープロファイルがない場合は元の音声を返す
-                return audio, {"echo_cancellation_applied": False}
-                
-        except Exception as e:
-            logger.error(f"エコーキャンセルに失敗: {e}")
-            return audio, {"error": 1.0}
-    
-    async def _apply_gain_control(self, audio: np.ndarray) -> Tuple[np.ndarray, Dict[str, float]]:
-        """ゲイン制御"""
-        try:
-            # 現在のRMSレベルを計算
-            current_rms = np.sqrt(np.mean(audio**2))
-            
-            # 目標レベル（-12dB）
-            target_rms = 0.25
-            
-            if current_rms > 0:
-                # ゲイン調整係数を計算
-                gain_factor = min(self.gain_boost_factor, target_rms / current_rms)
-                
-                # ゲインを適用
-                enhanced_audio = audio * gain_factor
-                
-                metrics = {
-                    "original_rms": current_rms,
-                    "target_rms": target_rms,
-                    "gain_factor": gain_factor,
-                    "final_rms": np.sqrt(np.mean(enhanced_audio**2))
+
+    def _record_real_time_factor(self, stage_seconds: Dict[EnhancementType, float], audio_seconds: float):
+        if audio_seconds <= 0:
+            return
+        for enhancement_type, seconds in stage_seconds.items():
+            stats = self.type_stats.get(enhancement_type)
+            if stats is None:
+                stats = self.type_stats[enhancement_type] = {
+                    "calls": 0,
+                    "processing_seconds": 0.0,
+                    "audio_seconds": 0.0,
+                    "rtf": Histogram(RTF_BOUNDS),
                 }
-                
-                return enhanced_audio, metrics
-            else:
-                return audio, {"gain_control_applied": False}
-                
-        except Exception as e:
-            logger.error(f"ゲイン制御に失敗: {e}")
-            return audio, {"error": 1.0}
-    
-    async def _enhance_spectrum(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, Dict[str, float]]:
-        """スペクトル強調"""
-        try:
-            # STFT
-            stft = librosa.stft(audio, n_fft=1024, hop_length=256)
-            
-            # スペクトル強調（高周波成分を少し強調）
-            frequencies = np.linspace(0, sample_rate/2, stft.shape[0])
-            enhancement_filter = 1.0 + 0.3 * (frequencies / (sample_rate/2))
-            enhancement_filter = np.clip(enhancement_filter, 0.5, 2.0)
-            
-            # フィルターを適用
-            enhanced_stft = stft * enhancement_filter[:, np.newaxis]
-            
-            # ISTFT
-            enhanced_audio = librosa.istft(enhanced_stft, hop_length=256)
-            
-            # 品質メトリクス
-            high_freq_enhancement = np.mean(enhancement_filter)
-            
-            metrics = {
-                "spectral_enhancement_factor": high_freq_enhancement,
-                "spectral_enhancement_applied": True
-            }
-            
-            return enhanced_audio, metrics
-            
-        except Exception as e:
-            logger.error(f"スペクトル強調に失敗: {e}")
-            return audio, {"error": 1.0}
-    
-    async def _update_noise_profile(self, audio: np.ndarray, sample_rate: int):
-        """ノイズプロファイルを更新"""
-        try:
-            current_time = datetime.now()
-            
-            # 更新間隔をチェック
-            if (current_time - self.last_noise_profile_update).total_seconds() < self.noise_profile_update_interval:
-                return
-            
-            # 最初の1秒間をノイズとして扱う
-            noise_samples = int(sample_rate)
-            if len(audio) >= noise_samples:
-                noise_segment = audio[:noise_samples]
-                
-                # STFT
-                noise_stft = librosa.stft(noise_segment, n_fft=1024, hop_length=256)
-                
-                # ノイズプロファイルを更新
-                if self.noise_profile is None:
-                    self.noise_profile = np.mean(np.abs(noise_stft), axis=1, keepdims=True)
-                else:
-                    # 指数移動平均で更新
-                    alpha = 0.1
-                    self.noise_profile = alpha * np.mean(np.abs(noise_stft), axis=1, keepdims=True) + \
-                                       (1 - alpha) * self.noise_profile
-                
-                self.last_noise_profile_update = current_time
-                logger.debug("ノイズプロファイルを更新しました")
-                
-        except Exception as e:
-            logger.error(f"ノイズプロファイル更新に失敗: {e}")
-    
+            stats["calls"] += 1
+            stats["processing_seconds"] += seconds
+            stats["audio_seconds"] += audio_seconds
+            stats["rtf"].observe(seconds / audio_seconds)
+
+    def close_stream(self, stream_id: str):
+        """ストリームの状態を破棄"""
+        self.streams.pop(stream_id, None)
+        self._stream_locks.pop(stream_id, None)
+
     def _calculate_snr(self, audio: np.ndarray) -> float:
         """SNR（Signal-to-Noise Ratio）を計算"""
-        try:
-            # 簡易的なSNR計算
-            signal_power = np.mean(audio**2)
-            noise_power = np.var(audio) * 0.1  # 簡易ノイズ推定
-            
-            if noise_power > 0:
-                snr = 10 * np.log10(signal_power / noise_power)
-                return max(snr, -20)  # -20dB以下は制限
-            else:
-                return 0.0
-                
-        except Exception:
-            return 0.0
-    
+        return calculate_snr(audio)
+
     def set_enhancement_parameters(self, **kwargs):
         """音声品質向上パラメータを設定"""
-        if 'noise_reduction_strength' in kwargs:
+        if kwargs.get('noise_reduction_strength') is not None:
             self.noise_reduction_strength = kwargs['noise_reduction_strength']
-        if 'echo_cancellation_strength' in kwargs:
+        if kwargs.get('echo_cancellation_strength') is not None:
             self.echo_cancellation_strength = kwargs['echo_cancellation_strength']
-        if 'gain_boost_factor' in kwargs:
+        if kwargs.get('gain_boost_factor') is not None:
             self.gain_boost_factor = kwargs['gain_boost_factor']
-        
+
         logger.info(f"音声品質向上パラメータを更新: {kwargs}")
-    
+
+    def get_real_time_factors(self) -> Dict[str, Any]:
+        """種類ごとのリアルタイム係数（処理時間 / 音声の長さ）"""
+        return {
+            enhancement_type.value: {
+                "calls": stats["calls"],
+                "real_time_factor": stats["processing_seconds"] / stats["audio_seconds"],
+                "distribution": stats["rtf"].to_dict(),
+            }
+            for enhancement_type, stats in self.type_stats.items()
+        }
+
     def get_enhancement_stats(self) -> Dict[str, Any]:
         """音声品質向上の統計情報を取得"""
+        noise_profile_available = any(
+            enhancer.noise_profile is not None for enhancer in self.streams.values()
+        )
         if not self.enhancement_history:
-            return {"total_processed": 0}
-        
+            return {
+                "total_processed": 0,
+                "avg_processing_time_ms": 0.0,
+                "avg_snr_improvement": 0.0,
+                "avg_echo_reduction": 0.0,
+                "noise_profile_available": noise_profile_available,
+                "echo_profile_available": self.echo_profile is not None,
+                "active_streams": len(self.streams),
+                "real_time_factor": self.get_real_time_factors(),
+            }
+
         total_processed = len(self.enhancement_history)
-        avg_processing_time = np.mean([r.processing_time_ms for r in self.enhancement_history.values()])
-        
+        avg_processing_time = float(np.mean([r.processing_time_ms for r in self.enhancement_history]))
+
         # 品質メトリクスの統計
-        all_metrics = []
-        for result in self.enhancement_history.values():
-            if "error" not in result.quality_metrics:
-                all_metrics.append(result.quality_metrics)
-        
+        all_metrics = [
+            result.quality_metrics
+            for result in self.enhancement_history
+            if "error" not in result.quality_metrics
+        ]
+
         if all_metrics:
-            avg_snr_improvement = np.mean([m.get("noise_reduction_ratio", 0) for m in all_metrics])
-            avg_echo_reduction = np.mean([m.get("echo_reduction", 0) for m in all_metrics])
+            avg_snr_improvement = float(np.mean([m.get("noise_reduction_ratio", 0) for m in all_metrics]))
+            avg_echo_reduction = float(np.mean([m.get("echo_reduction", 0) for m in all_metrics]))
         else:
             avg_snr_improvement = 0.0
             avg_echo_reduction = 0.0
-        
+
         return {
             "total_processed": total_processed,
             "avg_processing_time_ms": avg_processing_time,
             "avg_snr_improvement": avg_snr_improvement,
             "avg_echo_reduction": avg_echo_reduction,
-            "noise_profile_available": self.noise_profile is not None,
-            "echo_profile_available": self.echo_profile is not None
+            "noise_profile_available": noise_profile_available,
+            "echo_profile_available": self.echo_profile is not None,
+            "active_streams": len(self.streams),
+            "real_time_factor": self.get_real_time_factors(),
         }
-    
+
     def clear_history(self):
         """処理履歴をクリア"""
         self.enhancement_history.clear()
@@ -0,0 +1,384 @@
+"""
+音声の転送方式（全中継 / SFU / MCU）
+
+- relay: 各話者の音声を他の全参加者へ個別に中継する（従来の方式、送信数はO(N²)）
+- sfu:   音声レベル上位K人の話者の音声だけを中継する
+- mcu:   上位K人の話者の音声をサーバーで1本にミックスし、受信者ごとに1フレーム送る
+
+話者の選択は ParticipantManagementService.update_audio_level で更新された音声レベルに
+基づく。選ばれた話者は一定時間（hold）無音が続くまで枠を保持し、話者の入れ替わりで
+音声が途切れないようにする。
+
+MCUではチャンク間隔ごとに各話者のキューから1チャンクずつ取り出して合計し、
+話していない受信者には共通のミックスを、話者には自分を除いたミックスを送る。
+ミックスできるのは MIX_SAMPLE_RATE のPCM16のみで、それ以外はSFUと同じく中継する。
+"""
+
+import asyncio
+import base64
+import heapq
+import json
+import time
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.core.audio_frames import (
+    AUDIO_TRANSPORT_BINARY,
+    AudioCodec,
+    AudioFrameHeader,
+    encode_audio_frame,
+)
+from app.core.outbound_queue import MessageClass
+from app.core.websocket import manager
+from app.services.participant_management_service import (
+    ParticipantStatus,
+    participant_management_service,
+)
+
+logger = structlog.get_logger()
+
+# ミックスした音声の送信者ID（実在のユーザーIDとは重ならない）
+MIXED_USER_ID = 0
+MIX_SAMPLE_RATE = 16000
+
+
+class ForwardingMode(str, Enum):
+    """音声の転送方式"""
+
+    RELAY = "relay"
+    SFU = "sfu"
+    MCU = "mcu"
+
+
+class SpeakerSelector:
+    """セッションごとの転送する話者の枠（最大K人）"""
+
+    def __init__(self, max_speakers: int, min_level: float, hold_seconds: float):
+        self.max_speakers = max_speakers
+        self.min_level = min_level
+        self.hold_seconds = hold_seconds
+        # 話者 → 最後にしきい値を超えた時刻
+        self.slots: Dict[int, float] = {}
+
+    def update(self, participants: List[Any], now: float) -> Set[int]:
+        """参加者の音声レベルから枠を更新し、選ばれている話者を返す"""
+        levels = {p.user_id: p.audio_level for p in participants}
+
+        for user_id in list(self.slots):
+            level = levels.get(user_id)
+            if level is None:
+                del self.slots[user_id]
+            elif level >= self.min_level:
+                self.slots[user_id] = now
+            elif now - self.slots[user_id] > self.hold_seconds:
+                del self.slots[user_id]
+
+        free = self.max_speakers - len(self.slots)
+        if free > 0:
+            candidates = (
+                p
+                for p in participants
+                if p.user_id not in self.slots and p.audio_level >= self.min_level
+            )
+            for participant in heapq.nlargest(free, candidates, key=lambda p: p.audio_level):
+                self.slots[participant.user_id] = now
+
+        return set(self.slots)
+
+
+class _MixSession:
+    """MCUでミックス待ちのチャンク"""
+
+    def __init__(self, jitter_chunks: int):
+        self.jitter_chunks = jitter_chunks
+        self.queues: Dict[int, Deque[np.ndarray]] = {}
+        self.levels: Dict[int, float] = {}
+        self.seq = 0
+
+    def add(self, user_id: int, samples: np.ndarray, level: float) -> bool:
+        """チャンクを追加（キューがあふれて古いチャンクを捨てた場合はTrue）"""
+        queue = self.queues.get(user_id)
+        if queue is None:
+            queue = self.queues[user_id] = deque(maxlen=self.jitter_chunks)
+        dropped = len(queue) == queue.maxlen
+        queue.append(samples)
+        self.levels[user_id] = level
+        return dropped
+
+    def take(self) -> Dict[int, np.ndarray]:
+        """各話者から1チャンクずつ取り出す（空になった話者は外す）"""
+        chunks = {}
+        for user_id in list(self.queues):
+            queue = self.queues[user_id]
+            if queue:
+                chunks[user_id] = queue.popleft()
+            if not queue:
+                del self.queues[user_id]
+        return chunks
+
+
+def mix_chunks(chunks: List[np.ndarray]) -> np.ndarray:
+    """チャンク（int16）を行列にまとめる（短いチャンクは0で埋める）"""
+    length = max(len(chunk) for chunk in chunks)
+    matrix = np.zeros((len(chunks), length), dtype=np.int32)
+    for row, chunk in enumerate(chunks):
+        matrix[row, : len(chunk)] = chunk
+    return matrix
+
+
+def to_pcm16(mix: np.ndarray) -> bytes:
+    """ミックス（int32）をクリップしてPCM16にする"""
+    return np.clip(mix, -32768, 32767).astype(np.int16).tobytes()
+
+
+class AudioForwarder:
+    """音声の転送方式を選択し、MCUではミックスを配信する"""
+
+    def __init__(
+        self,
+        mode: ForwardingMode = ForwardingMode.RELAY,
+        max_speakers: int = 3,
+        min_level: float = 0.05,
+        hold_seconds: float = 1.0,
+        mix_interval: float = 0.1,
+        jitter_chunks: int = 3,
+        participants_provider: Optional[Callable[[str], Awaitable[List[Any]]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.mode = ForwardingMode(mode)
+        self.max_speakers = max_speakers
+        self.min_level = min_level
+        self.hold_seconds = hold_seconds
+        self.mix_interval = mix_interval
+        self.jitter_chunks = jitter_chunks
+        self.participants_provider = participants_provider
+        self.clock = clock
+
+        self._selectors: Dict[str, SpeakerSelector] = {}
+        self._mixes: Dict[str, _MixSession] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # 統計情報
+        self.stats = {
+            "relayed": 0,
+            "suppressed": 0,
+            "mixed_chunks": 0,
+            "dropped_chunks": 0,
+            "mix_ticks": 0,
+            "mix_frames": 0,
+            "mix_sends": 0,
+            "mix_bytes": 0,
+        }
+
+    def select_speakers(self, session_id: str, participants: List[Any]) -> Set[int]:
+        """転送する話者（音声レベル上位K人）を選ぶ"""
+        selector = self._selectors.get(session_id)
+        if selector is None:
+            selector = self._selectors[session_id] = SpeakerSelector(
+                self.max_speakers, self.min_level, self.hold_seconds
+            )
+        speakers = selector.update(participants, self.clock())
+        if not speakers and not participants:
+            del self._selectors[session_id]
+        return speakers
+
+    def discard_session(self, session_id: str) -> None:
+        """セッションの話者選択・ミックスの状態を破棄"""
+        self._selectors.pop(session_id, None)
+        self._mixes.pop(session_id, None)
+
+    def accept(
+        self,
+        session_id: str,
+        user_id: int,
+        participants: List[Any],
+        audio: Optional[bytes] = None,
+        sample_rate: int = MIX_SAMPLE_RATE,
+        codec: AudioCodec = AudioCodec.PCM16,
+    ) -> bool:
+        """話者のチャンクを受け取り、個別に中継すべきならTrueを返す
+
+        MCUでミックスに回したチャンクや、SFU/MCUで上位K人に入らない話者の
+        チャンクはFalse（中継しない）。
+        """
+        if self.mode == ForwardingMode.RELAY:
+            self.stats["relayed"] += 1
+            return True
+
+        speakers = self.select_speakers(session_id, participants)
+        if user_id not in speakers:
+            self.stats["suppressed"] += 1
+            return False
+
+        if (
+            self.mode == ForwardingMode.MCU
+            and audio
+            and codec == AudioCodec.PCM16
+            and sample_rate == MIX_SAMPLE_RATE
+        ):
+            mix = self._mixes.get(session_id)
+            if mix is None:
+                mix = self._mixes[session_id] = _MixSession(self.jitter_chunks)
+            level = next((p.audio_level for p in participants if p.user_id == user_id), 0.0)
+            samples = np.frombuffer(audio, dtype=np.int16, count=len(audio) // 2)
+            if mix.add(user_id, samples, level):
+                self.stats["dropped_chunks"] += 1
+            self.stats["mixed_chunks"] += 1
+            return False
+
+        self.stats["relayed"] += 1
+        return True
+
+    async def mix_tick(self):
+        """ミックス待ちのチャンクを1チャンク分ずつミックスして配信"""
+        self.stats["mix_ticks"] += 1
+        for session_id in list(self._mixes):
+            mix = self._mixes[session_id]
+            chunks = mix.take()
+            if not mix.queues:
+                del self._mixes[session_id]
+            if not chunks:
+                continue
+            try:
+                await self._send_mix(session_id, mix, chunks)
+            except Exception as e:
+                logger.error(f"音声ミックスの配信に失敗: {e}", session_id=session_id)
+
+    async def _send_mix(self, session_id: str, mix: _MixSession, chunks: Dict[int, np.ndarray]):
+        provider = (
+            self.participants_provider or participant_management_service.get_session_participants
+        )
+        participants = await provider(session_id)
+        speakers = list(chunks)
+        matrix = mix_chunks([chunks[user_id] for user_id in speakers])
+        total = matrix.sum(axis=0)
+        rows = {user_id: row for row, user_id in enumerate(speakers)}
+        level = max(mix.levels.get(user_id, 0.0) for user_id in speakers)
+        mix.seq += 1
+
+        # 話していない受信者には同じミックスを送り、話者には自分を除いたミックスを送る
+        shared: List[str] = []
+        for participant in participants:
+            if not participant.connection_id or participant.status == ParticipantStatus.MUTED:
+                continue
+            row = rows.get(participant.user_id)
+            if row is None:
+                shared.append(participant.connection_id)
+            elif len(speakers) > 1:
+                others = [user_id for user_id in speakers if user_id != participant.user_id]
+                await self._send(
+                    session_id, mix.seq, level, others,
+                    to_pcm16(total - matrix[row]), [participant.connection_id],
+                )
+
+        if shared:
+            await self._send(session_id, mix.seq, level, speakers, to_pcm16(total), shared)
+
+    async def _send(
+        self,
+        session_id: str,
+        seq: int,
+        level: float,
+        speakers: List[int],
+        pcm: bytes,
+        connection_ids: List[str],
+    ):
+        """ミックスを受信者の転送形式ごとに1度だけエンコードして送る"""
+        binary_recipients = []
+        json_recipients = []
+        for connection_id in connection_ids:
+            if manager.get_audio_transport(connection_id) == AUDIO_TRANSPORT_BINARY:
+                binary_recipients.append(connection_id)
+            else:
+                json_recipients.append(connection_id)
+
+        if binary_recipients:
+            frame = encode_audio_frame(
+                AudioFrameHeader(
+                    session_id=session_id,
+                    user_id=MIXED_USER_ID,
+                    seq=seq,
+                    timestamp_ms=int(time.time() * 1000),
+                    sample_rate=MIX_SAMPLE_RATE,
+                    level=level,
+                ),
+                pcm,
+            )
+            await manager.fan_out(frame, binary_recipients, MessageClass.AUDIO)
+            self.stats["mix_bytes"] += len(frame) * len(binary_recipients)
+
+        if json_recipients:
+            payload = json.dumps(
+                {
+                    "type": "audio_data",
+                    "session_id": session_id,
+                    "user_id": MIXED_USER_ID,
+                    "mixed": True,
+                    "speakers": speakers,
+                    "audio_data": base64.b64encode(pcm).decode("ascii"),
+                    "audio_level": level,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            )
+            await manager.fan_out(payload, json_recipients, MessageClass.AUDIO)
+            self.stats["mix_bytes"] += len(payload) * len(json_recipients)
+
+        self.stats["mix_frames"] += 1
+        self.stats["mix_sends"] += len(connection_ids)
+
+    async def _run(self):
+        next_tick = self.clock()
+        while True:
+            next_tick += self.mix_interval
+            await asyncio.sleep(max(0.0, next_tick - self.clock()))
+            try:
+                await self.mix_tick()
+            except Exception as e:
+                logger.error(f"音声ミックス処理に失敗: {e}")
+
+    async def start(self):
+        """MCUのミックスループを開始"""
+        if self.mode != ForwardingMode.MCU or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audio mixer started", interval=self.mix_interval)
+
+    async def stop(self):
+        """ミックスループを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._mixes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "mode": self.mode.value,
+            "max_speakers": self.max_speakers,
+            "mixing_sessions": len(self._mixes),
+            "selecting_sessions": len(self._selectors),
+        }
+
+
+def create_audio_forwarder() -> AudioForwarder:
+    """設定に応じた転送方式を作成"""
+    return AudioForwarder(
+        mode=settings.AUDIO_FORWARDING_MODE,
+        max_speakers=settings.AUDIO_MAX_FORWARDED_SPEAKERS,
+        min_level=settings.AUDIO_SPEAKER_MIN_LEVEL,
+        hold_seconds=settings.AUDIO_SPEAKER_HOLD_SECONDS,
+        mix_interval=settings.AUDIO_MIX_INTERVAL_MS / 1000,
+        jitter_chunks=settings.AUDIO_MIX_JITTER_CHUNKS,
+    )
+
+
+# グローバルインスタンス
+audio_forwarder = create_audio_forwarder()
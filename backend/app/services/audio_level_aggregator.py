@@ -0,0 +1,282 @@
+"""
+音声レベル・発言者の通知の集約
+
+音声チャンクごとに全参加者へ audio_level_update を送る代わりに、セッションごとに
+一定間隔（既定10Hz）で音声レベルをサンプリングし、全話者分をまとめた1フレーム
+（audio_levels）だけを配信する。
+
+- record() は最新の値を記録するだけのO(1)処理で、送信は行わない
+- 間隔内の値はピーク値を使う（途中の発話を取りこぼさない）
+- 閾値未満の値、前回送った値から変化の小さい値は送らない
+  （閾値未満になった話者だけは一度 0.0 を送り、メーターを戻せるようにする）
+- 発言中の話者の集合が変わったときだけ active_speakers_changed を送る
+- 配信間隔はセッションごとに set_tick_rate() で変更できる
+  （ホスト・モデレーターが set_audio_level_rate メッセージで指定する）
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import structlog
+
+from app.config import settings
+from app.core.exceptions import ValidationException
+from app.core.outbound_queue import MessageClass
+from app.core.websocket import manager
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class _SessionLevels:
+    """セッションごとの集約状態"""
+
+    interval: float
+    next_due: float
+    # 今回の間隔で観測したピーク値
+    pending: Dict[int, float] = field(default_factory=dict)
+    # 最後に送った値（閾値以上のもののみ）
+    sent: Dict[int, float] = field(default_factory=dict)
+    # 発言中の話者と最後に閾値を超えた時刻
+    speaking: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def idle(self) -> bool:
+        return not self.pending and not self.sent and not self.speaking
+
+
+class AudioLevelAggregator:
+    """セッションごとに音声レベルをまとめて一定間隔で配信する"""
+
+    def __init__(
+        self,
+        tick_hz: float = 10.0,
+        min_level: float = 0.05,
+        change_epsilon: float = 0.02,
+        speaking_threshold: float = 0.1,
+        hold_seconds: float = 0.5,
+        max_tick_hz: float = 50.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_level = min_level
+        self.change_epsilon = change_epsilon
+        self.speaking_threshold = speaking_threshold
+        self.hold_seconds = hold_seconds
+        self.max_tick_hz = max_tick_hz
+        self.clock = clock
+        self.default_interval = self._interval(tick_hz)
+
+        self._sessions: Dict[str, _SessionLevels] = {}
+        self._tick_rates: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # 統計情報
+        self.stats = {
+            "levels_recorded": 0,
+            "ticks": 0,
+            "level_frames": 0,
+            "levels_sent": 0,
+            "levels_skipped": 0,
+            "speaker_changes": 0,
+        }
+
+    def _interval(self, tick_hz: float) -> float:
+        if tick_hz <= 0 or tick_hz > self.max_tick_hz:
+            raise ValidationException(
+                f"音声レベルの配信レートは0より大きく{self.max_tick_hz}Hz以下で指定してください"
+            )
+        return 1.0 / tick_hz
+
+    def set_tick_rate(self, session_id: str, tick_hz: Optional[float]) -> None:
+        """セッションの配信レートを設定（Noneで既定値に戻す）"""
+        if tick_hz is None:
+            self._tick_rates.pop(session_id, None)
+            interval = self.default_interval
+        else:
+            interval = self._interval(tick_hz)
+            self._tick_rates[session_id] = interval
+
+        state = self._sessions.get(session_id)
+        if state is not None:
+            state.interval = interval
+            state.next_due = min(state.next_due, self.clock() + interval)
+        self._wakeup.set()
+
+    def get_tick_rate(self, session_id: str) -> float:
+        """セッションの配信レート（Hz）"""
+        return 1.0 / self._tick_rates.get(session_id, self.default_interval)
+
+    def record(self, session_id: str, user_id: int, level: float) -> None:
+        """音声レベルを記録する（送信は次の配信タイミングでまとめて行う）"""
+        state = self._sessions.get(session_id)
+        if state is None:
+            interval = self._tick_rates.get(session_id, self.default_interval)
+            state = self._sessions[session_id] = _SessionLevels(
+                interval=interval, next_due=self.clock() + interval
+            )
+            self._wakeup.set()
+        if level > state.pending.get(user_id, -1.0):
+            state.pending[user_id] = level
+        self.stats["levels_recorded"] += 1
+
+    def remove_participant(self, session_id: str, user_id: int) -> None:
+        """退出した参加者を次の配信で発言者から外す"""
+        state = self._sessions.get(session_id)
+        if state is not None:
+            state.pending.pop(user_id, None)
+            if user_id in state.speaking:
+                state.speaking[user_id] = float("-inf")
+
+    def discard_session(self, session_id: str) -> None:
+        """セッションの状態と設定を破棄"""
+        self._sessions.pop(session_id, None)
+        self._tick_rates.pop(session_id, None)
+
+    def _collect(self, state: _SessionLevels, now: float):
+        """今回送る音声レベルと発言者の変化を求めて状態を進める"""
+        levels: Dict[int, float] = {}
+        for user_id in state.pending.keys() | state.sent.keys():
+            level = state.pending.get(user_id, 0.0)
+            if level < self.min_level:
+                if state.sent.pop(user_id, None) is not None:
+                    levels[user_id] = 0.0
+                continue
+            previous = state.sent.get(user_id)
+            if previous is not None and abs(level - previous) < self.change_epsilon:
+                self.stats["levels_skipped"] += 1
+                continue
+            levels[user_id] = round(level, 3)
+            state.sent[user_id] = level
+
+        started: List[int] = []
+        for user_id, level in state.pending.items():
+            if level > self.speaking_threshold:
+                if user_id not in state.speaking:
+                    started.append(user_id)
+                state.speaking[user_id] = now
+        stopped = [
+            user_id
+            for user_id, last_active in state.speaking.items()
+            if now - last_active > self.hold_seconds
+        ]
+        for user_id in stopped:
+            del state.speaking[user_id]
+
+        state.pending = {}
+        return levels, sorted(started), sorted(stopped)
+
+    async def flush_session(self, session_id: str, now: Optional[float] = None) -> None:
+        """セッションの音声レベルと発言者の変化を配信"""
+        state = self._sessions.get(session_id)
+        if state is None:
+            return
+        now = self.clock() if now is None else now
+        levels, started, stopped = self._collect(state, now)
+        if state.idle:
+            del self._sessions[session_id]
+
+        timestamp = datetime.now().isoformat()
+        if started or stopped:
+            # 発言者の変化は取りこぼすと表示が戻らないため、合体されないクラスで送る
+            await manager.broadcast_to_session(
+                {
+                    "type": "active_speakers_changed",
+                    "session_id": session_id,
+                    "active_speakers": sorted(state.speaking),
+                    "started": started,
+                    "stopped": stopped,
+                    "timestamp": timestamp,
+                },
+                session_id,
+                message_class=MessageClass.CONTROL,
+            )
+            self.stats["speaker_changes"] += 1
+
+        if levels:
+            await manager.broadcast_to_session(
+                {
+                    "type": "audio_levels",
+                    "session_id": session_id,
+                    "levels": {str(user_id): level for user_id, level in levels.items()},
+                    "timestamp": timestamp,
+                },
+                session_id,
+                message_class=MessageClass.NOTIFICATION,
+                coalesce_key=f"audio_levels:{session_id}",
+            )
+            self.stats["level_frames"] += 1
+            self.stats["levels_sent"] += len(levels)
+
+    async def tick(self) -> float:
+        """配信時刻を迎えたセッションを配信し、次の配信までの秒数を返す"""
+        self.stats["ticks"] += 1
+        now = self.clock()
+        next_due = now + self.default_interval
+        for session_id in list(self._sessions):
+            state = self._sessions[session_id]
+            if state.next_due <= now:
+                # 遅れた分は取り戻さず、次の間隔から数え直す
+                state.next_due = max(state.next_due + state.interval, now)
+                try:
+                    await self.flush_session(session_id, now)
+                except Exception as e:
+                    logger.error(f"音声レベルの配信に失敗: {e}", session_id=session_id)
+            next_due = min(next_due, state.next_due)
+        return max(0.0, next_due - now)
+
+    async def _run(self):
+        while True:
+            delay = await self.tick()
+            self._wakeup.clear()
+            if not self._sessions:
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """配信ループを開始"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audio level aggregator started", tick_hz=1.0 / self.default_interval)
+
+    async def stop(self):
+        """配信ループを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._sessions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "tick_hz": 1.0 / self.default_interval,
+            "active_sessions": len(self._sessions),
+            "custom_tick_rates": len(self._tick_rates),
+        }
+
+
+def create_audio_level_aggregator() -> AudioLevelAggregator:
+    """設定に応じた集約器を作成"""
+    return AudioLevelAggregator(
+        tick_hz=settings.AUDIO_LEVEL_TICK_HZ,
+        min_level=settings.AUDIO_LEVEL_MIN_LEVEL,
+        change_epsilon=settings.AUDIO_LEVEL_CHANGE_EPSILON,
+        speaking_threshold=settings.AUDIO_LEVEL_SPEAKING_THRESHOLD,
+        hold_seconds=settings.AUDIO_LEVEL_SPEAKER_HOLD_SECONDS,
+        max_tick_hz=settings.AUDIO_LEVEL_MAX_TICK_HZ,
+    )
+
+
+# グローバルインスタンス
+audio_level_aggregator = create_audio_level_aggregator()
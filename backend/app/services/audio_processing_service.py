@@ -3,7 +3,7 @@ import io
 import wave
 import struct
 import numpy as np
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
 from datetime import datetime
 import structlog
 import asyncio
@@ -12,10 +12,120 @@ from enum import Enum
 
 from app.core.exceptions import ValidationException
 from app.schemas.websocket import AudioDataMessage
+from app.core.audio_frames import AudioFrameHeader
+from app.services.audio_recorder import AudioRecorder, audio_recorder
+from app.services.audio_ring_buffer import AudioRingBuffer
 
 logger = structlog.get_logger()
 
 
+# SNRの簡易推定で雑音とみなす分散の割合
+NOISE_VARIANCE_RATIO = 0.1
+_PCM16_SCALE = 32768.0
+
+
+@dataclass
+class AudioMetrics:
+    """1チャンク分の音声メトリクス（振幅は -1.0〜1.0 に正規化）"""
+
+    rms: float
+    peak: float
+    snr: float  # dB（簡易推定）
+    is_speaking: bool
+
+
+def _pcm16_samples(audio_data: bytes, channels: int = 1) -> np.ndarray:
+    """16-bit PCMのサンプルをコピーせずに取得（ステレオは左チャンネルのみ）"""
+    samples = np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+    if channels > 1:
+        samples = samples[::channels]
+    return samples
+
+
+def _metrics_from_sums(
+    count, total, energy, peak, speaking_threshold: float
+) -> Tuple[Any, Any, Any, Any]:
+    """サンプル数・合計・二乗和・ピーク（int）からメトリクスを計算（配列にも使える）"""
+    count = np.maximum(count, 1)
+    mean = total / count / _PCM16_SCALE
+    mean_power = energy / count / (_PCM16_SCALE * _PCM16_SCALE)
+    variance = np.maximum(mean_power - mean * mean, 0.0)
+    rms = np.sqrt(mean_power)
+    snr = 10 * np.log10(
+        (mean_power + 1e-10) / (variance * NOISE_VARIANCE_RATIO + 1e-10)
+    )
+    return rms, peak / _PCM16_SCALE, snr, rms > speaking_threshold
+
+
+def compute_audio_metrics(
+    audio_data: bytes, channels: int = 1, speaking_threshold: float = 0.01
+) -> AudioMetrics:
+    """RMS・ピーク・SNR推定・発話判定をまとめて計算
+
+    int16のまま int64 で集計するため、浮動小数点のコピーを作らず二乗もあふれない。
+    """
+    samples = _pcm16_samples(audio_data, channels)
+    if samples.size == 0:
+        return AudioMetrics(rms=0.0, peak=0.0, snr=0.0, is_speaking=False)
+
+    total = int(samples.sum(dtype=np.int64))
+    energy = int(np.einsum("i,i->", samples, samples, dtype=np.int64))
+    peak = max(int(samples.max()), -int(samples.min()))
+    rms, peak, snr, is_speaking = _metrics_from_sums(
+        samples.size, total, energy, peak, speaking_threshold
+    )
+    return AudioMetrics(
+        rms=float(rms), peak=float(peak), snr=float(snr), is_speaking=bool(is_speaking)
+    )
+
+
+def compute_audio_metrics_batch(
+    chunks: Sequence[bytes],
+    channels: Union[int, Sequence[int]] = 1,
+    speaking_threshold: float = 0.01,
+) -> List[AudioMetrics]:
+    """複数チャンクのメトリクスを1つの2次元配列でまとめて計算
+
+    1ティック分に届いた全セッションのチャンクを渡す想定。長さが異なる
+    チャンクは0で埋めて並べ、平均は各チャンクのサンプル数で割る。
+    """
+    if not chunks:
+        return []
+    if isinstance(channels, int):
+        channels = [channels] * len(chunks)
+
+    rows = [_pcm16_samples(data, ch) for data, ch in zip(chunks, channels)]
+    counts = np.fromiter((row.size for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.zeros((len(rows), max(int(counts.max()), 1)), dtype=np.int16)
+    for i, row in enumerate(rows):
+        matrix[i, : row.size] = row
+
+    totals = matrix.sum(axis=1, dtype=np.int64)
+    energies = np.einsum("ij,ij->i", matrix, matrix, dtype=np.int64)
+    peaks = np.maximum(
+        matrix.max(axis=1).astype(np.int32), -matrix.min(axis=1).astype(np.int32)
+    )
+    rms, peak, snr, speaking = _metrics_from_sums(
+        counts, totals, energies, peaks, speaking_threshold
+    )
+    empty = counts == 0
+    snr = np.where(empty, 0.0, snr)
+    return [
+        AudioMetrics(rms=r, peak=p, snr=n, is_speaking=s)
+        for r, p, n, s in zip(rms.tolist(), peak.tolist(), snr.tolist(), speaking.tolist())
+    ]
+
+
+def calculate_rms(audio_data: bytes, channels: int = 1) -> Tuple[float, float]:
+    """16-bit PCMのRMSとピーク（-1.0〜1.0に正規化）を計算
+
+    ステレオの場合は左チャンネルのみ使用する。発話区間検出（転写）と
+    音声レベル計算で同じ値を使うため共通化している。
+    """
+    metrics = compute_audio_metrics(audio_data, channels)
+    return metrics.rms, metrics.peak
+
+
 class AudioQuality(str, Enum):
     """音声品質レベル"""
     LOW = "low"
@@ -160,98 +270,169 @@ class AudioQualityManager:
 
 
 class AudioBufferManager:
-    """音声バッファ管理クラス"""
+    """音声バッファ管理クラス
 
-    def __init__(self):
-        self.buffers: Dict[str, List[AudioChunk]] = {}
+    セッションごとのリングバッファ（全参加者のチャンクを到着順に保持し、目標遅延を
+    超えたものは捨てる）と、話者ごとのリングバッファ（転写やレベル解析用に直近の
+    音声を保持する）を持つ。どちらも事前確保した固定サイズのNumPy配列を使う。
+    """
+
+    def __init__(
+        self,
+        max_buffer_size: int = 1000,
+        max_buffer_seconds: float = 5.0,
+        user_buffer_seconds: float = 5.0,
+        sample_rate: int = 16000,
+    ):
+        self.buffers: Dict[str, AudioRingBuffer] = {}
+        self.user_buffers: Dict[Tuple[str, int], AudioRingBuffer] = {}
         self.buffer_sizes: Dict[str, int] = {}
-        self.max_buffer_size = 1000  # 最大バッファサイズ
+        self.max_buffer_size = max_buffer_size  # 最大バッファサイズ（チャンク数）
+        self.max_buffer_samples = int(max_buffer_seconds * sample_rate)
+        self.user_buffer_samples = int(user_buffer_seconds * sample_rate)
         self.target_latency_ms = 100  # 目標遅延時間
 
-    async def add_chunk(self, session_id: str, chunk: AudioChunk):
-        """音声チャンクをバッファに追加"""
-        if session_id not in self.buffers:
-            self.buffers[session_id] = []
+    def _session_buffer(self, session_id: str) -> AudioRingBuffer:
+        buffer = self.buffers.get(session_id)
+        if buffer is None:
+            buffer = AudioRingBuffer(self.max_buffer_size, self.max_buffer_samples)
+            self.buffers[session_id] = buffer
             self.buffer_sizes[session_id] = 0
+        return buffer
 
-        # バッファに追加
-        self.buffers[session_id].append(chunk)
-        self.buffer_sizes[session_id] += len(chunk.data)
+    def _user_buffer(self, session_id: str, user_id: int) -> AudioRingBuffer:
+        key = (session_id, user_id)
+        buffer = self.user_buffers.get(key)
+        if buffer is None:
+            buffer = AudioRingBuffer(self.max_buffer_size, self.user_buffer_samples)
+            self.user_buffers[key] = buffer
+        return buffer
+
+    async def add_chunk(self, session_id: str, chunk: AudioChunk):
+        """音声チャンクをバッファに追加"""
+        timestamp = chunk.timestamp.timestamp()
+        seq = _chunk_seq(chunk.chunk_id)
+        for buffer in (
+            self._session_buffer(session_id),
+            self._user_buffer(session_id, chunk.user_id),
+        ):
+            buffer.append(
+                chunk.data,
+                timestamp,
+                seq=seq,
+                user_id=chunk.user_id,
+                sample_rate=chunk.sample_rate,
+                channels=chunk.channels,
+                chunk_id=chunk.chunk_id,
+            )
 
         # バッファサイズ制限
         await self._manage_buffer_size(session_id)
 
     async def get_chunks(self, session_id: str, limit: int = 10) -> List[AudioChunk]:
         """バッファから音声チャンクを取得"""
-        if session_id not in self.buffers:
+        buffer = self.buffers.get(session_id)
+        if buffer is None:
             return []
 
-        return self.buffers[session_id][-limit:]
+        chunks = []
+        for position in range(max(len(buffer) - limit, 0), len(buffer)):
+            info = buffer.chunk_info(position)
+            chunks.append(
+                AudioChunk(
+                    data=info["data"],
+                    sample_rate=info["sample_rate"],
+                    channels=info["channels"],
+                    timestamp=datetime.fromtimestamp(info["timestamp"]),
+                    chunk_id=info["chunk_id"],
+                    user_id=info["user_id"],
+                    session_id=session_id,
+                )
+            )
+        return chunks
+
+    def get_window(
+        self,
+        session_id: str,
+        user_id: int,
+        duration_ms: Optional[float] = None,
+        sample_rate: int = 16000,
+    ) -> np.ndarray:
+        """話者の直近の音声（int16）をコピーせずに取得
+
+        返す配列はバッファのビューで、以降の書き込みで上書きされる。
+        """
+        buffer = self.user_buffers.get((session_id, user_id))
+        if buffer is None:
+            return np.zeros(0, dtype=np.int16)
+        num_samples = None if duration_ms is None else int(duration_ms * sample_rate / 1000)
+        return buffer.window(num_samples)
 
     async def clear_buffer(self, session_id: str):
         """バッファをクリア"""
         if session_id in self.buffers:
             self.buffers[session_id].clear()
             self.buffer_sizes[session_id] = 0
+        for key, buffer in self.user_buffers.items():
+            if key[0] == session_id:
+                buffer.clear()
+
+    async def remove_session(self, session_id: str):
+        """セッションのバッファを解放"""
+        self.buffers.pop(session_id, None)
+        self.buffer_sizes.pop(session_id, None)
+        for key in [key for key in self.user_buffers if key[0] == session_id]:
+            del self.user_buffers[key]
 
     async def get_buffer_stats(self, session_id: str) -> Dict[str, Any]:
         """バッファ統計を取得"""
-        if session_id not in self.buffers:
-            return {
-                "chunk_count": 0,
-                "total_size": 0,
-                "average_latency": 0.0
-            }
-
-        chunks = self.buffers[session_id]
-        if not chunks:
+        buffer = self.buffers.get(session_id)
+        if buffer is None or not len(buffer):
             return {
                 "chunk_count": 0,
                 "total_size": 0,
                 "average_latency": 0.0
             }
 
-        # 平均遅延を計算
-        current_time = datetime.now()
-        latencies = [
-            (current_time - chunk.timestamp).total_seconds() * 1000
-            for chunk in chunks
-        ]
-        average_latency = sum(latencies) / len(latencies)
-
         return {
-            "chunk_count": len(chunks),
-            "total_size": self.buffer_sizes[session_id],
-            "average_latency": average_latency
+            "chunk_count": len(buffer),
+            "total_size": buffer.byte_size,
+            "average_latency": buffer.average_latency_ms(),
+            "evicted": buffer.evicted,
+            "memory_bytes": buffer.memory_bytes + sum(
+                user_buffer.memory_bytes
+                for key, user_buffer in self.user_buffers.items()
+                if key[0] == session_id
+            ),
         }
 
     async def _manage_buffer_size(self, session_id: str):
         """バッファサイズを管理"""
-        if session_id not in self.buffers:
+        buffer = self.buffers.get(session_id)
+        if buffer is None:
             return
 
-        # 最大サイズを超えた場合、古いチャンクを削除
-        while len(self.buffers[session_id]) > self.max_buffer_size:
-            removed_chunk = self.buffers[session_id].pop(0)
-            self.buffer_sizes[session_id] -= len(removed_chunk.data)
-
+        # 最大サイズ（チャンク数・サンプル数）はリングバッファへの追加時に適用済み
         # 目標遅延時間を超えた場合、古いチャンクを削除
-        current_time = datetime.now()
-        while self.buffers[session_id]:
-            oldest_chunk = self.buffers[session_id][0]
-            latency_ms = (current_time - oldest_chunk.timestamp).total_seconds() * 1000
-            
-            if latency_ms > self.target_latency_ms:
-                removed_chunk = self.buffers[session_id].pop(0)
-                self.buffer_sizes[session_id] -= len(removed_chunk.data)
-            else:
-                break
+        buffer.trim_older_than(
+            datetime.now().timestamp() - self.target_latency_ms / 1000
+        )
+        self.buffer_sizes[session_id] = buffer.byte_size
+
+
+def _chunk_seq(chunk_id: Optional[str]) -> int:
+    """chunk_id末尾の数値をシーケンス番号として取り出す（なければ0）"""
+    if chunk_id:
+        tail = chunk_id.rsplit("_", 1)[-1]
+        if tail.isdigit():
+            return int(tail)
+    return 0
 
 
 class AudioProcessingService:
     """音声データ処理サービス"""
 
-    def __init__(self):
+    def __init__(self, recorder: Optional[AudioRecorder] = None):
         # 音声設定
         self.default_sample_rate = 16000
         self.default_channels = 1
@@ -266,6 +447,7 @@ class AudioProcessingService:
         
         # 録音セッション
         self.recording_sessions: Dict[str, bool] = {}
+        self.recorder = recorder or audio_recorder
         
         # 音声レベル履歴
         self.audio_level_history: Dict[str, List[AudioLevel]] = {}
@@ -276,61 +458,123 @@ class AudioProcessingService:
             # Base64デコード
             audio_data = self._decode_audio_data(audio_message.data)
 
-            # 音声データの検証
-            self._validate_audio_data(audio_data, audio_message)
-
-            # 音声品質を調整
-            optimal_quality = self.quality_manager.adjust_quality_for_network(
-                audio_message.session_id
-            )
-            
-            # 音声データを品質に応じて処理
-            processed_audio_data = await self._process_audio_for_quality(
-                audio_data, optimal_quality
-            )
-
-            # 音声チャンクを作成
-            chunk = AudioChunk(
-                data=processed_audio_data,
+            return await self._process_raw_audio(
+                audio_data,
+                session_id=audio_message.session_id,
+                user_id=audio_message.user_id,
                 sample_rate=audio_message.sample_rate or self.default_sample_rate,
                 channels=audio_message.channels or self.default_channels,
                 timestamp=audio_message.timestamp if isinstance(audio_message.timestamp, datetime) else datetime.fromisoformat(audio_message.timestamp),
-                chunk_id=audio_message.chunk_id
-                or f"chunk_{int(datetime.now().timestamp() * 1000)}",
-                user_id=audio_message.user_id,
-                session_id=audio_message.session_id,
+                chunk_id=audio_message.chunk_id,
             )
 
-            # 音声レベルを計算
-            audio_level = self._calculate_audio_level(chunk)
+        except Exception as e:
+            logger.error(f"Failed to process audio data: {e}")
+            raise ValidationException("Invalid audio data")
 
-            # 音声品質メトリクスを計算
-            quality_metrics = await self._calculate_quality_metrics(chunk, audio_level)
+    async def process_audio_frame(
+        self, header: AudioFrameHeader, audio: bytes
+    ) -> AudioChunk:
+        """バイナリ音声フレームを処理（Base64デコード不要）"""
+        try:
+            return await self._process_raw_audio(
+                bytes(audio),
+                session_id=header.session_id,
+                user_id=header.user_id,
+                sample_rate=header.sample_rate or self.default_sample_rate,
+                channels=self.default_channels,
+                timestamp=datetime.fromtimestamp(header.timestamp_ms / 1000),
+                chunk_id=f"chunk_{header.user_id}_{header.seq}",
+            )
 
-            # バッファに追加
-            await self.buffer_manager.add_chunk(chunk.session_id, chunk)
+        except Exception as e:
+            logger.error(f"Failed to process audio frame: {e}")
+            raise ValidationException("Invalid audio data")
 
-            # 音声レベル履歴を更新
-            await self._update_audio_level_history(chunk.session_id, audio_level)
+    async def _process_raw_audio(
+        self,
+        audio_data: bytes,
+        session_id: str,
+        user_id: int,
+        sample_rate: int,
+        channels: int,
+        timestamp: datetime,
+        chunk_id: Optional[str] = None,
+    ) -> AudioChunk:
+        """デコード済みの音声データを処理"""
+        # 音声データの検証
+        self._validate_audio_data(audio_data)
+
+        # 音声品質を調整
+        optimal_quality = self.quality_manager.adjust_quality_for_network(session_id)
+        
+        # 音声データを品質に応じて処理
+        processed_audio_data = await self._process_audio_for_quality(
+            audio_data, optimal_quality
+        )
+
+        # 音声チャンクを作成
+        chunk = AudioChunk(
+            data=processed_audio_data,
+            sample_rate=sample_rate,
+            channels=channels,
+            timestamp=timestamp,
+            chunk_id=chunk_id
+            or f"chunk_{int(datetime.now().timestamp() * 1000)}",
+            user_id=user_id,
+            session_id=session_id,
+        )
+
+        metrics = compute_audio_metrics(
+            chunk.data, chunk.channels, self.speaking_threshold
+        )
+        audio_level = await self._record_chunk(chunk, metrics)
+
+        logger.debug(
+            f"Processed audio chunk: {chunk.chunk_id}",
+            user_id=chunk.user_id,
+            session_id=chunk.session_id,
+            level=audio_level.level,
+            is_speaking=audio_level.is_speaking,
+            quality=optimal_quality.value,
+        )
+
+        return chunk
+
+    async def process_audio_batch(self, chunks: List[AudioChunk]) -> List[AudioLevel]:
+        """1ティック分のチャンク（全セッション）をまとめて処理
+
+        メトリクスは全チャンクを1つの2次元配列にしてまとめて計算する。
+        """
+        metrics_list = compute_audio_metrics_batch(
+            [chunk.data for chunk in chunks],
+            [chunk.channels for chunk in chunks],
+            self.speaking_threshold,
+        )
+        return [
+            await self._record_chunk(chunk, metrics)
+            for chunk, metrics in zip(chunks, metrics_list)
+        ]
 
-            # 録音中なら保存
-            if self.recording_sessions.get(audio_message.session_id, False):
-                await self._save_audio_chunk(chunk)
+    async def _record_chunk(self, chunk: AudioChunk, metrics: AudioMetrics) -> AudioLevel:
+        """計算済みのメトリクスでチャンクを記録（レベル・品質・バッファ・録音）"""
+        # 音声レベルを計算
+        audio_level = self._calculate_audio_level(chunk, metrics)
 
-            logger.debug(
-                f"Processed audio chunk: {chunk.chunk_id}",
-                user_id=chunk.user_id,
-                session_id=chunk.session_id,
-                level=audio_level.level,
-                is_speaking=audio_level.is_speaking,
-                quality=optimal_quality.value,
-            )
+        # 音声品質メトリクスを計算
+        await self._calculate_quality_metrics(chunk, audio_level, metrics)
 
-            return chunk
+        # バッファに追加
+        await self.buffer_manager.add_chunk(chunk.session_id, chunk)
 
-        except Exception as e:
-            logger.error(f"Failed to process audio data: {e}")
-            raise ValidationException("Invalid audio data")
+        # 音声レベル履歴を更新
+        await self._update_audio_level_history(chunk.session_id, audio_level)
+
+        # 録音中なら保存
+        if self.recording_sessions.get(chunk.session_id, False):
+            await self._save_audio_chunk(chunk)
+
+        return audio_level
 
     async def _process_audio_for_quality(
         self, audio_data: bytes, quality: AudioQuality
@@ -358,15 +602,19 @@ class AudioProcessingService:
             return audio_data
 
     async def _calculate_quality_metrics(
-        self, chunk: AudioChunk, audio_level: AudioLevel
+        self,
+        chunk: AudioChunk,
+        audio_level: AudioLevel,
+        metrics: Optional[AudioMetrics] = None,
     ) -> AudioQualityMetrics:
         """音声品質メトリクスを計算"""
         try:
-            # SNR（Signal-to-Noise Ratio）の簡易計算
-            audio_array = np.frombuffer(chunk.data, dtype=np.int16)
-            signal_power = np.mean(audio_array**2)
-            noise_power = np.var(audio_array) * 0.1  # 簡易ノイズ推定
-            snr = 10 * np.log10(signal_power / (noise_power + 1e-10))
+            # SNR（Signal-to-Noise Ratio）の簡易推定（レベル計算と同じ集計を使う）
+            if metrics is None:
+                metrics = compute_audio_metrics(
+                    chunk.data, chunk.channels, self.speaking_threshold
+                )
+            snr = metrics.snr
 
             # 明瞭度の計算（簡易）
             clarity = min(1.0, audio_level.rms * 5)
@@ -434,7 +682,7 @@ class AudioProcessingService:
             logger.error(f"Failed to decode base64 audio data: {e}")
             raise ValidationException("Invalid base64 audio data")
 
-    def _validate_audio_data(self, audio_data: bytes, message: AudioDataMessage):
+    def _validate_audio_data(self, audio_data: bytes):
         """音声データの検証"""
         if not audio_data:
             raise ValidationException("Empty audio data")
@@ -447,37 +695,25 @@ class AudioProcessingService:
         if len(audio_data) < 44:  # WAVヘッダー最小サイズ
             logger.warning("Audio data may not be in valid format")
 
-    def _calculate_audio_level(self, chunk: AudioChunk) -> AudioLevel:
+    def _calculate_audio_level(
+        self, chunk: AudioChunk, metrics: Optional[AudioMetrics] = None
+    ) -> AudioLevel:
         """音声レベルを計算"""
         try:
-            # バイトデータを数値配列に変換
-            if chunk.channels == 1:
-                # モノラル
-                audio_array = np.frombuffer(chunk.data, dtype=np.int16)
-            else:
-                # ステレオ（左チャンネルのみ使用）
-                audio_array = np.frombuffer(chunk.data, dtype=np.int16)[::2]
-
-            # 正規化（-1.0 から 1.0）
-            audio_normalized = audio_array.astype(np.float32) / 32768.0
-
-            # RMS（二乗平均平方根）を計算
-            rms = np.sqrt(np.mean(audio_normalized**2))
-
-            # ピーク値を計算
-            peak = np.max(np.abs(audio_normalized))
+            # RMS（二乗平均平方根）・ピーク値・話者検出
+            if metrics is None:
+                metrics = compute_audio_metrics(
+                    chunk.data, chunk.channels, self.speaking_threshold
+                )
 
             # 音声レベル（0.0 - 1.0）
-            level = min(1.0, rms * 10)  # スケーリング
-
-            # 話者検出
-            is_speaking = rms > self.speaking_threshold
+            level = min(1.0, metrics.rms * 10)  # スケーリング
 
             return AudioLevel(
                 level=level,
-                is_speaking=is_speaking,
-                rms=rms,
-                peak=peak,
+                is_speaking=metrics.is_speaking,
+                rms=metrics.rms,
+                peak=metrics.peak,
                 timestamp=chunk.timestamp,
                 user_id=chunk.user_id,
             )
@@ -495,28 +731,16 @@ class AudioProcessingService:
             )
 
     async def _save_audio_chunk(self, chunk: AudioChunk):
-        """音声チャンクをファイルに保存"""
+        """音声チャンクを録音ファイルに追記（書き込みはバックグラウンドで行う）"""
         try:
-            # セッション別ディレクトリを作成
-            import os
-            from app.config import settings
-
-            session_dir = f"recordings/{chunk.session_id}"
-            os.makedirs(session_dir, exist_ok=True)
-
-            # ファイル名を生成
-            timestamp_str = chunk.timestamp.strftime("%Y%m%d_%H%M%S")
-            filename = f"{session_dir}/audio_{chunk.user_id}_{timestamp_str}_{chunk.chunk_id}.wav"
-
-            # WAVファイルとして保存
-            with wave.open(filename, "wb") as wav_file:
-                wav_file.setnchannels(chunk.channels)
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(chunk.sample_rate)
-                wav_file.writeframes(chunk.data)
-
-            logger.debug(f"Saved audio chunk: {filename}")
-
+            self.recorder.write(
+                chunk.session_id,
+                chunk.user_id,
+                chunk.data,
+                chunk.sample_rate,
+                chunk.channels,
+                chunk.timestamp,
+            )
         except Exception as e:
             logger.error(f"Failed to save audio chunk: {e}")
 
@@ -528,7 +752,10 @@ class AudioProcessingService:
     async def stop_recording(self, session_id: str):
         """セッションの録音を停止"""
         self.recording_sessions[session_id] = False
-        logger.info(f"Stopped recording for session: {session_id}")
+        paths = await self.recorder.close_session(session_id)
+        logger.info(
+            f"Stopped recording for session: {session_id} ({len(paths)} files)"
+        )
 
     async def get_session_audio_levels(
         self, session_id: str, user_id: int
@@ -0,0 +1,345 @@
+"""
+録音のストリーミング書き込み
+
+セッション・話者ごとに録音ファイルを1つ開いたままにしてチャンクを追記する。
+ファイル操作（ディレクトリ作成・オープン・書き込み・クローズ）はすべて専用の
+バックグラウンドスレッドで順番に実行し、イベントループをブロックしない。
+WAVはヘッダーを仮の長さで書いておき、クローズ時に実際の長さで書き換える。
+ファイルはサイズまたは録音時間で切り替える（ローテーション）。
+FLAC / Opus は soundfile（libsndfile）で書き込み、使えない場合はWAVにする。
+"""
+
+import asyncio
+import os
+import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+FORMAT_WAV = "wav"
+FORMAT_FLAC = "flac"
+FORMAT_OPUS = "opus"
+
+# soundfile に渡すフォーマットとサブタイプ
+_SOUNDFILE_FORMATS = {
+    FORMAT_FLAC: ("FLAC", "PCM_16", "flac"),
+    FORMAT_OPUS: ("OGG", "OPUS", "opus"),
+}
+
+WAV_HEADER_SIZE = 44
+
+
+def wav_header(sample_rate: int, channels: int, data_size: int) -> bytes:
+    """16-bit PCMのWAVヘッダー"""
+    byte_rate = sample_rate * channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        channels,
+        sample_rate,
+        byte_rate,
+        channels * 2,
+        16,
+        b"data",
+        data_size,
+    )
+
+
+class StreamingWavWriter:
+    """追記型のWAVファイル（ヘッダーはクローズ時に確定）"""
+
+    def __init__(self, path: str, sample_rate: int, channels: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.data_size = 0
+        self._file: BinaryIO = open(path, "wb", buffering=64 * 1024)
+        self._file.write(wav_header(sample_rate, channels, 0))
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self.data_size += len(data)
+
+    def close(self):
+        if self._file.closed:
+            return
+        # 奇数長のデータチャンクは1バイト詰める（RIFFの規則）
+        if self.data_size % 2:
+            self._file.write(b"\x00")
+        self._file.seek(0)
+        self._file.write(wav_header(self.sample_rate, self.channels, self.data_size))
+        self._file.close()
+
+
+class StreamingSoundFileWriter:
+    """soundfile（libsndfile）を使う圧縮形式のストリーミング書き込み"""
+
+    def __init__(self, path: str, sample_rate: int, channels: int, audio_format: str):
+        import numpy as np
+        import soundfile
+
+        self._np = np
+        container, subtype, _ = _SOUNDFILE_FORMATS[audio_format]
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.data_size = 0
+        self._file = soundfile.SoundFile(
+            path,
+            mode="w",
+            samplerate=sample_rate,
+            channels=channels,
+            format=container,
+            subtype=subtype,
+        )
+        self._closed = False
+
+    def write(self, data: bytes):
+        usable = len(data) - len(data) % (2 * self.channels)
+        frames = self._np.frombuffer(data[:usable], dtype=self._np.int16)
+        self._file.write(frames.reshape(-1, self.channels))
+        self.data_size += usable
+
+    def close(self):
+        if not self._closed:
+            self._file.close()
+            self._closed = True
+
+
+def soundfile_available(audio_format: str) -> bool:
+    """圧縮形式で保存できるか（soundfile と対応する libsndfile があるか）"""
+    if audio_format not in _SOUNDFILE_FORMATS:
+        return False
+    try:
+        import soundfile
+    except (ImportError, OSError):
+        return False
+    container, subtype, _ = _SOUNDFILE_FORMATS[audio_format]
+    return subtype in soundfile.available_subtypes(container)
+
+
+class _Track:
+    """1話者分の録音（書き込みはスレッド側からのみ触る）"""
+
+    def __init__(self, session_id: str, user_id: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.writer: Optional[Any] = None
+        self.index = 0
+        self.paths: List[str] = []
+
+
+class AudioRecorder:
+    """セッション・話者ごとのストリーミング録音"""
+
+    def __init__(
+        self,
+        base_dir: str = "recordings",
+        audio_format: str = FORMAT_WAV,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_file_seconds: float = 600.0,
+        max_pending_bytes: int = 16 * 1024 * 1024,
+    ):
+        if audio_format != FORMAT_WAV and not soundfile_available(audio_format):
+            logger.warning(
+                f"Recording format {audio_format} is not available, using WAV"
+            )
+            audio_format = FORMAT_WAV
+        self.base_dir = base_dir
+        self.audio_format = audio_format
+        self.max_file_bytes = max_file_bytes
+        self.max_file_seconds = max_file_seconds
+        self.max_pending_bytes = max_pending_bytes
+
+        self._tracks: Dict[Tuple[str, int], _Track] = {}
+        # ファイル操作は1本のスレッドで投入順に実行する
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recorder")
+        self._pending_bytes = 0
+        # 未処理バイト数と統計はループと書き込みスレッドの両方から更新する
+        self._lock = threading.Lock()
+
+        # 統計情報
+        self.stats = {
+            "chunks": 0,
+            "bytes": 0,
+            "files_opened": 0,
+            "files_closed": 0,
+            "rotations": 0,
+            "dropped": 0,
+            "errors": 0,
+        }
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._pending_bytes
+
+    def write(
+        self,
+        session_id: str,
+        user_id: int,
+        data: bytes,
+        sample_rate: int,
+        channels: int,
+        timestamp: datetime,
+    ):
+        """チャンクを追記する（待たずに返る）
+
+        書き込みが追いつかず未処理のデータが上限を超えた場合はチャンクを捨てる。
+        """
+        with self._lock:
+            if self._pending_bytes + len(data) > self.max_pending_bytes:
+                self.stats["dropped"] += 1
+                return
+            self._pending_bytes += len(data)
+
+        key = (session_id, user_id)
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(session_id, user_id)
+
+        future = self._executor.submit(
+            self._write_sync, track, data, sample_rate, channels, timestamp
+        )
+        future.add_done_callback(lambda f, size=len(data): self._on_written(f, size))
+
+    def _count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _on_written(self, future: Future, size: int):
+        # スレッドから呼ばれる（カウンタの更新のみ）
+        with self._lock:
+            self._pending_bytes -= size
+        if future.exception() is not None:
+            self._count("errors")
+            logger.error(f"Failed to write recording: {future.exception()}")
+
+    def _write_sync(
+        self,
+        track: _Track,
+        data: bytes,
+        sample_rate: int,
+        channels: int,
+        timestamp: datetime,
+    ):
+        writer = track.writer
+        if writer is not None and (
+            writer.sample_rate != sample_rate
+            or writer.channels != channels
+            or writer.data_size + len(data) > self.max_file_bytes
+            or writer.data_size / (sample_rate * channels * 2) >= self.max_file_seconds
+        ):
+            self._close_writer(track)
+            self._count("rotations")
+            writer = None
+
+        if writer is None:
+            writer = self._open_writer(track, sample_rate, channels, timestamp)
+
+        writer.write(data)
+        with self._lock:
+            self.stats["chunks"] += 1
+            self.stats["bytes"] += len(data)
+
+    def _open_writer(
+        self, track: _Track, sample_rate: int, channels: int, timestamp: datetime
+    ):
+        session_dir = os.path.join(self.base_dir, track.session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        extension = (
+            FORMAT_WAV
+            if self.audio_format == FORMAT_WAV
+            else _SOUNDFILE_FORMATS[self.audio_format][2]
+        )
+        path = os.path.join(
+            session_dir,
+            f"audio_{track.user_id}_{timestamp.strftime('%Y%m%d_%H%M%S')}"
+            f"_{track.index:03d}.{extension}",
+        )
+        if self.audio_format == FORMAT_WAV:
+            writer = StreamingWavWriter(path, sample_rate, channels)
+        else:
+            writer = StreamingSoundFileWriter(
+                path, sample_rate, channels, self.audio_format
+            )
+        track.writer = writer
+        track.index += 1
+        track.paths.append(path)
+        self._count("files_opened")
+        logger.debug(f"Opened recording file: {path}")
+        return writer
+
+    def _close_writer(self, track: _Track):
+        if track.writer is None:
+            return
+        try:
+            track.writer.close()
+        finally:
+            track.writer = None
+            self._count("files_closed")
+
+    def _close_tracks_sync(self, tracks: List[_Track]) -> List[str]:
+        paths: List[str] = []
+        for track in tracks:
+            try:
+                self._close_writer(track)
+            except Exception as e:
+                self._count("errors")
+                logger.error(f"Failed to close recording: {e}")
+            paths.extend(track.paths)
+        return paths
+
+    async def close_session(self, session_id: str) -> List[str]:
+        """セッションの録音を確定して、書き込んだファイルのパスを返す"""
+        tracks = [
+            self._tracks.pop(key) for key in list(self._tracks) if key[0] == session_id
+        ]
+        if not tracks:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._close_tracks_sync, tracks)
+
+    async def close(self):
+        """全ての録音を確定してスレッドを止める"""
+        tracks = list(self._tracks.values())
+        self._tracks.clear()
+        if tracks:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._close_tracks_sync, tracks)
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        with self._lock:
+            stats = {**self.stats, "pending_bytes": self._pending_bytes}
+        return {
+            **stats,
+            "format": self.audio_format,
+            "open_tracks": len(self._tracks),
+        }
+
+
+def create_audio_recorder() -> AudioRecorder:
+    """設定に応じた録音器を作成"""
+    return AudioRecorder(
+        base_dir=settings.RECORDING_DIR,
+        audio_format=settings.RECORDING_FORMAT,
+        max_file_bytes=settings.RECORDING_MAX_FILE_BYTES,
+        max_file_seconds=settings.RECORDING_MAX_FILE_SECONDS,
+    )
+
+
+# グローバルインスタンス
+audio_recorder = create_audio_recorder()
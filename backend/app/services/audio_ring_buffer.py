@@ -0,0 +1,219 @@
+"""
+音声のリングバッファ
+
+int16サンプルを事前確保したNumPy配列に循環して書き込み、チャンクごとの
+タイムスタンプ・シーケンス番号などを並列の配列で保持する。追加と古いチャンクの
+削除はO(1)（償却）で、メモリ使用量はバッファごとに固定になる。
+
+サンプル配列は容量の2倍を確保し、同じサンプルを2か所に書き込む。これにより
+容量以内の任意の区間が常に連続したメモリになり、ウィンドウをコピーせずに
+ビューとして返せる。返したビューは以降の書き込みで上書きされるため、
+保持する場合は呼び出し側でコピーすること。
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def pcm16_to_samples(audio_data: bytes) -> np.ndarray:
+    """16-bit PCMをサンプル配列に変換（奇数バイトは末尾を0で埋める）"""
+    if len(audio_data) % 2:
+        audio_data = audio_data + b"\x00"
+    return np.frombuffer(audio_data, dtype=np.int16)
+
+
+class AudioRingBuffer:
+    """1セッション（または1話者）分の音声リングバッファ"""
+
+    def __init__(self, max_chunks: int = 1000, max_samples: int = 16000 * 5):
+        self.max_chunks = max_chunks
+        self.max_samples = max_samples
+
+        # サンプル（2重書き込み用に容量の2倍）
+        self._samples = np.zeros(max_samples * 2, dtype=np.int16)
+        # チャンクごとのメタデータ（インデックスは 通し番号 % max_chunks）
+        self._offsets = np.zeros(max_chunks, dtype=np.int64)  # 先頭サンプルの通し番号
+        self._lengths = np.zeros(max_chunks, dtype=np.int32)  # サンプル数
+        self._byte_lengths = np.zeros(max_chunks, dtype=np.int32)
+        self._timestamps = np.zeros(max_chunks, dtype=np.float64)  # UNIX秒
+        self._seqs = np.zeros(max_chunks, dtype=np.int64)
+        self._user_ids = np.zeros(max_chunks, dtype=np.int64)
+        self._sample_rates = np.zeros(max_chunks, dtype=np.int32)
+        self._channels = np.zeros(max_chunks, dtype=np.int16)
+        self._chunk_ids: List[Optional[str]] = [None] * max_chunks
+
+        self._head = 0  # 最も古いチャンクの通し番号
+        self._tail = 0  # 次に書き込むチャンクの通し番号
+        self._sample_start = 0  # 最も古いサンプルの通し番号
+        self._sample_end = 0  # 次に書き込むサンプルの通し番号
+        self._byte_size = 0
+        # 平均遅延用（桁落ちを避けるため基準時刻からの差の合計を持つ）
+        self._timestamp_base = 0.0
+        self._timestamp_sum = 0.0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    @property
+    def byte_size(self) -> int:
+        """保持しているチャンクの合計バイト数"""
+        return self._byte_size
+
+    @property
+    def sample_count(self) -> int:
+        return self._sample_end - self._sample_start
+
+    @property
+    def oldest_timestamp(self) -> Optional[float]:
+        if not len(self):
+            return None
+        return float(self._timestamps[self._head % self.max_chunks])
+
+    def append(
+        self,
+        audio_data: bytes,
+        timestamp: float,
+        seq: int = 0,
+        user_id: int = 0,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        chunk_id: Optional[str] = None,
+    ):
+        """チャンクを追加（容量を超える分は古いチャンクから捨てる）"""
+        samples = pcm16_to_samples(audio_data)
+        byte_length = len(audio_data)
+        if samples.size > self.max_samples:
+            # 1チャンクで容量を超える場合は末尾だけ残す
+            samples = samples[-self.max_samples:]
+            byte_length = samples.size * 2
+        count = samples.size
+
+        while len(self) and (
+            len(self) >= self.max_chunks
+            or self._sample_end + count - self._sample_start > self.max_samples
+        ):
+            self.pop_oldest()
+        if not len(self):
+            self._timestamp_base = timestamp
+
+        # サンプルを2か所に書き込む（折り返しは最大2分割）
+        start = self._sample_end % self.max_samples
+        first = min(count, self.max_samples - start)
+        self._samples[start:start + first] = samples[:first]
+        self._samples[start + self.max_samples:start + self.max_samples + first] = samples[:first]
+        if first < count:
+            rest = count - first
+            self._samples[:rest] = samples[first:]
+            self._samples[self.max_samples:self.max_samples + rest] = samples[first:]
+
+        index = self._tail % self.max_chunks
+        self._offsets[index] = self._sample_end
+        self._lengths[index] = count
+        self._byte_lengths[index] = byte_length
+        self._timestamps[index] = timestamp
+        self._seqs[index] = seq
+        self._user_ids[index] = user_id
+        self._sample_rates[index] = sample_rate
+        self._channels[index] = channels
+        self._chunk_ids[index] = chunk_id
+
+        self._tail += 1
+        self._sample_end += count
+        self._byte_size += byte_length
+        self._timestamp_sum += timestamp - self._timestamp_base
+
+    def pop_oldest(self):
+        """最も古いチャンクを捨てる"""
+        if not len(self):
+            return
+        index = self._head % self.max_chunks
+        self._byte_size -= int(self._byte_lengths[index])
+        self._timestamp_sum -= float(self._timestamps[index]) - self._timestamp_base
+        self._chunk_ids[index] = None
+        self._head += 1
+        self.evicted += 1
+        if len(self):
+            self._sample_start = int(self._offsets[self._head % self.max_chunks])
+        else:
+            self._sample_start = self._sample_end
+            self._timestamp_sum = 0.0
+
+    def trim_older_than(self, cutoff: float) -> int:
+        """タイムスタンプが cutoff より古いチャンクを捨てて件数を返す"""
+        removed = 0
+        while len(self) and self._timestamps[self._head % self.max_chunks] < cutoff:
+            self.pop_oldest()
+            removed += 1
+        return removed
+
+    def clear(self):
+        """全チャンクを捨てる（確保したメモリはそのまま）"""
+        for i in range(self._head, self._tail):
+            self._chunk_ids[i % self.max_chunks] = None
+        self._head = self._tail
+        self._sample_start = self._sample_end
+        self._byte_size = 0
+        self._timestamp_sum = 0.0
+
+    def _view(self, start: int, count: int) -> np.ndarray:
+        offset = start % self.max_samples
+        return self._samples[offset:offset + count]
+
+    def window(self, num_samples: Optional[int] = None) -> np.ndarray:
+        """直近 num_samples サンプルのビュー（省略時は保持している全サンプル）"""
+        available = self.sample_count
+        count = available if num_samples is None else min(num_samples, available)
+        return self._view(self._sample_end - count, count)
+
+    def chunk_samples(self, position: int) -> np.ndarray:
+        """古い方から position 番目のチャンクのサンプルのビュー"""
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        index = (self._head + position) % self.max_chunks
+        return self._view(int(self._offsets[index]), int(self._lengths[index]))
+
+    def chunk_info(self, position: int) -> Dict[str, Any]:
+        """古い方から position 番目のチャンクのメタデータとデータ"""
+        index = (self._head + position) % self.max_chunks
+        return {
+            "data": self.chunk_samples(position).tobytes()[: int(self._byte_lengths[index])],
+            "timestamp": float(self._timestamps[index]),
+            "seq": int(self._seqs[index]),
+            "user_id": int(self._user_ids[index]),
+            "sample_rate": int(self._sample_rates[index]),
+            "channels": int(self._channels[index]),
+            "chunk_id": self._chunk_ids[index],
+        }
+
+    def timestamps(self) -> np.ndarray:
+        """保持しているチャンクのタイムスタンプ（古い順、コピー）"""
+        positions = np.arange(self._head, self._tail) % self.max_chunks
+        return self._timestamps[positions]
+
+    def average_latency_ms(self, now: Optional[float] = None) -> float:
+        """保持しているチャンクの平均遅延（ミリ秒、O(1)）"""
+        if not len(self):
+            return 0.0
+        now = datetime.now().timestamp() if now is None else now
+        return (now - self._timestamp_base - self._timestamp_sum / len(self)) * 1000
+
+    @property
+    def memory_bytes(self) -> int:
+        """確保済みのメモリ量（固定）"""
+        return sum(
+            array.nbytes
+            for array in (
+                self._samples,
+                self._offsets,
+                self._lengths,
+                self._byte_lengths,
+                self._timestamps,
+                self._seqs,
+                self._user_ids,
+                self._sample_rates,
+                self._channels,
+            )
+        )
@@ -0,0 +1,239 @@
+"""
+有効期限付きアイテム（通知・アナウンスメント）の共有ストア
+
+- アイテムはID・ユーザー・セッションごとの索引に1回だけ登録する。ユーザー・セッションの
+  索引は追加順の dict（順序付き集合）なので、新しい順の読み出しは逆順にたどるだけで済む
+- 有効期限は (期限のUNIX時刻, 追加順, ID) のヒープで管理し、期限切れの処理は先頭から
+  取り出すだけなので期限切れの件数に比例する。読み書きの前に毎回呼ぶので、読み出し側で
+  期限を確認する必要はない
+- 優先度ごとのバケット（追加順の dict）をスコープ（全体・セッション・セッションなし）ごとに
+  持ち、優先度の高い順・新しい順のビューをソートせずに返す
+- ユーザーごとに却下したアイテムIDの集合を持つ
+"""
+
+import heapq
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+# 優先度の値（通知・アナウンスメント共通）と順位
+PRIORITY_RANKS = {"low": 0, "normal": 1, "high": 2, "urgent": 3}
+
+_ALL = object()  # 全アイテムのビューのキー
+
+
+@dataclass
+class _Entry:
+    item: Any
+    seq: int
+    rank: int
+    session_id: Optional[str]
+    user_ids: Tuple[int, ...]
+
+
+class _RankedView:
+    """優先度の高い順・新しい順に並んだアイテムID"""
+
+    def __init__(self):
+        self.buckets: List[Dict[str, None]] = [{} for _ in PRIORITY_RANKS]
+        self.size = 0
+
+    def add(self, item_id: str, rank: int) -> None:
+        self.buckets[rank][item_id] = None
+        self.size += 1
+
+    def remove(self, item_id: str, rank: int) -> None:
+        bucket = self.buckets[rank]
+        if item_id in bucket:
+            del bucket[item_id]
+            self.size -= 1
+
+    def keyed(self, entries: Dict[str, _Entry]) -> Iterator[Tuple[int, int, str]]:
+        """(-順位, -追加順, ID) を昇順に返す（heapq.merge でビューを合わせられる）"""
+        for rank in range(len(self.buckets) - 1, -1, -1):
+            for item_id in reversed(self.buckets[rank]):
+                yield -rank, -entries[item_id].seq, item_id
+
+
+class ExpiringItemStore:
+    """ID・ユーザー・セッション・有効期限で索引を張ったアイテムストア"""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.time,
+        on_expire: Optional[Callable[[Any], None]] = None,
+    ):
+        self.clock = clock
+        self.on_expire = on_expire  # 期限切れで外したアイテムごとに呼ぶ
+        self._entries: Dict[str, _Entry] = {}
+        self._next_seq = 0
+        self._by_user: Dict[int, Dict[str, None]] = {}
+        self._by_session: Dict[str, Dict[str, None]] = {}
+        self._views: Dict[Any, _RankedView] = {_ALL: _RankedView()}
+        self._expiry: List[Tuple[float, int, str]] = []
+        self._dismissed: Dict[int, Set[str]] = {}
+        self._dismissed_by: Dict[str, Set[int]] = {}
+        self.expired_total = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(
+        self,
+        item: Any,
+        user_ids: Iterable[int] = (),
+        session_id: Optional[str] = None,
+        priority: str = "normal",
+    ) -> None:
+        """アイテムを登録（item.id と item.expires_at を使う）"""
+        self.expire()
+        session_id = session_id or None
+        previous = self._entries.pop(item.id, None)
+        if previous is not None:
+            self._unindex(item.id, previous)
+        seq = self._next_seq
+        self._next_seq += 1
+        entry = _Entry(
+            item=item,
+            seq=seq,
+            rank=PRIORITY_RANKS.get(priority, PRIORITY_RANKS["normal"]),
+            session_id=session_id,
+            user_ids=tuple(dict.fromkeys(uid for uid in user_ids if uid)),
+        )
+        self._entries[item.id] = entry
+
+        for user_id in entry.user_ids:
+            self._by_user.setdefault(user_id, {})[item.id] = None
+        if session_id:
+            self._by_session.setdefault(session_id, {})[item.id] = None
+        self._views[_ALL].add(item.id, entry.rank)
+        view = self._views.get(session_id)
+        if view is None:
+            view = self._views[session_id] = _RankedView()
+        view.add(item.id, entry.rank)
+
+        expires_at = self._expiry_time(item.expires_at)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, seq, item.id))
+
+    def get(self, item_id: str) -> Optional[Any]:
+        """IDでアイテムを取得（期限切れならNone）"""
+        self.expire()
+        entry = self._entries.get(item_id)
+        return entry.item if entry else None
+
+    def for_user(self, user_id: int) -> Iterator[Any]:
+        """ユーザー宛てのアイテムを新しい順に返す"""
+        self.expire()
+        ids = self._by_user.get(user_id)
+        if ids:
+            for item_id in reversed(ids):
+                yield self._entries[item_id].item
+
+    def for_session(self, session_id: str) -> Iterator[Any]:
+        """セッションのアイテムを新しい順に返す"""
+        self.expire()
+        ids = self._by_session.get(session_id)
+        if ids:
+            for item_id in reversed(ids):
+                yield self._entries[item_id].item
+
+    def ranked(self, session_id: Optional[str] = None) -> Iterator[Any]:
+        """優先度の高い順・新しい順にアイテムを返す
+
+        session_id を指定した場合はそのセッションとセッションなしのアイテムだけを返す。
+        """
+        self.expire()
+        if session_id is None:
+            keyed = self._views[_ALL].keyed(self._entries)
+        else:
+            keyed = heapq.merge(
+                *(
+                    self._views[scope].keyed(self._entries)
+                    for scope in (session_id, None)
+                    if scope in self._views
+                )
+            )
+        for _, _, item_id in keyed:
+            yield self._entries[item_id].item
+
+    def dismiss(self, item_id: str, user_id: int) -> bool:
+        """ユーザーがアイテムを却下したことを記録（新たに却下した場合True）"""
+        if item_id not in self._entries:
+            return False
+        dismissed = self._dismissed.setdefault(user_id, set())
+        if item_id in dismissed:
+            return False
+        dismissed.add(item_id)
+        self._dismissed_by.setdefault(item_id, set()).add(user_id)
+        return True
+
+    def dismissed(self, user_id: int) -> Set[str]:
+        """ユーザーが却下したアイテムIDの集合"""
+        return self._dismissed.get(user_id, set())
+
+    def expire(self, now: Optional[float] = None) -> List[Any]:
+        """期限切れのアイテムを索引から外して返す"""
+        now = self.clock() if now is None else now
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now:
+            _, seq, item_id = heapq.heappop(self._expiry)
+            entry = self._entries.get(item_id)
+            # 同じIDで登録し直されたアイテムの古い予定は無視する
+            if entry is None or entry.seq != seq:
+                continue
+            del self._entries[item_id]
+            self._unindex(item_id, entry)
+            expired.append(entry.item)
+            if self.on_expire is not None:
+                self.on_expire(entry.item)
+        self.expired_total += len(expired)
+        return expired
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            "items": len(self._entries),
+            "scheduled_expiries": len(self._expiry),
+            "users": len(self._by_user),
+            "sessions": len(self._by_session),
+            "expired": self.expired_total,
+        }
+
+    def _unindex(self, item_id: str, entry: _Entry) -> None:
+        for user_id in entry.user_ids:
+            self._discard(self._by_user, user_id, item_id)
+        if entry.session_id:
+            self._discard(self._by_session, entry.session_id, item_id)
+        self._views[_ALL].remove(item_id, entry.rank)
+        view = self._views.get(entry.session_id)
+        if view is not None:
+            view.remove(item_id, entry.rank)
+            if not view.size:
+                del self._views[entry.session_id]
+        for user_id in self._dismissed_by.pop(item_id, ()):
+            dismissed = self._dismissed.get(user_id)
+            if dismissed is not None:
+                dismissed.discard(item_id)
+                if not dismissed:
+                    del self._dismissed[user_id]
+
+    @staticmethod
+    def _discard(index: Dict[Any, Dict[str, None]], key: Any, item_id: str) -> None:
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.pop(item_id, None)
+        if not ids:
+            del index[key]
+
+    @staticmethod
+    def _expiry_time(expires_at: Optional[datetime]) -> Optional[float]:
+        if expires_at is None:
+            return None
+        return expires_at.timestamp()
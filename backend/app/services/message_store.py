@@ -0,0 +1,293 @@
+"""
+セッション別メッセージ履歴のインデックス付きストア
+
+- 履歴は古い順の deque（上限を超えたら先頭から破棄）で、メッセージには追加順の
+  シーケンス番号を振る。deque 上の位置は「シーケンス番号 - 先頭の番号」で求まる
+- メッセージIDからシーケンス番号への辞書で、編集・削除・リアクション対象の検索はO(1)
+- 削除は論理削除のまま位置を残す（tombstone）。削除されていないメッセージを1とする
+  Fenwick木をリングバッファの位置（シーケンス番号 mod 上限）に張り、削除・破棄は
+  O(log n)、offset 件目の位置は順位検索で O(log n) で求まる。ページングは先頭を
+  順位検索で求めてから順にたどり、削除済みの連続に当たるたびに順位検索で飛ばすので
+  O(limit log n) で、削除済みメッセージの数には依存しない
+- 検索用に小文字化した本文の3文字単位（trigram）の転置インデックスを追加・編集・削除・
+  破棄のたびに差分で更新する。3文字以上のクエリは候補の積集合を取ってから部分一致を
+  確認し、2文字以下のクエリは小文字化済みの本文を新しい順に走査する
+"""
+
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import structlog
+
+logger = structlog.get_logger()
+
+NGRAM_SIZE = 3
+
+# 永続化フック: (イベント名 "created" / "edited" / "deleted", メッセージ)
+MessagePersistenceHook = Callable[[str, Any], Awaitable[None]]
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class _FenwickTree:
+    """0/1 の配列に対する累積和と順位検索"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tree = [0] * (size + 1)
+        self._top = 1 << (size.bit_length() - 1) if size else 0
+
+    def add(self, index: int, delta: int) -> None:
+        index += 1
+        while index <= self.size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """[0, index) の合計"""
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, rank: int) -> int:
+        """1 が rank+1 個目に現れる位置（rank は0始まり）"""
+        index = 0
+        step = self._top
+        while step:
+            following = index + step
+            if following <= self.size and self._tree[following] <= rank:
+                index = following
+                rank -= self._tree[following]
+            step >>= 1
+        return index
+
+
+class SessionMessageStore:
+    """1セッション分のメッセージ履歴"""
+
+    def __init__(self, max_messages: int = 1000):
+        self.max_messages = max_messages
+        self._messages: Deque[Any] = deque()
+        self._head_seq = 0  # 先頭メッセージのシーケンス番号
+        self._seq_by_id: Dict[str, int] = {}
+        self._live = _FenwickTree(max_messages)  # 位置は シーケンス番号 % max_messages
+        self._deleted_count = 0
+        self._lowered: Dict[int, str] = {}  # 削除されていないメッセージの小文字化した本文
+        self._index: Dict[str, Set[int]] = {}
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        """削除されていないメッセージ数"""
+        return len(self._messages) - self._deleted_count
+
+    @property
+    def deleted_count(self) -> int:
+        return self._deleted_count
+
+    def append(self, message: Any) -> None:
+        """メッセージを追加（上限を超えたら最も古いメッセージを破棄）"""
+        while len(self._messages) >= self.max_messages:
+            self._evict_oldest()
+        seq = self._head_seq + len(self._messages)
+        self._messages.append(message)
+        self._seq_by_id[message.id] = seq
+        self._live.add(seq % self.max_messages, 1)
+        self._add_to_index(seq, message.content)
+
+    def get(self, message_id: str) -> Optional[Any]:
+        """IDでメッセージを取得（削除済みも含む）"""
+        seq = self._seq_by_id.get(message_id)
+        if seq is None:
+            return None
+        return self._messages[seq - self._head_seq]
+
+    def reindex(self, message: Any) -> None:
+        """編集後の本文でインデックスを更新"""
+        seq = self._seq_by_id.get(message.id)
+        if seq is None or seq not in self._lowered:
+            return
+        self._remove_from_index(seq)
+        self._add_to_index(seq, message.content)
+
+    def mark_deleted(self, message: Any) -> bool:
+        """メッセージを削除済みにする（既に削除済みならFalse）"""
+        seq = self._seq_by_id.get(message.id)
+        if seq is None or seq not in self._lowered:
+            return False
+        self._remove_from_index(seq)
+        self._live.add(seq % self.max_messages, -1)
+        self._deleted_count += 1
+        return True
+
+    def page(self, offset: int = 0, limit: int = 50) -> List[Any]:
+        """削除されていないメッセージを古い順に offset 件目から limit 件取得"""
+        if limit <= 0 or offset < 0 or offset >= len(self):
+            return []
+        end = min(offset + limit, len(self))
+        position = self._position_of(offset)
+        result = []
+        for rank in range(offset, end):
+            # 削除済みに当たったら、続く削除済みの連続は順位検索でまとめて飛ばす
+            if self._head_seq + position not in self._lowered:
+                position = self._position_of(rank)
+            result.append(self._messages[position])
+            position += 1
+        return result
+
+    def latest(self, limit: int) -> List[Any]:
+        """削除されていない最新 limit 件を古い順で取得"""
+        count = len(self)
+        return self.page(max(0, count - limit), limit)
+
+    def search(self, query: str, limit: int = 20) -> List[Any]:
+        """本文に query を含む（大文字小文字を区別しない）最新 limit 件を古い順で取得"""
+        if limit <= 0:
+            return []
+        needle = query.lower()
+        if not needle:
+            return self.latest(limit)
+
+        result = []
+        if len(needle) < NGRAM_SIZE:
+            # 短いクエリはインデックスを使えないので新しい順に走査して早めに打ち切る
+            for position in range(len(self._messages) - 1, -1, -1):
+                text = self._lowered.get(self._head_seq + position)
+                if text is not None and needle in text:
+                    result.append(self._messages[position])
+                    if len(result) >= limit:
+                        break
+        else:
+            postings = []
+            for gram in _ngrams(needle):
+                seqs = self._index.get(gram)
+                if not seqs:
+                    return []
+                postings.append(seqs)
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for seqs in postings[1:]:
+                candidates &= seqs
+                if not candidates:
+                    return []
+            for seq in sorted(candidates, reverse=True):
+                if needle in self._lowered[seq]:
+                    result.append(self._messages[seq - self._head_seq])
+                    if len(result) >= limit:
+                        break
+        result.reverse()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            "messages": len(self),
+            "deleted": self._deleted_count,
+            "evicted": self.evicted,
+            "index_terms": len(self._index),
+        }
+
+    def _position_of(self, offset: int) -> int:
+        """offset 件目の（削除されていない）メッセージの deque 上の位置
+
+        リングバッファ上では先頭のスロットから末尾までを数えてから先頭に折り返す。
+        """
+        capacity = self.max_messages
+        head = self._head_seq % capacity
+        before_head = self._live.prefix(head)
+        after_head = len(self) - before_head
+        if offset < after_head:
+            slot = self._live.find(before_head + offset)
+        else:
+            slot = self._live.find(offset - after_head)
+        return (slot - head) % capacity
+
+    def _evict_oldest(self) -> None:
+        message = self._messages.popleft()
+        seq = self._head_seq
+        self._head_seq += 1
+        self._seq_by_id.pop(message.id, None)
+        if seq in self._lowered:
+            self._remove_from_index(seq)
+            self._live.add(seq % self.max_messages, -1)
+        else:
+            self._deleted_count -= 1
+        self.evicted += 1
+
+    def _add_to_index(self, seq: int, content: str) -> None:
+        text = (content or "").lower()
+        self._lowered[seq] = text
+        for gram in _ngrams(text):
+            seqs = self._index.get(gram)
+            if seqs is None:
+                self._index[gram] = {seq}
+            else:
+                seqs.add(seq)
+
+    def _remove_from_index(self, seq: int) -> None:
+        text = self._lowered.pop(seq, None)
+        if text is None:
+            return
+        for gram in _ngrams(text):
+            seqs = self._index.get(gram)
+            if seqs is None:
+                continue
+            seqs.discard(seq)
+            if not seqs:
+                del self._index[gram]
+
+
+class ChatMessagePersistence:
+    """メッセージの追加・編集・削除を chat_messages テーブルに書き込むフック
+
+    セッションIDと同じ room_id のチャットルームがある場合だけ書き込む。
+    システムメッセージ（user_id = 0）は送信者がいないので対象外。
+    """
+
+    def __init__(self):
+        self._room_ids: Dict[str, int] = {}
+
+    async def __call__(self, event: str, message: Any) -> None:
+        if not message.user_id:
+            return
+
+        from app.core.database import AsyncSessionLocal
+        from app.repositories.chat_message_repository import chat_message_repository
+
+        async with AsyncSessionLocal() as db:
+            if event == "created":
+                chat_room_id = await self._resolve_room(db, message.session_id)
+                if chat_room_id is None:
+                    return
+                await chat_message_repository.create_message(
+                    db,
+                    {
+                        "message_id": message.id,
+                        "content": message.content,
+                        "message_type": message.message_type.value,
+                        "chat_room_id": chat_room_id,
+                        "sender_id": message.user_id,
+                    },
+                )
+            elif event == "edited":
+                await chat_message_repository.update_message(
+                    db, message.id, {"content": message.content, "is_edited": True}
+                )
+            elif event == "deleted":
+                await chat_message_repository.delete_message(db, message.id)
+
+    async def _resolve_room(self, db, session_id: str) -> Optional[int]:
+        chat_room_id = self._room_ids.get(session_id)
+        if chat_room_id is not None:
+            return chat_room_id
+
+        from app.repositories.chat_room_repository import chat_room_repository
+
+        room = await chat_room_repository.get_by_room_id(db, session_id)
+        if room is None:
+            return None
+        self._room_ids[session_id] = room.id
+        return room.id
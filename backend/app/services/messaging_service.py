@@ -1,12 +1,20 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 from datetime import datetime, timedelta
 from enum import Enum
+import asyncio
 import structlog
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
 
+from app.config import settings
+from app.core.outbound_queue import MessageClass
 from app.core.websocket import manager
 from app.models.user import User
+from app.services.message_store import (
+    ChatMessagePersistence,
+    MessagePersistenceHook,
+    SessionMessageStore,
+)
 
 logger = structlog.get_logger()
 
@@ -53,9 +61,20 @@ class Message:
 class MessagingService:
     """メッセージングサービス"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_messages: int = 1000,
+        persistence: Optional[MessagePersistenceHook] = None,
+    ):
+        self.max_messages = max_messages
         # セッション別メッセージ履歴
-        self.session_messages: Dict[str, List[Message]] = {}
+        self.session_messages: Dict[str, SessionMessageStore] = {}
+        # 追加・編集・削除を外部（DBなど）に書き込むフック
+        self.persistence = persistence
+        # 配信後にバックグラウンドで書き込む（順序を保つため直前の書き込みを待つ）
+        self._persist_tasks: Set[asyncio.Task] = set()
+        self._persist_tail: Optional[asyncio.Task] = None
+        self.persist_failures = 0
         # メッセージID管理
         self.message_counter: Dict[str, int] = {}
         # メッセージ配信状態
@@ -80,6 +99,7 @@ class MessagingService:
 
             # メッセージをブロードキャスト
             await self._broadcast_message(message)
+            self._persist("created", message)
 
             logger.info(
                 f"Text message sent: {message.id} in session {session_id}",
@@ -111,6 +131,7 @@ class MessagingService:
 
             # メッセージをブロードキャスト
             await self._broadcast_message(message)
+            self._persist("created", message)
 
             logger.info(
                 f"System message sent: {message.id} in session {session_id}",
@@ -147,6 +168,7 @@ class MessagingService:
 
             # メッセージをブロードキャスト
             await self._broadcast_message(message)
+            self._persist("created", message)
 
             logger.info(
                 f"Emoji reaction sent: {emoji} to message {target_message_id}",
@@ -181,6 +203,7 @@ class MessagingService:
 
             # メッセージをブロードキャスト
             await self._broadcast_message(message)
+            self._persist("created", message)
 
             logger.info(
                 f"Notification sent: {content} in session {session_id}",
@@ -210,9 +233,11 @@ class MessagingService:
             # メッセージを更新
             message.content = new_content
             message.edited_at = datetime.now()
+            self.session_messages[session_id].reindex(message)
 
             # 編集通知をブロードキャスト
             await self._broadcast_message_update(message)
+            self._persist("edited", message)
 
             logger.info(
                 f"Message edited: {message_id} in session {session_id}",
@@ -242,9 +267,11 @@ class MessagingService:
 
             # メッセージを論理削除
             message.deleted_at = datetime.now()
+            self.session_messages[session_id].mark_deleted(message)
 
             # 削除通知をブロードキャスト
             await self._broadcast_message_deletion(message)
+            self._persist("deleted", message)
 
             logger.info(
                 f"Message deleted: {message_id} in session {session_id}",
@@ -262,12 +289,11 @@ class MessagingService:
     ) -> List[Message]:
         """セッションのメッセージ履歴を取得"""
         try:
-            if session_id in self.session_messages:
-                messages = self.session_messages[session_id]
-                # 削除されていないメッセージのみ取得
-                active_messages = [msg for msg in messages if not msg.deleted_at]
-                return active_messages[offset : offset + limit]
-            return []
+            store = self.session_messages.get(session_id)
+            if store is None:
+                return []
+            # 削除されていないメッセージのみ取得
+            return store.page(offset, limit)
 
         except Exception as e:
             logger.error(f"Failed to get session messages: {e}")
@@ -278,20 +304,11 @@ class MessagingService:
     ) -> List[Message]:
         """メッセージを検索"""
         try:
-            if session_id not in self.session_messages:
+            store = self.session_messages.get(session_id)
+            if store is None:
                 return []
-
-            messages = self.session_messages[session_id]
-            query_lower = query.lower()
-
             # 削除されていないメッセージから検索
-            matching_messages = [
-                msg
-                for msg in messages
-                if not msg.deleted_at and query_lower in msg.content.lower()
-            ]
-
-            return matching_messages[-limit:]
+            return store.search(query, limit)
 
         except Exception as e:
             logger.error(f"Failed to search messages: {e}")
@@ -325,26 +342,64 @@ class MessagingService:
 
     async def _save_message(self, message: Message):
         """メッセージを保存"""
-        if message.session_id not in self.session_messages:
-            self.session_messages[message.session_id] = []
-
-        self.session_messages[message.session_id].append(message)
+        store = self.session_messages.get(message.session_id)
+        if store is None:
+            store = self.session_messages[message.session_id] = SessionMessageStore(
+                self.max_messages
+            )
 
-        # メッセージ履歴サイズ制限（最新1000件まで保持）
-        if len(self.session_messages[message.session_id]) > 1000:
-            self.session_messages[message.session_id] = self.session_messages[
-                message.session_id
-            ][-1000:]
+        # メッセージ履歴サイズ制限（最新 max_messages 件まで保持）
+        store.append(message)
 
     async def _find_message(
         self, session_id: str, message_id: str
     ) -> Optional[Message]:
         """メッセージを検索"""
-        if session_id in self.session_messages:
-            for message in self.session_messages[session_id]:
-                if message.id == message_id:
-                    return message
-        return None
+        store = self.session_messages.get(session_id)
+        if store is None:
+            return None
+        return store.get(message_id)
+
+    def _persist(self, event: str, message: Message):
+        """永続化フックをバックグラウンドで呼ぶ（配信は書き込みを待たない）"""
+        if self.persistence is None:
+            return
+        # 書き込みまでに編集されても、その時点の内容で書き込む
+        snapshot = replace(message)
+        task = asyncio.create_task(self._write(event, snapshot, self._persist_tail))
+        self._persist_tail = task
+        self._persist_tasks.add(task)
+        task.add_done_callback(self._persist_tasks.discard)
+
+    async def _write(
+        self, event: str, message: Message, previous: Optional[asyncio.Task]
+    ):
+        # 作成より先に編集・削除が書き込まれないよう、発生順に書き込む
+        if previous is not None:
+            await asyncio.wait({previous})
+        try:
+            await self.persistence(event, message)
+        except Exception as e:
+            self.persist_failures += 1
+            logger.warning(f"Failed to persist message {message.id} ({event}): {e}")
+
+    async def flush(self):
+        """未完了の書き込みを待つ（シャットダウン時など）"""
+        if self._persist_tasks:
+            await asyncio.wait(set(self._persist_tasks))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        stores = self.session_messages.values()
+        return {
+            "sessions": len(self.session_messages),
+            "messages": sum(len(store) for store in stores),
+            "deleted": sum(store.deleted_count for store in stores),
+            "evicted": sum(store.evicted for store in stores),
+            "persistence": self.persistence is not None,
+            "pending_writes": len(self._persist_tasks),
+            "failed_writes": self.persist_failures,
+        }
 
     async def _broadcast_message(self, message: Message):
         """メッセージをブロードキャスト"""
@@ -362,7 +417,9 @@ class MessagingService:
             },
         }
 
-        await manager.broadcast_to_session(message_data, message.session_id)
+        await manager.broadcast_to_session(
+            message_data, message.session_id, message_class=MessageClass.CHAT
+        )
 
     async def _broadcast_message_update(self, message: Message):
         """メッセージ更新をブロードキャスト"""
@@ -378,7 +435,9 @@ class MessagingService:
             },
         }
 
-        await manager.broadcast_to_session(update_data, message.session_id)
+        await manager.broadcast_to_session(
+            update_data, message.session_id, message_class=MessageClass.CHAT
+        )
 
     async def _broadcast_message_deletion(self, message: Message):
         """メッセージ削除をブロードキャスト"""
@@ -393,8 +452,20 @@ class MessagingService:
             },
         }
 
-        await manager.broadcast_to_session(deletion_data, message.session_id)
+        await manager.broadcast_to_session(
+            deletion_data, message.session_id, message_class=MessageClass.CHAT
+        )
+
+
+def create_messaging_service() -> MessagingService:
+    """設定に応じたメッセージングサービスを作成"""
+    return MessagingService(
+        max_messages=settings.MESSAGE_HISTORY_LIMIT,
+        persistence=(
+            ChatMessagePersistence() if settings.MESSAGE_PERSISTENCE_ENABLED else None
+        ),
+    )
 
 
 # グローバルメッセージングサービスインスタンス
-messaging_service = MessagingService()
+messaging_service = create_messaging_service()
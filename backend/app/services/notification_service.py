@@ -5,9 +5,12 @@ import structlog
 from dataclasses import dataclass
 import json
 import uuid
+from itertools import islice
 
+from app.core.outbound_queue import MessageClass
 from app.core.websocket import manager
 from app.models.user import User
+from app.services.expiring_store import ExpiringItemStore
 
 logger = structlog.get_logger()
 
@@ -64,12 +67,8 @@ class NotificationService:
     """通知サービス"""
 
     def __init__(self):
-        # 通知履歴
-        self.notifications: Dict[str, List[Notification]] = {}
-        # セッション別通知
-        self.session_notifications: Dict[str, List[Notification]] = {}
-        # ユーザー別通知
-        self.user_notifications: Dict[int, List[Notification]] = {}
+        # 通知（ID・セッション・ユーザー・有効期限で索引付け）
+        self.store = ExpiringItemStore(on_expire=self._forget_delivery_status)
         # 配信状態管理
         self.delivery_status: Dict[str, Dict[str, bool]] = {}
 
@@ -246,27 +245,13 @@ class NotificationService:
     ) -> List[Notification]:
         """ユーザーの通知を取得"""
         try:
-            notifications = self.user_notifications.get(user_id, [])
+            # 期限切れの通知は除外済み・新しい順
+            notifications = self.store.for_user(user_id)
 
             if unread_only:
-                notifications = [
-                    n
-                    for n in notifications
-                    if n.read_at is None
-                    and (n.expires_at is None or n.expires_at > datetime.now())
-                ]
+                notifications = (n for n in notifications if n.read_at is None)
 
-            # 期限切れの通知を除外
-            notifications = [
-                n
-                for n in notifications
-                if n.expires_at is None or n.expires_at > datetime.now()
-            ]
-
-            # 作成日時でソート（新しい順）
-            notifications.sort(key=lambda x: x.created_at, reverse=True)
-
-            return notifications[:limit]
+            return list(islice(notifications, limit))
 
         except Exception as e:
             logger.error(f"Failed to get user notifications: {e}")
@@ -277,19 +262,8 @@ class NotificationService:
     ) -> List[Notification]:
         """セッションの通知を取得"""
         try:
-            notifications = self.session_notifications.get(session_id, [])
-
-            # 期限切れの通知を除外
-            notifications = [
-                n
-                for n in notifications
-                if n.expires_at is None or n.expires_at > datetime.now()
-            ]
-
-            # 作成日時でソート（新しい順）
-            notifications.sort(key=lambda x: x.created_at, reverse=True)
-
-            return notifications[:limit]
+            # 期限切れの通知は除外済み・新しい順
+            return list(islice(self.store.for_session(session_id), limit))
 
         except Exception as e:
             logger.error(f"Failed to get session notifications: {e}")
@@ -298,69 +272,35 @@ class NotificationService:
     async def cleanup_expired_notifications(self):
         """期限切れの通知をクリーンアップ"""
         try:
-            current_time = datetime.now()
-
-            # 全通知から期限切れのものを削除
-            for notification_list in self.notifications.values():
-                notification_list[:] = [
-                    n
-                    for n in notification_list
-                    if n.expires_at is None or n.expires_at > current_time
-                ]
-
-            # セッション別通知から期限切れのものを削除
-            for notification_list in self.session_notifications.values():
-                notification_list[:] = [
-                    n
-                    for n in notification_list
-                    if n.expires_at is None or n.expires_at > current_time
-                ]
-
-            # ユーザー別通知から期限切れのものを削除
-            for notification_list in self.user_notifications.values():
-                notification_list[:] = [
-                    n
-                    for n in notification_list
-                    if n.expires_at is None or n.expires_at > current_time
-                ]
-
-            logger.info("Expired notifications cleaned up")
+            # 期限の早い順に期限切れのものだけを取り出して削除
+            expired = self.store.expire()
+
+            logger.info("Expired notifications cleaned up", count=len(expired))
 
         except Exception as e:
             logger.error(f"Failed to cleanup expired notifications: {e}")
 
     async def _save_notification(self, notification: Notification):
         """通知を保存"""
-        # 全通知に追加
-        if notification.id not in self.notifications:
-            self.notifications[notification.id] = []
-        self.notifications[notification.id].append(notification)
-
-        # セッション別通知に追加
-        if notification.session_id:
-            if notification.session_id not in self.session_notifications:
-                self.session_notifications[notification.session_id] = []
-            self.session_notifications[notification.session_id].append(notification)
-
-        # ユーザー別通知に追加
-        if notification.user_id:
-            if notification.user_id not in self.user_notifications:
-                self.user_notifications[notification.user_id] = []
-            self.user_notifications[notification.user_id].append(notification)
-
-        # ターゲットユーザー別通知に追加
-        if notification.target_user_ids:
-            for user_id in notification.target_user_ids:
-                if user_id not in self.user_notifications:
-                    self.user_notifications[user_id] = []
-                self.user_notifications[user_id].append(notification)
+        # 宛先ユーザー（本人とターゲットユーザー）とセッションで索引付け
+        self.store.add(
+            notification,
+            user_ids=[notification.user_id, *(notification.target_user_ids or [])],
+            session_id=notification.session_id,
+            priority=notification.priority.value,
+        )
 
     async def _find_notification(self, notification_id: str) -> Optional[Notification]:
         """通知を検索"""
-        if notification_id in self.notifications:
-            for notification in self.notifications[notification_id]:
-                return notification
-        return None
+        return self.store.get(notification_id)
+
+    def _forget_delivery_status(self, notification: Notification):
+        """期限切れの通知の配信状態を破棄"""
+        self.delivery_status.pop(notification.id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {**self.store.get_stats(), "delivery_status": len(self.delivery_status)}
 
     async def _broadcast_notification(self, notification: Notification):
         """通知をブロードキャスト"""
@@ -384,7 +324,12 @@ class NotificationService:
             },
         }
 
-        await manager.broadcast_to_session(notification_data, notification.session_id)
+        await manager.broadcast_to_session(
+            notification_data,
+            notification.session_id,
+            message_class=MessageClass.NOTIFICATION,
+            coalesce_key=notification.id,
+        )
 
         # 配信状態を更新
         notification.delivered_at = datetime.now()
@@ -408,7 +353,9 @@ class NotificationService:
             },
         }
 
-        await manager.broadcast_to_user(notification_data, user_id)
+        await manager.broadcast_to_user(
+            notification_data, user_id, coalesce_key=notification.id
+        )
 
         # 配信状態を更新
         notification.delivered_at = datetime.now()
@@ -433,8 +380,10 @@ class NotificationService:
         }
 
         # 全アクティブユーザーに配信
-        for user_id in manager.user_connections.keys():
-            await manager.broadcast_to_user(notification_data, user_id)
+        for user_id in list(manager.user_connections.keys()):
+            await manager.broadcast_to_user(
+                notification_data, user_id, coalesce_key=notification.id
+            )
 
         # 配信状態を更新
         notification.delivered_at = datetime.now()
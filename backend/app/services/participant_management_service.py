@@ -7,6 +7,8 @@ from enum import Enum
 from app.models.user import User
 from app.models.voice_session import VoiceSession
 from app.core.websocket import manager
+from app.services.audio_level_aggregator import audio_level_aggregator
+from app.services.participation_tracker import participation_tracker
 from app.core.exceptions import (
     BridgeLineException,
     ValidationException,
@@ -203,6 +205,7 @@ class ParticipantManagementService:
             
             # 参加者リストから削除
             del self.active_sessions[session_id][user_id]
+            audio_level_aggregator.remove_participant(session_id, user_id)
             
             # セッションが空になった場合の処理
             if not self.active_sessions[session_id]:
@@ -340,6 +343,27 @@ class ParticipantManagementService:
             logger.error(f"参加者ミュート制御に失敗: {e}", session_id=session_id, user_id=user_id)
             raise
     
+    async def set_audio_level_rate(
+        self,
+        session_id: str,
+        tick_hz: Optional[float],
+        changed_by: int
+    ) -> float:
+        """セッションの音声レベル配信レートを変更（ホスト・モデレーターのみ）"""
+        if not await self._check_permission(session_id, changed_by, "manage_participants"):
+            raise PermissionException("音声レベル配信レートを変更する権限がありません")
+
+        audio_level_aggregator.set_tick_rate(session_id, tick_hz)
+        tick_hz = audio_level_aggregator.get_tick_rate(session_id)
+
+        logger.info(
+            "音声レベル配信レートを変更",
+            session_id=session_id,
+            tick_hz=tick_hz,
+            changed_by=changed_by
+        )
+        return tick_hz
+
     async def get_session_participants(
         self,
         session_id: str,
@@ -384,9 +408,15 @@ class ParticipantManagementService:
         self,
         session_id: str,
         user_id: int,
-        audio_level: float
+        audio_level: float,
+        timestamp: Optional[float] = None,
+        duration: Optional[float] = None
     ) -> None:
-        """参加者の音声レベルを更新"""
+        """参加者の音声レベルを更新
+
+        timestamp はチャンク先頭のUNIX時刻（秒）、duration はチャンク長（秒）。
+        分からない場合は受信時刻と前回チャンクからの経過時間で代用する。
+        """
         try:
             if session_id not in self.active_sessions or user_id not in self.active_sessions[session_id]:
                 return
@@ -394,19 +424,23 @@ class ParticipantManagementService:
             participant = self.active_sessions[session_id][user_id]
             participant.audio_level = audio_level
             
+            # 発言時間・ターンなどの集計
+            talk = participation_tracker.record(
+                session_id, user_id, audio_level, timestamp=timestamp, duration=duration
+            )
+            participant.speak_time_session = talk.talk_time
+            
             # 発言状態の判定
-            is_speaking = audio_level > 0.1  # 閾値
+            is_speaking = audio_level > participation_tracker.speaking_threshold
             if is_speaking != participant.is_speaking:
                 participant.is_speaking = is_speaking
                 if is_speaking:
                     participant.status = ParticipantStatus.SPEAKING
-                    participant.speak_time_session += 0.1  # 100ms単位で累積
                 else:
                     participant.status = ParticipantStatus.CONNECTED
             
-            # 音声レベル更新通知（頻度制限あり）
-            if audio_level > 0.05:  # 一定レベル以上の場合のみ通知
-                await self._broadcast_audio_level_update(session_id, user_id, audio_level)
+            # 音声レベルの通知はセッションごとに一定間隔でまとめて配信する
+            audio_level_aggregator.record(session_id, user_id, audio_level)
                 
         except Exception as e:
             logger.error(f"音声レベル更新に失敗: {e}", session_id=session_id, user_id=user_id)
@@ -461,30 +495,6 @@ class ParticipantManagementService:
         except Exception as e:
             logger.error(f"参加者更新通知の送信に失敗: {e}", session_id=session_id)
     
-    async def _broadcast_audio_level_update(
-        self,
-        session_id: str,
-        user_id: int,
-        audio_level: float
-    ) -> None:
-        """音声レベル更新通知をブロードキャスト"""
-        try:
-            message = {
-                "type": "audio_level_update",
-                "session_id": session_id,
-                "user_id": user_id,
-                "audio_level": audio_level,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # 全参加者に通知
-            for p in self.active_sessions[session_id].values():
-                if p.connection_id and p.connection_id in manager.connection_info:
-                    await manager.send_personal_message(message, p.connection_id)
-                    
-        except Exception as e:
-            logger.error(f"音声レベル更新通知の送信に失敗: {e}", session_id=session_id)
-    
     async def _cleanup_empty_session(self, session_id: str) -> None:
         """空のセッションをクリーンアップ"""
         try:
@@ -493,6 +503,13 @@ class ParticipantManagementService:
             
             if session_id in self.session_metadata:
                 del self.session_metadata[session_id]
+
+            audio_level_aggregator.discard_session(session_id)
+            participation_tracker.discard_session(session_id)
+            # audio_forwarding はこのモジュールをインポートしているので遅延インポート
+            from app.services.audio_forwarding import audio_forwarder
+
+            audio_forwarder.discard_session(session_id)
             
             logger.info(f"空のセッションをクリーンアップ: {session_id}")
             
@@ -510,7 +527,9 @@ class ParticipantManagementService:
             speaking_count = len([p for p in participants.values() if p.status == ParticipantStatus.SPEAKING])
             muted_count = len([p for p in participants.values() if p.status == ParticipantStatus.MUTED])
             
-            total_speak_time = sum(p.speak_time_session for p in participants.values())
+            # 発言時間・ターン・重なり・無音は逐次集計のスナップショットから返す
+            participation = participation_tracker.snapshot(session_id) or {}
+            total_speak_time = participation.get("total_talk_time", 0.0)
             
             return {
                 "total_participants": len(participants),
@@ -519,6 +538,11 @@ class ParticipantManagementService:
                 "speaking_participants": speaking_count,
                 "muted_participants": muted_count,
                 "total_speak_time": total_speak_time,
+                "total_turns": participation.get("total_turns", 0),
+                "overlap_time": participation.get("overlap_time", 0.0),
+                "silence_time": participation.get("silence_time", 0.0),
+                "silence_count": participation.get("silence_count", 0),
+                "participation": participation.get("participants", {}),
                 "session_duration": (datetime.now() - self.session_metadata[session_id]["created_at"]).total_seconds()
             }
             
@@ -0,0 +1,255 @@
+"""
+発言時間・参加状況の逐次集計
+
+音声チャンクごとに（タイムスタンプとチャンク長を使って）参加者ごとの
+発言時間・ターン数・発言の重なり・無音区間をO(1)で更新し、DBや転写結果を参照せずに
+スナップショットを返す。
+
+- 音声レベルが閾値を超えたチャンクを有声とし、その長さを発言時間に加える
+- 有声チャンクの間隔が hangover 以下なら同じターンとみなす
+- 他の話者の有声区間と重なった時間は両者の overlap_time に計上する
+  （ターン中の話者の数だけ走査するため、セッションの人数には依存しない）
+- 誰も話していない区間が min_silence 以上続いたらセッションの無音区間として数える
+- チャンク長が分からない場合は同じ話者の前回チャンクからの経過時間で推定する
+- 話者をまたぐ比較はサーバーの時計で行う。クライアントのタイムスタンプは話者ごとに
+  「サーバーの受信時刻 - タイムスタンプ」の最小値（時計のずれ + 最小の遅延）を足して
+  サーバーの時計に直すので、チャンクの間隔はクライアントの値のまま保たれる
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class ParticipantTalk:
+    """参加者ごとの集計値"""
+
+    talk_time: float = 0.0
+    turns: int = 0
+    longest_turn: float = 0.0
+    overlap_time: float = 0.0
+    interruptions: int = 0  # 他の話者の発言中に始めたターン数
+    gap_count: int = 0  # 自分のターン間の無音
+    gap_time: float = 0.0
+    turn_start: Optional[float] = None
+    voice_end: Optional[float] = None
+    last_chunk_start: Optional[float] = None
+    clock_offset: Optional[float] = None  # クライアントの時計からサーバーの時計への補正（秒）
+
+    def close_turn(self):
+        if self.turn_start is not None and self.voice_end is not None:
+            self.longest_turn = max(self.longest_turn, self.voice_end - self.turn_start)
+        self.turn_start = None
+
+
+@dataclass
+class SessionTalk:
+    """セッションごとの集計値"""
+
+    started_at: float
+    last_timestamp: float
+    participants: Dict[int, ParticipantTalk] = field(default_factory=dict)
+    # ターン中の話者と最後の有声チャンクの区間
+    speaking: Dict[int, Tuple[float, float]] = field(default_factory=dict)
+    voice_until: Optional[float] = None
+    total_talk_time: float = 0.0
+    total_turns: int = 0
+    overlap_time: float = 0.0
+    silence_count: int = 0
+    silence_time: float = 0.0
+    longest_silence: float = 0.0
+
+
+class ParticipationTracker:
+    """セッションごとの発言時間・ターン・重なり・無音を逐次集計する"""
+
+    def __init__(
+        self,
+        speaking_threshold: float = 0.1,
+        turn_hangover: float = 0.5,
+        min_silence: float = 1.0,
+        default_chunk_seconds: float = 0.1,
+        max_chunk_seconds: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.speaking_threshold = speaking_threshold
+        self.turn_hangover = turn_hangover
+        self.min_silence = min_silence
+        self.default_chunk_seconds = default_chunk_seconds
+        self.max_chunk_seconds = max_chunk_seconds
+        self.clock = clock
+
+        self._sessions: Dict[str, SessionTalk] = {}
+        self.stats = {"chunks": 0, "voiced_chunks": 0}
+
+    def record(
+        self,
+        session_id: str,
+        user_id: int,
+        level: float,
+        timestamp: Optional[float] = None,
+        duration: Optional[float] = None,
+    ) -> ParticipantTalk:
+        """音声チャンク1つ分を集計する
+
+        timestamp はクライアントの時計でのチャンク先頭のUNIX時刻（秒）、duration は
+        チャンク長（秒）。timestamp がなければサーバーの受信時刻を使う。
+        """
+        now = self.clock()
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = SessionTalk(started_at=now, last_timestamp=now)
+        talk = state.participants.get(user_id)
+        if talk is None:
+            talk = state.participants[user_id] = ParticipantTalk()
+
+        if timestamp is None:
+            start = now
+        else:
+            offset = now - timestamp
+            if talk.clock_offset is None or offset < talk.clock_offset:
+                talk.clock_offset = offset
+            start = timestamp + talk.clock_offset
+
+        if duration is None:
+            if talk.last_chunk_start is not None and start > talk.last_chunk_start:
+                duration = min(start - talk.last_chunk_start, self.max_chunk_seconds)
+            else:
+                duration = self.default_chunk_seconds
+        talk.last_chunk_start = start
+        end = start + duration
+        state.last_timestamp = max(state.last_timestamp, end)
+        self.stats["chunks"] += 1
+
+        if level <= self.speaking_threshold:
+            return talk
+        self.stats["voiced_chunks"] += 1
+
+        # セッション全体で誰も話していなかった区間
+        if state.voice_until is not None:
+            silence = start - state.voice_until
+            if silence >= self.min_silence:
+                state.silence_count += 1
+                state.silence_time += silence
+                state.longest_silence = max(state.longest_silence, silence)
+        state.voice_until = end if state.voice_until is None else max(state.voice_until, end)
+
+        # 他の話者との重なり（ターンが終わった話者はここで外す）
+        overlapped = False
+        for other_id, (other_start, other_end) in list(state.speaking.items()):
+            if other_id == user_id:
+                continue
+            if start - other_end > self.turn_hangover:
+                state.participants[other_id].close_turn()
+                del state.speaking[other_id]
+                continue
+            overlap = min(end, other_end) - max(start, other_start)
+            if overlap > 0:
+                talk.overlap_time += overlap
+                state.participants[other_id].overlap_time += overlap
+                state.overlap_time += overlap
+            if other_end > start:
+                overlapped = True
+
+        # ターンの開始・継続
+        if talk.turn_start is None or start - talk.voice_end > self.turn_hangover:
+            if talk.voice_end is not None:
+                talk.close_turn()
+                talk.gap_count += 1
+                talk.gap_time += max(0.0, start - talk.voice_end)
+            talk.turn_start = start
+            talk.turns += 1
+            state.total_turns += 1
+            if overlapped:
+                talk.interruptions += 1
+
+        talk.talk_time += duration
+        state.total_talk_time += duration
+        talk.voice_end = end if talk.voice_end is None else max(talk.voice_end, end)
+        state.speaking[user_id] = (start, end)
+        return talk
+
+    def snapshot(self, session_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """セッションの集計値のスナップショット（参加者数に比例した時間で組み立てる）"""
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        now = state.last_timestamp if now is None else now
+
+        participants = {}
+        for user_id, talk in state.participants.items():
+            in_turn = (
+                user_id in state.speaking
+                and talk.voice_end is not None
+                and now - talk.voice_end <= self.turn_hangover
+            )
+            longest_turn = talk.longest_turn
+            if talk.turn_start is not None:
+                longest_turn = max(longest_turn, talk.voice_end - talk.turn_start)
+            participants[user_id] = {
+                "talk_time": talk.talk_time,
+                "talk_share": (
+                    talk.talk_time / state.total_talk_time if state.total_talk_time else 0.0
+                ),
+                "turns": talk.turns,
+                "average_turn": talk.talk_time / talk.turns if talk.turns else 0.0,
+                "longest_turn": longest_turn,
+                "overlap_time": talk.overlap_time,
+                "interruptions": talk.interruptions,
+                "gap_count": talk.gap_count,
+                "gap_time": talk.gap_time,
+                "is_speaking": in_turn,
+            }
+
+        return {
+            "session_id": session_id,
+            "started_at": datetime.fromtimestamp(state.started_at).isoformat(),
+            "last_activity": datetime.fromtimestamp(state.last_timestamp).isoformat(),
+            "last_timestamp": state.last_timestamp,
+            "duration": max(0.0, now - state.started_at),
+            "total_talk_time": state.total_talk_time,
+            "total_turns": state.total_turns,
+            "overlap_time": state.overlap_time,
+            "silence_count": state.silence_count,
+            "silence_time": state.silence_time,
+            "longest_silence": state.longest_silence,
+            "active_speakers": sorted(
+                user_id for user_id, values in participants.items() if values["is_speaking"]
+            ),
+            "participants": participants,
+        }
+
+    def discard_session(self, session_id: str) -> None:
+        """セッションの集計を破棄"""
+        self._sessions.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "sessions": len(self._sessions),
+            "participants": sum(len(s.participants) for s in self._sessions.values()),
+        }
+
+
+def create_participation_tracker() -> ParticipationTracker:
+    """設定に応じた集計器を作成"""
+    return ParticipationTracker(
+        speaking_threshold=settings.AUDIO_LEVEL_SPEAKING_THRESHOLD,
+        turn_hangover=settings.PARTICIPATION_TURN_HANGOVER_SECONDS,
+        min_silence=settings.PARTICIPATION_MIN_SILENCE_SECONDS,
+        default_chunk_seconds=settings.PARTICIPATION_DEFAULT_CHUNK_SECONDS,
+        max_chunk_seconds=settings.PARTICIPATION_MAX_CHUNK_SECONDS,
+    )
+
+
+# グローバルインスタンス
+participation_tracker = create_participation_tracker()
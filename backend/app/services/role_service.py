@@ -5,6 +5,7 @@ import json
 import structlog
 from datetime import datetime
 
+from app.core.user_cache import user_identity_cache
 from app.models.role import Role, UserRole
 from app.models.user import User
 from app.integrations.firebase_client import set_admin_claim, get_user_claims
@@ -93,6 +94,7 @@ class RoleService:
             
             self.db.add(user_role)
             await self.db.commit()
+            user_identity_cache.invalidate(user_id)
             
             logger.info(f"Role {role_name} assigned to user {user_id}")
             return True
@@ -130,6 +132,7 @@ class RoleService:
             if user_role:
                 user_role.is_active = False
                 await self.db.commit()
+                user_identity_cache.invalidate(user_id)
                 logger.info(f"Role {role_name} removed from user {user_id}")
                 return True
             
@@ -0,0 +1,406 @@
+"""
+転写ジョブのスケジューラー
+
+転写API呼び出しをWebSocketのメッセージ処理から切り離し、全体・セッションごとの
+同時実行数の上限、上限付きの待ちキュー、部分転写の最新優先（古いものは破棄）、
+ジョブごとの期限を適用して実行する。結果はコールバックで非同期に返す。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+import structlog
+
+from app.config import settings
+from app.core.metrics import QUEUE_DEPTH_BOUNDS, Histogram
+
+logger = structlog.get_logger()
+
+# 待ち時間・処理時間（ミリ秒）のバケット
+TRANSCRIPTION_TIME_BOUNDS_MS = [10, 50, 100, 250, 500, 1000, 2000, 5000, 10000]
+# ディスパッチャーでエラーが起きたときに再開まで待つ時間（秒）
+DISPATCH_ERROR_BACKOFF_SECONDS = 0.5
+
+
+class TranscriptionJobKind(str, Enum):
+    """転写ジョブの種類"""
+
+    FINAL = "final"  # 閉じた発話（確定転写）
+    PARTIAL = "partial"  # 発話途中のスナップショット（部分転写）
+
+
+class TranscriptionJobStatus(str, Enum):
+    """転写ジョブのステータス"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    SUPERSEDED = "superseded"  # 同じ話者の新しい部分転写・確定転写に置き換えられた
+    EXPIRED = "expired"  # 実行前に期限を過ぎた
+    TIMED_OUT = "timed_out"  # 実行中に期限を過ぎた
+    FAILED = "failed"
+    REJECTED = "rejected"  # キューがあふれて受け付けなかった
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class TranscriptionJob:
+    """転写ジョブ"""
+
+    session_id: str
+    user_id: int
+    kind: TranscriptionJobKind
+    run: Callable[[], Awaitable[Any]]
+    deadline: float  # clock基準の期限
+    enqueued_at: float
+    on_result: Optional[Callable[["TranscriptionJob", Any], Awaitable[None]]] = None
+    status: TranscriptionJobStatus = TranscriptionJobStatus.PENDING
+    result: Any = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.session_id, self.user_id
+
+    async def wait(self) -> Any:
+        """ジョブの終了を待って結果を返す（完了以外はNone）"""
+        await self.done.wait()
+        return self.result
+
+
+class TranscriptionScheduler:
+    """転写ジョブのスケジューラー
+
+    確定転写はFIFO、部分転写は話者ごとに最新の1件だけを保持し、
+    確定転写を優先して取り出す。セッションごとの同時実行数に達している
+    ジョブは飛ばして、他セッションのジョブを先に実行する。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        per_session_concurrency: int = 2,
+        max_pending: int = 64,
+        final_timeout: float = 15.0,
+        partial_timeout: float = 3.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_session_concurrency = per_session_concurrency
+        self.max_pending = max_pending
+        self.timeouts = {
+            TranscriptionJobKind.FINAL: final_timeout,
+            TranscriptionJobKind.PARTIAL: partial_timeout,
+        }
+        self.clock = clock
+
+        self._finals: Deque[TranscriptionJob] = deque()
+        # (session_id, user_id) → 最新の部分転写ジョブ（置き換えても順番は維持）
+        self._partials: "OrderedDict[Tuple[str, int], TranscriptionJob]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # 統計情報
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "superseded": 0,
+            "expired": 0,
+            "timed_out": 0,
+            "failed": 0,
+            "rejected": 0,
+            "evicted": 0,
+            "cancelled": 0,
+        }
+        self.queue_depth_histogram = Histogram(QUEUE_DEPTH_BOUNDS)
+        self.wait_time_histograms = {
+            kind: Histogram(TRANSCRIPTION_TIME_BOUNDS_MS)
+            for kind in TranscriptionJobKind
+        }
+        self.service_time_histograms = {
+            kind: Histogram(TRANSCRIPTION_TIME_BOUNDS_MS)
+            for kind in TranscriptionJobKind
+        }
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._finals) + len(self._partials)
+
+    @property
+    def running_count(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def is_running(self) -> bool:
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    def submit(
+        self,
+        session_id: str,
+        user_id: int,
+        kind: TranscriptionJobKind,
+        run: Callable[[], Awaitable[Any]],
+        on_result: Optional[Callable[[TranscriptionJob, Any], Awaitable[None]]] = None,
+        timeout: Optional[float] = None,
+    ) -> TranscriptionJob:
+        """ジョブを積む（待たずに返る）
+
+        run は転写を実行するコルーチン関数、on_result は完了時に結果を受け取る。
+        キューがあふれた場合は最も古い部分転写を捨てて場所を空け、
+        空けられなければジョブをREJECTEDで返す。
+        """
+        now = self.clock()
+        job = TranscriptionJob(
+            session_id=session_id,
+            user_id=user_id,
+            kind=kind,
+            run=run,
+            deadline=now + (timeout if timeout is not None else self.timeouts[kind]),
+            enqueued_at=now,
+            on_result=on_result,
+        )
+        self.stats["submitted"] += 1
+
+        superseded = self._partials.get(job.key)
+        if superseded is not None:
+            # 同じ話者の待機中の部分転写は新しいジョブで不要になる
+            self._finish(superseded, TranscriptionJobStatus.SUPERSEDED)
+            if kind == TranscriptionJobKind.FINAL:
+                del self._partials[job.key]
+
+        if kind == TranscriptionJobKind.PARTIAL and superseded is not None:
+            # 置き換え（キュー内の順番は維持）
+            self._partials[job.key] = job
+        else:
+            if self.pending_count >= self.max_pending and not self._evict_partial():
+                logger.warning(
+                    "Transcription queue full",
+                    session_id=session_id,
+                    kind=kind.value,
+                    pending=self.pending_count,
+                )
+                self._finish(job, TranscriptionJobStatus.REJECTED)
+                return job
+            if kind == TranscriptionJobKind.FINAL:
+                self._finals.append(job)
+            else:
+                self._partials[job.key] = job
+
+        self.queue_depth_histogram.observe(self.pending_count)
+        self._idle.clear()
+        self._wakeup.set()
+        return job
+
+    def _evict_partial(self) -> bool:
+        """最も古い部分転写を捨てる"""
+        if not self._partials:
+            return False
+        _, job = self._partials.popitem(last=False)
+        self.stats["evicted"] += 1
+        self._finish(job, TranscriptionJobStatus.SUPERSEDED)
+        return True
+
+    def cancel_session(
+        self, session_id: str, kind: Optional[TranscriptionJobKind] = None
+    ) -> int:
+        """セッションの待機中のジョブを取り消す（kind指定時はその種類のみ）"""
+        cancelled = 0
+        if kind in (None, TranscriptionJobKind.PARTIAL):
+            for key in [key for key in self._partials if key[0] == session_id]:
+                self._finish(self._partials.pop(key), TranscriptionJobStatus.CANCELLED)
+                cancelled += 1
+        if kind in (None, TranscriptionJobKind.FINAL):
+            remaining = deque()
+            for job in self._finals:
+                if job.session_id == session_id:
+                    self._finish(job, TranscriptionJobStatus.CANCELLED)
+                    cancelled += 1
+                else:
+                    remaining.append(job)
+            self._finals = remaining
+        self._check_idle()
+        return cancelled
+
+    def _next_job(self) -> Optional[TranscriptionJob]:
+        """実行可能な次のジョブを取り出す（確定転写を優先）"""
+        for job in self._finals:
+            if self._running.get(job.session_id, 0) < self.per_session_concurrency:
+                self._finals.remove(job)
+                return job
+        for key, job in self._partials.items():
+            if self._running.get(job.session_id, 0) < self.per_session_concurrency:
+                del self._partials[key]
+                return job
+        return None
+
+    def _dispatch(self):
+        """空きがある限りジョブを開始する"""
+        while len(self._tasks) < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                break
+
+            now = self.clock()
+            if now >= job.deadline:
+                self._finish(job, TranscriptionJobStatus.EXPIRED)
+                continue
+
+            self.wait_time_histograms[job.kind].observe((now - job.enqueued_at) * 1000)
+            job.status = TranscriptionJobStatus.RUNNING
+            self._running[job.session_id] = self._running.get(job.session_id, 0) + 1
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._on_task_done)
+        self._check_idle()
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._wakeup.set()
+
+    async def _execute(self, job: TranscriptionJob):
+        """ジョブを期限付きで実行し、結果をコールバックへ渡す"""
+        started = self.clock()
+        status = TranscriptionJobStatus.COMPLETED
+        try:
+            job.result = await asyncio.wait_for(
+                job.run(), timeout=max(job.deadline - started, 0.0)
+            )
+        except asyncio.TimeoutError:
+            status = TranscriptionJobStatus.TIMED_OUT
+            logger.warning(
+                "Transcription job timed out",
+                session_id=job.session_id,
+                kind=job.kind.value,
+            )
+        except asyncio.CancelledError:
+            status = TranscriptionJobStatus.CANCELLED
+        except Exception as e:
+            status = TranscriptionJobStatus.FAILED
+            logger.error(f"Transcription job failed: {e}", session_id=job.session_id)
+        finally:
+            self.service_time_histograms[job.kind].observe(
+                (self.clock() - started) * 1000
+            )
+            running = self._running.get(job.session_id, 0) - 1
+            if running > 0:
+                self._running[job.session_id] = running
+            else:
+                self._running.pop(job.session_id, None)
+
+        if status == TranscriptionJobStatus.COMPLETED and job.on_result is not None:
+            try:
+                await job.on_result(job, job.result)
+            except Exception as e:
+                logger.error(f"Transcription result callback failed: {e}")
+        self._finish(job, status)
+
+    def _finish(self, job: TranscriptionJob, status: TranscriptionJobStatus):
+        job.status = status
+        if status != TranscriptionJobStatus.COMPLETED:
+            job.result = None
+        self.stats[status.value] += 1
+        job.done.set()
+
+    def _check_idle(self):
+        if not self.pending_count and not self._tasks:
+            self._idle.set()
+
+    async def start(self):
+        """ディスパッチャーを開始"""
+        if self.is_running:
+            return
+        logger.info(
+            "Starting transcription scheduler",
+            max_concurrency=self.max_concurrency,
+            per_session_concurrency=self.per_session_concurrency,
+        )
+        # イベントは作成時のイベントループに結び付くので、起動のたびに作り直す
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        if self.pending_count:
+            self._wakeup.set()
+        self._check_idle()
+        self._dispatcher = asyncio.create_task(self._run_dispatcher())
+
+    async def stop(self):
+        """ディスパッチャーを停止（待機中・実行中のジョブは取り消す）"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+        for job in list(self._finals) + list(self._partials.values()):
+            self._finish(job, TranscriptionJobStatus.CANCELLED)
+        self._finals.clear()
+        self._partials.clear()
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._idle.set()
+
+    async def join(self):
+        """待機中・実行中のジョブが全て終わるまで待つ"""
+        await self._idle.wait()
+
+    async def _run_dispatcher(self):
+        while True:
+            try:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                self._dispatch()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in transcription dispatcher: {e}")
+                # 同じエラーで空回りしないように少し待ってから再開する
+                await asyncio.sleep(DISPATCH_ERROR_BACKOFF_SECONDS)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "pending": {
+                TranscriptionJobKind.FINAL.value: len(self._finals),
+                TranscriptionJobKind.PARTIAL.value: len(self._partials),
+            },
+            "running": self.running_count,
+            "running_sessions": dict(self._running),
+            "max_concurrency": self.max_concurrency,
+            "per_session_concurrency": self.per_session_concurrency,
+            "max_pending": self.max_pending,
+            "queue_depth_histogram": self.queue_depth_histogram.to_dict(),
+            "wait_time_ms_histograms": {
+                kind.value: histogram.to_dict()
+                for kind, histogram in self.wait_time_histograms.items()
+            },
+            "service_time_ms_histograms": {
+                kind.value: histogram.to_dict()
+                for kind, histogram in self.service_time_histograms.items()
+            },
+        }
+
+
+def create_transcription_scheduler() -> TranscriptionScheduler:
+    """設定に応じたスケジューラーを作成"""
+    return TranscriptionScheduler(
+        max_concurrency=settings.TRANSCRIPTION_MAX_CONCURRENCY,
+        per_session_concurrency=settings.TRANSCRIPTION_SESSION_CONCURRENCY,
+        max_pending=settings.TRANSCRIPTION_MAX_PENDING,
+        final_timeout=settings.TRANSCRIPTION_FINAL_TIMEOUT,
+        partial_timeout=settings.TRANSCRIPTION_PARTIAL_TIMEOUT,
+    )
+
+
+# グローバルスケジューラー
+transcription_scheduler = create_transcription_scheduler()
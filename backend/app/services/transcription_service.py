@@ -1,17 +1,41 @@
 import asyncio
+import time
 import structlog
-from typing import Dict, List, Optional, Any, Tuple
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
-from app.integrations.openai_client import openai_client
+from app.core.metrics import Histogram
+from app.integrations.transcription_backend import (
+    TranscriptionBackend,
+    transcription_backend,
+)
 from app.models.transcription import Transcription
 from app.repositories import transcription_repository
-from app.schemas.transcription import TranscriptionCreate, TranscriptionResponse
+from app.schemas.transcription import TranscriptionResponse
+from app.services.audio_processing_service import calculate_rms
+from app.services.transcription_scheduler import (
+    TranscriptionJob,
+    TranscriptionJobKind,
+    TranscriptionScheduler,
+)
+from app.services.transcription_writer import (
+    TranscriptionWriteBuffer,
+    transcription_write_buffer,
+)
+from app.services.utterance_segmenter import (
+    SegmenterConfig,
+    Utterance,
+    UtteranceSegmenter,
+)
 
 logger = structlog.get_logger()
 
+# 発話終了から確定テキストまでの遅延（ミリ秒）のバケット
+EOU_LATENCY_BOUNDS_MS = [100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000]
+
 
 class TranscriptionQuality(str, Enum):
     """転写品質レベル"""
@@ -68,9 +92,19 @@ class RealtimeTranscriptionStats:
 class RealtimeTranscriptionManager:
     """リアルタイム転写管理クラス"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        clock=time.monotonic,
+        backend: Optional[TranscriptionBackend] = None,
+        writer: Optional[TranscriptionWriteBuffer] = None,
+    ):
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
-        self.chunk_buffers: Dict[str, List[bytes]] = {}
+        # 転写バックエンド（未指定ならグローバルのバックエンドを使う）
+        self.backend = backend
+        # 確定した転写の書き込みバッファ
+        self.writer = writer or transcription_write_buffer
+        # セッションごとの話者別発話区間検出器
+        self.segmenters: Dict[str, UtteranceSegmenter] = {}
         self.partial_transcriptions: Dict[str, Dict[int, str]] = {}
         self.speaker_profiles: Dict[str, Dict[int, Dict[str, Any]]] = {}
         self.language_detection: Dict[str, str] = {}
@@ -83,6 +117,59 @@ class RealtimeTranscriptionManager:
         self.max_chunk_duration = 10.0  # 最大チャンク時間
         self.partial_update_interval = 1.0  # 部分転写更新間隔
         self.speaker_confidence_threshold = 0.7  # 話者識別信頼度閾値
+        self.speech_threshold = 0.01  # 発話判定のRMS閾値（音声レベル計算と同じ値）
+        self.end_silence_duration = 0.5  # 発話終了とみなす無音時間
+
+        # 転写APIの呼び出し回数と遅延の計測
+        self.clock = clock
+        self.transcription_metrics = {
+            "partial_calls": 0,
+            "final_calls": 0,
+            "audio_seconds": 0.0,
+        }
+        self.eou_latency = Histogram(EOU_LATENCY_BOUNDS_MS)
+
+        # 転写ジョブのスケジューラー（未設定なら音声処理の中で転写を待つ）
+        self.scheduler: Optional[TranscriptionScheduler] = None
+        # 非同期に確定した転写結果の通知先 (session_id, chunk)
+        self.result_listeners: List[
+            Callable[[str, TranscriptionChunk], Awaitable[None]]
+        ] = []
+
+    def get_backend(self) -> TranscriptionBackend:
+        """転写に使うバックエンドを取得"""
+        return self.backend or transcription_backend
+
+    def attach_scheduler(self, scheduler: Optional[TranscriptionScheduler]):
+        """転写をスケジューラー経由で非同期に実行する（Noneで同期実行に戻す）"""
+        self.scheduler = scheduler
+
+    def add_result_listener(
+        self, listener: Callable[[str, TranscriptionChunk], Awaitable[None]]
+    ):
+        """非同期に得られた転写結果の通知先を登録"""
+        if listener not in self.result_listeners:
+            self.result_listeners.append(listener)
+
+    @property
+    def is_scheduled(self) -> bool:
+        """転写をスケジューラー経由で実行するか（スケジューラー稼働中のみ）"""
+        return self.scheduler is not None and self.scheduler.is_running
+
+    def is_session_active(self, session_id: str) -> bool:
+        """転写中のセッションか"""
+        session_info = self.active_sessions.get(session_id)
+        return bool(session_info and session_info.get("is_active"))
+
+    def _segmenter_config(self) -> SegmenterConfig:
+        """現在の設定から発話区間検出の設定を作成"""
+        return SegmenterConfig(
+            speech_threshold=self.speech_threshold,
+            end_silence_duration=self.end_silence_duration,
+            min_utterance_duration=self.min_chunk_duration,
+            max_utterance_duration=self.max_chunk_duration,
+            partial_interval=self.partial_update_interval,
+        )
         
     async def start_session(self, session_id: str, initial_language: str = "ja"):
         """セッションの転写を開始"""
@@ -93,7 +180,9 @@ class RealtimeTranscriptionManager:
             "is_active": True,
             "language": initial_language,
         }
-        self.chunk_buffers[session_id] = []
+        self.segmenters[session_id] = UtteranceSegmenter(
+            self._segmenter_config(), clock=self.clock
+        )
         self.partial_transcriptions[session_id] = {}
         self.speaker_profiles[session_id] = {}
         self.language_detection[session_id] = initial_language
@@ -106,8 +195,23 @@ class RealtimeTranscriptionManager:
         """セッションの転写を停止"""
         if session_id in self.active_sessions:
             self.active_sessions[session_id]["is_active"] = False
-        if session_id in self.chunk_buffers:
-            del self.chunk_buffers[session_id]
+        segmenter = self.segmenters.pop(session_id, None)
+        if segmenter is not None:
+            # 発話途中の音声を確定させてから終了する
+            if self.is_scheduled:
+                self.scheduler.cancel_session(session_id, TranscriptionJobKind.PARTIAL)
+                jobs = [
+                    self._schedule_utterance(session_id, utterance)
+                    for utterance in segmenter.flush()
+                ]
+                await asyncio.gather(*(job.wait() for job in jobs))
+            else:
+                for utterance in segmenter.flush():
+                    await self._transcribe_utterance(session_id, utterance)
+        try:
+            await self.writer.flush_session(session_id, close=True)
+        except Exception as e:
+            logger.error(f"Failed to flush transcriptions: {e}", session_id=session_id)
         if session_id in self.partial_transcriptions:
             del self.partial_transcriptions[session_id]
         if session_id in self.speaker_profiles:
@@ -128,33 +232,52 @@ class RealtimeTranscriptionManager:
         audio_data: bytes,
         timestamp: datetime,
         sample_rate: int = 16000,
+        rms: Optional[float] = None,
     ) -> Tuple[Optional[TranscriptionChunk], Optional[TranscriptionChunk]]:
-        """音声チャンクを処理して転写（確定と部分転写の両方を返す）"""
+        """音声チャンクを処理して転写（確定と部分転写の両方を返す）
+
+        チャンクは話者ごとの発話区間検出に通し、転写するのは閉じた発話と
+        一定間隔の部分転写だけにする。rms には音声レベル計算で求めた値を
+        渡せる（省略時はここで計算する）。
+        スケジューラーが稼働している場合は転写を待たずに (None, None) を返し、
+        結果は result_listeners へ通知する。
+        """
         try:
             if session_id not in self.active_sessions:
                 return None, None
-                
+
             session_info = self.active_sessions[session_id]
             if not session_info.get("is_active", False):
                 return None, None
 
-            # バッファに追加
-            self.chunk_buffers[session_id].append(audio_data)
-
             # 現在時間を更新
             session_info["current_time"] = (
                 timestamp - session_info["start_time"]
             ).total_seconds()
 
-            # 部分転写を生成
-            partial_chunk = await self._generate_partial_transcription(
-                session_id, user_id, timestamp
+            if rms is None:
+                rms, _ = calculate_rms(audio_data)
+
+            utterances = self.segmenters[session_id].push(
+                user_id, audio_data, session_info["current_time"], rms, sample_rate
             )
 
-            # 確定転写を生成（条件を満たした場合）
+            if self.is_scheduled:
+                for utterance in utterances:
+                    self._schedule_utterance(session_id, utterance)
+                return None, None
+
             final_chunk = None
-            if self._should_transcribe(session_id):
-                final_chunk = await self._transcribe_buffer(session_id, user_id, timestamp)
+            partial_chunk = None
+            for utterance in utterances:
+                if utterance.is_final:
+                    # 確定転写（閉じた発話）
+                    final_chunk = await self._transcribe_utterance(session_id, utterance)
+                else:
+                    # 部分転写（発話中、一定間隔）
+                    partial_chunk = await self._generate_partial_transcription(
+                        session_id, utterance
+                    )
 
             # 統計を更新
             await self._update_stats(session_id, final_chunk, partial_chunk)
@@ -166,18 +289,50 @@ class RealtimeTranscriptionManager:
             await self._update_error_stats(session_id)
             return None, None
 
+    def _schedule_utterance(
+        self, session_id: str, utterance: Utterance
+    ) -> TranscriptionJob:
+        """発話の転写ジョブをスケジューラーに積む"""
+        if utterance.is_final:
+            kind = TranscriptionJobKind.FINAL
+            run = partial(self._transcribe_utterance, session_id, utterance)
+        else:
+            kind = TranscriptionJobKind.PARTIAL
+            run = partial(self._generate_partial_transcription, session_id, utterance)
+        return self.scheduler.submit(
+            session_id, utterance.user_id, kind, run, on_result=self._on_job_result
+        )
+
+    async def _on_job_result(
+        self, job: TranscriptionJob, chunk: Optional[TranscriptionChunk]
+    ):
+        """スケジューラーで完了した転写を統計に反映し、通知先へ渡す"""
+        if chunk is None:
+            return
+        if chunk.is_final:
+            await self._update_stats(job.session_id, chunk, None)
+        else:
+            # 発話が閉じた後に届いた部分転写は古いので配信しない
+            segmenter = self.segmenters.get(job.session_id)
+            if segmenter is None or not segmenter.is_speaking(job.user_id):
+                return
+            await self._update_stats(job.session_id, None, chunk)
+
+        for listener in self.result_listeners:
+            try:
+                await listener(job.session_id, chunk)
+            except Exception as e:
+                logger.error(f"Transcription result listener failed: {e}")
+
     async def _generate_partial_transcription(
-        self, session_id: str, user_id: int, timestamp: datetime
+        self, session_id: str, utterance: Utterance
     ) -> Optional[TranscriptionChunk]:
-        """部分転写を生成"""
+        """発話途中の音声から部分転写を生成"""
         try:
-            buffer = self.chunk_buffers[session_id]
-            if not buffer:
-                return None
-
-            # 最新のチャンクのみで部分転写
-            latest_chunk = buffer[-1]
-            transcription_result = await openai_client.transcribe_chunk(latest_chunk)
+            self.transcription_metrics["partial_calls"] += 1
+            transcription_result = await self.get_backend().transcribe_chunk(
+                utterance.audio, self.language_detection.get(session_id, "ja")
+            )
 
             if not transcription_result or not transcription_result.get("text"):
                 return None
@@ -186,46 +341,47 @@ class RealtimeTranscriptionManager:
             confidence = transcription_result.get("confidence", 0.0)
 
             # 部分転写を保存
-            self.partial_transcriptions[session_id][user_id] = text
+            self.partial_transcriptions[session_id][utterance.user_id] = text
 
-            session_info = self.active_sessions[session_id]
-            current_time = session_info["current_time"]
-
-            return TranscriptionChunk(
+            chunk = TranscriptionChunk(
                 text=text,
-                start_time=current_time - 0.1,
-                end_time=current_time,
+                start_time=utterance.start_time,
+                end_time=utterance.end_time,
                 confidence=confidence,
                 is_final=False,
-                speaker_id=user_id,
+                speaker_id=utterance.user_id,
                 language=self.language_detection[session_id],
                 quality=self._assess_quality(confidence),
             )
+            self.active_sessions[session_id]["last_partial"] = chunk
+            return chunk
 
         except Exception as e:
             logger.error(f"Failed to generate partial transcription: {e}")
             return None
 
-    async def _transcribe_buffer(
-        self, session_id: str, user_id: int, timestamp: datetime
+    async def _transcribe_utterance(
+        self, session_id: str, utterance: Utterance
     ) -> Optional[TranscriptionChunk]:
-        """バッファを転写"""
+        """閉じた発話を転写"""
         try:
-            buffer = self.chunk_buffers[session_id]
-            if not buffer:
-                return None
+            self.transcription_metrics["final_calls"] += 1
+            self.transcription_metrics["audio_seconds"] += utterance.duration
 
-            # 音声データを結合
-            combined_audio = b"".join(buffer)
-
-            # OpenAI Whisperで転写
-            transcription_result = await openai_client.transcribe_audio_data(
-                combined_audio
+            transcription_result = await self.get_backend().transcribe_audio_data(
+                utterance.audio, self.language_detection.get(session_id, "ja")
             )
 
+            if utterance.speech_ended_at is not None:
+                self.eou_latency.observe(
+                    (self.clock() - utterance.speech_ended_at) * 1000
+                )
+
+            # 確定したので部分転写は不要
+            if session_id in self.partial_transcriptions:
+                self.partial_transcriptions[session_id].pop(utterance.user_id, None)
+
             if not transcription_result or not transcription_result.get("text"):
-                # バッファをクリア
-                self.chunk_buffers[session_id] = []
                 return None
 
             # 転写結果を処理
@@ -234,30 +390,22 @@ class RealtimeTranscriptionManager:
 
             # 話者識別
             speaker_id, speaker_confidence = await self._identify_speaker(
-                session_id, user_id, combined_audio
+                session_id, utterance.user_id, utterance.audio
             )
 
             # 言語検出
             detected_language = transcription_result.get("language", "ja")
-            if detected_language != self.language_detection[session_id]:
+            if detected_language != self.language_detection.get(session_id):
                 self.language_detection[session_id] = detected_language
 
-            # 時間情報を計算
-            session_info = self.active_sessions[session_id]
-            start_time = session_info["current_time"] - len(buffer) * 0.1
-            end_time = session_info["current_time"]
-
-            # バッファをクリア
-            self.chunk_buffers[session_id] = []
-
             # 転写チャンクを作成
             chunk = TranscriptionChunk(
                 text=text,
-                start_time=start_time,
-                end_time=end_time,
+                start_time=utterance.start_time,
+                end_time=utterance.end_time,
                 confidence=confidence,
                 is_final=True,
-                speaker_id=speaker_id or user_id,
+                speaker_id=speaker_id or utterance.user_id,
                 language=detected_language,
                 quality=self._assess_quality(confidence),
                 speaker_confidence=speaker_confidence,
@@ -273,7 +421,7 @@ class RealtimeTranscriptionManager:
             return chunk
 
         except Exception as e:
-            logger.error(f"Failed to transcribe buffer for session {session_id}: {e}")
+            logger.error(f"Failed to transcribe utterance for session {session_id}: {e}")
             return None
 
     async def _identify_speaker(
@@ -371,47 +519,9 @@ class RealtimeTranscriptionManager:
         # 実際の実装では、メモリまたはデータベースから取得
         return []
 
-    def _should_transcribe(self, session_id: str) -> bool:
-        """転写すべきかどうかを判定"""
-        if session_id not in self.chunk_buffers:
-            return False
-
-        buffer = self.chunk_buffers[session_id]
-        if not buffer:
-            return False
-
-        # バッファの合計時間を計算
-        total_duration = len(buffer) * 0.1  # 100ms chunks
-
-        # 最小時間に達しているか、最大時間を超えているか
-        return (
-            total_duration >= self.min_chunk_duration
-            or total_duration >= self.max_chunk_duration
-        )
-
     async def _save_transcription(self, session_id: str, chunk: TranscriptionChunk):
-        """転写結果をデータベースに保存"""
-        try:
-            from app.core.database import get_db
-
-            # VoiceSessionのIDを取得（仮実装）
-            voice_session_id = 1  # TODO: 実際のセッションIDを取得
-
-            transcription_data = TranscriptionCreate(
-                voice_session_id=voice_session_id,
-                speaker_id=chunk.speaker_id,
-                text_content=chunk.text,
-                start_time_seconds=chunk.start_time,
-                end_time_seconds=chunk.end_time,
-                confidence_score=chunk.confidence,
-                language=chunk.language,
-            )
-
-            async for db in get_db():
-                await transcription_repository.create(db, transcription_data)
-
-        except Exception as e:
-            logger.error(f"Failed to save transcription: {e}")
+        """転写結果を書き込みバッファに積む（保存はまとめて非同期に行う）"""
+        self.writer.add(session_id, chunk)
 
     async def get_session_transcriptions(
         self, session_id: str, limit: int = 100, offset: int = 0
@@ -437,39 +547,11 @@ class RealtimeTranscriptionManager:
     async def get_realtime_transcription(
         self, session_id: str
     ) -> Optional[TranscriptionChunk]:
-        """リアルタイム転写結果を取得（部分転写）"""
-        try:
-            if session_id not in self.chunk_buffers:
-                return None
-
-            buffer = self.chunk_buffers[session_id]
-            if not buffer:
-                return None
-
-            # 最新のチャンクのみで部分転写
-            latest_chunk = buffer[-1]
-            transcription_result = await openai_client.transcribe_chunk(latest_chunk)
-
-            if not transcription_result or not transcription_result.get("text"):
-                return None
-
-            text = transcription_result["text"].strip()
-            confidence = transcription_result.get("confidence", 0.0)
-
-            session_info = self.active_sessions[session_id]
-            current_time = session_info["current_time"]
-
-            return TranscriptionChunk(
-                text=text,
-                start_time=current_time - 0.1,
-                end_time=current_time,
-                confidence=confidence,
-                is_final=False,
-            )
-
-        except Exception as e:
-            logger.error(f"Failed to get realtime transcription: {e}")
+        """リアルタイム転写結果を取得（直近の部分転写、API呼び出しなし）"""
+        session_info = self.active_sessions.get(session_id)
+        if not session_info:
             return None
+        return session_info.get("last_partial")
 
     async def get_session_stats(self, session_id: str) -> Dict[str, Any]:
         """セッションの統計情報を取得"""
@@ -499,6 +581,29 @@ class RealtimeTranscriptionManager:
         """リアルタイム統計を取得"""
         return self.stats.get(session_id)
 
+    def get_scheduler_stats(self) -> Optional[Dict[str, Any]]:
+        """転写スケジューラーの統計を取得（未設定ならNone）"""
+        return self.scheduler.get_stats() if self.scheduler is not None else None
+
+    def get_segmentation_stats(self) -> Dict[str, Any]:
+        """発話区間検出と転写API呼び出しの統計を取得"""
+        metrics = self.transcription_metrics
+        audio_seconds = sum(
+            segmenter.stats["audio_seconds"] for segmenter in self.segmenters.values()
+        )
+        total_calls = metrics["partial_calls"] + metrics["final_calls"]
+        return {
+            **metrics,
+            "api_calls_per_audio_minute": (
+                total_calls / (audio_seconds / 60) if audio_seconds else 0.0
+            ),
+            "eou_latency_ms": self.eou_latency.to_dict(),
+            "sessions": {
+                session_id: segmenter.get_stats()
+                for session_id, segmenter in self.segmenters.items()
+            },
+        }
+
     async def get_partial_transcriptions(self, session_id: str) -> Dict[int, str]:
         """部分転写を取得"""
         return self.partial_transcriptions.get(session_id, {})
@@ -519,8 +624,14 @@ realtime_transcription_manager = RealtimeTranscriptionManager()
 class TranscriptionService:
     """転写サービス（後方互換性のため残す）"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        backend: Optional[TranscriptionBackend] = None,
+        writer: Optional[TranscriptionWriteBuffer] = None,
+    ):
         self.transcription_repository = transcription_repository
+        self.backend = backend
+        self.writer = writer or transcription_write_buffer
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
         self.chunk_buffers: Dict[str, List[bytes]] = {}
         self.buffer_duration = 3.0  # 3秒のバッファ
@@ -541,6 +652,10 @@ class TranscriptionService:
         )
         return final_chunk
 
+    def get_backend(self) -> TranscriptionBackend:
+        """転写に使うバックエンドを取得"""
+        return self.backend or transcription_backend
+
     def _should_transcribe(self, session_id: str) -> bool:
         """転写すべきかどうかを判定"""
         if session_id not in self.chunk_buffers:
@@ -571,8 +686,7 @@ class TranscriptionService:
             # 音声データを結合
             combined_audio = b"".join(buffer)
 
-            # OpenAI Whisperで転写
-            transcription_result = await openai_client.transcribe_audio_data(
+            transcription_result = await self.get_backend().transcribe_audio_data(
                 combined_audio
             )
 
@@ -616,28 +730,8 @@ class TranscriptionService:
             return None
 
     async def _save_transcription(self, session_id: str, chunk: TranscriptionChunk):
-        """転写結果をデータベースに保存"""
-        try:
-            from app.core.database import get_db
-
-            # VoiceSessionのIDを取得（仮実装）
-            voice_session_id = 1  # TODO: 実際のセッションIDを取得
-
-            transcription_data = TranscriptionCreate(
-                voice_session_id=voice_session_id,
-                speaker_id=chunk.speaker_id,
-                text_content=chunk.text,
-                start_time_seconds=chunk.start_time,
-                end_time_seconds=chunk.end_time,
-                confidence_score=chunk.confidence,
-                language=chunk.language,
-            )
-
-            async for db in get_db():
-                await self.transcription_repository.create(db, transcription_data)
-
-        except Exception as e:
-            logger.error(f"Failed to save transcription: {e}")
+        """転写結果を書き込みバッファに積む（保存はまとめて非同期に行う）"""
+        self.writer.add(session_id, chunk)
 
     async def get_session_transcriptions(
         self, session_id: str, limit: int = 100, offset: int = 0
@@ -674,7 +768,9 @@ class TranscriptionService:
 
             # 最新のチャンクのみで部分転写
             latest_chunk = buffer[-1]
-            transcription_result = await openai_client.transcribe_chunk(latest_chunk)
+            transcription_result = await self.get_backend().transcribe_chunk(
+                latest_chunk
+            )
 
             if not transcription_result or not transcription_result.get("text"):
                 return None
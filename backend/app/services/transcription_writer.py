@@ -0,0 +1,340 @@
+"""
+転写結果の書き込みバッファ（write-behind）
+
+確定した転写チャンクをセッションごとに溜め、件数または経過時間のしきい値で
+複数行INSERTとしてまとめて保存する。音声処理の経路ではバッファへ積むだけで
+データベースを待たない。VoiceSessionのIDはセッションごとに一度だけ解決する。
+"""
+
+import asyncio
+import json
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import structlog
+
+from app.config import settings
+from app.core.metrics import Histogram
+from app.schemas.transcription import TranscriptionCreate, TranscriptionStatus
+
+if TYPE_CHECKING:
+    from app.services.transcription_service import TranscriptionChunk
+
+logger = structlog.get_logger()
+
+# 1回のINSERTの行数のバケット
+WRITE_BATCH_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200]
+# 最初のチャンクを積んでからコミットまで（ミリ秒）のバケット
+FLUSH_LATENCY_BOUNDS_MS = [10, 50, 100, 250, 500, 1000, 2000, 5000, 10000]
+
+# (session_id) → voice_sessions.id（見つからなければNone）
+VoiceSessionResolver = Callable[[str], Awaitable[Optional[int]]]
+# 行をまとめて保存して保存件数を返す
+TranscriptionWriter = Callable[[List[TranscriptionCreate]], Awaitable[int]]
+
+
+async def resolve_voice_session_id(session_id: str) -> Optional[int]:
+    """セッションIDから音声セッションのIDを取得"""
+    from app.core.database import get_db
+    from app.repositories.voice_session_repository import voice_session_repository
+
+    async for db in get_db():
+        voice_session = await voice_session_repository.get_by_session_id(db, session_id)
+        return voice_session.id if voice_session is not None else None
+    return None
+
+
+async def insert_transcriptions(rows: List[TranscriptionCreate]) -> int:
+    """転写結果をまとめて保存"""
+    from app.core.database import get_db
+    from app.repositories import transcription_repository
+
+    async for db in get_db():
+        return await transcription_repository.create_many(db, objs_in=rows)
+    return 0
+
+
+def chunk_to_create(
+    voice_session_id: int, chunk: "TranscriptionChunk"
+) -> TranscriptionCreate:
+    """転写チャンクを保存用スキーマに変換"""
+    return TranscriptionCreate(
+        voice_session_id=voice_session_id,
+        user_id=chunk.speaker_id,
+        content=chunk.text,
+        language=chunk.language,
+        audio_duration=max(chunk.end_time - chunk.start_time, 0.0),
+        confidence_score=min(max(chunk.confidence, 0.0), 1.0),
+        speakers=json.dumps(
+            {
+                "speaker_id": chunk.speaker_id,
+                "speaker_confidence": chunk.speaker_confidence,
+                "start_time": chunk.start_time,
+                "end_time": chunk.end_time,
+            }
+        ),
+        status=TranscriptionStatus.COMPLETED,
+    )
+
+
+class TranscriptionWriteBuffer:
+    """転写結果の書き込みバッファ
+
+    セッションのバッファが max_batch_size に達するか、最初のチャンクを積んでから
+    flush_interval 秒経つと保存する。保存に失敗したチャンクはバッファに戻して
+    次回に再試行し、max_buffered を超えた分は古い順に捨てる。
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 50,
+        flush_interval: float = 2.0,
+        max_buffered: int = 1000,
+        resolver: VoiceSessionResolver = resolve_voice_session_id,
+        writer: TranscriptionWriter = insert_transcriptions,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.resolver = resolver
+        self.writer = writer
+        self.clock = clock
+
+        # session_id → [(chunk, 積んだ時刻)]
+        self._buffers: Dict[str, List[Tuple["TranscriptionChunk", float]]] = {}
+        self._voice_session_ids: Dict[str, Optional[int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # 件数しきい値で保存を予約済みのセッション
+        self._scheduled: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+        # 統計情報
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "dropped": 0,
+            "resolved_sessions": 0,
+        }
+        self.batch_size_histogram = Histogram(WRITE_BATCH_BOUNDS)
+        self.flush_latency_histogram = Histogram(FLUSH_LATENCY_BOUNDS_MS)
+
+    @property
+    def buffered_count(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    @property
+    def is_running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    def add(self, session_id: str, chunk: "TranscriptionChunk"):
+        """確定した転写チャンクを積む（待たずに返る）"""
+        if chunk.speaker_id is None:
+            self.stats["dropped"] += 1
+            return
+
+        buffer = self._buffers.setdefault(session_id, [])
+        buffer.append((chunk, self.clock()))
+        self.stats["enqueued"] += 1
+
+        overflow = len(buffer) - self.max_buffered
+        if overflow > 0:
+            del buffer[:overflow]
+            self.stats["dropped"] += overflow
+            logger.warning(
+                "Transcription write buffer overflow",
+                session_id=session_id,
+                dropped=overflow,
+            )
+
+        if len(buffer) >= self.max_batch_size:
+            self._spawn_flush(session_id)
+        else:
+            self._wakeup.set()
+
+    def _spawn_flush(self, session_id: str):
+        if session_id in self._scheduled:
+            return
+        self._scheduled.add(session_id)
+        task = asyncio.create_task(self._flush_scheduled(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_scheduled(self, session_id: str):
+        self._scheduled.discard(session_id)
+        try:
+            await self.flush_session(session_id)
+        except Exception as e:
+            logger.error(f"Failed to flush transcriptions: {e}", session_id=session_id)
+
+    async def _get_voice_session_id(self, session_id: str) -> Optional[int]:
+        """音声セッションのIDを解決（セッションごとに一度だけ）"""
+        if session_id not in self._voice_session_ids:
+            self._voice_session_ids[session_id] = await self.resolver(session_id)
+            self.stats["resolved_sessions"] += 1
+        return self._voice_session_ids[session_id]
+
+    async def flush_session(self, session_id: str, close: bool = False) -> int:
+        """セッションのバッファを保存して保存件数を返す
+
+        close=True の場合はセッション終了として解決済みのIDも破棄する。
+        """
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        written = 0
+        async with lock:
+            pending = self._buffers.pop(session_id, [])
+            try:
+                while pending:
+                    batch = pending[: self.max_batch_size]
+                    written += await self._write(session_id, batch)
+                    pending = pending[len(batch):]
+            finally:
+                if pending:
+                    # 失敗した分は後から積まれたものより前に戻す
+                    self._buffers[session_id] = pending + self._buffers.get(session_id, [])
+            if close:
+                self._voice_session_ids.pop(session_id, None)
+                if not self._buffers.get(session_id):
+                    self._locks.pop(session_id, None)
+        return written
+
+    async def _write(
+        self, session_id: str, batch: List[Tuple["TranscriptionChunk", float]]
+    ) -> int:
+        voice_session_id = await self._get_voice_session_id(session_id)
+        if voice_session_id is None:
+            self.stats["dropped"] += len(batch)
+            logger.warning(
+                "Voice session not found, dropping transcriptions",
+                session_id=session_id,
+                count=len(batch),
+            )
+            return 0
+
+        rows = [chunk_to_create(voice_session_id, chunk) for chunk, _ in batch]
+        try:
+            written = await self.writer(rows)
+        except Exception:
+            self.stats["failed_flushes"] += 1
+            raise
+
+        now = self.clock()
+        self.stats["flushes"] += 1
+        self.stats["written"] += written
+        self.batch_size_histogram.observe(len(rows))
+        self.flush_latency_histogram.observe((now - batch[0][1]) * 1000)
+        return written
+
+    async def flush_all(self, close: bool = False) -> int:
+        """全セッションのバッファを保存"""
+        written = 0
+        for session_id in list(self._buffers):
+            try:
+                written += await self.flush_session(session_id, close=close)
+            except Exception as e:
+                logger.error(f"Failed to flush transcriptions: {e}", session_id=session_id)
+        return written
+
+    def _due_sessions(self, now: float) -> Tuple[List[str], Optional[float]]:
+        """期限を過ぎたセッションと、次の期限までの秒数"""
+        due: List[str] = []
+        next_due: Optional[float] = None
+        for session_id, buffer in self._buffers.items():
+            if not buffer:
+                continue
+            remaining = buffer[0][1] + self.flush_interval - now
+            if remaining <= 0:
+                due.append(session_id)
+            elif next_due is None or remaining < next_due:
+                next_due = remaining
+        return due, next_due
+
+    async def _run_flusher(self):
+        while True:
+            try:
+                due, next_due = self._due_sessions(self.clock())
+                for session_id in due:
+                    try:
+                        await self.flush_session(session_id)
+                    except Exception as e:
+                        logger.error(
+                            f"Failed to flush transcriptions: {e}", session_id=session_id
+                        )
+                        # 失敗したセッションは次の間隔まで待つ
+                        next_due = self.flush_interval
+                if due and next_due is None:
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=next_due if next_due is not None else None,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in transcription write flusher: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    async def start(self):
+        """時間しきい値での保存を開始"""
+        if self.is_running:
+            return
+        # イベント・ロックは使ったイベントループに結び付くので、起動のたびに作り直す
+        self._wakeup = asyncio.Event()
+        self._locks.clear()
+        if self._buffers:
+            self._wakeup.set()
+        self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def stop(self):
+        """停止（バッファに残ったチャンクを保存してから終わる）"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush_all(close=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "buffered": self.buffered_count,
+            "buffered_sessions": len(self._buffers),
+            "max_batch_size": self.max_batch_size,
+            "flush_interval": self.flush_interval,
+            "batch_size_histogram": self.batch_size_histogram.to_dict(),
+            "flush_latency_ms_histogram": self.flush_latency_histogram.to_dict(),
+        }
+
+
+def create_transcription_write_buffer() -> TranscriptionWriteBuffer:
+    """設定に応じた書き込みバッファを作成"""
+    return TranscriptionWriteBuffer(
+        max_batch_size=settings.TRANSCRIPTION_WRITE_BATCH_SIZE,
+        flush_interval=settings.TRANSCRIPTION_WRITE_FLUSH_INTERVAL,
+        max_buffered=settings.TRANSCRIPTION_WRITE_MAX_BUFFERED,
+    )
+
+
+# グローバル書き込みバッファ
+transcription_write_buffer = create_transcription_write_buffer()
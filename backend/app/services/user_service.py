@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, desc, asc
 import structlog
 
+from app.core.user_cache import user_identity_cache
 from app.models.user import User
 from app.repositories.user_repository import user_repository
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
@@ -35,11 +36,15 @@ class UserService:
         self, db: AsyncSession, user_id: int, user_data: UserUpdate
     ) -> Optional[User]:
         """ユーザーを更新"""
-        return await user_repository.update(db, user_id, user_data)
+        user = await user_repository.update(db, user_id, user_data)
+        user_identity_cache.invalidate(user_id)
+        return user
 
     async def delete_user(self, db: AsyncSession, user_id: int) -> bool:
         """ユーザーを削除"""
-        return await user_repository.delete(db, user_id)
+        deleted = await user_repository.delete(db, user_id)
+        user_identity_cache.invalidate(user_id)
+        return deleted
 
     async def get_team_members(
         self, db: AsyncSession, team_id: int
@@ -0,0 +1,257 @@
+"""
+話者ごとの発話区間検出（エネルギーベースVAD）
+
+音声チャンクを話者（ユーザー）ごとにバッファし、RMSによる発話判定で
+発話の開始・終了を検出する。転写に回すのは閉じた発話と、発話中に一定間隔で
+作る部分転写用のスナップショットだけにする。
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+BYTES_PER_SAMPLE = 2  # 16-bit PCM
+
+
+@dataclass
+class SegmenterConfig:
+    """発話区間検出の設定"""
+
+    speech_threshold: float = 0.01  # RMSがこれを超えたフレームを発話とみなす
+    onset_duration: float = 0.2  # 発話開始とみなす連続発話時間（秒）
+    end_silence_duration: float = 0.5  # 発話終了とみなす連続無音時間（秒）
+    pre_roll_duration: float = 0.2  # 発話開始前に含める音声（秒）
+    min_utterance_duration: float = 0.5  # これより短い発話は転写しない（秒）
+    max_utterance_duration: float = 10.0  # これを超えたら発話を区切る（秒）
+    partial_interval: Optional[float] = 1.0  # 部分転写の間隔（秒、Noneで無効）
+
+
+@dataclass
+class Utterance:
+    """検出された発話（確定）または発話途中のスナップショット（部分）"""
+
+    user_id: int
+    audio: bytes
+    start_time: float  # セッション開始からの秒数
+    end_time: float
+    is_final: bool
+    reason: str = "partial"  # silence / max_duration / flush / partial
+    # 最後の発話フレームを受け取った時刻（clock基準）
+    speech_ended_at: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
+
+@dataclass
+class _SpeakerState:
+    """話者ごとの検出状態"""
+
+    in_speech: bool = False
+    frames: List[bytes] = field(default_factory=list)
+    duration: float = 0.0
+    speech_duration: float = 0.0
+    start_time: float = 0.0
+    speech_run: float = 0.0
+    silence_run: float = 0.0
+    last_partial_duration: float = 0.0
+    speech_ended_at: Optional[float] = None
+    pre_roll: Deque = field(default_factory=deque)  # (frame, duration)
+    pre_roll_duration: float = 0.0
+
+
+class UtteranceSegmenter:
+    """1セッション分の話者別発話区間検出器"""
+
+    def __init__(
+        self,
+        config: Optional[SegmenterConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config or SegmenterConfig()
+        self.clock = clock
+        self.speakers: Dict[int, _SpeakerState] = {}
+
+        # 統計情報
+        self.stats = {
+            "frames": 0,
+            "speech_frames": 0,
+            "audio_seconds": 0.0,
+            "utterances": 0,
+            "partials": 0,
+            "dropped_short": 0,
+            "forced_splits": 0,
+        }
+
+    def push(
+        self,
+        user_id: int,
+        audio: bytes,
+        end_time: float,
+        rms: float,
+        sample_rate: int = 16000,
+        channels: int = 1,
+    ) -> List[Utterance]:
+        """音声フレームを追加し、確定した発話・部分転写のスナップショットを返す
+
+        end_time はこのフレームの終端（セッション開始からの秒数）。
+        """
+        frame_duration = len(audio) / (BYTES_PER_SAMPLE * channels * sample_rate)
+        is_speech = rms > self.config.speech_threshold
+        state = self.speakers.setdefault(user_id, _SpeakerState())
+
+        self.stats["frames"] += 1
+        self.stats["audio_seconds"] += frame_duration
+        if is_speech:
+            self.stats["speech_frames"] += 1
+
+        if not state.in_speech:
+            return self._push_idle(
+                user_id, state, audio, frame_duration, end_time, is_speech
+            )
+        return self._push_speech(
+            user_id, state, audio, frame_duration, end_time, is_speech
+        )
+
+    def _push_idle(
+        self,
+        user_id: int,
+        state: _SpeakerState,
+        audio: bytes,
+        frame_duration: float,
+        end_time: float,
+        is_speech: bool,
+    ) -> List[Utterance]:
+        state.pre_roll.append((audio, frame_duration))
+        state.pre_roll_duration += frame_duration
+        state.speech_run = state.speech_run + frame_duration if is_speech else 0.0
+
+        if state.speech_run >= self.config.onset_duration:
+            # 発話開始: 直前の音声（プリロール）ごと発話に含める
+            state.in_speech = True
+            state.frames = [frame for frame, _ in state.pre_roll]
+            state.duration = state.pre_roll_duration
+            state.speech_duration = state.speech_run
+            state.start_time = end_time - state.duration
+            state.silence_run = 0.0
+            state.last_partial_duration = 0.0
+            state.speech_ended_at = self.clock()
+            state.pre_roll.clear()
+            state.pre_roll_duration = 0.0
+            return self._maybe_partial(user_id, state, end_time)
+
+        # プリロール（と発話開始判定中のフレーム）だけを保持する
+        limit = self.config.pre_roll_duration + self.config.onset_duration
+        while (
+            state.pre_roll and state.pre_roll_duration - state.pre_roll[0][1] >= limit
+        ):
+            _, dropped = state.pre_roll.popleft()
+            state.pre_roll_duration -= dropped
+        return []
+
+    def _push_speech(
+        self,
+        user_id: int,
+        state: _SpeakerState,
+        audio: bytes,
+        frame_duration: float,
+        end_time: float,
+        is_speech: bool,
+    ) -> List[Utterance]:
+        state.frames.append(audio)
+        state.duration += frame_duration
+        if is_speech:
+            state.silence_run = 0.0
+            state.speech_duration += frame_duration
+            state.speech_ended_at = self.clock()
+        else:
+            state.silence_run += frame_duration
+
+        if state.silence_run >= self.config.end_silence_duration:
+            utterance = self._close(user_id, state, end_time, "silence")
+            return [utterance] if utterance else []
+
+        if state.duration >= self.config.max_utterance_duration:
+            # 長い発話は区切り、続きは新しい発話として扱う
+            self.stats["forced_splits"] += 1
+            utterance = self._close(user_id, state, end_time, "max_duration")
+            continuation = self.speakers[user_id]
+            continuation.in_speech = True
+            continuation.start_time = end_time
+            continuation.speech_ended_at = state.speech_ended_at
+            return [utterance] if utterance else []
+
+        return self._maybe_partial(user_id, state, end_time)
+
+    def _maybe_partial(
+        self, user_id: int, state: _SpeakerState, end_time: float
+    ) -> List[Utterance]:
+        interval = self.config.partial_interval
+        if not interval or state.duration - state.last_partial_duration < interval:
+            return []
+        state.last_partial_duration = state.duration
+        self.stats["partials"] += 1
+        return [
+            Utterance(
+                user_id=user_id,
+                audio=b"".join(state.frames),
+                start_time=state.start_time,
+                end_time=end_time,
+                is_final=False,
+            )
+        ]
+
+    def _close(
+        self, user_id: int, state: _SpeakerState, end_time: float, reason: str
+    ) -> Optional[Utterance]:
+        """発話を閉じる（短すぎる発話は捨てる）"""
+        utterance = None
+        if state.speech_duration >= self.config.min_utterance_duration:
+            utterance = Utterance(
+                user_id=user_id,
+                audio=b"".join(state.frames),
+                start_time=state.start_time,
+                end_time=end_time,
+                is_final=True,
+                reason=reason,
+                speech_ended_at=state.speech_ended_at,
+            )
+            self.stats["utterances"] += 1
+        else:
+            self.stats["dropped_short"] += 1
+
+        self.speakers[user_id] = _SpeakerState()
+        return utterance
+
+    def flush(self, user_id: Optional[int] = None) -> List[Utterance]:
+        """発話途中のバッファを強制的に閉じる（セッション終了時など）"""
+        user_ids = list(self.speakers) if user_id is None else [user_id]
+        utterances = []
+        for uid in user_ids:
+            state = self.speakers.get(uid)
+            if state is None or not state.in_speech:
+                continue
+            utterance = self._close(
+                uid, state, state.start_time + state.duration, "flush"
+            )
+            if utterance:
+                utterances.append(utterance)
+        return utterances
+
+    def is_speaking(self, user_id: int) -> bool:
+        """話者が発話中か"""
+        state = self.speakers.get(user_id)
+        return bool(state and state.in_speech)
+
+    def get_stats(self) -> Dict[str, float]:
+        """統計情報の取得"""
+        return {
+            **self.stats,
+            "active_speakers": sum(1 for s in self.speakers.values() if s.in_speech),
+        }
@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 from datetime import datetime, timedelta
@@ -7,6 +7,9 @@ import uuid
 from app.models.voice_session import VoiceSession
 from app.models.user import User
 from app.repositories.voice_session_repository import voice_session_repository
+from app.repositories.voice_session_participant_repository import (
+    voice_session_participant_repository,
+)
 from app.schemas.voice_session import (
     VoiceSessionCreate,
     VoiceSessionUpdate,
@@ -26,11 +29,15 @@ from app.schemas.voice_session import (
     RealtimeStatsResponse,
     SessionProgressResponse,
 )
+from app.config import settings
+from app.core.ttl_cache import TTLCache
 from app.core.exceptions import (
     NotFoundException,
     ValidationException,
     PermissionException,
 )
+from app.services.participant_management_service import participant_management_service
+from app.services.participation_tracker import participation_tracker
 
 logger = structlog.get_logger()
 
@@ -38,6 +45,13 @@ logger = structlog.get_logger()
 class VoiceSessionService:
     """音声セッションサービス"""
 
+    # リアルタイム統計のDB由来の値（session_id -> 値）。サービスはリクエストごとに
+    # 作られるので、キャッシュはクラスで共有する
+    realtime_stats_cache: TTLCache[Dict[str, Any]] = TTLCache(
+        ttl=settings.REALTIME_STATS_CACHE_SECONDS,
+        max_size=settings.REALTIME_STATS_CACHE_MAX_SIZE,
+    )
+
     def __init__(self, db: AsyncSession):
         self.db = db
         self.repository = voice_session_repository
@@ -62,7 +76,7 @@ class VoiceSessionService:
             session = await self.repository.create(self.db, obj_in=session_data)
 
             # レスポンス形式に変換
-            return VoiceSessionResponse.model_validate(session)
+            return await self._to_response(session)
 
         except (ValidationException, NotFoundException):
             raise
@@ -87,7 +101,7 @@ class VoiceSessionService:
                 raise PermissionException("Access denied")
 
             # 詳細レスポンス形式に変換
-            response = VoiceSessionDetailResponse.model_validate(session)
+            response = await self._to_response(session, VoiceSessionDetailResponse)
 
             # 関連データの件数を設定
             response.transcriptions_count = len(session.transcriptions)
@@ -129,9 +143,7 @@ class VoiceSessionService:
             total = await self.repository.count(self.db, filters={"user_id": user_id})
 
             # レスポンス形式に変換
-            session_responses = [
-                VoiceSessionResponse.model_validate(session) for session in sessions
-            ]
+            session_responses = await self._to_responses(sessions)
 
             return VoiceSessionListResponse(
                 sessions=session_responses,
@@ -176,9 +188,7 @@ class VoiceSessionService:
             total = await self.repository.count(self.db, filters={"team_id": team_id})
 
             # レスポンス形式に変換
-            session_responses = [
-                VoiceSessionResponse.model_validate(session) for session in sessions
-            ]
+            session_responses = await self._to_responses(sessions)
 
             return VoiceSessionListResponse(
                 sessions=session_responses,
@@ -211,7 +221,7 @@ class VoiceSessionService:
                 self.db, db_obj=session, obj_in=update_data
             )
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            return await self._to_response(updated_session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -238,7 +248,7 @@ class VoiceSessionService:
                 self.db, db_obj=session, obj_in=update_data
             )
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            return await self._to_response(updated_session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -278,7 +288,7 @@ class VoiceSessionService:
             if not updated_session:
                 raise NotFoundException("Failed to update audio info")
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            return await self._to_response(updated_session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -312,7 +322,7 @@ class VoiceSessionService:
             if not updated_session:
                 raise NotFoundException("Failed to update analysis info")
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            return await self._to_response(updated_session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -367,9 +377,7 @@ class VoiceSessionService:
             total = len(sessions)
 
             # レスポンス形式に変換
-            session_responses = [
-                VoiceSessionResponse.model_validate(session) for session in sessions
-            ]
+            session_responses = await self._to_responses(sessions)
 
             return VoiceSessionListResponse(
                 sessions=session_responses,
@@ -444,9 +452,7 @@ class VoiceSessionService:
             total = await self.repository.count(self.db, filters={"is_public": True})
 
             # レスポンス形式に変換
-            session_responses = [
-                VoiceSessionResponse.model_validate(session) for session in sessions
-            ]
+            session_responses = await self._to_responses(sessions)
 
             return VoiceSessionListResponse(
                 sessions=session_responses,
@@ -489,7 +495,7 @@ class VoiceSessionService:
             if session.user_id != user_id:
                 raise PermissionException("Access denied")
             
-            return VoiceSessionDetailResponse.model_validate(session)
+            return await self._to_response(session, VoiceSessionDetailResponse)
         except (NotFoundException, PermissionException):
             raise
         except Exception as e:
@@ -516,7 +522,7 @@ class VoiceSessionService:
                 self.db, db_obj=session, obj_in=update_data
             )
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            return await self._to_response(updated_session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -544,7 +550,7 @@ class VoiceSessionService:
                 self.db, db_obj=session, obj_in=update_data
             )
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            return await self._to_response(updated_session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -562,7 +568,7 @@ class VoiceSessionService:
     ) -> VoiceSessionResponse:
         """参加者を追加"""
         try:
-            session = await self.get_session_by_session_id(session_id)  # pyright: ignore[reportCallIssue]
+            session = await self.repository.get_by_session_id(self.db, session_id)
             if not session:
                 raise NotFoundException("Voice session not found")
 
@@ -575,35 +581,15 @@ class VoiceSessionService:
             if not participant_user:
                 raise NotFoundException("Participant user not found")
 
-            # 参加者情報を更新
-            participants = self._parse_participants(session.participants)
-
-            # 既存の参加者かチェック
-            if any(p["user_id"] == participant_user_id for p in participants):
-                raise ValidationException("User is already a participant")
-
-            # 新しい参加者を追加
-            new_participant = {
-                "user_id": participant_user_id,
-                "username": participant_user.username,
-                "email": participant_user.email,
-                "role": role.value,
-                "joined_at": datetime.now().isoformat(),
-                "is_active": True,
-            }
-            participants.append(new_participant)
-
-            # セッションを更新
-            update_data = VoiceSessionUpdate(
-                participants=self._serialize_participants(participants),
-                participant_count=len(participants),
-            )
-
-            updated_session = await self.repository.update(
-                self.db, db_obj=session, obj_in=update_data
+            # 1行追加する（既存の参加者は一意制約で弾かれる）
+            participant = await voice_session_participant_repository.add_participant(
+                self.db, session.id, participant_user_id, role.value
             )
+            if participant is None:
+                raise ValidationException("User is already a participant")
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            await self.db.refresh(session)
+            return await self._to_response(session)
 
         except (NotFoundException, PermissionException, ValidationException):
             raise
@@ -616,7 +602,7 @@ class VoiceSessionService:
     ) -> VoiceSessionResponse:
         """参加者を削除"""
         try:
-            session = await self.get_session_by_session_id(session_id)  # pyright: ignore[reportCallIssue]
+            session = await self.repository.get_by_session_id(self.db, session_id)
             if not session:
                 raise NotFoundException("Voice session not found")
 
@@ -624,25 +610,12 @@ class VoiceSessionService:
             if not await self._can_manage_participants(session, user_id):
                 raise PermissionException("Access denied")
 
-            # 参加者情報を更新
-            participants = self._parse_participants(session.participants)
-
-            # 参加者を削除
-            participants = [
-                p for p in participants if p["user_id"] != participant_user_id
-            ]
-
-            # セッションを更新
-            update_data = VoiceSessionUpdate(
-                participants=self._serialize_participants(participants),
-                participant_count=len(participants),
-            )
-
-            updated_session = await self.repository.update(
-                self.db, db_obj=session, obj_in=update_data
+            await voice_session_participant_repository.remove_participant(
+                self.db, session.id, participant_user_id
             )
 
-            return VoiceSessionResponse.model_validate(updated_session)
+            await self.db.refresh(session)
+            return await self._to_response(session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -655,7 +628,7 @@ class VoiceSessionService:
     ) -> ParticipantListResponse:
         """参加者一覧を取得"""
         try:
-            session = await self.get_session_by_session_id(session_id)  # pyright: ignore[reportCallIssue]
+            session = await self.repository.get_by_session_id(self.db, session_id)
             if not session:
                 raise NotFoundException("Voice session not found")
 
@@ -663,29 +636,26 @@ class VoiceSessionService:
             if not await self._can_view_participants(session, user_id):
                 raise PermissionException("Access denied")
 
-            participants = self._parse_participants(session.participants)
+            # 参加者とユーザーを1クエリで取得
+            rows = await voice_session_participant_repository.get_with_users(
+                self.db, session.id
+            )
 
-            # 参加者情報を取得
             participant_responses = []
             active_count = 0
-
-            for participant in participants:
-                user = await self._get_user_by_id(participant["user_id"])
-                if user:
-                    participant_responses.append(
-                        {
-                            "user_id": participant["user_id"],
-                            "username": user.username,
-                            "email": user.email,
-                            "role": participant["role"],
-                            "joined_at": datetime.fromisoformat(
-                                participant["joined_at"]
-                            ),
-                            "is_active": participant["is_active"],
-                        }
-                    )
-                    if participant["is_active"]:
-                        active_count += 1
+            for participant, user in rows:
+                participant_responses.append(
+                    {
+                        "user_id": participant.user_id,
+                        "username": user.username,
+                        "email": user.email,
+                        "role": participant.role,
+                        "joined_at": participant.joined_at,
+                        "is_active": participant.is_active,
+                    }
+                )
+                if participant.is_active:
+                    active_count += 1
 
             return ParticipantListResponse(
                 participants=participant_responses,
@@ -708,7 +678,7 @@ class VoiceSessionService:
     ) -> VoiceSessionResponse:
         """参加者の権限を更新"""
         try:
-            session = await self.get_session_by_session_id(session_id)  # pyright: ignore[reportCallIssue]
+            session = await self.repository.get_by_session_id(self.db, session_id)
             if not session:
                 raise NotFoundException("Voice session not found")
 
@@ -716,27 +686,13 @@ class VoiceSessionService:
             if session.user_id != user_id:
                 raise PermissionException("Access denied")
 
-            # 参加者情報を更新
-            participants = self._parse_participants(session.participants)
-
-            # 参加者の権限を更新
-            for participant in participants:
-                if participant["user_id"] == participant_user_id:
-                    participant["role"] = new_role.value
-                    break
-            else:
+            if not await voice_session_participant_repository.update_role(
+                self.db, session.id, participant_user_id, new_role.value
+            ):
                 raise NotFoundException("Participant not found")
 
-            # セッションを更新
-            update_data = VoiceSessionUpdate(
-                participants=self._serialize_participants(participants)
-            )
-
-            updated_session = await self.repository.update(
-                self.db, db_obj=session, obj_in=update_data
-            )
-
-            return VoiceSessionResponse.model_validate(updated_session)
+            await self.db.refresh(session)
+            return await self._to_response(session)
 
         except (NotFoundException, PermissionException):
             raise
@@ -747,22 +703,60 @@ class VoiceSessionService:
             raise ValidationException("Failed to update participant role")
 
     # ヘルパーメソッド
-    def _parse_participants(self, participants_json: str) -> list:
-        """参加者JSONをパース"""
-        import json
-
-        if not participants_json:
-            return []
-        try:
-            return json.loads(participants_json)
-        except json.JSONDecodeError:
-            return []
+    async def _to_response(self, session: VoiceSession, response_class=VoiceSessionResponse):
+        """セッションを応答形式に変換（participants は参加者テーブルから組み立てる）"""
+        rows = await voice_session_participant_repository.get_with_users(
+            self.db, session.id
+        )
+        response = response_class.model_validate(session)
+        response.participants = self._serialize_participants(rows)
+        return response
+
+    async def _to_responses(
+        self, sessions: List[VoiceSession]
+    ) -> List[VoiceSessionResponse]:
+        """セッション一覧を応答形式に変換（参加者はまとめて1クエリで取得）"""
+        rows_by_session = (
+            await voice_session_participant_repository.get_with_users_for_sessions(
+                self.db, [session.id for session in sessions]
+            )
+        )
+        responses = []
+        for session in sessions:
+            response = VoiceSessionResponse.model_validate(session)
+            response.participants = self._serialize_participants(
+                rows_by_session.get(session.id, [])
+            )
+            responses.append(response)
+        return responses
 
-    def _serialize_participants(self, participants: list) -> str:
-        """参加者リストをJSONにシリアライズ"""
+    def _serialize_participants(self, rows: List[Tuple[Any, User]]) -> str:
+        """参加者の行を従来の participants と同じ形式のJSONにシリアライズ"""
         import json
 
-        return json.dumps(participants)
+        return json.dumps(
+            [
+                {
+                    "user_id": participant.user_id,
+                    "username": user.username,
+                    "email": user.email,
+                    "role": participant.role,
+                    "joined_at": participant.joined_at.isoformat()
+                    if participant.joined_at
+                    else None,
+                    "is_active": participant.is_active,
+                }
+                for participant, user in rows
+            ]
+        )
+
+    async def _get_participant_role(
+        self, session: VoiceSession, user_id: int
+    ) -> Optional[str]:
+        """参加者の役割を取得（参加していなければNone）"""
+        return await voice_session_participant_repository.get_role(
+            self.db, session.id, user_id
+        )
 
     async def _can_manage_participants(
         self, session: VoiceSession, user_id: int
@@ -773,12 +767,8 @@ class VoiceSessionService:
             return True
 
         # 参加者リストから権限をチェック
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return participant["role"] in ["owner", "moderator"]
-
-        return False
+        role = await self._get_participant_role(session, user_id)
+        return role in ["owner", "moderator"]
 
     async def _can_view_participants(self, session: VoiceSession, user_id: int) -> bool:
         """参加者一覧閲覧権限があるかチェック"""
@@ -787,12 +777,7 @@ class VoiceSessionService:
             return True
 
         # 参加者の場合
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return True
-
-        return False
+        return await self._get_participant_role(session, user_id) is not None
 
     async def _can_manage_recording(self, session: VoiceSession, user_id: int) -> bool:  # pyright: ignore[reportRedeclaration]
         """録音管理権限があるかチェック"""
@@ -801,12 +786,8 @@ class VoiceSessionService:
             return True
 
         # 参加者リストから権限をチェック
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return participant["role"] in ["owner", "moderator"]
-
-        return False
+        role = await self._get_participant_role(session, user_id)
+        return role in ["owner", "moderator"]
 
     async def _can_view_recording(self, session: VoiceSession, user_id: int) -> bool:  # pyright: ignore[reportRedeclaration]
         """録音状態閲覧権限があるかチェック"""
@@ -815,12 +796,7 @@ class VoiceSessionService:
             return True
 
         # 参加者の場合
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return True
-
-        return False
+        return await self._get_participant_role(session, user_id) is not None
 
     # 録音制御メソッド
     async def start_recording(
@@ -1073,12 +1049,8 @@ class VoiceSessionService:
             return True
 
         # 参加者リストから権限をチェック
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return participant["role"] in ["owner", "moderator"]
-
-        return False
+        role = await self._get_participant_role(session, user_id)
+        return role in ["owner", "moderator"]
 
     async def _can_view_recording(self, session: VoiceSession, user_id: int) -> bool:
         """録音状態閲覧権限があるかチェック"""
@@ -1087,20 +1059,27 @@ class VoiceSessionService:
             return True
 
         # 参加者の場合
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return True
-
-        return False
+        return await self._get_participant_role(session, user_id) is not None
 
     # リアルタイム統計メソッド
     async def get_realtime_stats(
         self, session_id: str, user_id: int
     ) -> RealtimeStatsResponse:
-        """リアルタイム統計を取得"""
+        """リアルタイム統計を取得
+
+        DB由来の値（文字起こし件数など）が REALTIME_STATS_CACHE_SECONDS 以内に
+        取得済みなら、セッション本体を読み込まずに権限だけを確認し、参加者管理と
+        発言時間の集計のスナップショットと合わせて応答する。
+        """
         try:
-            session = await self.get_session_by_session_id(session_id)  # pyright: ignore[reportCallIssue]
+            base = self.realtime_stats_cache.get(session_id)
+            if base is not None:
+                # 権限チェック（参加者またはオーナー）
+                if not await self._can_view(base["user_id"], base["id"], user_id):
+                    raise PermissionException("Access denied")
+                return self._build_realtime_stats(session_id, base)
+
+            session = await self.repository.get_by_session_id(self.db, session_id)
             if not session:
                 raise NotFoundException("Voice session not found")
 
@@ -1108,22 +1087,9 @@ class VoiceSessionService:
             if not await self._can_view_session(session, user_id):
                 raise PermissionException("Access denied")
 
-            # 現在の継続時間を計算
-            current_duration = 0.0
-            if session.started_at:
-                if session.ended_at:
-                    current_duration = (
-                        session.ended_at - session.started_at
-                    ).total_seconds()
-                else:
-                    current_duration = (
-                        datetime.now() - session.started_at
-                    ).total_seconds()
-
             # 参加者情報を取得
-            participants = self._parse_participants(session.participants)
-            active_participants = sum(
-                1 for p in participants if p.get("is_active", True)
+            active_participants = await voice_session_participant_repository.count_active(
+                self.db, session.id
             )
 
             # 録音状態を取得
@@ -1153,19 +1119,23 @@ class VoiceSessionService:
                 except:
                     key_topics_count = 0
 
-            return RealtimeStatsResponse(
-                session_id=session_id,
-                current_duration=current_duration,
-                participant_count=session.participant_count,
-                active_participants=active_participants,
-                recording_duration=recording_duration,
-                transcription_count=transcription_count,
-                analysis_progress=analysis_progress,
-                sentiment_score=session.sentiment_score,
-                key_topics_count=key_topics_count,
-                last_activity=session.updated_at or session.created_at,
-                is_live=session.status == "active",
-            )
+            base = {
+                "id": session.id,
+                "user_id": session.user_id,
+                "started_at": session.started_at,
+                "ended_at": session.ended_at,
+                "participant_count": session.participant_count,
+                "active_participants": active_participants,
+                "recording_duration": recording_duration,
+                "transcription_count": transcription_count,
+                "analysis_progress": analysis_progress,
+                "sentiment_score": session.sentiment_score,
+                "key_topics_count": key_topics_count,
+                "last_activity": session.updated_at or session.created_at,
+                "is_live": session.status == "active",
+            }
+            self.realtime_stats_cache.put(session_id, base)
+            return self._build_realtime_stats(session_id, base)
 
         except (NotFoundException, PermissionException):
             raise
@@ -1173,6 +1143,46 @@ class VoiceSessionService:
             logger.error(f"Failed to get realtime stats for session {session_id}: {e}")
             raise ValidationException("Failed to get realtime stats")
 
+    def _build_realtime_stats(
+        self, session_id: str, base: Dict[str, Any]
+    ) -> RealtimeStatsResponse:
+        """DB由来の値と参加者管理・発言時間の集計からリアルタイム統計を組み立てる"""
+        # 現在の継続時間を計算
+        current_duration = 0.0
+        if base["started_at"]:
+            end = base["ended_at"] or datetime.now(base["started_at"].tzinfo)
+            current_duration = (end - base["started_at"]).total_seconds()
+
+        # 接続中の参加者数と発言の集計は参加者管理から取る（未接続ならDBの値）
+        live = participant_management_service.active_sessions.get(session_id)
+        active_participants = len(live) if live else base["active_participants"]
+        participation = participation_tracker.snapshot(session_id) or {}
+        last_activity = base["last_activity"]
+        if participation:
+            last_activity = max(
+                last_activity,
+                datetime.fromtimestamp(participation["last_timestamp"], last_activity.tzinfo),
+            )
+
+        return RealtimeStatsResponse(
+            session_id=session_id,
+            current_duration=current_duration,
+            participant_count=base["participant_count"],
+            active_participants=active_participants,
+            recording_duration=base["recording_duration"],
+            transcription_count=base["transcription_count"],
+            analysis_progress=base["analysis_progress"],
+            sentiment_score=base["sentiment_score"],
+            key_topics_count=base["key_topics_count"],
+            last_activity=last_activity,
+            is_live=base["is_live"],
+            total_speak_time=participation.get("total_talk_time", 0.0),
+            total_turns=participation.get("total_turns", 0),
+            overlap_time=participation.get("overlap_time", 0.0),
+            silence_time=participation.get("silence_time", 0.0),
+            participation=participation.get("participants", {}),
+        )
+
     async def get_session_progress(
         self, session_id: str, user_id: int
     ) -> SessionProgressResponse:
@@ -1292,14 +1302,18 @@ class VoiceSessionService:
 
     async def _can_view_session(self, session: VoiceSession, user_id: int) -> bool:
         """セッション閲覧権限があるかチェック"""
+        return await self._can_view(session.user_id, session.id, user_id)
+
+    async def _can_view(
+        self, owner_id: int, voice_session_id: int, user_id: int
+    ) -> bool:
+        """セッション閲覧権限があるかチェック（セッション本体を読み込まずに判定）"""
         # オーナーの場合
-        if session.user_id == user_id:
+        if owner_id == user_id:
             return True
 
         # 参加者の場合
-        participants = self._parse_participants(session.participants)
-        for participant in participants:
-            if participant["user_id"] == user_id:
-                return True
-
-        return False
+        role = await voice_session_participant_repository.get_role(
+            self.db, voice_session_id, user_id
+        )
+        return role is not None
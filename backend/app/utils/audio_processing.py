@@ -1,21 +1,258 @@
 """
 音声処理機能のモジュール
 """
+import asyncio
 import io
+import os
+import tempfile
 import wave
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Union, BinaryIO
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union, BinaryIO
 import librosa
 import soundfile as sf
 from pydub import AudioSegment
 from app.utils.constants import AUDIO_QUALITY_SETTINGS, SupportedAudioFormats
 
+# バイト列またはファイルパス（プロセスプールに渡せる形）
+AudioSource = Union[bytes, str, os.PathLike]
+
+# ストリーミング処理で一度に読み込む長さ
+STREAM_BLOCK_SECONDS = 30.0
+# librosa の既定値（spectral_centroid / melspectrogram / piptrack）
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+
+def _open_source(source: AudioSource) -> Union[io.BytesIO, str]:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return os.fspath(source)
+
+
+@contextmanager
+def _readable_source(source: AudioSource,
+                     format: Optional[str] = None) -> Iterator[Union[io.BytesIO, str]]:
+    """soundfile で開ける形にして返す
+
+    libsndfile が扱えないコンテナ（M4A・AAC など）は pydub（ffmpeg）で一度だけ
+    一時WAVファイルに変換し、以降は同じストリーミング処理で読む。
+    """
+    try:
+        sf.info(_open_source(source))
+    except sf.LibsndfileError:
+        pass
+    else:
+        yield _open_source(source)
+        return
+    
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        AudioSegment.from_file(_open_source(source), format=format).export(path, format="wav")
+        yield path
+    finally:
+        os.remove(path)
+
+
+def _to_mono(block: np.ndarray) -> np.ndarray:
+    """(frames, channels) をモノラルにする（librosa.load と同じく平均）"""
+    if block.shape[1] == 1:
+        return block[:, 0]
+    return block.mean(axis=1)
+
+
+def _read_dtype(channels: int) -> str:
+    """モノラルは int16 のまま読み書きする（変換誤差がなく、メモリも半分）"""
+    return "int16" if channels == 1 else "float32"
+
+
+def _block_frames(sample_rate: int) -> int:
+    """ブロック長（フレーム境界がずれないようホップ長の倍数にそろえる）"""
+    frames = int(STREAM_BLOCK_SECONDS * sample_rate)
+    return max(HOP_LENGTH, frames - frames % HOP_LENGTH)
+
+
+def read_audio_info(source: AudioSource, format: Optional[str] = None) -> Dict[str, Any]:
+    """ヘッダーだけを読んで基本情報を返す（libsndfile が扱える形式はデコードしない）"""
+    with _readable_source(source, format) as readable:
+        info = sf.info(readable)
+    return {
+        "sample_rate": info.samplerate,
+        "channels": info.channels,
+        "frames": info.frames,
+        "duration": info.frames / info.samplerate if info.samplerate else 0.0,
+        "format": info.format,
+        "subtype": info.subtype,
+    }
+
+
+def stream_split_audio(source: AudioSource, segment_duration: float,
+                       output_dir: Optional[str] = None,
+                       format: Optional[str] = None) -> List[Union[bytes, str]]:
+    """ブロック単位で読みながらモノラルのWAVセグメントに分割"""
+    segments: List[Union[bytes, str]] = []
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    with _readable_source(source, format) as readable, sf.SoundFile(readable) as f:
+        sr = f.samplerate
+        segment_frames = max(1, int(segment_duration * sr))
+        block_frames = _block_frames(sr)
+        dtype = _read_dtype(f.channels)
+        
+        while True:
+            block = f.read(min(segment_frames, block_frames), dtype=dtype, always_2d=True)
+            if len(block) == 0:
+                break
+            
+            if output_dir is None:
+                target: Union[io.BytesIO, str] = io.BytesIO()
+            else:
+                target = os.path.join(output_dir, f"segment_{len(segments):04d}.wav")
+            
+            # 1セグメントもブロックずつ書き込む（長いセグメントでもメモリは一定）
+            with sf.SoundFile(target, mode="w", samplerate=sr, channels=1,
+                              format="WAV", subtype="PCM_16") as out:
+                remaining = segment_frames
+                while len(block) > 0:
+                    out.write(_to_mono(block))
+                    remaining -= len(block)
+                    if remaining <= 0:
+                        break
+                    block = f.read(min(remaining, block_frames), dtype=dtype, always_2d=True)
+            
+            segments.append(target.getvalue() if isinstance(target, io.BytesIO) else target)
+    
+    return segments
+
+
+def stream_merge_audio(sources: List[AudioSource],
+                       output_path: Optional[str] = None,
+                       format: Optional[str] = None) -> Union[bytes, str]:
+    """セグメントを順に読みながら1つのモノラルWAVに追記して結合
+
+    サンプリングレートは最初のセグメントにそろえる（異なるセグメントはそのセグメントだけ読み込んで変換）。
+    """
+    sr = read_audio_info(sources[0], format)["sample_rate"]
+    target: Union[io.BytesIO, str] = io.BytesIO() if output_path is None else output_path
+    
+    with sf.SoundFile(target, mode="w", samplerate=sr, channels=1,
+                      format="WAV", subtype="PCM_16") as out:
+        for source in sources:
+            with _readable_source(source, format) as readable, sf.SoundFile(readable) as f:
+                if f.samplerate == sr:
+                    for block in f.blocks(blocksize=_block_frames(sr),
+                                          dtype=_read_dtype(f.channels), always_2d=True):
+                        out.write(_to_mono(block))
+                else:
+                    y = _to_mono(f.read(dtype="float32", always_2d=True))
+                    out.write(librosa.resample(y, orig_sr=f.samplerate, target_sr=sr))
+    
+    return target.getvalue() if isinstance(target, io.BytesIO) else target
+
+
+def stream_analyze_audio(source: AudioSource, format: Optional[str] = None) -> Dict[str, Any]:
+    """ブロック単位で特徴量を集計して分析
+
+    全体を一度に読み込んだ場合（center=True）と同じフレームになるように、先頭と末尾に
+    n_fft/2 の無音を足した信号を center=False で分析し、次のフレームに必要な
+    n_fft - hop 以上のサンプルを次のブロックへ持ち越す。
+    ピッチの振幅しきい値だけはブロック内の最大値が基準になる。
+    """
+    sum_squares = 0.0
+    total_frames = 0
+    centroid_sum = rolloff_sum = 0.0
+    feature_frames = 0
+    pitch_count = 0
+    pitch_sum = pitch_sum_squares = 0.0
+    
+    def analyze(y: np.ndarray, sr: int) -> int:
+        """y に収まるフレームを分析し、使い切ったサンプル数を返す"""
+        nonlocal centroid_sum, rolloff_sum, feature_frames
+        nonlocal pitch_count, pitch_sum, pitch_sum_squares
+        if len(y) < N_FFT:
+            return 0
+        frames = 1 + (len(y) - N_FFT) // HOP_LENGTH
+        y = y[: (frames - 1) * HOP_LENGTH + N_FFT]
+        
+        # スペクトラム分析
+        S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+        centroids = librosa.feature.spectral_centroid(S=S, sr=sr)[0]
+        rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr)[0]
+        centroid_sum += float(np.sum(centroids))
+        rolloff_sum += float(np.sum(rolloff))
+        feature_frames += len(centroids)
+        
+        # ピッチ分析
+        pitches, magnitudes = librosa.piptrack(S=S, sr=sr)
+        pitch_values = pitches[magnitudes > 0.1].astype(np.float64)
+        pitch_count += len(pitch_values)
+        pitch_sum += float(np.sum(pitch_values))
+        pitch_sum_squares += float(np.dot(pitch_values, pitch_values))
+        return frames * HOP_LENGTH
+    
+    with _readable_source(source, format) as readable, sf.SoundFile(readable) as f:
+        sr = f.samplerate
+        channels = f.channels
+        # center=True と同じく先頭に n_fft/2 の無音を置く
+        carry = np.zeros(N_FFT // 2, dtype=np.float32)
+        for block in f.blocks(blocksize=_block_frames(sr), dtype="float32", always_2d=True):
+            y = _to_mono(block)
+            total_frames += len(y)
+            sum_squares += float(np.dot(y.astype(np.float64), y))
+            
+            buffer = np.concatenate([carry, y])
+            carry = buffer[analyze(buffer, sr):]
+        
+        # 末尾にも n_fft/2 の無音を足して残りのフレームを分析
+        analyze(np.concatenate([carry, np.zeros(N_FFT // 2, dtype=np.float32)]), sr)
+    
+    rms = np.sqrt(sum_squares / total_frames) if total_frames else 0.0
+    pitch_mean = pitch_sum / pitch_count if pitch_count else 0.0
+    pitch_var = pitch_sum_squares / pitch_count - pitch_mean ** 2 if pitch_count else 0.0
+    
+    return {
+        "duration": total_frames / sr if sr else 0.0,
+        "sample_rate": int(sr),
+        "channels": int(channels),
+        "rms": float(rms),
+        "db": float(20 * np.log10(rms + 1e-10)),
+        "spectral_centroid_mean": centroid_sum / feature_frames if feature_frames else 0.0,
+        "spectral_rolloff_mean": rolloff_sum / feature_frames if feature_frames else 0.0,
+        # メルスペクトログラムの形状（center=True のフレーム数）は長さから求まる
+        "mel_spectrogram_shape": (N_MELS, 1 + total_frames // HOP_LENGTH),
+        "pitch_mean": float(pitch_mean),
+        "pitch_std": float(np.sqrt(max(pitch_var, 0.0))),
+    }
+
 
 class AudioProcessor:
     """音声処理クラス"""
     
-    def __init__(self):
+    def __init__(self, executor: Optional[Executor] = None, max_workers: int = 2):
         self.supported_formats = [fmt.value for fmt in SupportedAudioFormats]
+        # 重い計算はイベントループではなくプロセスプールで行う（初回利用時に作成）
+        self.max_workers = max_workers
+        self._executor = executor
+        self._owns_executor = executor is None
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+    
+    async def _run(self, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), fn, *args)
+    
+    def shutdown(self):
+        """プロセスプールを停止"""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
     
     async def process_audio(self, audio_data: Union[bytes, BinaryIO], 
                            input_format: str, output_format: str = "wav",
@@ -64,46 +301,10 @@ class AudioProcessor:
         
         return audio_segment
     
-    async def analyze_audio(self, audio_data: bytes, format: str = "wav") -> Dict[str, Union[float, int, str]]:
-        """音声データを分析"""
+    async def analyze_audio(self, audio_data: AudioSource, format: str = "wav") -> Dict[str, Union[float, int, str]]:
+        """音声データを分析（ブロックごとに読み込み、プロセスプールで計算）"""
         try:
-            # 音声データを読み込み
-            y, sr = librosa.load(io.BytesIO(audio_data), sr=None)
-            
-            # 基本情報
-            duration = librosa.get_duration(y=y, sr=sr)
-            sample_rate = sr
-            channels = 1 if len(y.shape) == 1 else 2
-            
-            # 音量分析
-            rms = np.sqrt(np.mean(y**2))
-            db = 20 * np.log10(rms + 1e-10)
-            
-            # スペクトラム分析
-            spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-            
-            # メルスペクトログラム
-            mel_spectrogram = librosa.feature.melspectrogram(y=y, sr=sr)
-            mel_spectrogram_db = librosa.power_to_db(mel_spectrogram, ref=np.max)
-            
-            # ピッチ分析
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            pitch_values = pitches[magnitudes > 0.1]
-            
-            return {
-                "duration": float(duration),
-                "sample_rate": int(sample_rate),
-                "channels": int(channels),
-                "rms": float(rms),
-                "db": float(db),
-                "spectral_centroid_mean": float(np.mean(spectral_centroids)),
-                "spectral_rolloff_mean": float(np.mean(spectral_rolloff)),
-                "mel_spectrogram_shape": mel_spectrogram_db.shape,
-                "pitch_mean": float(np.mean(pitch_values)) if len(pitch_values) > 0 else 0.0,
-                "pitch_std": float(np.std(pitch_values)) if len(pitch_values) > 0 else 0.0
-            }
-            
+            return await self._run(stream_analyze_audio, audio_data, format)
         except Exception as e:
             raise ValueError(f"音声分析に失敗しました: {str(e)}")
     
@@ -191,74 +392,54 @@ class AudioProcessor:
         
         return y_filtered
     
-    async def split_audio(self, audio_data: bytes, segment_duration: float = 30.0) -> List[bytes]:
-        """音声をセグメントに分割"""
+    async def split_audio(self, audio_data: AudioSource, segment_duration: float = 30.0,
+                          output_dir: Optional[str] = None,
+                          format: Optional[str] = None) -> List[Union[bytes, str]]:
+        """音声をセグメントに分割
+
+        output_dir を指定するとセグメントをファイルに書き出してパスを返す。
+        """
         try:
-            # 音声データを読み込み
-            y, sr = librosa.load(io.BytesIO(audio_data), sr=None)
-            
-            # セグメント長をサンプル数に変換
-            segment_samples = int(segment_duration * sr)
-            
-            segments = []
-            for i in range(0, len(y), segment_samples):
-                segment = y[i:i + segment_samples]
-                
-                # セグメントを出力
-                output_buffer = io.BytesIO()
-                sf.write(output_buffer, segment, sr, format='WAV')
-                segments.append(output_buffer.getvalue())
-            
-            return segments
-            
+            return await self._run(stream_split_audio, audio_data, segment_duration,
+                                   output_dir, format)
         except Exception as e:
             raise ValueError(f"音声分割に失敗しました: {str(e)}")
     
-    async def merge_audio(self, audio_segments: List[bytes]) -> bytes:
-        """音声セグメントを結合"""
+    async def merge_audio(self, audio_segments: List[AudioSource],
+                          output_path: Optional[str] = None,
+                          format: Optional[str] = None) -> Union[bytes, str]:
+        """音声セグメントを結合
+
+        output_path を指定すると結合結果をファイルに書き出してパスを返す。
+        """
         try:
             if not audio_segments:
                 raise ValueError("音声セグメントが指定されていません")
             
-            # 最初のセグメントからサンプリングレートを取得
-            y_first, sr = librosa.load(io.BytesIO(audio_segments[0]), sr=None)
-            merged_audio = y_first
-            
-            # 残りのセグメントを結合
-            for segment_data in audio_segments[1:]:
-                y_segment, _ = librosa.load(io.BytesIO(segment_data), sr=sr)
-                merged_audio = np.concatenate([merged_audio, y_segment])
-            
-            # 結合された音声を出力
-            output_buffer = io.BytesIO()
-            sf.write(output_buffer, merged_audio, sr, format='WAV')
-            
-            return output_buffer.getvalue()
+            return await self._run(stream_merge_audio, list(audio_segments), output_path, format)
             
         except Exception as e:
             raise ValueError(f"音声結合に失敗しました: {str(e)}")
     
-    async def get_audio_info(self, audio_data: bytes, format: str = "wav") -> Dict[str, Union[str, int, float]]:
-        """音声ファイルの基本情報を取得"""
+    async def get_audio_info(self, audio_data: AudioSource, format: str = "wav") -> Dict[str, Union[str, int, float]]:
+        """音声ファイルの基本情報を取得（ヘッダーのみ読む）"""
         try:
-            # 音声データを読み込み
-            y, sr = librosa.load(io.BytesIO(audio_data), sr=None)
+            info = read_audio_info(audio_data, format)
+            duration = info["duration"]
             
-            # 基本情報
-            duration = librosa.get_duration(y=y, sr=sr)
-            channels = 1 if len(y.shape) == 1 else 2
-            samples = len(y)
-            
-            # ファイルサイズ（概算）
-            file_size = len(audio_data)
+            # ファイルサイズ
+            if isinstance(audio_data, (bytes, bytearray)):
+                file_size = len(audio_data)
+            else:
+                file_size = os.path.getsize(audio_data)
             
             return {
                 "format": format,
                 "duration_seconds": float(duration),
                 "duration_formatted": self._format_duration(duration),
-                "sample_rate": int(sr),
-                "channels": int(channels),
-                "samples": int(samples),
+                "sample_rate": int(info["sample_rate"]),
+                "channels": int(info["channels"]),
+                "samples": int(info["frames"]),
                 "file_size_bytes": file_size,
                 "file_size_formatted": self._format_file_size(file_size)
             }
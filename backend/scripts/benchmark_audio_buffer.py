@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+音声バッファのマイクロベンチマークスクリプト
+200セッション（各4話者）が100msチャンクを毎秒10回送る負荷で、add_chunk() と
+get_buffer_stats() 1回あたりのコストを、従来のリスト方式とリングバッファ方式で比較します
+"""
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import structlog
+
+from app.services.audio_processing_service import AudioBufferManager, AudioChunk
+
+SESSION_COUNT = 200
+USERS_PER_SESSION = 4
+CHUNKS_PER_SECOND = 10
+SAMPLES_PER_CHUNK = 16000 // CHUNKS_PER_SECOND
+SIMULATED_SECONDS = 30
+# セッションごとに保持するチャンク数（両方式で同じ、リングは10秒分のサンプルを確保）
+MAX_CHUNKS = 100
+# 遅延による削除を無効にしてバッファを上限まで埋める（最悪ケース）
+TARGET_LATENCY_MS = 3_600_000
+
+
+class LegacyAudioBufferManager:
+    """従来方式（チャンクのリストを pop(0) で削る）"""
+
+    def __init__(self):
+        self.buffers: Dict[str, List[AudioChunk]] = {}
+        self.buffer_sizes: Dict[str, int] = {}
+        self.max_buffer_size = MAX_CHUNKS
+        self.target_latency_ms = TARGET_LATENCY_MS
+
+    async def add_chunk(self, session_id: str, chunk: AudioChunk):
+        if session_id not in self.buffers:
+            self.buffers[session_id] = []
+            self.buffer_sizes[session_id] = 0
+        self.buffers[session_id].append(chunk)
+        self.buffer_sizes[session_id] += len(chunk.data)
+
+        while len(self.buffers[session_id]) > self.max_buffer_size:
+            removed_chunk = self.buffers[session_id].pop(0)
+            self.buffer_sizes[session_id] -= len(removed_chunk.data)
+
+        current_time = datetime.now()
+        while self.buffers[session_id]:
+            oldest_chunk = self.buffers[session_id][0]
+            latency_ms = (current_time - oldest_chunk.timestamp).total_seconds() * 1000
+            if latency_ms > self.target_latency_ms:
+                removed_chunk = self.buffers[session_id].pop(0)
+                self.buffer_sizes[session_id] -= len(removed_chunk.data)
+            else:
+                break
+
+    async def get_buffer_stats(self, session_id: str) -> Dict[str, Any]:
+        chunks = self.buffers[session_id]
+        current_time = datetime.now()
+        latencies = [
+            (current_time - chunk.timestamp).total_seconds() * 1000 for chunk in chunks
+        ]
+        return {
+            "chunk_count": len(chunks),
+            "total_size": self.buffer_sizes[session_id],
+            "average_latency": sum(latencies) / len(latencies),
+        }
+
+
+def ring_manager() -> AudioBufferManager:
+    manager = AudioBufferManager(
+        max_buffer_size=MAX_CHUNKS,
+        max_buffer_seconds=MAX_CHUNKS * SAMPLES_PER_CHUNK / 16000,
+        user_buffer_seconds=2.0,
+    )
+    manager.target_latency_ms = TARGET_LATENCY_MS
+    return manager
+
+
+async def bench(name: str, factory, payload: bytes):
+    manager = factory()
+    sessions = [f"session_{i}" for i in range(SESSION_COUNT)]
+    add_times: List[float] = []
+    stats_times: List[float] = []
+
+    for second in range(SIMULATED_SECONDS):
+        start = time.perf_counter()
+        count = 0
+        for tick in range(CHUNKS_PER_SECOND):
+            seq = second * CHUNKS_PER_SECOND + tick
+            now = datetime.now()
+            for session_id in sessions:
+                for user_id in range(USERS_PER_SESSION):
+                    await manager.add_chunk(
+                        session_id,
+                        AudioChunk(
+                            data=payload,
+                            sample_rate=16000,
+                            channels=1,
+                            timestamp=now,
+                            chunk_id=f"chunk_{user_id}_{seq}",
+                            user_id=user_id,
+                            session_id=session_id,
+                        ),
+                    )
+                    count += 1
+        add_times.append((time.perf_counter() - start) / count * 1_000_000)
+
+        start = time.perf_counter()
+        for session_id in sessions:
+            await manager.get_buffer_stats(session_id)
+        stats_times.append((time.perf_counter() - start) / len(sessions) * 1_000_000)
+
+    # 後半（バッファが埋まった状態）の平均
+    steady_add = statistics.mean(add_times[SIMULATED_SECONDS // 2:])
+    steady_stats = statistics.mean(stats_times[SIMULATED_SECONDS // 2:])
+    print(
+        f"  {name:<12} add_chunk {steady_add:7.2f} µs/call  "
+        f"get_buffer_stats {steady_stats:9.2f} µs/call"
+    )
+    return steady_add, steady_stats
+
+
+async def main():
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+
+    print("🚀 音声バッファベンチマーク")
+    print(
+        f"   sessions={SESSION_COUNT}  users/session={USERS_PER_SESSION}  "
+        f"chunks/s={CHUNKS_PER_SECOND}  simulated={SIMULATED_SECONDS}s"
+    )
+
+    payload = (np.random.default_rng(42).integers(
+        -3000, 3000, SAMPLES_PER_CHUNK, dtype=np.int16
+    )).tobytes()
+
+    legacy_add, legacy_stats = await bench("legacy list", LegacyAudioBufferManager, payload)
+    ring_add, ring_stats = await bench("ring buffer", ring_manager, payload)
+
+    manager = ring_manager()
+    await manager.add_chunk(
+        "s", AudioChunk(payload, 16000, 1, datetime.now(), "chunk_0", 0, "s")
+    )
+    stats = await manager.get_buffer_stats("s")
+    print(f"   ring memory per session (+1 speaker): {stats['memory_bytes'] / 1024:.0f} KiB")
+    print(f"✅ add_chunk speedup: {legacy_add / ring_add:.1f}x  "
+          f"get_buffer_stats speedup: {legacy_stats / ring_stats:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
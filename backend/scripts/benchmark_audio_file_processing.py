@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+音声ファイル処理のベンチマークスクリプト
+長時間の会議録音（既定は2時間、16kHzモノラルWAV）について、情報取得・分割・結合・分析の
+実行時間とピークメモリ（RSS）を、従来方式（librosa.load で全体を読み込む）と
+ストリーミング方式で比較します。ピークメモリを正しく測るため、1ケースごとに別プロセスで実行します
+
+使い方:
+    python scripts/benchmark_audio_file_processing.py [--minutes 120] [--ops info,split,merge,analyze]
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 16000
+SEGMENT_SECONDS = 30.0
+
+
+def write_recording(path: str, minutes: float):
+    """会議録音に見立てたファイルを少しずつ書き出す"""
+    rng = np.random.default_rng(42)
+    block = SAMPLE_RATE * 60
+    with sf.SoundFile(path, "w", samplerate=SAMPLE_RATE, channels=1, subtype="PCM_16") as f:
+        for minute in range(int(minutes)):
+            t = np.arange(block) / SAMPLE_RATE
+            tone = 0.2 * np.sin(2 * np.pi * (180 + minute % 7 * 20) * t)
+            f.write((tone + rng.normal(0, 0.02, block)).astype(np.float32))
+
+
+def legacy_run(op: str, path: str, workdir: str):
+    """従来方式（AudioProcessor の以前の実装と同じ処理）"""
+    import librosa
+
+    data = Path(path).read_bytes()
+    y, sr = librosa.load(io.BytesIO(data), sr=None)
+    if op == "info":
+        librosa.get_duration(y=y, sr=sr)
+    elif op == "split":
+        step = int(SEGMENT_SECONDS * sr)
+        for i in range(0, len(y), step):
+            sf.write(io.BytesIO(), y[i:i + step], sr, format="WAV")
+    elif op == "merge":
+        step = int(SEGMENT_SECONDS * sr)
+        segments = []
+        for i in range(0, len(y), step):
+            buffer = io.BytesIO()
+            sf.write(buffer, y[i:i + step], sr, format="WAV")
+            segments.append(buffer.getvalue())
+        del y
+        merged, _ = librosa.load(io.BytesIO(segments[0]), sr=None)
+        for segment in segments[1:]:
+            merged = np.concatenate([merged, librosa.load(io.BytesIO(segment), sr=sr)[0]])
+        sf.write(os.path.join(workdir, "merged.wav"), merged, sr)
+    elif op == "analyze":
+        librosa.feature.spectral_centroid(y=y, sr=sr)
+        librosa.feature.spectral_rolloff(y=y, sr=sr)
+        librosa.feature.melspectrogram(y=y, sr=sr)
+        librosa.piptrack(y=y, sr=sr)
+
+
+def streaming_run(op: str, path: str, workdir: str):
+    """ストリーミング方式（ファイルパスを渡してブロックごとに処理）"""
+    from app.utils.audio_processing import (
+        read_audio_info,
+        stream_analyze_audio,
+        stream_merge_audio,
+        stream_split_audio,
+    )
+
+    if op == "info":
+        read_audio_info(path)
+    elif op == "split":
+        stream_split_audio(path, SEGMENT_SECONDS, os.path.join(workdir, "split"))
+    elif op == "merge":
+        segments = stream_split_audio(path, SEGMENT_SECONDS, os.path.join(workdir, "merge"))
+        stream_merge_audio(segments, os.path.join(workdir, "merged.wav"))
+    elif op == "analyze":
+        stream_analyze_audio(path)
+
+
+def child(mode: str, op: str, path: str):
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        (legacy_run if mode == "legacy" else streaming_run)(op, path, workdir)
+        elapsed = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_rss_mib": peak_mib}))
+
+
+def run_case(mode: str, op: str, path: str):
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", mode, op, path],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=120)
+    parser.add_argument("--ops", default="info,split,merge,analyze")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "OP", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    print("🚀 音声ファイル処理ベンチマーク")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "meeting.wav")
+        write_recording(path, args.minutes)
+        print(f"   recording={args.minutes:.0f}min  size={os.path.getsize(path) / 2**20:.0f}MiB")
+
+        for op in args.ops.split(","):
+            for mode in ("legacy", "streaming"):
+                result = run_case(mode, op, path)
+                if result is None:
+                    print(f"  {op:<8} {mode:<10} failed (out of memory?)")
+                    continue
+                print(
+                    f"  {op:<8} {mode:<10} {result['seconds']:8.2f} s  "
+                    f"peak RSS {result['peak_rss_mib']:8.0f} MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
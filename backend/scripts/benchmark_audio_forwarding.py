@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+音声転送方式のベンチマークスクリプト
+20人の話者が100msごとにPCM16チャンクを送るセッションで、全中継（relay）・
+上位K人のみ中継（SFU）・上位K人をミックス（MCU）の送信回数・送信バイト数・
+サーバー側の処理時間を比較します
+
+話者の音声レベル: 主話者3人（0.4-0.6）、相づち5人（0.06-0.1）、残りは背景音（0.01）
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import structlog
+from starlette.websockets import WebSocketState
+
+from app.core import message_handlers
+from app.core.audio_frames import (
+    AUDIO_TRANSPORT_BINARY,
+    AudioCodec,
+    AudioFrameHeader,
+    encode_audio_frame,
+)
+from app.core.websocket import ConnectionManager
+from app.services import audio_forwarding
+from app.services.audio_forwarding import AudioForwarder, ForwardingMode
+from app.services.participant_management_service import (
+    ParticipantStatus,
+    participant_management_service,
+)
+
+SPEAKERS = 20
+MAX_FORWARDED = 3
+TICKS = 100  # 10秒分
+SAMPLES_PER_CHUNK = 1600
+
+
+class CountingWebSocket:
+    """送信回数とバイト数を数えるWebSocket"""
+
+    def __init__(self, totals):
+        self.totals = totals
+        self.client_state = WebSocketState.CONNECTED
+
+    async def send_bytes(self, data: bytes):
+        self.totals["sends"] += 1
+        self.totals["bytes"] += len(data)
+
+    async def send_text(self, data: str):
+        self.totals["sends"] += 1
+        self.totals["bytes"] += len(data)
+
+    async def close(self, code: int = 1000):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def level_for(user_id: int, rng: random.Random) -> float:
+    if user_id <= 3:
+        return rng.uniform(0.4, 0.6)
+    if user_id <= 8:
+        return rng.uniform(0.06, 0.1)
+    return 0.01
+
+
+async def run(mode: ForwardingMode):
+    totals = {"sends": 0, "bytes": 0}
+    manager = ConnectionManager()
+    manager.max_connections_per_session = SPEAKERS + 1
+    message_handlers.manager = manager
+    audio_forwarding.manager = manager
+
+    participants = []
+    for user_id in range(1, SPEAKERS + 1):
+        user = SimpleNamespace(id=user_id, display_name=f"user{user_id}", username=f"user{user_id}")
+        connection_id = await manager.connect(
+            CountingWebSocket(totals), "bench", user, audio_transport=AUDIO_TRANSPORT_BINARY
+        )
+        participants.append(
+            SimpleNamespace(
+                user_id=user_id,
+                connection_id=connection_id,
+                status=ParticipantStatus.CONNECTED,
+                audio_level=0.0,
+            )
+        )
+    by_id = {p.user_id: p for p in participants}
+
+    async def get_session_participants(session_id):
+        return participants
+
+    async def update_audio_level(session_id, user_id, level, **kwargs):
+        by_id[user_id].audio_level = level
+
+    participant_management_service.get_session_participants = get_session_participants
+    participant_management_service.update_audio_level = update_audio_level
+
+    forwarder = AudioForwarder(
+        mode=mode, max_speakers=MAX_FORWARDED, participants_provider=get_session_participants
+    )
+    message_handlers.audio_forwarder = forwarder
+
+    rng = random.Random(42)
+    audio = np.random.default_rng(42).integers(-2000, 2000, SAMPLES_PER_CHUNK, dtype=np.int16).tobytes()
+    users = [SimpleNamespace(id=p.user_id, display_name=f"user{p.user_id}") for p in participants]
+
+    server_time = 0.0
+    for tick in range(TICKS):
+        start = time.perf_counter()
+        for user, participant in zip(users, participants):
+            frame = encode_audio_frame(
+                AudioFrameHeader(
+                    session_id="bench",
+                    user_id=user.id,
+                    seq=tick,
+                    timestamp_ms=int(time.time() * 1000),
+                    sample_rate=16000,
+                    codec=AudioCodec.PCM16,
+                    level=level_for(user.id, rng),
+                ),
+                audio,
+            )
+            await message_handlers.WebSocketMessageHandler.handle_audio_frame(
+                "bench", participant.connection_id, user, frame
+            )
+        if mode == ForwardingMode.MCU:
+            await forwarder.mix_tick()
+        server_time += time.perf_counter() - start
+        # 送信キューを流す
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.2)
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+
+    return totals, server_time / TICKS * 1000
+
+
+async def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+    print("🚀 音声転送方式ベンチマーク")
+    print(f"   speakers={SPEAKERS}  K={MAX_FORWARDED}  ticks={TICKS} (100ms)  chunk={SAMPLES_PER_CHUNK * 2}B")
+
+    baseline = None
+    for mode in (ForwardingMode.RELAY, ForwardingMode.SFU, ForwardingMode.MCU):
+        totals, ms_per_tick = await run(mode)
+        baseline = baseline or totals
+        print(
+            f"  {mode.value:<6} sends/tick {totals['sends'] / TICKS:7.1f}  "
+            f"KiB/s {totals['bytes'] / TICKS * 10 / 1024:9.1f}  "
+            f"server {ms_per_tick:6.2f} ms/tick  "
+            f"({baseline['sends'] / max(totals['sends'], 1):.1f}x fewer sends)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+音声レベル通知のベンチマークスクリプト
+20人のセッションで各参加者が100msごとにチャンクを送るとき、従来方式（チャンクごとに
+audio_level_update を全参加者へ個別送信）と集約方式（10Hzで全話者分を1フレームに
+まとめて配信）の送信回数・送信バイト数を比較します
+
+話者の音声レベル: 主話者3人（0.4-0.6）、相づち5人（0.06-0.1）、残りは背景音（0.01）
+"""
+
+import asyncio
+import logging
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import structlog
+from starlette.websockets import WebSocketState
+
+from app.core.websocket import ConnectionManager
+from app.services import audio_level_aggregator as aggregator_module
+from app.services.audio_level_aggregator import AudioLevelAggregator
+
+PARTICIPANTS = 20
+TICKS = 100  # 10秒分（100msごと）
+
+
+class CountingWebSocket:
+    """送信回数とバイト数を数えるWebSocket"""
+
+    def __init__(self, totals):
+        self.totals = totals
+        self.client_state = WebSocketState.CONNECTED
+
+    async def send_bytes(self, data: bytes):
+        self.totals["sends"] += 1
+        self.totals["bytes"] += len(data)
+
+    async def send_text(self, data: str):
+        self.totals["sends"] += 1
+        self.totals["bytes"] += len(data)
+
+    async def close(self, code: int = 1000):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def level_for(user_id: int, rng: random.Random) -> float:
+    if user_id <= 3:
+        return rng.uniform(0.4, 0.6)
+    if user_id <= 8:
+        return rng.uniform(0.06, 0.1)
+    return 0.01
+
+
+async def connect_all(totals):
+    manager = ConnectionManager()
+    manager.max_connections_per_session = PARTICIPANTS + 1
+    connection_ids = []
+    for user_id in range(1, PARTICIPANTS + 1):
+        user = SimpleNamespace(id=user_id, display_name=f"user{user_id}")
+        connection_ids.append(await manager.connect(CountingWebSocket(totals), "bench", user))
+    return manager, connection_ids
+
+
+async def run_legacy():
+    totals = {"sends": 0, "bytes": 0}
+    manager, connection_ids = await connect_all(totals)
+    rng = random.Random(42)
+
+    for _ in range(TICKS):
+        for user_id in range(1, PARTICIPANTS + 1):
+            level = level_for(user_id, rng)
+            if level <= 0.05:
+                continue
+            message = {
+                "type": "audio_level_update",
+                "session_id": "bench",
+                "user_id": user_id,
+                "audio_level": level,
+                "timestamp": datetime.now().isoformat(),
+            }
+            for connection_id in connection_ids:
+                await manager.send_personal_message(message, connection_id)
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.2)
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+    return totals
+
+
+async def run_aggregated():
+    totals = {"sends": 0, "bytes": 0}
+    manager, _ = await connect_all(totals)
+    aggregator_module.manager = manager
+    clock = SimpleNamespace(now=0.0)
+    aggregator = AudioLevelAggregator(tick_hz=10, clock=lambda: clock.now)
+    rng = random.Random(42)
+
+    for _ in range(TICKS):
+        for user_id in range(1, PARTICIPANTS + 1):
+            aggregator.record("bench", user_id, level_for(user_id, rng))
+        clock.now += 0.1
+        await aggregator.tick()
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.2)
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+    return totals, aggregator.get_stats()
+
+
+async def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+    print("🚀 音声レベル通知ベンチマーク")
+    print(f"   participants={PARTICIPANTS}  ticks={TICKS} (100ms)")
+
+    legacy = await run_legacy()
+    aggregated, stats = await run_aggregated()
+    for name, totals in (("legacy", legacy), ("aggregated", aggregated)):
+        print(
+            f"  {name:<10} sends/s {totals['sends'] / TICKS * 10:8.1f}  "
+            f"KiB/s {totals['bytes'] / TICKS * 10 / 1024:8.1f}"
+        )
+    print(
+        f"  {legacy['sends'] / max(aggregated['sends'], 1):.1f}x fewer sends  "
+        f"(levels sent {stats['levels_sent']}, skipped {stats['levels_skipped']}, "
+        f"speaker changes {stats['speaker_changes']})"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
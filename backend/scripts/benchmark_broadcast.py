@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+ブロードキャストレイテンシのベンチマークスクリプト
+受信者数 10/50/200 でのセッションブロードキャストの p50/p99 を、
+従来の逐次送信方式と送信キュー経由の並行ファンアウト方式で比較します
+
+- producer: ブロードキャスト呼び出しが戻るまでの時間
+- delivery: 低速クライアント以外の全受信者に届くまでの時間
+"""
+
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from starlette.websockets import WebSocketState
+import structlog
+
+from app.core.websocket import ConnectionManager
+
+RECIPIENT_COUNTS = [10, 50, 200]
+ITERATIONS = 200
+SEND_LATENCY = (0.0002, 0.002)  # 通常クライアントの送信遅延（秒）
+SLOW_CLIENT_LATENCY = 1.0  # 低速クライアントの送信遅延（秒）
+
+MESSAGE = {
+    "type": "chat_message",
+    "session_id": "bench",
+    "user_id": 1,
+    "display_name": "Bench User",
+    "message": "x" * 200,
+    "timestamp": "2024-01-01T00:00:00",
+}
+
+
+class DeliveryCounter:
+    """受信完了数のカウンター"""
+
+    def __init__(self):
+        self.count = 0
+
+    async def wait_for(self, expected: int):
+        while self.count < expected:
+            await asyncio.sleep(0)
+
+
+class SimulatedWebSocket:
+    """送信遅延を模擬するWebSocket"""
+
+    def __init__(self, counter: DeliveryCounter, latency: float = None):
+        self.counter = counter
+        self.latency = latency
+        self.client_state = WebSocketState.CONNECTED
+
+    async def send_text(self, data: str):
+        await asyncio.sleep(self.latency or random.uniform(*SEND_LATENCY))
+        self.counter.count += 1
+
+    async def close(self, code: int = 1000):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def percentile(samples, ratio):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def build_manager(recipients: int, with_slow_client: bool, counter):
+    manager = ConnectionManager()
+    manager.max_connections_per_session = recipients + 1
+    manager.send_timeout = 0.25
+    for user_id in range(recipients):
+        latency = SLOW_CLIENT_LATENCY if with_slow_client and user_id == 0 else None
+        await manager.connect(
+            SimulatedWebSocket(counter, latency), "bench", SimpleNamespace(id=user_id)
+        )
+    return manager
+
+
+async def legacy_broadcast(manager: ConnectionManager, message: dict):
+    """従来方式: 受信者ごとにエンコードし、逐次送信"""
+    for connection_id in list(manager.session_connections["bench"]):
+        websocket = manager.active_connections[connection_id]
+        await websocket.send_text(json.dumps(message))
+
+
+async def run_case(recipients: int, mode: str, with_slow_client: bool):
+    counter = DeliveryCounter()
+    manager = await build_manager(recipients, with_slow_client, counter)
+    fast_recipients = recipients - (1 if with_slow_client else 0)
+    iterations = ITERATIONS if not (with_slow_client and mode == "legacy") else 5
+    producer_samples = []
+    delivery_samples = []
+
+    for _ in range(iterations):
+        counter.count = 0
+        start = time.perf_counter()
+        if mode == "legacy":
+            await legacy_broadcast(manager, MESSAGE)
+        else:
+            await manager.broadcast_to_session(MESSAGE, "bench")
+        producer_samples.append((time.perf_counter() - start) * 1000)
+        await counter.wait_for(fast_recipients)
+        delivery_samples.append((time.perf_counter() - start) * 1000)
+
+    evicted = manager.performance_monitor.total_evictions
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+
+    return {
+        "producer_p99": percentile(producer_samples, 0.99),
+        "delivery_p50": statistics.median(delivery_samples),
+        "delivery_p99": percentile(delivery_samples, 0.99),
+        "evicted": evicted,
+    }
+
+
+async def main():
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR)
+    )
+
+    print("📡 ブロードキャストレイテンシベンチマーク")
+    print("=" * 80)
+    print(
+        f"{'recipients':>10} {'slow':>5} {'mode':>8} {'producer p99':>13} "
+        f"{'delivery p50':>13} {'delivery p99':>13} {'evicted':>8}"
+    )
+
+    for with_slow_client in (False, True):
+        for recipients in RECIPIENT_COUNTS:
+            for mode in ("legacy", "fan_out"):
+                result = await run_case(recipients, mode, with_slow_client)
+                print(
+                    f"{recipients:>10} {str(with_slow_client):>5} {mode:>8} "
+                    f"{result['producer_p99']:>13.2f} {result['delivery_p50']:>13.2f} "
+                    f"{result['delivery_p99']:>13.2f} {result['evicted']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+データベース接続プールの負荷ベンチマークスクリプト
+get_db 相当の「セッションを開いて短いクエリを1本流して閉じる」処理を
+並列に実行し、接続プール（QueuePool）と NullPool のリクエスト/秒を比較します
+
+使い方:
+    DATABASE_URL=postgresql+asyncpg://... python scripts/benchmark_db_pool.py
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.core.database import get_engine_options
+
+QUERY = text("SELECT 1")
+
+
+async def run_load(url: str, options: dict, concurrency: int, duration: float):
+    """指定時間、並列にリクエストを流してスループットとレイテンシを測定"""
+    engine = create_async_engine(url, **options)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with session_factory() as session:
+                await session.execute(QUERY)
+            latencies.append(time.perf_counter() - start)
+
+    # ウォームアップ
+    async with session_factory() as session:
+        await session.execute(QUERY)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "requests": len(latencies),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="接続プールのベンチマーク")
+    parser.add_argument("--url", default=os.environ.get("DATABASE_URL", settings.DATABASE_URL))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    pooled = get_engine_options(args.url)
+    null = {**pooled, "poolclass": NullPool}
+    for key in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+        null.pop(key, None)
+
+    print("🚀 データベース接続プールベンチマーク")
+    print(f"   url={args.url.split('@')[-1]}  duration={args.duration}s")
+
+    for concurrency in args.concurrency:
+        print(f"\n📊 concurrency={concurrency}")
+        results = {}
+        for name, options in (("NullPool", null), ("QueuePool", pooled)):
+            try:
+                result = await run_load(args.url, options, concurrency, args.duration)
+            except Exception as e:
+                print(f"  ❌ {name}: {e}")
+                break
+            results[name] = result
+            print(
+                f"  {name:<10} {result['rps']:8.0f} req/s  "
+                f"p50 {result['p50_ms']:6.2f} ms  p99 {result['p99_ms']:6.2f} ms"
+            )
+        if len(results) == 2:
+            print(f"  ✅ speedup: {results['QueuePool']['rps'] / results['NullPool']['rps']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+メッセージ履歴ストアのベンチマークスクリプト
+1000件のセッション履歴（1割を削除済み）に対して、従来方式（リストを毎回フィルタ・
+小文字化して走査）とインデックス付きストアの ID検索・ページ取得・検索 の所要時間を比較します
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.message_store import SessionMessageStore
+
+MESSAGES = 1000
+ITERATIONS = 2000
+WORDS = ["hello", "meeting", "agenda", "update", "thanks", "question", "deploy", "review"]
+
+
+def build(rng: random.Random):
+    legacy = []
+    store = SessionMessageStore(MESSAGES)
+    for i in range(MESSAGES):
+        content = " ".join(rng.choice(WORDS) for _ in range(8)) + f" #{i}"
+        message = SimpleNamespace(id=f"bench_{i}", content=content, deleted_at=None)
+        legacy.append(message)
+        store.append(message)
+    for message in rng.sample(legacy, MESSAGES // 10):
+        message.deleted_at = time.time()
+        store.mark_deleted(message)
+    return legacy, store
+
+
+def legacy_find(messages, message_id):
+    for message in messages:
+        if message.id == message_id:
+            return message
+    return None
+
+
+def legacy_page(messages, offset, limit):
+    active = [msg for msg in messages if not msg.deleted_at]
+    return active[offset : offset + limit]
+
+
+def legacy_search(messages, query, limit):
+    query_lower = query.lower()
+    return [m for m in messages if not m.deleted_at and query_lower in m.content.lower()][-limit:]
+
+
+def measure(fn) -> float:
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(i)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    legacy, store = build(rng)
+    ids = [f"bench_{rng.randrange(MESSAGES)}" for _ in range(ITERATIONS)]
+    queries = [f"#{rng.randrange(MESSAGES)}" for _ in range(ITERATIONS)]
+
+    print("🚀 メッセージ履歴ストアベンチマーク")
+    print(f"   messages={MESSAGES}  deleted={store.deleted_count}  iterations={ITERATIONS}")
+    cases = [
+        ("find", lambda i: legacy_find(legacy, ids[i]), lambda i: store.get(ids[i])),
+        ("page", lambda i: legacy_page(legacy, 400, 50), lambda i: store.page(400, 50)),
+        (
+            "search",
+            lambda i: legacy_search(legacy, queries[i], 20),
+            lambda i: store.search(queries[i], 20),
+        ),
+        (
+            "search(word)",
+            lambda i: legacy_search(legacy, "review", 20),
+            lambda i: store.search("review", 20),
+        ),
+    ]
+    for name, legacy_fn, store_fn in cases:
+        before, after = measure(legacy_fn), measure(store_fn)
+        print(f"  {name:<13} legacy {before:8.1f}µs  store {after:8.1f}µs  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
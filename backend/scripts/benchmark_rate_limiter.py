@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+レート制限器のマイクロベンチマークスクリプト
+10,000ユーザーが混在する負荷で is_allowed() 1回あたりのコストを、
+従来のタイムスタンプリスト方式とトークンバケット方式で比較します
+"""
+
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import structlog
+
+from app.core.message_router import RateLimiter
+from app.schemas.websocket import MessagePriority
+
+USER_COUNT = 10_000
+CALLS = 200_000
+ROUNDS = 5
+PRIORITIES = list(MessagePriority)
+
+
+class LegacyRateLimiter:
+    """従来方式（ユーザーごとのタイムスタンプリストを毎回作り直す）"""
+
+    def __init__(self):
+        self.user_requests: Dict[int, List[float]] = {}
+        self.limits = RateLimiter().limits
+
+    async def is_allowed(self, user_id: int, priority: MessagePriority) -> bool:
+        current_time = time.time()
+
+        if user_id not in self.user_requests:
+            self.user_requests[user_id] = []
+
+        window_size = self.limits[priority][1]
+        self.user_requests[user_id] = [
+            req_time
+            for req_time in self.user_requests[user_id]
+            if current_time - req_time < window_size
+        ]
+
+        max_requests = self.limits[priority][0]
+        if len(self.user_requests[user_id]) >= max_requests:
+            return False
+
+        self.user_requests[user_id].append(current_time)
+        return True
+
+
+async def run_round(limiter, workload) -> float:
+    """1ラウンド実行し、1呼び出しあたりの平均時間（マイクロ秒）を返す"""
+    start = time.perf_counter()
+    for user_id, priority in workload:
+        await limiter.is_allowed(user_id, priority)
+    return (time.perf_counter() - start) / len(workload) * 1_000_000
+
+
+async def bench(name: str, factory, workload):
+    # ウォームアップで全ユーザーのバケット/リストを上限付近まで埋める
+    limiter = factory()
+    await run_round(limiter, workload)
+
+    results = [await run_round(limiter, workload) for _ in range(ROUNDS)]
+    print(
+        f"  {name:<14} mean {statistics.mean(results):6.2f} µs/call  "
+        f"best {min(results):6.2f} µs/call"
+    )
+    return statistics.mean(results)
+
+
+async def main():
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+
+    print("🚀 レート制限器ベンチマーク")
+    print(f"   users={USER_COUNT:,}  calls/round={CALLS:,}  rounds={ROUNDS}")
+
+    rng = random.Random(42)
+    # 一部のユーザーに集中する偏った負荷（上位1%が半分の呼び出し）
+    hot_users = max(1, USER_COUNT // 100)
+    workload = [
+        (
+            rng.randrange(hot_users) if rng.random() < 0.5 else rng.randrange(USER_COUNT),
+            rng.choice(PRIORITIES),
+        )
+        for _ in range(CALLS)
+    ]
+
+    legacy = await bench("legacy list", LegacyRateLimiter, workload)
+    bucket = await bench("token bucket", RateLimiter, workload)
+
+    print(f"✅ speedup: {legacy / bucket:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
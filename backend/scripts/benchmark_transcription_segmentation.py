@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+発話区間検出（VAD）付きリアルタイム転写のリプレイベンチマークスクリプト
+複数話者の会話音声（合成、またはWAVファイル）を100msチャンクで再生し、
+音声1分あたりの転写API呼び出し回数と、発話終了から確定テキストまでの遅延を測定します
+
+転写APIはフェイクに置き換え、仮想時計上で処理時間（固定遅延＋音声長比例）を
+消費させるため、実時間を待たずに何分ぶんの音声でも再生できます
+
+使い方:
+    python scripts/benchmark_transcription_segmentation.py --minutes 5 --speakers 3
+    python scripts/benchmark_transcription_segmentation.py --wav sample_16k_mono.wav
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import random
+import statistics
+import sys
+import wave
+from datetime import timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import structlog
+
+# app.services は同名のインスタンスを再エクスポートしているためモジュールを直接取得する
+ts = importlib.import_module("app.services.transcription_service")
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.1
+CHUNK_SAMPLES = int(SAMPLE_RATE * CHUNK_SECONDS)
+
+
+class VirtualClock:
+    """リプレイ用の仮想時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeTranscriber:
+    """処理時間を仮想時計で消費する転写APIのフェイク"""
+
+    def __init__(self, clock: VirtualClock, base_latency: float, per_second: float):
+        self.clock = clock
+        self.base_latency = base_latency
+        self.per_second = per_second
+        self.calls = {"partial": 0, "final": 0}
+
+    def _consume(self, audio: bytes):
+        seconds = len(audio) / (2 * SAMPLE_RATE)
+        self.clock.now += self.base_latency + self.per_second * seconds
+
+    async def transcribe_chunk(self, audio: bytes, language: str = "ja"):
+        self.calls["partial"] += 1
+        self._consume(audio)
+        return {"text": "部分", "confidence": 0.8}
+
+    async def transcribe_audio_data(self, audio: bytes, language: str = "ja"):
+        self.calls["final"] += 1
+        self._consume(audio)
+        return {"text": "確定", "confidence": 0.9, "language": "ja", "words": []}
+
+
+def synth_speaker(rng: random.Random, seconds: float) -> np.ndarray:
+    """発話（1〜6秒、短い息継ぎを含む）と沈黙（1〜8秒）を交互に並べた合成音声"""
+    total = int(seconds * SAMPLE_RATE)
+    signal = np.zeros(total, dtype=np.float32)
+    pos = int(rng.uniform(0, 3) * SAMPLE_RATE)
+    while pos < total:
+        talk = int(rng.uniform(1.0, 6.0) * SAMPLE_RATE)
+        end = min(total, pos + talk)
+        t = np.arange(end - pos) / SAMPLE_RATE
+        # 音節ごとに振幅が揺れる有声音
+        envelope = 0.15 + 0.1 * np.abs(np.sin(2 * np.pi * 3 * t))
+        voiced = np.sin(2 * np.pi * rng.uniform(120, 240) * t) * envelope
+        signal[pos:end] = voiced + np.random.default_rng(pos).normal(0, 0.01, end - pos)
+        # 息継ぎ（発話終了とはみなさない長さ）
+        for _ in range(int(talk / SAMPLE_RATE)):
+            gap = pos + int(rng.uniform(0, talk))
+            signal[gap : gap + int(0.15 * SAMPLE_RATE)] = 0.0
+        pos = end + int(rng.uniform(1.0, 8.0) * SAMPLE_RATE)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def load_wav(path: str) -> np.ndarray:
+    """16kHz・モノラル・16-bitのWAVを読み込む"""
+    with wave.open(path, "rb") as wav_file:
+        if (
+            wav_file.getframerate() != SAMPLE_RATE
+            or wav_file.getnchannels() != 1
+            or wav_file.getsampwidth() != 2
+        ):
+            raise ValueError("16kHz / mono / 16-bit のWAVを指定してください")
+        return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+
+async def replay(tracks: List[np.ndarray], args) -> dict:
+    """全話者の音声を100msずつ並行して再生"""
+    clock = VirtualClock()
+    transcriber = FakeTranscriber(clock, args.base_latency, args.per_second)
+    ts.openai_client = transcriber
+
+    manager = ts.RealtimeTranscriptionManager(clock=clock)
+    latencies: List[float] = []
+
+    async def no_save(session_id, chunk):
+        return None
+
+    transcribe_utterance = manager._transcribe_utterance
+
+    async def timed_transcribe(session_id, utterance):
+        chunk = await transcribe_utterance(session_id, utterance)
+        latencies.append((clock() - utterance.speech_ended_at) * 1000)
+        return chunk
+
+    manager._save_transcription = no_save
+    manager._transcribe_utterance = timed_transcribe
+
+    await manager.start_session("bench")
+    start = manager.active_sessions["bench"]["start_time"]
+    frames = max(len(track) for track in tracks) // CHUNK_SAMPLES
+
+    for i in range(frames):
+        frame_time = (i + 1) * CHUNK_SECONDS
+        # 転写中に届いたチャンクは処理が遅れる（インライン処理のため）
+        clock.now = max(clock.now, frame_time)
+        timestamp = start + timedelta(seconds=frame_time)
+        for user_id, track in enumerate(tracks, start=1):
+            chunk = track[i * CHUNK_SAMPLES : (i + 1) * CHUNK_SAMPLES]
+            if len(chunk) < CHUNK_SAMPLES:
+                continue
+            await manager.process_audio_chunk(
+                "bench", user_id, chunk.tobytes(), timestamp
+            )
+
+    stats = manager.get_segmentation_stats()["sessions"]["bench"]
+    await manager.stop_session("bench")
+
+    audio_minutes = stats["audio_seconds"] / 60
+    latencies.sort()
+    return {
+        "audio_minutes": audio_minutes,
+        "partial_calls": transcriber.calls["partial"],
+        "final_calls": transcriber.calls["final"],
+        "calls_per_minute": sum(transcriber.calls.values()) / audio_minutes,
+        # 従来方式: チャンクごとに部分転写 + 0.5秒（5チャンク）ごとに確定転写
+        "legacy_calls_per_minute": (stats["frames"] + stats["frames"] / 5)
+        / audio_minutes,
+        "utterances": stats["utterances"],
+        "dropped_short": stats["dropped_short"],
+        "eou_p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "eou_p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="発話区間検出付き転写のリプレイベンチマーク"
+    )
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--wav", help="16kHz・モノラルのWAV（1話者として再生）")
+    parser.add_argument(
+        "--base-latency", type=float, default=0.35, help="転写APIの固定遅延（秒）"
+    )
+    parser.add_argument(
+        "--per-second", type=float, default=0.03, help="音声1秒あたりの追加遅延（秒）"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL)
+    )
+
+    rng = random.Random(args.seed)
+    if args.wav:
+        tracks = [load_wav(args.wav)]
+    else:
+        tracks = [synth_speaker(rng, args.minutes * 60) for _ in range(args.speakers)]
+
+    print("🚀 発話区間検出付きリアルタイム転写ベンチマーク")
+    print(
+        f"   speakers={len(tracks)}  audio={sum(len(t) for t in tracks) / SAMPLE_RATE / 60:.1f} min"
+        f"  api latency={args.base_latency}s + {args.per_second}s/audio-sec"
+    )
+
+    result = await replay(tracks, args)
+
+    print(f"\n📊 音声 {result['audio_minutes']:.1f} 分（話者ごとの合計）")
+    print(
+        f"  API呼び出し   {result['calls_per_minute']:7.1f} 回/分  "
+        f"(partial {result['partial_calls']}, final {result['final_calls']})"
+    )
+    print(f"  従来方式      {result['legacy_calls_per_minute']:7.1f} 回/分")
+    print(
+        f"  発話          {result['utterances']} 件（短すぎて破棄 {result['dropped_short']} 件）"
+    )
+    print(
+        f"  発話終了→確定テキスト  p50 {result['eou_p50_ms']:7.1f} ms  "
+        f"p95 {result['eou_p95_ms']:7.1f} ms"
+    )
+    print(
+        f"✅ API呼び出し削減: {result['legacy_calls_per_minute'] / result['calls_per_minute']:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from starlette.websockets import WebSocketState
 
 from app.main import app
 from app.core.database import get_db
@@ -319,6 +320,51 @@ def mock_websocket():
     mock_ws.close = AsyncMock()
     return mock_ws
 
+class FakeWebSocket:
+    """送信内容を記録するWebSocketのフェイク（送信遅延・送信失敗を指定できる）"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.client_state = WebSocketState.CONNECTED
+        self.sent_text: list = []
+        self.sent_bytes: list = []
+        self.closed = False
+
+    async def send_text(self, data: str):
+        if self.fail:
+            raise RuntimeError("send failed")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent_text.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.sent_bytes.append(data)
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        self.client_state = WebSocketState.DISCONNECTED
+
+@pytest.fixture
+def fake_websocket():
+    """ConnectionManagerに接続できるWebSocketのフェイクを作るファクトリ"""
+    return FakeWebSocket
+
+# 時刻を注入できるコンポーネント用の時計
+class FakeClock:
+    """呼び出すと now を返す時計（テストで now を進める）"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def fake_clock():
+    """FakeClockを作るファクトリ（開始時刻を指定できる）"""
+    return FakeClock
+
 # テスト用の設定
 @pytest.fixture(autouse=True)
 def setup_test_environment():
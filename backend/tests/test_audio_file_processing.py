@@ -0,0 +1,151 @@
+"""
+音声ファイル処理（ストリーミング分割・結合・分析）のテスト
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.utils import audio_processing
+from app.utils.audio_processing import AudioProcessor
+
+
+def _wav(samples: np.ndarray, sr: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def _tone(seconds: float, sr: int = 16000, freq: float = 440.0) -> np.ndarray:
+    t = np.arange(int(seconds * sr)) / sr
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _read(data: bytes) -> np.ndarray:
+    samples, _ = sf.read(io.BytesIO(data), dtype="int16")
+    return samples
+
+
+@pytest.fixture
+def processor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield AudioProcessor(executor=executor)
+    executor.shutdown()
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # ブロック境界をまたぐ処理を小さなデータで確認する
+    monkeypatch.setattr(audio_processing, "STREAM_BLOCK_SECONDS", 0.25)
+
+
+@pytest.mark.asyncio
+async def test_get_audio_info_reads_header(processor, tmp_path):
+    stereo = np.column_stack([_tone(2.5), _tone(2.5, freq=220)])
+    data = _wav(stereo, sr=8000)
+    path = tmp_path / "a.wav"
+    path.write_bytes(data)
+
+    for source in (data, str(path)):
+        info = await processor.get_audio_info(source)
+        assert info["sample_rate"] == 8000
+        assert info["channels"] == 2
+        assert info["samples"] == 40000
+        assert info["duration_seconds"] == pytest.approx(5.0)
+        assert info["file_size_bytes"] == len(data)
+
+
+@pytest.mark.asyncio
+async def test_split_and_merge_round_trip(processor, small_blocks, tmp_path):
+    data = _wav(_tone(2.3))
+    original = _read(data)
+
+    segments = await processor.split_audio(data, segment_duration=1.0)
+    assert [len(_read(s)) for s in segments] == [16000, 16000, 4800]
+
+    merged = await processor.merge_audio(segments)
+    assert np.array_equal(_read(merged), original)
+
+    paths = await processor.split_audio(data, segment_duration=1.0, output_dir=str(tmp_path / "seg"))
+    output = str(tmp_path / "merged.wav")
+    assert await processor.merge_audio(paths, output_path=output) == output
+    assert np.array_equal(sf.read(output, dtype="int16")[0], original)
+
+
+@pytest.mark.asyncio
+async def test_split_downmixes_stereo(processor):
+    left, right = _tone(1.0), _tone(1.0, freq=220)
+    segments = await processor.split_audio(_wav(np.column_stack([left, right])), 0.5)
+
+    mono = np.concatenate([_read(s) for s in segments])
+    expected = _read(_wav((left + right) / 2))
+    assert np.abs(mono.astype(int) - expected).max() <= 1
+
+
+@pytest.mark.asyncio
+async def test_merge_resamples_to_first_segment_rate(processor):
+    merged = await processor.merge_audio([_wav(_tone(1.0)), _wav(_tone(0.5, sr=8000), sr=8000)])
+    assert len(_read(merged)) == 24000
+    assert sf.info(io.BytesIO(merged)).samplerate == 16000
+
+
+@pytest.mark.asyncio
+async def test_analyze_matches_whole_file(processor, small_blocks):
+    y = _tone(2.0)
+    result = await processor.analyze_audio(_wav(y))
+
+    y16 = _read(_wav(y)).astype(np.float32) / 32768.0
+    assert result["duration"] == pytest.approx(2.0)
+    assert result["rms"] == pytest.approx(float(np.sqrt(np.mean(y16**2))), rel=1e-4)
+    assert result["mel_spectrogram_shape"] == librosa_mel_shape(y16)
+    # 純音なので重心はほぼ440Hz付近（ブロック境界の差は小さい）
+    assert result["spectral_centroid_mean"] == pytest.approx(
+        float(np.mean(audio_processing.librosa.feature.spectral_centroid(y=y16, sr=16000))),
+        rel=0.05,
+    )
+
+
+def librosa_mel_shape(y: np.ndarray):
+    return audio_processing.librosa.feature.melspectrogram(y=y, sr=16000).shape
+
+
+@pytest.mark.asyncio
+async def test_formats_libsndfile_cannot_open_are_transcoded_once(processor, monkeypatch):
+    # M4A などは libsndfile で開けないので pydub（ffmpeg）で一時WAVに変換して読む
+    m4a = b"\x00\x00\x00\x18ftypM4A \x00\x00\x00\x00"
+    with pytest.raises(sf.LibsndfileError):
+        sf.info(io.BytesIO(m4a))
+
+    samples = (_tone(1.5) * 32767).astype(np.int16)
+    decoded = []
+
+    def from_file(file, format=None):
+        decoded.append(format)
+        return audio_processing.AudioSegment(
+            data=samples.tobytes(), sample_width=2, frame_rate=16000, channels=1
+        )
+
+    monkeypatch.setattr(audio_processing.AudioSegment, "from_file", from_file)
+
+    info = await processor.get_audio_info(m4a, format="m4a")
+    assert info["sample_rate"] == 16000
+    assert info["samples"] == len(samples)
+    assert info["format"] == "m4a"
+
+    segments = await processor.split_audio(m4a, segment_duration=1.0, format="m4a")
+    assert [len(_read(segment)) for segment in segments] == [16000, 8000]
+
+    result = await processor.analyze_audio(m4a, format="m4a")
+    assert result["duration"] == pytest.approx(1.5)
+    assert decoded == ["m4a", "m4a", "m4a"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_input_raises_value_error(processor):
+    with pytest.raises(ValueError):
+        await processor.get_audio_info(b"not audio")
+    with pytest.raises(ValueError):
+        await processor.merge_audio([])
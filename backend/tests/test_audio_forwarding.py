@@ -0,0 +1,233 @@
+"""
+音声の転送方式（SFU / MCU）のテスト
+"""
+
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.core import message_handlers
+from app.core.audio_frames import (
+    AUDIO_TRANSPORT_BINARY,
+    AUDIO_TRANSPORT_JSON,
+    AudioCodec,
+    AudioFrameHeader,
+    decode_audio_frame,
+    encode_audio_frame,
+)
+from app.core.websocket import ConnectionManager
+from app.services import audio_forwarding
+from app.services.audio_forwarding import (
+    MIXED_USER_ID,
+    AudioForwarder,
+    ForwardingMode,
+    SpeakerSelector,
+    mix_chunks,
+    to_pcm16,
+)
+from app.services.participant_management_service import (
+    ParticipantManagementService,
+    ParticipantStatus,
+)
+
+
+def _participant(user_id: int, level: float = 0.0, connection_id=None):
+    return SimpleNamespace(
+        user_id=user_id,
+        connection_id=connection_id,
+        status=ParticipantStatus.CONNECTED,
+        audio_level=level,
+    )
+
+
+def _pcm(value: int, count: int = 160) -> bytes:
+    return np.full(count, value, dtype=np.int16).tobytes()
+
+
+def test_selector_keeps_top_k_with_hold():
+    selector = SpeakerSelector(max_speakers=2, min_level=0.05, hold_seconds=1.0)
+    participants = [_participant(1, 0.3), _participant(2, 0.2), _participant(3, 0.1), _participant(4, 0.01)]
+
+    assert selector.update(participants, now=0.0) == {1, 2}
+
+    # 一瞬静かになっても hold の間は枠を保持し、より大きな新しい話者に奪われない
+    participants[1].audio_level = 0.0
+    participants[2].audio_level = 0.5
+    assert selector.update(participants, now=0.5) == {1, 2}
+
+    # hold を過ぎたら次の話者が入る
+    assert selector.update(participants, now=1.6) == {1, 3}
+
+    # 退出した話者は外れる
+    assert selector.update(participants[2:], now=1.7) == {3}
+
+
+def test_mix_pads_and_clips():
+    matrix = mix_chunks([np.array([30000, 1], dtype=np.int16), np.array([10000], dtype=np.int16)])
+    assert matrix.tolist() == [[30000, 1], [10000, 0]]
+    pcm = np.frombuffer(to_pcm16(matrix.sum(axis=0)), dtype=np.int16)
+    assert pcm.tolist() == [32767, 1]
+
+
+@pytest_asyncio.fixture
+async def session(monkeypatch, fake_websocket, fake_clock):
+    """バイナリ受信者4人・JSON受信者1人のセッション"""
+    manager = ConnectionManager()
+    monkeypatch.setattr(message_handlers, "manager", manager)
+    monkeypatch.setattr(audio_forwarding, "manager", manager)
+
+    sockets = {}
+    participants = []
+    for user_id in range(1, 6):
+        ws = fake_websocket()
+        user = SimpleNamespace(id=user_id, display_name=f"user{user_id}")
+        transport = AUDIO_TRANSPORT_JSON if user_id == 5 else AUDIO_TRANSPORT_BINARY
+        connection_id = await manager.connect(ws, "s1", user, audio_transport=transport)
+        sockets[user_id] = ws
+        participants.append(_participant(user_id, connection_id=connection_id))
+
+    async def get_session_participants(session_id):
+        return participants
+
+    async def update_audio_level(session_id, user_id, level, **kwargs):
+        for participant in participants:
+            if participant.user_id == user_id:
+                participant.audio_level = level
+
+    service = message_handlers.participant_management_service
+    monkeypatch.setattr(service, "get_session_participants", get_session_participants)
+    monkeypatch.setattr(service, "update_audio_level", update_audio_level)
+
+    def use(mode: ForwardingMode, **kwargs) -> AudioForwarder:
+        forwarder = AudioForwarder(
+            mode=mode, participants_provider=get_session_participants, clock=fake_clock(), **kwargs
+        )
+        monkeypatch.setattr(message_handlers, "audio_forwarder", forwarder)
+        return forwarder
+
+    yield SimpleNamespace(manager=manager, sockets=sockets, participants=participants, use=use)
+
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+
+
+async def _send_frame(session, user_id: int, level: float, audio: bytes):
+    frame = encode_audio_frame(
+        AudioFrameHeader(
+            session_id="s1",
+            user_id=user_id,
+            seq=1,
+            timestamp_ms=1_700_000_000_000,
+            sample_rate=16000,
+            codec=AudioCodec.PCM16,
+            level=level,
+        ),
+        audio,
+    )
+    await message_handlers.WebSocketMessageHandler.handle_audio_frame(
+        "s1",
+        session.participants[user_id - 1].connection_id,
+        SimpleNamespace(id=user_id, display_name=f"user{user_id}"),
+        frame,
+    )
+
+
+@pytest.mark.asyncio
+async def test_sfu_forwards_only_top_speakers(session):
+    forwarder = session.use(ForwardingMode.SFU, max_speakers=2)
+
+    for user_id, level in ((1, 0.6), (2, 0.4), (3, 0.2), (4, 0.01)):
+        await _send_frame(session, user_id, level, _pcm(user_id))
+    await asyncio.sleep(0.01)
+
+    senders = {
+        decode_audio_frame(frame)[0].user_id for frame in session.sockets[4].sent_bytes
+    }
+    assert senders == {1, 2}
+    assert forwarder.stats["suppressed"] == 2
+    assert forwarder.stats["relayed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_selector_is_discarded_with_empty_session(monkeypatch, fake_clock):
+    forwarder = AudioForwarder(mode=ForwardingMode.SFU, clock=fake_clock())
+    monkeypatch.setattr(audio_forwarding, "audio_forwarder", forwarder)
+    service = ParticipantManagementService()
+    user = SimpleNamespace(id=1, username="user1", display_name="user1")
+    participant = await service.join_session("s1", user, connection_id="c1")
+
+    forwarder.select_speakers("s1", [participant])
+    assert forwarder.get_stats()["selecting_sessions"] == 1
+
+    await service.leave_session("s1", 1)
+    assert forwarder.get_stats()["selecting_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_mcu_sends_one_mix_per_listener(session):
+    forwarder = session.use(ForwardingMode.MCU, max_speakers=3)
+
+    await _send_frame(session, 1, 0.5, _pcm(100))
+    await _send_frame(session, 2, 0.3, _pcm(20))
+    # JSONで送られてきた音声もミックスに入る
+    await message_handlers.WebSocketMessageHandler.handle_audio_data(
+        "s1",
+        session.participants[4].connection_id,
+        SimpleNamespace(id=5, display_name="user5"),
+        base64.b64encode(_pcm(3)).decode("ascii"),
+        0.2,
+    )
+    await asyncio.sleep(0.01)
+    # ミックス前は何も中継されない
+    assert all(not ws.sent_bytes for ws in session.sockets.values())
+
+    await forwarder.mix_tick()
+    await asyncio.sleep(0.01)
+
+    def received(user_id):
+        frames = session.sockets[user_id].sent_bytes
+        assert len(frames) == 1
+        header, payload = decode_audio_frame(frames[0])
+        assert header.user_id == MIXED_USER_ID
+        return set(np.frombuffer(bytes(payload), dtype=np.int16).tolist())
+
+    # 話していない受信者は全員分、話者は自分以外の合計を受け取る
+    assert received(3) == {123}
+    assert received(4) == {123}
+    assert received(1) == {23}
+    assert received(2) == {103}
+    messages = [json.loads(m) for m in session.sockets[5].sent_text]
+    json_mix = [m for m in messages if m.get("type") == "audio_data"]
+    assert len(json_mix) == 1
+    assert json_mix[0]["mixed"] is True
+    assert sorted(json_mix[0]["speakers"]) == [1, 2]
+    assert set(np.frombuffer(base64.b64decode(json_mix[0]["audio_data"]), dtype=np.int16)) == {120}
+
+    stats = forwarder.get_stats()
+    assert stats["mixed_chunks"] == 3
+    assert stats["mix_sends"] == 5
+    assert stats["mixing_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_mcu_relays_unmixable_codecs(session):
+    forwarder = session.use(ForwardingMode.MCU)
+    frame = encode_audio_frame(
+        AudioFrameHeader(
+            session_id="s1", user_id=1, seq=1, timestamp_ms=0,
+            sample_rate=48000, codec=AudioCodec.OPUS, level=0.5,
+        ),
+        b"opus",
+    )
+    await message_handlers.WebSocketMessageHandler.handle_audio_frame(
+        "s1", session.participants[0].connection_id, SimpleNamespace(id=1, display_name="user1"), frame
+    )
+    await asyncio.sleep(0.01)
+
+    assert session.sockets[2].sent_bytes == [frame]
+    assert forwarder.stats["relayed"] == 1
@@ -0,0 +1,262 @@
+"""
+バイナリ音声フレームと音声中継のテスト
+"""
+
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from app.core import message_handlers
+from app.core.audio_frames import (
+    AUDIO_TRANSPORT_BINARY,
+    AUDIO_TRANSPORT_JSON,
+    HEADER_SIZE,
+    AudioCodec,
+    AudioFrameHeader,
+    decode_audio_frame,
+    encode_audio_frame,
+)
+from app.core.websocket import ConnectionManager
+from app.services.participant_management_service import ParticipantStatus
+
+
+def _header(**overrides) -> AudioFrameHeader:
+    values = dict(
+        session_id="s1",
+        user_id=1,
+        seq=7,
+        timestamp_ms=1_700_000_000_000,
+        sample_rate=16000,
+        codec=AudioCodec.OPUS,
+        level=0.5,
+    )
+    values.update(overrides)
+    return AudioFrameHeader(**values)
+
+
+def test_round_trip():
+    audio = bytes(range(256)) * 4
+    frame = encode_audio_frame(_header(), audio)
+
+    header, payload = decode_audio_frame(frame)
+
+    assert header.session_id == "s1"
+    assert header.user_id == 1
+    assert header.seq == 7
+    assert header.timestamp_ms == 1_700_000_000_000
+    assert header.sample_rate == 16000
+    assert header.codec == AudioCodec.OPUS
+    assert header.level == pytest.approx(0.5, abs=1e-4)
+    assert bytes(payload) == audio
+    assert len(frame) == HEADER_SIZE + len("s1") + len(audio)
+
+
+def test_payload_is_zero_copy_view():
+    frame = encode_audio_frame(_header(), b"\x01\x02\x03")
+    _, payload = decode_audio_frame(frame)
+
+    assert isinstance(payload, memoryview)
+    assert payload.obj is frame
+
+
+def test_rejects_bad_frames():
+    frame = encode_audio_frame(_header(), b"abc")
+
+    with pytest.raises(ValueError):
+        decode_audio_frame(frame[: HEADER_SIZE - 1])
+    with pytest.raises(ValueError):
+        decode_audio_frame(frame[: HEADER_SIZE + 1])
+    with pytest.raises(ValueError):
+        decode_audio_frame(b"\x09" + frame[1:])
+    with pytest.raises(ValueError):
+        decode_audio_frame(frame[:1] + b"\x7f" + frame[2:])
+
+
+@pytest_asyncio.fixture
+async def relay(monkeypatch, fake_websocket):
+    """2つのバイナリ受信者・1つのJSON受信者・1つのミュート受信者を持つセッション"""
+    manager = ConnectionManager()
+    monkeypatch.setattr(message_handlers, "manager", manager)
+
+    sockets = {}
+    participants = []
+    transports = {
+        1: AUDIO_TRANSPORT_BINARY,
+        2: AUDIO_TRANSPORT_BINARY,
+        3: AUDIO_TRANSPORT_BINARY,
+        4: AUDIO_TRANSPORT_JSON,
+        5: AUDIO_TRANSPORT_BINARY,
+    }
+    for user_id, transport in transports.items():
+        ws = fake_websocket()
+        user = SimpleNamespace(id=user_id, display_name=f"user{user_id}")
+        connection_id = await manager.connect(
+            ws, "s1", user, audio_transport=transport
+        )
+        sockets[user_id] = ws
+        participants.append(
+            SimpleNamespace(
+                user_id=user_id,
+                connection_id=connection_id,
+                status=ParticipantStatus.MUTED if user_id == 5 else ParticipantStatus.CONNECTED,
+            )
+        )
+
+    async def get_session_participants(session_id):
+        return participants
+
+    async def update_audio_level(session_id, user_id, level, **kwargs):
+        return True
+
+    service = message_handlers.participant_management_service
+    monkeypatch.setattr(service, "get_session_participants", get_session_participants)
+    monkeypatch.setattr(service, "update_audio_level", update_audio_level)
+
+    yield SimpleNamespace(manager=manager, sockets=sockets, participants=participants)
+
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+
+
+@pytest.mark.asyncio
+async def test_binary_frame_relayed_to_mixed_transports(relay):
+    audio = b"\x00\x01" * 160
+    frame = encode_audio_frame(_header(), audio)
+    sender = relay.participants[0]
+
+    await message_handlers.WebSocketMessageHandler.handle_audio_frame(
+        "s1", sender.connection_id, SimpleNamespace(id=1, display_name="user1"), frame
+    )
+    await asyncio.sleep(0.01)
+
+    # バイナリ受信者には受信フレームそのもの（同一オブジェクト）が届く
+    for user_id in (2, 3):
+        assert relay.sockets[user_id].sent_bytes == [frame]
+        assert relay.sockets[user_id].sent_bytes[0] is frame
+    # JSON受信者にはBase64のフォールバックが届く
+    json_messages = [json.loads(m) for m in relay.sockets[4].sent_text]
+    audio_messages = [m for m in json_messages if m["type"] == "audio_data"]
+    assert len(audio_messages) == 1
+    assert base64.b64decode(audio_messages[0]["audio_data"]) == audio
+    assert audio_messages[0]["user_id"] == 1
+    # 送信者とミュート中の参加者には届かない
+    assert relay.sockets[1].sent_bytes == []
+    assert relay.sockets[5].sent_bytes == []
+
+
+@pytest.mark.asyncio
+async def test_json_audio_relayed_as_binary_frame(relay):
+    audio = b"\x10\x20" * 80
+    sender = relay.participants[3]
+
+    await message_handlers.WebSocketMessageHandler.handle_audio_data(
+        "s1",
+        sender.connection_id,
+        SimpleNamespace(id=4, display_name="user4"),
+        base64.b64encode(audio).decode("ascii"),
+        0.25,
+    )
+    await asyncio.sleep(0.01)
+
+    frames = [relay.sockets[user_id].sent_bytes for user_id in (1, 2, 3)]
+    assert all(len(sent) == 1 for sent in frames)
+    # 全バイナリ受信者で同じフレームを共有する
+    assert frames[0][0] is frames[1][0] is frames[2][0]
+    header, payload = decode_audio_frame(frames[0][0])
+    assert header.user_id == 4
+    assert header.level == pytest.approx(0.25, abs=1e-4)
+    assert bytes(payload) == audio
+
+
+@pytest.mark.asyncio
+async def test_received_level_is_passed_to_transcription(relay, monkeypatch):
+    transcription = message_handlers.realtime_transcription_manager
+    process_audio_chunk = AsyncMock(return_value=(None, None))
+    monkeypatch.setattr(transcription, "is_session_active", lambda session_id: True)
+    monkeypatch.setattr(transcription, "process_audio_chunk", process_audio_chunk)
+    audio = b"\x00\x01" * 160
+
+    await message_handlers.WebSocketMessageHandler.handle_audio_frame(
+        "s1",
+        relay.participants[0].connection_id,
+        SimpleNamespace(id=1, display_name="user1"),
+        encode_audio_frame(_header(codec=AudioCodec.PCM16, level=0.3), audio),
+    )
+    await message_handlers.WebSocketMessageHandler.handle_audio_data(
+        "s1",
+        relay.participants[3].connection_id,
+        SimpleNamespace(id=4, display_name="user4"),
+        base64.b64encode(audio).decode("ascii"),
+        0.25,
+    )
+
+    # 受信した音声レベルをそのままRMSとして渡す（発話区間検出で再計算しない）
+    levels = [call.kwargs["rms"] for call in process_audio_chunk.await_args_list]
+    assert levels == [pytest.approx(0.3, abs=1e-4), 0.25]
+
+
+@pytest.mark.asyncio
+async def test_spoofed_frame_is_rejected(relay):
+    frame = encode_audio_frame(_header(user_id=2), b"abc")
+    sender = relay.participants[0]
+
+    await message_handlers.WebSocketMessageHandler.handle_audio_frame(
+        "s1", sender.connection_id, SimpleNamespace(id=1, display_name="user1"), frame
+    )
+    await asyncio.sleep(0.01)
+
+    assert all(relay.sockets[user_id].sent_bytes == [] for user_id in (2, 3, 5))
+    errors = [json.loads(m) for m in relay.sockets[1].sent_text]
+    assert errors and errors[-1]["type"] == "error"
+
+
+def test_voice_session_route_accepts_json_audio():
+    """JSONトランスポートのクライアントもテキストフレームで音声を送れる"""
+    from unittest.mock import MagicMock, patch
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api.v1 import websocket as websocket_route
+
+    app = FastAPI()
+    app.include_router(websocket_route.router)
+    user = SimpleNamespace(id=7, email="u7@example.com", display_name="U7")
+    db_session = MagicMock()
+    db_session.return_value.__aenter__ = AsyncMock(return_value=MagicMock())
+    db_session.return_value.__aexit__ = AsyncMock(return_value=False)
+    service = MagicMock()
+    service.return_value.get_session_by_session_id = AsyncMock(return_value=MagicMock())
+
+    with patch.object(
+        websocket_route.WebSocketAuth, "authenticate_websocket", AsyncMock(return_value=user)
+    ), patch("app.core.database.AsyncSessionLocal", db_session), patch.object(
+        websocket_route, "VoiceSessionService", service
+    ), patch.object(
+        websocket_route, "_check_user_participant_permission", AsyncMock(return_value=True)
+    ), patch.object(
+        websocket_route.WebSocketMessageHandler, "handle_join_session", AsyncMock()
+    ), patch.object(
+        message_handlers.WebSocketMessageHandler, "handle_audio_data", AsyncMock()
+    ) as handle_audio_data:
+        with TestClient(app).websocket_connect("/voice-sessions/room-1") as ws:
+            assert ws.receive_json()["type"] == "connection_established"
+            # 別セッションを指定してもこの接続のセッションとして扱う
+            ws.send_json(
+                {
+                    "type": "audio_data",
+                    "session_id": "other-room",
+                    "audio_data": base64.b64encode(b"\x00\x01" * 160).decode(),
+                    "audio_level": 0.4,
+                }
+            )
+
+    handle_audio_data.assert_awaited_once()
+    session_id, _, sender, audio_b64, level = handle_audio_data.await_args.args
+    assert (session_id, sender.id, level) == ("room-1", 7, 0.4)
+    assert base64.b64decode(audio_b64) == b"\x00\x01" * 160
@@ -0,0 +1,193 @@
+"""
+音声レベル・発言者の通知の集約のテスト
+"""
+
+import asyncio
+import importlib
+import json
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from app.core.exceptions import ValidationException
+from app.core.websocket import ConnectionManager
+from app.core import message_handlers
+from app.core.message_handlers import WebSocketMessageHandler
+from app.services import audio_level_aggregator as aggregator_module
+from app.services.audio_level_aggregator import AudioLevelAggregator
+from app.services.participant_management_service import (
+    ParticipantManagementService,
+    ParticipantRole,
+)
+
+participant_module = importlib.import_module("app.services.participant_management_service")
+
+
+@pytest_asyncio.fixture
+async def session(monkeypatch, fake_websocket, fake_clock):
+    """参加者3人のセッション"""
+    manager = ConnectionManager()
+    monkeypatch.setattr(aggregator_module, "manager", manager)
+
+    sockets = []
+    connections = []
+    for user_id in range(1, 4):
+        ws = fake_websocket()
+        connections.append(
+            await manager.connect(ws, "s1", SimpleNamespace(id=user_id, display_name=f"user{user_id}"))
+        )
+        sockets.append(ws)
+
+    clock = fake_clock()
+    aggregator = AudioLevelAggregator(tick_hz=8, hold_seconds=0.5, clock=clock)
+
+    async def advance(seconds: float):
+        clock.now += seconds
+        await aggregator.tick()
+        await asyncio.sleep(0.01)
+
+    def received(type_: str, index: int = 0):
+        messages = [json.loads(m) for m in sockets[index].sent_text]
+        return [m for m in messages if m.get("type") == type_]
+
+    yield SimpleNamespace(
+        aggregator=aggregator,
+        manager=manager,
+        connections=connections,
+        clock=clock,
+        advance=advance,
+        received=received,
+    )
+
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+
+
+@pytest.mark.asyncio
+async def test_levels_are_coalesced_per_tick(session):
+    aggregator = session.aggregator
+    for level in (0.2, 0.6, 0.3):
+        aggregator.record("s1", 1, level)
+    aggregator.record("s1", 2, 0.3)
+    aggregator.record("s1", 3, 0.01)
+
+    # 配信時刻前は何も送らない
+    await session.advance(0.0625)
+    assert session.received("audio_levels") == []
+
+    await session.advance(0.0625)
+    frames = session.received("audio_levels")
+    assert len(frames) == 1
+    # 間隔内のピーク値を使い、閾値未満の話者は含めない
+    assert frames[0]["levels"] == {"1": 0.6, "2": 0.3}
+
+    # 変化の小さい値は送らず、閾値未満になった話者には一度だけ0を送る
+    aggregator.record("s1", 1, 0.61)
+    await session.advance(0.125)
+    assert session.received("audio_levels")[-1]["levels"] == {"2": 0.0}
+
+    aggregator.record("s1", 1, 0.605)
+    await session.advance(0.125)
+    assert len(session.received("audio_levels")) == 2
+    assert aggregator.stats["levels_skipped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_active_speaker_changes_are_discrete_events(session):
+    aggregator = session.aggregator
+
+    aggregator.record("s1", 1, 0.5)
+    await session.advance(0.125)
+    aggregator.record("s1", 1, 0.5)
+    aggregator.record("s1", 2, 0.4)
+    await session.advance(0.125)
+
+    events = session.received("active_speakers_changed")
+    assert [(e["started"], e["stopped"]) for e in events] == [([1], []), ([2], [])]
+    assert events[-1]["active_speakers"] == [1, 2]
+
+    # hold の間は発言中のまま、過ぎたら終了イベントを送る
+    aggregator.record("s1", 2, 0.4)
+    await session.advance(0.125)
+    assert len(session.received("active_speakers_changed")) == 2
+    for _ in range(5):
+        aggregator.record("s1", 2, 0.4)
+        await session.advance(0.125)
+
+    events = session.received("active_speakers_changed")
+    assert events[-1]["stopped"] == [1]
+    assert events[-1]["active_speakers"] == [2]
+
+    # 退出した参加者は次の配信で発言者から外れる
+    aggregator.remove_participant("s1", 2)
+    await session.advance(0.125)
+    assert session.received("active_speakers_changed")[-1]["stopped"] == [2]
+
+    # 何も残っていないセッションは破棄される
+    await session.advance(0.125)
+    assert aggregator.get_stats()["active_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tick_rate_is_configurable_per_session(session):
+    aggregator = session.aggregator
+    aggregator.set_tick_rate("s1", 2)
+    assert aggregator.get_tick_rate("s1") == pytest.approx(2)
+    assert aggregator.get_tick_rate("s2") == pytest.approx(8)
+
+    aggregator.record("s1", 1, 0.5)
+    aggregator.record("s2", 1, 0.5)
+    await session.advance(0.125)
+    assert session.received("audio_levels") == []
+
+    await session.advance(0.375)
+    assert len(session.received("audio_levels")) == 1
+
+    with pytest.raises(ValidationException):
+        aggregator.set_tick_rate("s1", 0)
+
+    aggregator.set_tick_rate("s1", None)
+    assert aggregator.get_tick_rate("s1") == pytest.approx(8)
+
+
+@pytest.mark.asyncio
+async def test_hosts_and_moderators_set_rate_over_websocket(session, monkeypatch):
+    service = ParticipantManagementService()
+    service.active_sessions["s1"] = {
+        1: SimpleNamespace(role=ParticipantRole.HOST),
+        2: SimpleNamespace(role=ParticipantRole.MODERATOR),
+        3: SimpleNamespace(role=ParticipantRole.PARTICIPANT),
+    }
+    monkeypatch.setattr(message_handlers, "participant_management_service", service)
+    monkeypatch.setattr(message_handlers, "manager", session.manager)
+    monkeypatch.setattr(participant_module, "audio_level_aggregator", session.aggregator)
+
+    async def send(user_id: int, **fields):
+        await WebSocketMessageHandler.handle_message(
+            None,
+            {"type": "set_audio_level_rate", "session_id": "s1", **fields},
+            session.connections[user_id - 1],
+            SimpleNamespace(id=user_id),
+        )
+        await asyncio.sleep(0.01)
+
+    await send(1, tick_hz=2)
+    assert session.aggregator.get_tick_rate("s1") == pytest.approx(2)
+    assert session.received("audio_level_rate_updated", index=2)[-1]["tick_hz"] == pytest.approx(2)
+
+    # 一般参加者は変更できない
+    await send(3, tick_hz=20)
+    assert session.aggregator.get_tick_rate("s1") == pytest.approx(2)
+    assert session.received("control_error", index=2)
+
+    # 上限を超えるレートは拒否、0以下はペイロードの検証で弾く
+    await send(2, tick_hz=1000)
+    assert session.received("control_error", index=1)
+    await send(2, tick_hz=0)
+    assert session.received("error", index=1)
+    assert session.aggregator.get_tick_rate("s1") == pytest.approx(2)
+
+    # tick_hz を省略すると既定値に戻る
+    await send(2)
+    assert session.aggregator.get_tick_rate("s1") == pytest.approx(8)
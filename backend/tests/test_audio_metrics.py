@@ -0,0 +1,109 @@
+"""
+音声メトリクス計算（統合カーネル・バッチ）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from app.services.audio_processing_service import (
+    AudioChunk,
+    AudioProcessingService,
+    calculate_rms,
+    compute_audio_metrics,
+    compute_audio_metrics_batch,
+)
+
+
+def _reference(samples: np.ndarray):
+    """float64で計算した参照値"""
+    x = samples.astype(np.float64) / 32768.0
+    mean_power = np.mean(x**2)
+    variance = np.var(x)
+    snr = 10 * np.log10((mean_power + 1e-10) / (variance * 0.1 + 1e-10))
+    return np.sqrt(mean_power), np.max(np.abs(x)), snr
+
+
+def _tone(amplitude: float, count: int = 1600, offset: int = 0) -> np.ndarray:
+    t = np.arange(count)
+    return (np.sin(2 * np.pi * 440 * t / 16000) * amplitude * 32767 + offset).astype(np.int16)
+
+
+def test_loud_chunk_does_not_overflow():
+    samples = _tone(0.95)
+    metrics = compute_audio_metrics(samples.tobytes())
+    rms, peak, snr = _reference(samples)
+
+    assert metrics.rms == pytest.approx(rms)
+    assert metrics.peak == pytest.approx(peak)
+    assert metrics.snr == pytest.approx(snr)
+    assert metrics.is_speaking is True
+
+
+def test_full_scale_negative_peak_and_silence():
+    samples = np.array([-32768, 0, 100], dtype=np.int16)
+    assert compute_audio_metrics(samples.tobytes()).peak == 1.0
+
+    silence = compute_audio_metrics(np.zeros(1600, dtype=np.int16).tobytes())
+    assert silence.rms == 0.0
+    assert silence.snr == pytest.approx(0.0)
+    assert silence.is_speaking is False
+    assert compute_audio_metrics(b"").rms == 0.0
+
+
+def test_stereo_uses_left_channel():
+    left = _tone(0.5, 800)
+    stereo = np.column_stack([left, np.zeros_like(left)]).ravel()
+    assert calculate_rms(stereo.tobytes(), channels=2) == pytest.approx(
+        calculate_rms(left.tobytes())
+    )
+
+
+def test_batch_matches_single_chunk_kernel():
+    chunks = [
+        _tone(0.3).tobytes(),
+        _tone(0.9, 1200, offset=500).tobytes(),
+        np.zeros(400, dtype=np.int16).tobytes(),
+        b"\x01",  # 1バイトだけ（サンプルなし）
+        np.column_stack([_tone(0.2, 800), _tone(0.8, 800)]).ravel().tobytes(),
+    ]
+    channels = [1, 1, 1, 1, 2]
+
+    batch = compute_audio_metrics_batch(chunks, channels, speaking_threshold=0.05)
+    singles = [
+        compute_audio_metrics(chunk, ch, speaking_threshold=0.05)
+        for chunk, ch in zip(chunks, channels)
+    ]
+
+    assert len(batch) == len(chunks)
+    for got, expected in zip(batch, singles):
+        assert got.rms == pytest.approx(expected.rms)
+        assert got.peak == pytest.approx(expected.peak)
+        assert got.snr == pytest.approx(expected.snr)
+        assert got.is_speaking == expected.is_speaking
+    assert compute_audio_metrics_batch([]) == []
+
+
+@pytest.mark.asyncio
+async def test_process_audio_batch_records_levels():
+    from datetime import datetime
+
+    service = AudioProcessingService()
+    chunks = [
+        AudioChunk(
+            data=_tone(amplitude).tobytes(),
+            sample_rate=16000,
+            channels=1,
+            timestamp=datetime.now(),
+            chunk_id=f"chunk_{user_id}_0",
+            user_id=user_id,
+            session_id=f"s{user_id % 2}",
+        )
+        for user_id, amplitude in enumerate([0.0, 0.5, 0.001, 0.8])
+    ]
+
+    levels = await service.process_audio_batch(chunks)
+
+    assert [level.is_speaking for level in levels] == [False, True, False, True]
+    participants = await service.get_session_participants_audio_levels("s1")
+    assert set(participants) == {1, 3}
+    assert len(await service.get_audio_quality_metrics("s0")) == 2
@@ -0,0 +1,135 @@
+"""
+録音のストリーミング書き込みのテスト
+"""
+
+import os
+import wave
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.audio_processing_service import AudioChunk, AudioProcessingService
+from app.services.audio_recorder import WAV_HEADER_SIZE, AudioRecorder
+
+
+def _pcm(start: int, count: int) -> bytes:
+    return np.arange(start, start + count, dtype=np.int16).tobytes()
+
+
+def _read_wav(path: str):
+    with wave.open(path, "rb") as wav_file:
+        frames = wav_file.readframes(wav_file.getnframes())
+        return wav_file.getframerate(), wav_file.getnchannels(), frames
+
+
+@pytest.mark.asyncio
+async def test_one_file_per_speaker_with_patched_header(tmp_path):
+    recorder = AudioRecorder(base_dir=str(tmp_path))
+    now = datetime.now()
+    for i in range(5):
+        for user_id in (1, 2):
+            recorder.write("s1", user_id, _pcm(user_id * 100 + i * 10, 10), 16000, 1, now)
+
+    paths = await recorder.close_session("s1")
+
+    assert len(paths) == 2
+    assert sorted(os.listdir(tmp_path / "s1")) == sorted(os.path.basename(p) for p in paths)
+    for path in paths:
+        user_id = 1 if "audio_1_" in path else 2
+        rate, channels, frames = _read_wav(path)
+        assert (rate, channels) == (16000, 1)
+        assert frames == _pcm(user_id * 100, 50)
+        assert os.path.getsize(path) == WAV_HEADER_SIZE + 100
+
+    stats = recorder.get_stats()
+    assert stats["chunks"] == 10
+    assert stats["files_opened"] == stats["files_closed"] == 2
+    assert stats["open_tracks"] == 0
+    await recorder.close()
+
+
+@pytest.mark.asyncio
+async def test_rotation_by_size_duration_and_format(tmp_path):
+    recorder = AudioRecorder(base_dir=str(tmp_path), max_file_bytes=40)
+    timed = AudioRecorder(base_dir=str(tmp_path), max_file_seconds=0.002)
+    now = datetime.now()
+    # 20バイト×3 → 40バイトで切り替え
+    for i in range(3):
+        recorder.write("s1", 1, _pcm(i * 10, 10), 16000, 1, now)
+    # 16kHz で 0.002秒 = 32サンプル → 2チャンク目の後に切り替え
+    for i in range(3):
+        timed.write("s2", 1, _pcm(i * 20, 20), 16000, 1, now)
+    # サンプルレートが変わったら新しいファイル
+    recorder.write("s3", 1, _pcm(0, 4), 16000, 1, now)
+    recorder.write("s3", 1, _pcm(0, 4), 48000, 1, now)
+
+    s1 = await recorder.close_session("s1")
+    s2 = await timed.close_session("s2")
+    s3 = await recorder.close_session("s3")
+
+    assert [_read_wav(p)[2] for p in s1] == [_pcm(0, 20), _pcm(20, 10)]
+    assert [_read_wav(p)[2] for p in s2] == [_pcm(0, 40), _pcm(40, 20)]
+    assert [_read_wav(p)[0] for p in s3] == [16000, 48000]
+    assert recorder.get_stats()["rotations"] == 2
+    assert timed.get_stats()["rotations"] == 1
+    await recorder.close()
+    await timed.close()
+
+
+@pytest.mark.asyncio
+async def test_unavailable_format_falls_back_to_wav(tmp_path):
+    recorder = AudioRecorder(base_dir=str(tmp_path), audio_format="mp3")
+    assert recorder.audio_format == "wav"
+    await recorder.close()
+
+
+@pytest.mark.asyncio
+async def test_pending_limit_drops_chunks(tmp_path):
+    recorder = AudioRecorder(base_dir=str(tmp_path), max_pending_bytes=10)
+    recorder.write("s1", 1, _pcm(0, 10), 16000, 1, datetime.now())
+    assert recorder.get_stats()["dropped"] == 1
+    assert await recorder.close_session("s1") == []
+    await recorder.close()
+
+
+@pytest.mark.asyncio
+async def test_counters_stay_consistent_while_thread_drains(tmp_path):
+    recorder = AudioRecorder(base_dir=str(tmp_path))
+    now = datetime.now()
+    # ループ側の加算と書き込みスレッド側の減算・統計更新が並行する
+    for i in range(2000):
+        recorder.write("s1", i % 4, _pcm(i, 8), 16000, 1, now)
+
+    await recorder.close_session("s1")
+
+    stats = recorder.get_stats()
+    assert stats["pending_bytes"] == 0
+    assert stats["chunks"] == 2000
+    assert stats["bytes"] == 2000 * 16
+    await recorder.close()
+
+
+@pytest.mark.asyncio
+async def test_service_streams_recording_until_stopped(tmp_path):
+    recorder = AudioRecorder(base_dir=str(tmp_path))
+    service = AudioProcessingService(recorder=recorder)
+    await service.start_recording("s1")
+    for i in range(3):
+        await service._save_audio_chunk(
+            AudioChunk(
+                data=_pcm(i * 10, 10),
+                sample_rate=16000,
+                channels=1,
+                timestamp=datetime.now(),
+                chunk_id=f"chunk_1_{i}",
+                user_id=1,
+                session_id="s1",
+            )
+        )
+    await service.stop_recording("s1")
+
+    files = os.listdir(tmp_path / "s1")
+    assert len(files) == 1
+    assert _read_wav(str(tmp_path / "s1" / files[0]))[2] == _pcm(0, 30)
+    await recorder.close()
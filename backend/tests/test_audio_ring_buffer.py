@@ -0,0 +1,105 @@
+"""
+音声リングバッファのテスト
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.audio_processing_service import AudioBufferManager, AudioChunk
+from app.services.audio_ring_buffer import AudioRingBuffer
+
+
+def _pcm(start: int, count: int) -> bytes:
+    return np.arange(start, start + count, dtype=np.int16).tobytes()
+
+
+def test_wraparound_window_is_contiguous_view():
+    buffer = AudioRingBuffer(max_chunks=10, max_samples=10)
+    for i in range(7):
+        buffer.append(_pcm(i * 3, 3), timestamp=float(i), seq=i)
+
+    # 容量10サンプルに収まる最新3チャンク（9サンプル）だけが残る
+    assert len(buffer) == 3
+    assert buffer.sample_count == 9
+    window = buffer.window()
+    assert window.tolist() == list(range(12, 21))
+    # 折り返していてもコピーではなくビュー
+    assert window.base is not None
+    assert np.shares_memory(window, buffer._samples)
+
+    assert buffer.window(4).tolist() == [17, 18, 19, 20]
+    assert buffer.chunk_samples(0).tolist() == [12, 13, 14]
+    assert buffer.chunk_info(2)["seq"] == 6
+    assert buffer.timestamps().tolist() == [4.0, 5.0, 6.0]
+    assert buffer.evicted == 4
+
+
+def test_chunk_count_limit_and_odd_length():
+    buffer = AudioRingBuffer(max_chunks=2, max_samples=100)
+    buffer.append(b"abc", timestamp=1.0, chunk_id="a")
+    buffer.append(b"defg", timestamp=2.0, chunk_id="b")
+    buffer.append(b"hij", timestamp=3.0, chunk_id="c")
+
+    assert len(buffer) == 2
+    assert buffer.byte_size == 7
+    assert [buffer.chunk_info(i)["data"] for i in range(2)] == [b"defg", b"hij"]
+    assert [buffer.chunk_info(i)["chunk_id"] for i in range(2)] == ["b", "c"]
+
+
+def test_trim_and_average_latency():
+    buffer = AudioRingBuffer(max_chunks=10, max_samples=100)
+    base = 1_700_000_000.0
+    for i in range(4):
+        buffer.append(_pcm(0, 2), timestamp=base + i)
+
+    assert buffer.average_latency_ms(now=base + 4) == pytest.approx(2500.0)
+    assert buffer.trim_older_than(base + 2) == 2
+    assert buffer.average_latency_ms(now=base + 4) == pytest.approx(1500.0)
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.byte_size == 0
+    assert buffer.window().size == 0
+
+
+def test_memory_is_fixed():
+    buffer = AudioRingBuffer(max_chunks=5, max_samples=1600)
+    before = buffer.memory_bytes
+    for i in range(100):
+        buffer.append(_pcm(0, 800), timestamp=float(i))
+    assert buffer.memory_bytes == before
+    assert len(buffer) == 2
+
+
+@pytest.mark.asyncio
+async def test_manager_keeps_per_user_windows():
+    manager = AudioBufferManager(user_buffer_seconds=1.0)
+    now = datetime.now()
+    for i in range(3):
+        for user_id in (1, 2):
+            await manager.add_chunk(
+                "s1",
+                AudioChunk(
+                    data=_pcm(user_id * 1000 + i * 10, 10),
+                    sample_rate=16000,
+                    channels=1,
+                    timestamp=now,
+                    chunk_id=f"chunk_{user_id}_{i}",
+                    user_id=user_id,
+                    session_id="s1",
+                ),
+            )
+
+    assert len(manager.buffers["s1"]) == 6
+    window = manager.get_window("s1", 2)
+    assert window.tolist() == list(range(2000, 2030))
+    assert manager.get_window("s1", 1, duration_ms=1.25).tolist() == list(range(1010, 1030))
+    assert manager.buffers["s1"].chunk_info(5)["seq"] == 2
+
+    chunks = await manager.get_chunks("s1", limit=2)
+    assert [chunk.user_id for chunk in chunks] == [1, 2]
+
+    await manager.remove_session("s1")
+    assert manager.get_window("s1", 1).size == 0
@@ -0,0 +1,120 @@
+"""
+ワーカー間ブロードキャスト（バックプレーン）のテスト
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from app.core.backplane import (
+    TARGET_SESSION,
+    BackplaneMessage,
+    InMemoryBackplane,
+    session_channel,
+)
+from app.core.websocket import ConnectionManager
+
+
+async def _connect(manager: ConnectionManager, user_id: int, ws, session_id="s1"):
+    return await manager.connect(ws, session_id, SimpleNamespace(id=user_id))
+
+
+@pytest_asyncio.fixture
+async def workers():
+    """同じハブを共有する2つのワーカー（ConnectionManager）"""
+    hub = {}
+    managers = []
+    for _ in range(2):
+        m = ConnectionManager()
+        m.backplane = InMemoryBackplane(hub)
+        await m.start_backplane()
+        managers.append(m)
+    yield managers
+    for m in managers:
+        for connection_id in list(m.active_connections):
+            await m.disconnect(connection_id)
+        await m.stop_backplane()
+
+
+@pytest.mark.asyncio
+async def test_session_broadcast_reaches_other_worker(workers, fake_websocket):
+    a, b = workers
+    sender = fake_websocket()
+    local, remote = fake_websocket(), fake_websocket()
+    sender_id = await _connect(a, 1, sender)
+    await _connect(a, 2, local)
+    await _connect(b, 3, remote)
+
+    stats = await a.broadcast_to_session(
+        {"type": "chat"}, "s1", exclude_connection=sender_id
+    )
+    await asyncio.sleep(0.01)
+
+    # 戻り値は自ワーカー分の配信統計
+    assert stats["recipients"] == 1
+    assert sender.sent_text == []
+    assert local.sent_text == ['{"type": "chat"}']
+    assert remote.sent_text == ['{"type": "chat"}']
+    assert a.backplane.stats["published"] == 1
+    assert b.backplane.stats["received"] == 1
+
+
+@pytest.mark.asyncio
+async def test_user_message_reaches_other_worker_only_when_subscribed(
+    workers, fake_websocket
+):
+    a, b = workers
+    on_b = fake_websocket()
+    connection_id = await _connect(b, 7, on_b)
+
+    await a.broadcast_to_user({"type": "notify"}, 7)
+    await asyncio.sleep(0.01)
+    assert on_b.sent_text == ['{"type": "notify"}']
+
+    # 最後の接続が切れたら購読も解除される
+    await b.disconnect(connection_id)
+    assert b.backplane.channels == set()
+    await a.broadcast_to_user({"type": "notify"}, 7)
+    assert b.backplane.stats["received"] == 1
+
+
+@pytest.mark.asyncio
+async def test_own_messages_are_ignored():
+    backplane = InMemoryBackplane()
+    received = []
+
+    async def handler(message):
+        received.append(message)
+
+    await backplane.start(handler)
+    backplane.subscribe(session_channel("s1"))
+    await backplane._receive(
+        BackplaneMessage(
+            origin=backplane.node_id,
+            target=TARGET_SESSION,
+            key="s1",
+            payload="{}",
+            message_class="control",
+        )
+    )
+
+    assert received == []
+    assert backplane.stats["ignored_own"] == 1
+
+
+def test_message_json_roundtrip_keeps_binary_payload():
+    message = BackplaneMessage(
+        origin="node",
+        target=TARGET_SESSION,
+        key="s1",
+        payload=b"\x00\x01audio",
+        message_class="audio",
+        exclude_connection="c1",
+    )
+
+    decoded = BackplaneMessage.from_json(message.to_json())
+
+    assert decoded == message
+    assert decoded.channel == session_channel("s1")
@@ -282,6 +282,46 @@ class TestAnnouncementService:
         # 優先度の高い順にソートされていることを確認
         assert announcements[0].priority == AnnouncementPriority.URGENT
 
+    @pytest.mark.asyncio
+    async def test_get_active_announcements_filters_session_and_dismissed(
+        self, announcement_service
+    ):
+        """セッション・却下済みでのアクティブアナウンスメント絞り込みテスト"""
+        own = await announcement_service.create_announcement(
+            announcement_type=AnnouncementType.GENERAL,
+            title="セッション1",
+            content="内容",
+            sender="送信者",
+            session_id="s1",
+        )
+        await announcement_service.create_announcement(
+            announcement_type=AnnouncementType.GENERAL,
+            title="セッション2",
+            content="内容",
+            sender="送信者",
+            session_id="s2",
+            priority=AnnouncementPriority.URGENT,
+        )
+        global_announcement = await announcement_service.create_announcement(
+            announcement_type=AnnouncementType.GENERAL,
+            title="全体",
+            content="内容",
+            sender="送信者",
+            priority=AnnouncementPriority.HIGH,
+        )
+
+        await announcement_service.dismiss_announcement(global_announcement.id, 1)
+
+        titles = [
+            a.title
+            for a in await announcement_service.get_active_announcements(session_id="s1")
+        ]
+        assert titles == ["全体", "セッション1"]
+        announcements = await announcement_service.get_active_announcements(
+            user_id=1, session_id="s1"
+        )
+        assert [a.id for a in announcements] == [own.id]
+
     @pytest.mark.asyncio
     async def test_cleanup_expired_announcements(self, announcement_service):
         """期限切れアナウンスメントクリーンアップテスト"""
@@ -0,0 +1,158 @@
+"""
+ConnectionManagerのブロードキャストエンジンのテスト
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from app.core.websocket import ConnectionManager
+
+
+async def _connect(manager: ConnectionManager, user_id: int, ws, session_id="s1"):
+    user = SimpleNamespace(id=user_id)
+    return await manager.connect(ws, session_id, user)
+
+
+@pytest_asyncio.fixture
+async def manager():
+    m = ConnectionManager()
+    m.max_connections_per_session = 500
+    m.send_timeout = 0.05
+    yield m
+    for connection_id in list(m.active_connections):
+        await m.disconnect(connection_id)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_serializes_once_and_delivers_to_all(
+    manager, monkeypatch, fake_websocket
+):
+    sockets = [fake_websocket() for _ in range(5)]
+    for i, ws in enumerate(sockets):
+        await _connect(manager, i, ws)
+
+    calls = []
+    real_dumps = json.dumps
+
+    def counting_dumps(obj, *args, **kwargs):
+        calls.append(obj)
+        return real_dumps(obj, *args, **kwargs)
+
+    monkeypatch.setattr("app.core.websocket.json.dumps", counting_dumps)
+
+    stats = await manager.broadcast_to_session({"type": "test"}, "s1")
+    await asyncio.sleep(0.01)
+
+    assert len(calls) == 1
+    assert stats["recipients"] == 5
+    assert stats["queued"] == 5
+    assert stats["evicted"] == 0
+    assert all(ws.sent_text == ['{"type": "test"}'] for ws in sockets)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_excludes_sender(manager, fake_websocket):
+    sockets = [fake_websocket() for _ in range(3)]
+    connection_ids = [await _connect(manager, i, ws) for i, ws in enumerate(sockets)]
+
+    stats = await manager.broadcast_to_session(
+        {"type": "test"}, "s1", exclude_connection=connection_ids[0]
+    )
+    await asyncio.sleep(0.01)
+
+    assert stats["queued"] == 2
+    assert sockets[0].sent_text == []
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted_without_stalling_others(
+    manager, fake_websocket
+):
+    fast = [fake_websocket() for _ in range(10)]
+    slow = fake_websocket(delay=1.0)
+    for i, ws in enumerate(fast):
+        await _connect(manager, i, ws)
+    slow_id = await _connect(manager, 99, slow)
+
+    stats = await manager.broadcast_to_session({"type": "test"}, "s1")
+
+    # プロデューサーは送信完了を待たずに戻る
+    assert stats["queued"] == 11
+    assert stats["duration_ms"] < 50
+
+    await asyncio.sleep(0.1)
+    assert all(len(ws.sent_text) == 1 for ws in fast)
+    assert slow_id not in manager.active_connections
+    assert slow_id not in manager.session_connections["s1"]
+    await asyncio.sleep(0.01)
+    assert slow.closed
+
+
+@pytest.mark.asyncio
+async def test_failed_send_evicts_connection(manager, fake_websocket):
+    ok = fake_websocket()
+    broken = fake_websocket(fail=True)
+    await _connect(manager, 1, ok)
+    broken_id = await _connect(manager, 2, broken)
+
+    await manager.broadcast_to_session({"type": "test"}, "s1")
+    await asyncio.sleep(0.01)
+
+    assert ok.sent_text == ['{"type": "test"}']
+    assert broken_id not in manager.connection_info
+    assert broken.closed
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_user_reaches_all_user_connections(manager, fake_websocket):
+    first, second, other = fake_websocket(), fake_websocket(), fake_websocket()
+    await _connect(manager, 1, first, "s1")
+    await _connect(manager, 1, second, "s2")
+    await _connect(manager, 2, other, "s1")
+
+    stats = await manager.broadcast_to_user({"type": "notify"}, 1)
+    await asyncio.sleep(0.01)
+
+    assert stats["queued"] == 2
+    assert first.sent_text and second.sent_text
+    assert other.sent_text == []
+
+
+@pytest.mark.asyncio
+async def test_connection_without_queue_is_sent_directly(manager, fake_websocket):
+    fast, slow = fake_websocket(), fake_websocket(delay=1.0)
+    manager.active_connections = {"a": fast, "b": slow}
+    manager.session_connections = {"s1": {"a", "b"}}
+
+    stats = await manager.broadcast_to_session({"type": "test"}, "s1")
+
+    assert stats["delivered"] == 1
+    assert stats["timed_out"] == 1
+    assert stats["evicted"] == 1
+    assert "b" not in manager.active_connections
+
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_writer_task(manager, fake_websocket):
+    connection_id = await _connect(manager, 1, fake_websocket())
+    writer = manager.writer_tasks[connection_id]
+
+    await manager.disconnect(connection_id)
+    await asyncio.sleep(0)
+
+    assert writer.done()
+    assert connection_id not in manager.outbound_queues
+
+
+@pytest.mark.asyncio
+async def test_broadcast_stats_are_recorded(manager, fake_websocket):
+    await _connect(manager, 1, fake_websocket())
+    await manager.broadcast_to_session({"type": "test"}, "s1")
+
+    stats = await manager.get_performance_stats()
+    assert stats["broadcast_times"]["total_broadcasts"] == 1
+    assert stats["broadcast_times"]["sample_count"] == 1
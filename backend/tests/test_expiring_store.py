@@ -0,0 +1,94 @@
+"""
+有効期限付きアイテムストアのテスト
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.expiring_store import ExpiringItemStore
+
+
+def _item(item_id, expires_in=None, now=1000.0):
+    expires_at = datetime.fromtimestamp(now + expires_in) if expires_in is not None else None
+    return SimpleNamespace(id=item_id, expires_at=expires_at)
+
+
+def _ids(items):
+    return [item.id for item in items]
+
+
+def _store(clock, **kwargs):
+    return ExpiringItemStore(clock=lambda: clock.now, **kwargs)
+
+
+def test_indexes_by_user_and_session_newest_first():
+    clock = SimpleNamespace(now=1000.0)
+    store = _store(clock)
+    store.add(_item("a"), user_ids=[1, 2], session_id="s1")
+    store.add(_item("b"), user_ids=[1], session_id="s2")
+    store.add(_item("c"), user_ids=[2, 2], session_id="s1")
+
+    assert _ids(store.for_user(1)) == ["b", "a"]
+    assert _ids(store.for_user(2)) == ["c", "a"]
+    assert _ids(store.for_session("s1")) == ["c", "a"]
+    assert list(store.for_user(3)) == []
+    assert store.get("b").id == "b"
+
+
+def test_expire_removes_only_due_items_from_every_index():
+    clock = SimpleNamespace(now=1000.0)
+    expired = []
+    store = _store(clock, on_expire=expired.append)
+    store.add(_item("short", 10), user_ids=[1], session_id="s1", priority="urgent")
+    store.add(_item("long", 60), user_ids=[1], session_id="s1")
+    store.add(_item("forever"), user_ids=[1], session_id="s1")
+    store.dismiss("short", 1)
+
+    clock.now = 1030.0
+    assert store.get("short") is None
+    assert _ids(expired) == ["short"]
+    assert _ids(store.for_user(1)) == ["forever", "long"]
+    assert _ids(store.ranked()) == ["forever", "long"]
+    assert store.dismissed(1) == set()
+
+    assert _ids(store.expire(now=2000.0)) == ["long"]
+    assert store.get_stats()["items"] == 1
+    assert store.get_stats()["expired"] == 2
+
+
+def test_ranked_orders_by_priority_then_newest_and_filters_session():
+    clock = SimpleNamespace(now=1000.0)
+    store = _store(clock)
+    store.add(_item("low"), priority="low")
+    store.add(_item("normal-s1"), session_id="s1")
+    store.add(_item("urgent-s2"), session_id="s2", priority="urgent")
+    store.add(_item("normal"))
+    store.add(_item("high-s1"), session_id="s1", priority="high")
+
+    assert _ids(store.ranked()) == ["urgent-s2", "high-s1", "normal", "normal-s1", "low"]
+    assert _ids(store.ranked("s1")) == ["high-s1", "normal", "normal-s1", "low"]
+    assert _ids(store.ranked("missing")) == ["normal", "low"]
+
+
+def test_dismissals_are_tracked_per_user():
+    clock = SimpleNamespace(now=1000.0)
+    store = _store(clock)
+    store.add(_item("a"))
+
+    assert store.dismiss("a", 1) is True
+    assert store.dismiss("a", 1) is False
+    assert store.dismiss("missing", 1) is False
+    assert store.dismissed(1) == {"a"}
+    assert store.dismissed(2) == set()
+
+
+def test_readding_an_id_ignores_the_old_expiry():
+    clock = SimpleNamespace(now=1000.0)
+    store = _store(clock)
+    store.add(_item("a", 10), user_ids=[1])
+    store.add(_item("a", 100), user_ids=[2])
+
+    clock.now = 1050.0
+    assert store.get("a") is not None
+    assert list(store.for_user(1)) == []
+    assert _ids(store.for_user(2)) == ["a"]
@@ -0,0 +1,84 @@
+"""
+WebSocketMessageHandler.handle_message のディスパッチテーブルのテスト
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core import message_handlers
+from app.core.message_handlers import (
+    WebSocketMessageHandler,
+    get_handler_latency_stats,
+    initialize_message_handlers,
+)
+
+
+@pytest.fixture
+def user():
+    return SimpleNamespace(id=42, display_name="U")
+
+
+def test_initialize_is_idempotent():
+    initialize_message_handlers()
+    before = dict(message_handlers._dispatch_table)
+    initialize_message_handlers()
+
+    assert message_handlers._dispatch_table.keys() == before.keys()
+    assert {"join_session", "audio_data", "chat_message", "ping"} <= set(before)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_passes_message_fields_and_records_latency(user):
+    with patch.object(
+        WebSocketMessageHandler, "handle_chat_message", new_callable=AsyncMock
+    ) as handler:
+        await WebSocketMessageHandler.handle_message(
+            None,
+            {"type": "chat_message", "session_id": "s1", "message": "hello"},
+            "c1",
+            user,
+        )
+
+    handler.assert_awaited_once_with("s1", "c1", user, "hello", "text")
+    assert get_handler_latency_stats()["chat_message"]["count"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_type_reports_error(user):
+    with patch(
+        "app.core.message_handlers.manager.send_personal_message",
+        new_callable=AsyncMock,
+    ) as send:
+        await WebSocketMessageHandler.handle_message(
+            None, {"type": "no_such_type"}, "c1", user
+        )
+
+    message, connection_id = send.await_args.args
+    assert message["type"] == "error"
+    assert connection_id == "c1"
+
+
+@pytest.mark.asyncio
+async def test_invalid_payload_is_rejected_before_handler(user):
+    with patch.object(
+        WebSocketMessageHandler, "handle_chat_message", new_callable=AsyncMock
+    ) as handler, patch(
+        "app.core.message_handlers.manager.send_personal_message",
+        new_callable=AsyncMock,
+    ) as send:
+        await WebSocketMessageHandler.handle_message(
+            None, {"type": "chat_message", "session_id": "s1"}, "c1", user
+        )
+
+    handler.assert_not_awaited()
+    message, connection_id = send.await_args.args
+    assert message == {"type": "error", "message": "Invalid message: chat_message"}
+    assert connection_id == "c1"
+    # ping 以外のタイプにはスキーマが登録されている
+    assert {
+        message_type
+        for message_type, entry in message_handlers._dispatch_table.items()
+        if entry.schema is None
+    } == {"ping"}
@@ -5,7 +5,7 @@ from unittest.mock import AsyncMock, patch
 from datetime import datetime
 from types import SimpleNamespace
 
-from app.core.message_router import MessageRouter
+from app.core.message_router import MessageRouter, RateLimiter, RedisRateLimiter
 from app.schemas.websocket import WebSocketMessageType, MessagePriority
 
 
@@ -118,6 +118,76 @@ async def test_rate_limiter_respects_priority(router: MessageRouter, user):
     assert allowed == 30
 
 
+@pytest.mark.asyncio
+async def test_rate_limiter_buckets_are_per_priority_and_refill(fake_clock):
+    clock = fake_clock()
+    limiter = RateLimiter(clock=clock)
+
+    results = [await limiter.is_allowed(1, MessagePriority.LOW) for _ in range(11)]
+    assert results.count(True) == 10
+    # 他の優先度・他のユーザーは影響を受けない
+    assert await limiter.is_allowed(1, MessagePriority.NORMAL) is True
+    assert await limiter.is_allowed(2, MessagePriority.LOW) is True
+
+    # LOWは10回/分 → 6秒で1トークン回復
+    clock.now += 6.0
+    assert await limiter.is_allowed(1, MessagePriority.LOW) is True
+    assert await limiter.is_allowed(1, MessagePriority.LOW) is False
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_evicts_idle_buckets(fake_clock):
+    clock = fake_clock()
+    limiter = RateLimiter(clock=clock)
+
+    for user_id in range(100):
+        await limiter.is_allowed(user_id, MessagePriority.NORMAL)
+    assert len(limiter.buckets) == 100
+
+    clock.now += limiter.idle_ttl
+    await limiter.is_allowed(999, MessagePriority.NORMAL)
+
+    assert list(limiter.buckets) == [(999, MessagePriority.NORMAL)]
+    assert limiter.get_stats()["evicted"] == 100
+
+
+class FakeRedis:
+    def __init__(self, results=None, error=None):
+        self.results = list(results or [])
+        self.error = error
+        self.calls = []
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls.append((keys, args))
+            if self.error:
+                raise self.error
+            return self.results.pop(0)
+
+        return run
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limiter_uses_shared_bucket():
+    redis = FakeRedis(results=[1, 0])
+    limiter = RedisRateLimiter(redis_client=redis)
+
+    assert await limiter.is_allowed(7, MessagePriority.HIGH) is True
+    assert await limiter.is_allowed(7, MessagePriority.HIGH) is False
+    assert redis.calls[0] == (["ratelimit:7:high"], [60, 60000])
+    assert limiter.get_stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limiter_falls_back_to_memory():
+    limiter = RedisRateLimiter(redis_client=FakeRedis(error=ConnectionError("down")))
+
+    results = [await limiter.is_allowed(7, MessagePriority.LOW) for _ in range(11)]
+
+    assert results.count(True) == 10
+    assert limiter.get_stats()["fallbacks"] == 11
+
+
 @pytest.mark.asyncio
 async def test_priority_processing_order(router: MessageRouter, user):
     processed: list[tuple[str, str]] = []
@@ -167,3 +237,189 @@ async def test_no_handler_counts_failed(router: MessageRouter, user):
 
     stats = router.get_stats()
     assert stats["messages_failed"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_heap_dispatches_in_priority_order(user):
+    router = MessageRouter(worker_count=1)
+    processed: list[str] = []
+
+    async def handler(queued):
+        processed.append(queued.priority.value)
+
+    router.register_handler(WebSocketMessageType.TEXT_MESSAGE, handler)
+
+    for priority in ["low", "normal", "high", "urgent", "normal"]:
+        await router.route_message(
+            {
+                "type": WebSocketMessageType.TEXT_MESSAGE,
+                "session_id": "s1",
+                "content": priority,
+                "priority": priority,
+            },
+            user,
+            "s1",
+            "c1",
+        )
+
+    await router.start_processing()
+    await asyncio.sleep(0.05)
+    await router.stop_processing()
+
+    assert processed == ["urgent", "high", "normal", "normal", "low"]
+    stats = router.get_stats()
+    assert stats["queue_sizes"]["normal"] == 0
+    assert stats["wait_time_ms_histograms"]["normal"]["count"] == 2
+    assert stats["queue_depth_histogram"]["count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_unknown_or_missing_priority_defaults_to_normal(router: MessageRouter, user):
+    for priority in ("urgent", MessagePriority.HIGH, "bogus", None):
+        message = {
+            "type": WebSocketMessageType.TEXT_MESSAGE,
+            "session_id": "s1",
+            "content": "hi",
+        }
+        if priority is not None:
+            message["priority"] = priority
+        assert await router.route_message(message, user, "s1", "c1")
+
+    queued = sorted(router._heap)
+    assert [entry[0] for entry in queued] == [0, 1, 2, 2]
+    assert [entry[2].priority for entry in queued] == [
+        MessagePriority.URGENT,
+        MessagePriority.HIGH,
+        MessagePriority.NORMAL,
+        MessagePriority.NORMAL,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_retry_does_not_block_other_messages(user):
+    router = MessageRouter(worker_count=1)
+    processed: list[str] = []
+
+    async def handler(queued):
+        if queued.message["content"] == "flaky":
+            raise RuntimeError("boom")
+        processed.append(queued.message["content"])
+
+    router.register_handler(WebSocketMessageType.TEXT_MESSAGE, handler)
+
+    for content in ["flaky", "ok"]:
+        await router.route_message(
+            {"type": WebSocketMessageType.TEXT_MESSAGE, "session_id": "s1", "content": content},
+            user,
+            "s1",
+            "c1",
+        )
+
+    await router.start_processing()
+    await asyncio.sleep(0.05)
+    stats = router.get_stats()
+    await router.stop_processing()
+
+    # 失敗したメッセージは遅延キューで待機し、後続は処理される
+    assert processed == ["ok"]
+    assert stats["delayed_retries"] == 1
+    assert stats["messages_retried"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_messages_dropped_at_dequeue(user):
+    router = MessageRouter(worker_count=1)
+    processed: list[str] = []
+
+    async def handler(queued):
+        processed.append(queued.id)
+
+    router.register_handler(WebSocketMessageType.TEXT_MESSAGE, handler)
+    await router.route_message(
+        {"type": WebSocketMessageType.TEXT_MESSAGE, "session_id": "s1", "content": "x"},
+        user,
+        "s1",
+        "c1",
+    )
+    router._heap[0][2].expires_at = datetime(2000, 1, 1)
+
+    await router.start_processing()
+    await asyncio.sleep(0.05)
+    await router.stop_processing()
+
+    assert processed == []
+    assert router.get_stats()["messages_expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_delay_queue_requeues_when_due(user):
+    router = MessageRouter(worker_count=1)
+    processed: list[str] = []
+
+    async def handler(queued):
+        processed.append(queued.id)
+
+    router.register_handler(WebSocketMessageType.TEXT_MESSAGE, handler)
+    await router.route_message(
+        {"type": WebSocketMessageType.TEXT_MESSAGE, "session_id": "s1", "content": "x"},
+        user,
+        "s1",
+        "c1",
+    )
+    _, _, queued = router._heap.pop()
+    router.queue_depths[queued.priority] -= 1
+
+    await router.start_processing()
+    router._schedule_retry(queued, 0.02)
+    await asyncio.sleep(0.005)
+    assert processed == []
+    await asyncio.sleep(0.05)
+    await router.stop_processing()
+
+    assert processed == [queued.id]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_table_records_latency_and_accepts_string_types(user):
+    router = MessageRouter(worker_count=1)
+    received: list[str] = []
+
+    async def handler(queued):
+        received.append(queued.message["type"])
+
+    router.register_handler("custom_event", handler)
+    router.register_handler(WebSocketMessageType.TEXT_MESSAGE, handler)
+    assert set(router.dispatch_table) == {"custom_event", "text_message"}
+
+    await router.route_message(
+        {"type": "text_message", "session_id": "s1", "content": "hi"}, user, "s1", "c1"
+    )
+    await router.route_message({"type": "custom_event"}, user, "s1", "c1")
+
+    await router.start_processing()
+    await asyncio.sleep(0.05)
+    await router.stop_processing()
+
+    assert received == ["text_message", "custom_event"]
+    latency = router.get_stats()["handler_latency_ms"]
+    assert latency["text_message"]["count"] == 1
+    assert latency["custom_event"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_table_schema_rejects_invalid_message(user):
+    from app.schemas.websocket import PollVoteMessage
+
+    router = MessageRouter()
+
+    async def handler(queued):
+        pass
+
+    router.register_handler(WebSocketMessageType.POLL_VOTE, handler, schema=PollVoteMessage)
+
+    ok = await router.route_message(
+        {"type": WebSocketMessageType.POLL_VOTE, "session_id": "s1"}, user, "s1", "c1"
+    )
+
+    assert ok is False
+    assert router.get_stats()["messages_rejected"] == 1
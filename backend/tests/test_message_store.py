@@ -0,0 +1,197 @@
+"""
+セッション別メッセージ履歴ストアのテスト
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.message_store import SessionMessageStore
+from app.services.messaging_service import MessagingService
+
+
+def _message(i, content=None):
+    return SimpleNamespace(id=f"s1_{i}", content=content or f"message {i}", deleted_at=None)
+
+
+def _ids(messages):
+    return [message.id for message in messages]
+
+
+def _filled_store(count, max_messages=1000):
+    store = SessionMessageStore(max_messages)
+    for i in range(1, count + 1):
+        store.append(_message(i))
+    return store
+
+
+def test_ring_evicts_oldest_and_keeps_lookup_consistent():
+    store = SessionMessageStore(max_messages=3)
+    for i in range(1, 6):
+        store.append(_message(i, f"hello {i}"))
+
+    assert len(store) == 3
+    assert store.evicted == 2
+    assert store.get("s1_1") is None
+    assert store.get("s1_4").content == "hello 4"
+    assert _ids(store.page(0, 10)) == ["s1_3", "s1_4", "s1_5"]
+    # 破棄されたメッセージは検索インデックスからも消える
+    assert _ids(store.search("hello", 10)) == ["s1_3", "s1_4", "s1_5"]
+    assert _ids(store.search("hello 1", 10)) == []
+
+
+def test_page_skips_tombstones():
+    store = _filled_store(10)
+    for i in (2, 3, 7):
+        assert store.mark_deleted(store.get(f"s1_{i}")) is True
+    assert store.mark_deleted(store.get("s1_3")) is False
+
+    active = [f"s1_{i}" for i in range(1, 11) if i not in (2, 3, 7)]
+    assert len(store) == 7
+    assert store.deleted_count == 3
+    for offset in range(8):
+        for limit in (1, 2, 5):
+            assert _ids(store.page(offset, limit)) == active[offset : offset + limit]
+    assert _ids(store.latest(2)) == ["s1_9", "s1_10"]
+    # 削除済みでもIDでは引ける（編集・削除の権限チェック用）
+    assert store.get("s1_2") is not None
+
+
+def test_tombstones_are_dropped_on_eviction():
+    store = _filled_store(4, max_messages=4)
+    store.mark_deleted(store.get("s1_1"))
+    store.mark_deleted(store.get("s1_3"))
+
+    store.append(_message(5))
+    store.append(_message(6))
+
+    assert store.deleted_count == 1
+    assert _ids(store.page(0, 10)) == ["s1_4", "s1_5", "s1_6"]
+
+
+def test_page_after_ring_wraps_around():
+    store = _filled_store(11, max_messages=5)
+    for i in (8, 10):
+        store.mark_deleted(store.get(f"s1_{i}"))
+    store.append(_message(12))
+
+    active = ["s1_9", "s1_11", "s1_12"]
+    assert len(store) == 3
+    for offset in range(4):
+        assert _ids(store.page(offset, 10)) == active[offset:]
+    assert _ids(store.latest(2)) == ["s1_11", "s1_12"]
+
+
+def test_search_substring_case_insensitive_latest_first():
+    store = SessionMessageStore()
+    contents = ["Hello World", "say hello", "unrelated", "HELLO again", "hi", "ohi"]
+    for i, content in enumerate(contents, start=1):
+        store.append(_message(i, content))
+
+    assert _ids(store.search("hello", 10)) == ["s1_1", "s1_2", "s1_4"]
+    assert _ids(store.search("hello", 2)) == ["s1_2", "s1_4"]
+    assert _ids(store.search("LO WOR", 10)) == ["s1_1"]
+    # インデックスを使わない短いクエリ
+    assert _ids(store.search("hi", 10)) == ["s1_5", "s1_6"]
+    assert _ids(store.search("", 2)) == ["s1_5", "s1_6"]
+    assert store.search("missing", 10) == []
+
+
+def test_search_follows_edits_and_deletes():
+    store = SessionMessageStore()
+    first, second = _message(1, "draft text"), _message(2, "draft plan")
+    store.append(first)
+    store.append(second)
+
+    first.content = "final text"
+    store.reindex(first)
+    store.mark_deleted(second)
+
+    assert store.search("draft", 10) == []
+    assert _ids(store.search("final", 10)) == ["s1_1"]
+    assert store.get_stats()["index_terms"] == len(
+        {"final text"[i : i + 3] for i in range(len("final text") - 2)}
+    )
+
+
+@pytest.mark.asyncio
+async def test_messaging_service_uses_store_and_persistence_hook():
+    hook = AsyncMock()
+    service = MessagingService(max_messages=2, persistence=hook)
+
+    with patch("app.services.messaging_service.manager") as manager:
+        manager.broadcast_to_session = AsyncMock()
+        first = await service.send_text_message("s1", 1, "first")
+        second = await service.send_text_message("s1", 2, "second")
+        await service.send_text_message("s1", 1, "third")
+        await service.edit_message("s1", second.id, 2, "second edited")
+        await service.delete_message("s1", second.id, 2)
+
+        with pytest.raises(PermissionError):
+            await service.delete_message("s1", "s1_3", 2)
+        with pytest.raises(ValueError):
+            await service.edit_message("s1", first.id, 1, "gone")
+
+    await service.flush()
+    assert [m.content for m in await service.get_session_messages("s1")] == ["third"]
+    assert await service.search_messages("s1", "second") == []
+    assert [call.args[0] for call in hook.await_args_list] == [
+        "created",
+        "created",
+        "created",
+        "edited",
+        "deleted",
+    ]
+    assert service.get_stats()["evicted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_persistence_failure_does_not_break_sending():
+    service = MessagingService(persistence=AsyncMock(side_effect=RuntimeError("db down")))
+
+    with patch("app.services.messaging_service.manager") as manager:
+        manager.broadcast_to_session = AsyncMock()
+        message = await service.send_text_message("s1", 1, "hello")
+        await service.flush()
+
+    assert manager.broadcast_to_session.await_count == 1
+    assert service.get_stats()["failed_writes"] == 1
+    assert (await service.get_session_messages("s1"))[0].id == message.id
+
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_wait_for_persistence():
+    release = asyncio.Event()
+    written = []
+
+    async def hook(event, message):
+        await release.wait()
+        written.append((event, message.content))
+
+    service = MessagingService(persistence=hook)
+
+    with patch("app.services.messaging_service.manager") as manager:
+        manager.broadcast_to_session = AsyncMock()
+        message = await asyncio.wait_for(
+            service.send_text_message("s1", 1, "hello"), timeout=1
+        )
+        await service.edit_message("s1", message.id, 1, "hello again")
+        await service.delete_message("s1", message.id, 1)
+
+    # 書き込みが止まっていても配信は済んでいる
+    assert manager.broadcast_to_session.await_count == 3
+    assert written == []
+    assert service.get_stats()["pending_writes"] == 3
+
+    release.set()
+    await service.flush()
+
+    # 書き込みは発生順
+    assert written == [
+        ("created", "hello"),
+        ("edited", "hello again"),
+        ("deleted", "hello again"),
+    ]
+    assert service.get_stats()["pending_writes"] == 0
@@ -0,0 +1,116 @@
+"""
+接続ごとの送信キューのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.outbound_queue import (
+    MessageClass,
+    OutboundClassConfig,
+    OutboundQueue,
+    OverflowPolicy,
+)
+
+
+def make_queue(policy: OverflowPolicy, max_items: int = 3, max_bytes: int = 1024):
+    return OutboundQueue(
+        {MessageClass.CHAT: OutboundClassConfig(max_items, policy)}, max_bytes
+    )
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_messages():
+    queue = make_queue(OverflowPolicy.DROP_OLDEST)
+    for i in range(5):
+        assert queue.enqueue(f"m{i}", MessageClass.CHAT)
+
+    assert len(queue) == 3
+    assert queue.dropped == 2
+    assert [await queue.get() for _ in range(3)] == ["m2", "m3", "m4"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_latest_replaces_pending_message_with_same_key():
+    queue = make_queue(OverflowPolicy.COALESCE_LATEST)
+    queue.enqueue("level=0.1", MessageClass.CHAT, coalesce_key="u1")
+    queue.enqueue("other", MessageClass.CHAT, coalesce_key="u2")
+    queue.enqueue("level=0.9", MessageClass.CHAT, coalesce_key="u1")
+
+    assert len(queue) == 2
+    assert queue.coalesced == 1
+    assert await queue.get() == "level=0.9"
+    assert await queue.get() == "other"
+
+    # 送信済みのキーは再度積める
+    queue.enqueue("level=0.5", MessageClass.CHAT, coalesce_key="u1")
+    assert await queue.get() == "level=0.5"
+
+
+def test_disconnect_policy_rejects_on_overflow():
+    queue = make_queue(OverflowPolicy.DISCONNECT, max_items=2)
+    assert queue.enqueue("a", MessageClass.CHAT)
+    assert queue.enqueue("b", MessageClass.CHAT)
+    assert queue.enqueue("c", MessageClass.CHAT) is False
+
+
+def test_byte_limit_is_a_hard_bound():
+    queue = make_queue(OverflowPolicy.DROP_OLDEST, max_items=100, max_bytes=10)
+    for _ in range(10):
+        queue.enqueue("abcd", MessageClass.CHAT)
+
+    assert queue.queued_bytes <= 10
+    assert len(queue) == 2
+
+
+@pytest.mark.asyncio
+async def test_byte_overflow_never_drops_higher_priority_classes():
+    queue = OutboundQueue(max_bytes=10)
+    queue.enqueue("ctrl", MessageClass.CONTROL)
+    queue.enqueue("note", MessageClass.NOTIFICATION)
+
+    # 通知を捨てて音声を積む
+    assert queue.enqueue("aud1", MessageClass.AUDIO)
+    assert queue.dropped == 1
+    # 古い音声を捨てても足りなければ、制御メッセージは捨てずに積もうとした音声を捨てる
+    assert queue.enqueue("aud2-long", MessageClass.AUDIO)
+    assert queue.dropped == 3
+
+    assert await queue.get() == "ctrl"
+    assert len(queue) == 0
+
+
+def test_disconnect_only_when_own_class_overflows_bytes():
+    queue = OutboundQueue(max_bytes=10)
+    queue.enqueue("ctrl-msg", MessageClass.CONTROL)
+
+    # 他のクラスが埋めたバイト数では切断しない
+    assert queue.enqueue("chat", MessageClass.CHAT)
+    assert queue.dropped == 0
+    # チャット自身で上限を超える場合は切断する
+    assert queue.enqueue("chat-message", MessageClass.CHAT) is False
+
+
+@pytest.mark.asyncio
+async def test_control_messages_are_drained_first():
+    queue = OutboundQueue()
+    queue.enqueue("note", MessageClass.NOTIFICATION)
+    queue.enqueue("chat", MessageClass.CHAT)
+    queue.enqueue("pong", MessageClass.CONTROL)
+
+    assert await queue.get() == "pong"
+    assert await queue.get() == "chat"
+    assert await queue.get() == "note"
+
+
+@pytest.mark.asyncio
+async def test_close_wakes_waiting_reader():
+    queue = OutboundQueue()
+    reader = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+
+    queue.close()
+
+    assert await reader is None
+    assert queue.enqueue("late") is False
@@ -0,0 +1,183 @@
+"""
+発言時間・参加状況の逐次集計のテスト
+"""
+
+import importlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.participant_management_service import ParticipantManagementService
+from app.services.participation_tracker import ParticipationTracker
+
+# app.services はサービスのインスタンスを同名で再エクスポートしているので、
+# モジュール自体は sys.modules から取る
+participant_module = importlib.import_module("app.services.participant_management_service")
+
+
+def _tracker(**kwargs):
+    """サーバーの受信時刻を clock.now で与える集計器"""
+    clock = SimpleNamespace(now=0.0)
+    return ParticipationTracker(clock=lambda: clock.now, **kwargs), clock
+
+
+def _receive(tracker, clock, session_id, user_id, level, t, skew=0.0, delay=0.02, **kwargs):
+    """サーバー時刻 t に始まるチャンクを、時計が skew 秒ずれたクライアントから受信する"""
+    clock.now = t + delay
+    tracker.record(session_id, user_id, level, timestamp=t + skew, **kwargs)
+
+
+def _speak(tracker, clock, user_id, start, end, level=0.5, chunk=0.1, session_id="s1"):
+    """start から end まで chunk ごとに音声を送る"""
+    steps = round((end - start) / chunk)
+    for i in range(steps):
+        _receive(tracker, clock, session_id, user_id, level, start + i * chunk, duration=chunk)
+
+
+def test_talk_time_turns_and_gaps():
+    tracker, clock = _tracker(turn_hangover=0.5, min_silence=1.0)
+
+    _speak(tracker, clock, 1, 0.0, 2.0)
+    # 0.3秒の途切れは同じターン
+    _speak(tracker, clock, 1, 2.3, 3.0)
+    # 無音チャンクは発言時間に入らない
+    _speak(tracker, clock, 1, 3.0, 5.0, level=0.01)
+    _speak(tracker, clock, 1, 5.0, 6.0)
+
+    snapshot = tracker.snapshot("s1")
+    user = snapshot["participants"][1]
+    assert user["talk_time"] == pytest.approx(3.7)
+    assert user["turns"] == 2
+    assert user["gap_count"] == 1
+    assert user["gap_time"] == pytest.approx(2.0)
+    assert user["longest_turn"] == pytest.approx(3.0)
+    assert snapshot["silence_count"] == 1
+    assert snapshot["silence_time"] == pytest.approx(2.0)
+    assert snapshot["total_talk_time"] == pytest.approx(3.7)
+
+
+def test_overlaps_and_interruptions():
+    tracker, clock = _tracker(turn_hangover=0.5)
+
+    # 話者1が0-2秒、話者2が1-3秒（1秒重なる）。チャンクは交互に届く
+    for i in range(30):
+        t = i * 0.1
+        if t < 2.0 - 1e-9:
+            _receive(tracker, clock, "s1", 1, 0.5, t, duration=0.1)
+        if t >= 1.0 - 1e-9:
+            _receive(tracker, clock, "s1", 2, 0.5, t, duration=0.1)
+
+    snapshot = tracker.snapshot("s1")
+    assert snapshot["overlap_time"] == pytest.approx(1.0)
+    assert snapshot["participants"][1]["overlap_time"] == pytest.approx(1.0)
+    assert snapshot["participants"][2]["overlap_time"] == pytest.approx(1.0)
+    assert snapshot["participants"][2]["interruptions"] == 1
+    assert snapshot["participants"][1]["interruptions"] == 0
+    assert snapshot["participants"][1]["talk_share"] == pytest.approx(0.5)
+    assert snapshot["active_speakers"] == [2]
+    assert snapshot["total_turns"] == 2
+
+
+def test_chunk_duration_is_inferred_from_timestamps():
+    tracker, clock = _tracker(default_chunk_seconds=0.1, max_chunk_seconds=1.0)
+
+    # クライアントの時計がずれていても間隔はクライアントの値を使う
+    for t, delay in ((0.0, 0.05), (0.2, 0.09), (0.4, 0.05), (5.0, 0.3)):
+        _receive(tracker, clock, "s1", 1, 0.5, t, skew=-120.0, delay=delay)
+
+    # 最初は既定値、以降は前回チャンクからの経過時間（上限あり）
+    assert tracker.snapshot("s1")["participants"][1]["talk_time"] == pytest.approx(0.1 + 0.2 + 0.2 + 1.0)
+
+    tracker.discard_session("s1")
+    assert tracker.snapshot("s1") is None
+
+
+def test_client_clock_skew_does_not_create_overlap():
+    tracker, clock = _tracker(turn_hangover=0.5, min_silence=1.0)
+
+    # 話者1が0-1秒、話者2が1-2秒に交代で話す。話者2の時計は0.4秒遅れている
+    for i in range(10):
+        _receive(tracker, clock, "s1", 1, 0.5, i * 0.1, duration=0.1)
+    for i in range(10):
+        _receive(tracker, clock, "s1", 2, 0.5, 1.0 + i * 0.1, skew=-0.4, duration=0.1)
+    # JSONで送る話者3（タイムスタンプなし）は受信時刻で数える
+    clock.now = 3.5
+    tracker.record("s1", 3, 0.5, duration=0.1)
+
+    snapshot = tracker.snapshot("s1")
+    assert snapshot["overlap_time"] == pytest.approx(0.0)
+    assert snapshot["participants"][2]["interruptions"] == 0
+    assert snapshot["silence_count"] == 1
+    # 時刻は受信時刻（遅延0.02秒込み）にそろう
+    assert snapshot["silence_time"] == pytest.approx(3.5 - 2.02)
+    assert snapshot["last_timestamp"] == pytest.approx(3.6)
+
+
+@pytest.mark.asyncio
+async def test_session_stats_use_tracker(monkeypatch):
+    tracker = ParticipationTracker()
+    monkeypatch.setattr(participant_module, "participation_tracker", tracker)
+    service = ParticipantManagementService()
+    user = SimpleNamespace(id=1, username="user1", display_name="user1")
+    await service.join_session("s1", user)
+
+    for i in range(20):
+        await service.update_audio_level("s1", 1, 0.5, timestamp=100.0 + i * 0.1, duration=0.1)
+
+    participant = await service.get_participant_info("s1", 1)
+    assert participant.speak_time_session == pytest.approx(2.0)
+
+    stats = await service.get_session_stats("s1")
+    assert stats["total_speak_time"] == pytest.approx(2.0)
+    assert stats["total_turns"] == 1
+    assert stats["participation"][1]["turns"] == 1
+
+    await service.leave_session("s1", 1)
+    assert tracker.snapshot("s1") is None
+
+
+@pytest.mark.asyncio
+async def test_cached_realtime_stats_still_check_permission(monkeypatch):
+    import app.services.voice_session_service as voice_session_module
+    from app.core.exceptions import PermissionException
+    from app.core.ttl_cache import TTLCache
+
+    roles = {(10, 2): "participant"}
+
+    async def get_role(db, voice_session_id, user_id):
+        return roles.get((voice_session_id, user_id))
+
+    monkeypatch.setattr(
+        voice_session_module.voice_session_participant_repository, "get_role", get_role
+    )
+    cache = TTLCache(ttl=60.0)
+    monkeypatch.setattr(
+        voice_session_module.VoiceSessionService, "realtime_stats_cache", cache
+    )
+    now = datetime.now(timezone.utc)
+    cache.put(
+        "s1",
+        {
+            "id": 10,
+            "user_id": 1,
+            "started_at": now,
+            "ended_at": None,
+            "participant_count": 1,
+            "active_participants": 1,
+            "recording_duration": 0.0,
+            "transcription_count": 0,
+            "analysis_progress": 0.0,
+            "sentiment_score": None,
+            "key_topics_count": 0,
+            "last_activity": now,
+            "is_live": True,
+        },
+    )
+    service = voice_session_module.VoiceSessionService(db=None)
+
+    # オーナーと参加者はキャッシュから応答し、それ以外は拒否する
+    assert (await service.get_realtime_stats("s1", 1)).session_id == "s1"
+    assert (await service.get_realtime_stats("s1", 2)).session_id == "s1"
+    with pytest.raises(PermissionException):
+        await service.get_realtime_stats("s1", 3)
@@ -1,6 +1,7 @@
 import pytest
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+import numpy as np
 from unittest.mock import Mock, patch, AsyncMock
 from app.services.transcription_service import (
     RealtimeTranscriptionManager,
@@ -9,14 +10,15 @@ from app.services.transcription_service import (
     RealtimeTranscriptionStats,
     realtime_transcription_manager,
 )
+from app.services.utterance_segmenter import Utterance
 from app.core.websocket import WebSocketMessageHandler
 from app.models.user import User
 
 
 @pytest.fixture
 def mock_openai_client():
-    """OpenAIクライアントのモック"""
-    with patch("app.services.transcription_service.openai_client") as mock:
+    """転写バックエンドのモック"""
+    with patch("app.services.transcription_service.transcription_backend") as mock:
         mock.transcribe_audio_data = AsyncMock()
         mock.transcribe_chunk = AsyncMock()
         yield mock
@@ -52,6 +54,28 @@ def mock_partial_result():
     }
 
 
+def _pcm(amplitude: float, duration: float = 0.1, sample_rate: int = 16000) -> bytes:
+    """指定振幅の正弦波（16-bit PCM）"""
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    return (np.sin(2 * np.pi * 220 * t) * amplitude * 32767).astype(np.int16).tobytes()
+
+
+async def _feed_utterance(manager, session_id, user_id, speech_frames=20, silence_frames=6):
+    """発話（speech_frames × 100ms）と無音を流し、得られた確定・部分転写を返す"""
+    start = manager.active_sessions[session_id]["start_time"]
+    finals, partials = [], []
+    frames = [_pcm(0.3)] * speech_frames + [_pcm(0.0)] * silence_frames
+    for i, frame in enumerate(frames):
+        final_chunk, partial_chunk = await manager.process_audio_chunk(
+            session_id, user_id, frame, start + timedelta(seconds=(i + 1) * 0.1)
+        )
+        if final_chunk:
+            finals.append(final_chunk)
+        if partial_chunk:
+            partials.append(partial_chunk)
+    return finals, partials
+
+
 @pytest.fixture
 def sample_user():
     """サンプルユーザー"""
@@ -74,7 +98,7 @@ class TestRealtimeTranscriptionManager:
         await realtime_transcription_manager.start_session(session_id, "ja")
         
         assert session_id in realtime_transcription_manager.active_sessions
-        assert session_id in realtime_transcription_manager.chunk_buffers
+        assert session_id in realtime_transcription_manager.segmenters
         assert session_id in realtime_transcription_manager.partial_transcriptions
         assert session_id in realtime_transcription_manager.speaker_profiles
         assert session_id in realtime_transcription_manager.language_detection
@@ -96,7 +120,7 @@ class TestRealtimeTranscriptionManager:
         await realtime_transcription_manager.stop_session(session_id)
         
         # セッションが停止されていることを確認
-        assert session_id not in realtime_transcription_manager.chunk_buffers
+        assert session_id not in realtime_transcription_manager.segmenters
         assert session_id not in realtime_transcription_manager.partial_transcriptions
         assert session_id not in realtime_transcription_manager.speaker_profiles
         assert session_id not in realtime_transcription_manager.language_detection
@@ -134,17 +158,14 @@ class TestRealtimeTranscriptionManager:
         mock_openai_client.transcribe_audio_data.return_value = mock_transcription_result
         mock_openai_client.transcribe_chunk.return_value = mock_transcription_result
         
-        # 十分な音声データを追加（転写条件を満たす）
-        for _ in range(50):  # 5秒分のデータ
-            realtime_transcription_manager.chunk_buffers[session_id].append(mock_audio_data)
-        
-        # 音声チャンクを処理
-        final_chunk, partial_chunk = await realtime_transcription_manager.process_audio_chunk(
-            session_id, user_id, mock_audio_data, timestamp
+        # 2秒の発話と無音を流す（無音で発話が閉じて確定転写される）
+        finals, _ = await _feed_utterance(
+            realtime_transcription_manager, session_id, user_id
         )
-        
+
         # 結果を検証
-        assert final_chunk is not None
+        assert len(finals) == 1
+        final_chunk = finals[0]
         assert final_chunk.text == "こんにちは、テストです。"
         assert final_chunk.confidence == 0.85
         assert final_chunk.is_final is True
@@ -164,15 +185,19 @@ class TestRealtimeTranscriptionManager:
         # セッションを開始
         await realtime_transcription_manager.start_session(session_id)
         
-        # 音声データを追加
-        realtime_transcription_manager.chunk_buffers[session_id].append(mock_audio_data)
-        
         # モック設定
         mock_openai_client.transcribe_chunk.return_value = mock_partial_result
-        
-        # 部分転写を生成
+
+        # 発話途中のスナップショットから部分転写を生成
+        utterance = Utterance(
+            user_id=user_id,
+            audio=mock_audio_data,
+            start_time=0.0,
+            end_time=1.0,
+            is_final=False,
+        )
         partial_chunk = await realtime_transcription_manager._generate_partial_transcription(
-            session_id, user_id, timestamp
+            session_id, utterance
         )
         
         # 結果を検証
@@ -376,7 +401,7 @@ class TestWebSocketTranscriptionHandlers:
         )
         
         # セッションが停止されていることを確認
-        assert session_id not in realtime_transcription_manager.chunk_buffers
+        assert session_id not in realtime_transcription_manager.segmenters
 
 
 class TestTranscriptionIntegration:
@@ -398,18 +423,14 @@ class TestTranscriptionIntegration:
         mock_openai_client.transcribe_audio_data.return_value = mock_transcription_result
         mock_openai_client.transcribe_chunk.return_value = mock_transcription_result
         
-        # 音声データを処理（転写条件を満たす）
-        for _ in range(50):
-            realtime_transcription_manager.chunk_buffers[session_id].append(mock_audio_data)
-        
-        # 音声チャンクを処理
-        final_chunk, partial_chunk = await realtime_transcription_manager.process_audio_chunk(
-            session_id, user_id, mock_audio_data, timestamp
+        # 発話と無音を流す
+        finals, partials = await _feed_utterance(
+            realtime_transcription_manager, session_id, user_id
         )
-        
+
         # 結果を検証
-        assert final_chunk is not None
-        assert partial_chunk is not None
+        assert len(finals) == 1
+        assert partials
         
         # 統計を確認
         stats = await realtime_transcription_manager.get_realtime_stats(session_id)
@@ -470,20 +491,89 @@ class TestTranscriptionIntegration:
             "language": "en",
         }
         
-        with patch("app.services.transcription_service.openai_client") as mock_client:
-            mock_client.transcribe_audio_data.return_value = english_result
-            mock_client.transcribe_chunk.return_value = english_result
-            
-            # 十分な音声データを追加
-            for _ in range(50):
-                realtime_transcription_manager.chunk_buffers[session_id].append(b"audio")
-            
-            # 転写を実行
-            final_chunk, _ = await realtime_transcription_manager.process_audio_chunk(
-                session_id, user_id, b"audio", timestamp
+        with patch("app.services.transcription_service.transcription_backend") as mock_client:
+            mock_client.transcribe_audio_data = AsyncMock(return_value=english_result)
+            mock_client.transcribe_chunk = AsyncMock(return_value=english_result)
+
+            # 発話を流して転写を実行
+            finals, _ = await _feed_utterance(
+                realtime_transcription_manager, session_id, user_id
             )
-            
+
             # 言語が検出されていることを確認
-            if final_chunk:  # final_chunkがNoneでない場合のみテスト
-                assert final_chunk.language == "en"
-                assert realtime_transcription_manager.language_detection[session_id] == "en"
+            assert finals[0].language == "en"
+            assert realtime_transcription_manager.language_detection[session_id] == "en"
+
+
+class TestUtteranceSegmentation:
+    """話者別の発話区間検出のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_silence_and_chunks_do_not_call_transcriber(self, mock_openai_client):
+        """無音では転写APIを呼ばず、チャンクごとの部分転写も行わない"""
+        manager = RealtimeTranscriptionManager()
+        await manager.start_session("seg_silence")
+        start = manager.active_sessions["seg_silence"]["start_time"]
+
+        for i in range(30):
+            await manager.process_audio_chunk(
+                "seg_silence", 1, _pcm(0.0), start + timedelta(seconds=i * 0.1)
+            )
+
+        mock_openai_client.transcribe_chunk.assert_not_called()
+        mock_openai_client.transcribe_audio_data.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_speakers_are_segmented_separately(
+        self, mock_openai_client, mock_transcription_result
+    ):
+        """話者ごとに別のバッファで発話を区切る"""
+        mock_openai_client.transcribe_audio_data.return_value = mock_transcription_result
+        mock_openai_client.transcribe_chunk.return_value = mock_transcription_result
+        manager = RealtimeTranscriptionManager()
+        manager.partial_update_interval = None
+        await manager.start_session("seg_multi")
+        start = manager.active_sessions["seg_multi"]["start_time"]
+
+        # ユーザー1は話し続け、ユーザー2は短く話して黙る
+        finals = []
+        for i in range(15):
+            t = start + timedelta(seconds=(i + 1) * 0.1)
+            user2_frame = _pcm(0.3) if i < 8 else _pcm(0.0)
+            for user_id, frame in ((1, _pcm(0.3)), (2, user2_frame)):
+                final_chunk, _ = await manager.process_audio_chunk(
+                    "seg_multi", user_id, frame, t
+                )
+                if final_chunk:
+                    finals.append(final_chunk)
+
+        assert [chunk.speaker_id for chunk in finals] == [2]
+        assert manager.segmenters["seg_multi"].is_speaking(1)
+        # ユーザー2の発話だけが転写に送られる
+        sent_audio = mock_openai_client.transcribe_audio_data.call_args.args[0]
+        assert len(sent_audio) < 15 * len(_pcm(0.3))
+
+    @pytest.mark.asyncio
+    async def test_partials_are_bounded_and_stop_flushes(
+        self, mock_openai_client, mock_transcription_result
+    ):
+        """部分転写は一定間隔に制限され、停止時に発話途中の音声が確定される"""
+        mock_openai_client.transcribe_audio_data.return_value = mock_transcription_result
+        mock_openai_client.transcribe_chunk.return_value = mock_transcription_result
+        manager = RealtimeTranscriptionManager()
+        await manager.start_session("seg_partial")
+        start = manager.active_sessions["seg_partial"]["start_time"]
+
+        for i in range(35):  # 3.5秒の発話
+            await manager.process_audio_chunk(
+                "seg_partial", 1, _pcm(0.3), start + timedelta(seconds=(i + 1) * 0.1)
+            )
+
+        assert mock_openai_client.transcribe_chunk.call_count == 3
+        stats = manager.get_segmentation_stats()
+        assert stats["partial_calls"] == 3
+        assert stats["api_calls_per_audio_minute"] < 60
+
+        await manager.stop_session("seg_partial")
+        assert mock_openai_client.transcribe_audio_data.call_count == 1
+        assert manager.eou_latency.total == 1
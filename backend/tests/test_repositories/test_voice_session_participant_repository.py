@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  全モデルを登録して外部キーを解決する
+from app.models.base import Base
+from app.models.user import User
+from app.models.voice_session import VoiceSession
+from app.models.voice_session_participant import VoiceSessionParticipant
+from app.repositories.voice_session_participant_repository import (
+    VoiceSessionParticipantRepository,
+)
+from app.schemas.voice_session import ParticipantRoleEnum
+from app.services.voice_session_service import VoiceSessionService
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """参加者テーブルと関連テーブルだけを作ったSQLite（同時接続を試すためファイルを使う）"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'participants.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[
+                User.__table__,
+                VoiceSession.__table__,
+                VoiceSessionParticipant.__table__,
+            ],
+        )
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        for user_id in (1, 2, 3):
+            db.add(
+                User(
+                    id=user_id,
+                    email=f"user{user_id}@example.com",
+                    username=f"user{user_id}",
+                    full_name=f"User {user_id}",
+                )
+            )
+        for voice_session_id, room in ((10, "room-1"), (11, "room-2")):
+            db.add(
+                VoiceSession(
+                    id=voice_session_id,
+                    session_id=room,
+                    user_id=1,
+                    status="active",
+                    is_public=False,
+                    is_analyzed=False,
+                    participant_count=0,
+                )
+            )
+        await db.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+class TestVoiceSessionParticipantRepository:
+    """音声セッション参加者リポジトリのテストクラス"""
+
+    @pytest.fixture
+    def repository(self):
+        return VoiceSessionParticipantRepository()
+
+    @pytest.mark.asyncio
+    async def test_add_and_list_participants(self, repository, session_factory):
+        async with session_factory() as db:
+            await repository.add_participant(db, 10, 2, "moderator")
+            await repository.add_participant(db, 10, 3, "participant")
+
+            rows = await repository.get_with_users(db, 10)
+            assert [(p.user_id, u.username, p.role) for p, u in rows] == [
+                (2, "user2", "moderator"),
+                (3, "user3", "participant"),
+            ]
+            assert await repository.get_role(db, 10, 2) == "moderator"
+            assert await repository.get_role(db, 10, 1) is None
+            assert await repository.count_active(db, 10) == 2
+
+            session = await db.get(VoiceSession, 10)
+            await db.refresh(session)
+            assert session.participant_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_joins_do_not_lose_updates(self, repository, session_factory):
+        async def join(user_id):
+            async with session_factory() as db:
+                return await repository.add_participant(db, 10, user_id, "participant")
+
+        results = await asyncio.gather(join(2), join(3), join(2))
+
+        # 同じユーザーの重複は一意制約で弾かれ、他の参加者は失われない
+        assert sum(result is None for result in results) == 1
+        async with session_factory() as db:
+            assert {p.user_id for p, _ in await repository.get_with_users(db, 10)} == {2, 3}
+            session = await db.get(VoiceSession, 10)
+            assert session.participant_count == 2
+
+    @pytest.mark.asyncio
+    async def test_update_role_and_remove(self, repository, session_factory):
+        async with session_factory() as db:
+            await repository.add_participant(db, 10, 2, "participant")
+
+            assert await repository.update_role(db, 10, 2, "moderator") is True
+            assert await repository.update_role(db, 10, 3, "moderator") is False
+            assert await repository.get_role(db, 10, 2) == "moderator"
+
+            assert await repository.remove_participant(db, 10, 2) is True
+            assert await repository.remove_participant(db, 10, 2) is False
+            assert await repository.get_with_users(db, 10) == []
+
+            session = await db.get(VoiceSession, 10)
+            await db.refresh(session)
+            assert session.participant_count == 0
+
+    @pytest.mark.asyncio
+    async def test_get_with_users_for_sessions(self, repository, session_factory):
+        async with session_factory() as db:
+            await repository.add_participant(db, 10, 2, "participant")
+            await repository.add_participant(db, 11, 3, "moderator")
+            await repository.add_participant(db, 10, 3, "participant")
+
+            rows = await repository.get_with_users_for_sessions(db, [10, 11, 12])
+            assert {
+                session_id: [u.username for _, u in session_rows]
+                for session_id, session_rows in rows.items()
+            } == {10: ["user2", "user3"], 11: ["user3"], 12: []}
+            assert await repository.get_with_users_for_sessions(db, []) == {}
+
+
+@pytest.mark.asyncio
+async def test_service_responses_include_participant_rows(session_factory):
+    """participants カラムではなく参加者テーブルから応答の participants を組み立てる"""
+    async with session_factory() as db:
+        service = VoiceSessionService(db)
+
+        await service.add_participant("room-1", 1, 2, ParticipantRoleEnum.MODERATOR)
+        response = await service.add_participant(
+            "room-1", 1, 3, ParticipantRoleEnum.PARTICIPANT
+        )
+        participants = json.loads(response.participants)
+        assert [(p["user_id"], p["username"], p["role"]) for p in participants] == [
+            (2, "user2", "moderator"),
+            (3, "user3", "participant"),
+        ]
+        assert participants[0]["is_active"] is True
+
+        response = await service.update_participant_role(
+            "room-1", 1, 2, ParticipantRoleEnum.PARTICIPANT
+        )
+        assert json.loads(response.participants)[0]["role"] == "participant"
+
+        response = await service.remove_participant("room-1", 1, 2)
+        assert [p["user_id"] for p in json.loads(response.participants)] == [3]
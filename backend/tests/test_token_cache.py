@@ -0,0 +1,150 @@
+"""
+検証済みFirebaseトークンキャッシュのテスト
+"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from app.core import auth as core_auth
+from app.core.token_cache import VerifiedTokenCache
+
+
+NOW = 1_700_000_000.0
+
+
+def _claims(uid="u1", exp_in=3600, iat_offset=-10, now=NOW):
+    return {
+        "uid": uid,
+        "email": f"{uid}@example.com",
+        "exp": now + exp_in,
+        "iat": now + iat_offset,
+    }
+
+
+def test_cache_hit_until_token_exp(fake_clock):
+    clock = fake_clock(NOW)
+    cache = VerifiedTokenCache(clock=clock)
+    cache.put("token-a", _claims(exp_in=60))
+
+    assert cache.get("token-a")["uid"] == "u1"
+    clock.now += 61
+    assert cache.get("token-a") is None
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_cache_is_bounded_lru(fake_clock):
+    cache = VerifiedTokenCache(max_size=2, clock=fake_clock(NOW))
+    cache.put("a", _claims("a"))
+    cache.put("b", _claims("b"))
+    cache.get("a")
+    cache.put("c", _claims("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_revocation_compares_issued_at_not_auth_time(fake_clock):
+    clock = fake_clock(NOW)
+    cache = VerifiedTokenCache(clock=clock)
+    # 再ログインせずにリフレッシュしたトークン（auth_time は古いが iat は新しい）
+    refreshed = {**_claims("u1", iat_offset=-10), "auth_time": clock.now - 7200}
+    cache.put("refreshed", refreshed)
+    cache.update_revocation("u1", valid_after=clock.now - 3600, disabled=False)
+
+    assert cache.get("refreshed") is not None
+
+
+def test_revoked_tokens_are_rejected_and_purged(fake_clock):
+    clock = fake_clock(NOW)
+    cache = VerifiedTokenCache(revocation_check_interval=300, clock=clock)
+    cache.put("old", _claims("u1", iat_offset=-100))
+    cache.put("other", _claims("u2"))
+
+    assert cache.needs_revocation_check("u1") is True
+    # u1 のトークンを50秒前に失効させる
+    cache.update_revocation("u1", valid_after=clock.now - 50, disabled=False)
+    assert cache.needs_revocation_check("u1") is False
+
+    cache.purge()
+    assert cache.get("old") is None
+    assert cache.get("other") is not None
+    assert cache.stale_uids() == ["u2"]
+
+
+@pytest_asyncio.fixture
+async def firebase(monkeypatch):
+    """Firebase Admin SDKの呼び出しをフェイクに置き換える"""
+    cache = VerifiedTokenCache(revocation_check_interval=300)
+    monkeypatch.setattr(core_auth, "token_cache", cache)
+    monkeypatch.setattr(core_auth, "get_firebase_app", lambda: object())
+
+    now = time.time()
+    verify = MagicMock(return_value=_claims("u1", now=now))
+    users = {"u1": SimpleNamespace(uid="u1", tokens_valid_after_timestamp=0, disabled=False)}
+
+    def get_users(identifiers):
+        return SimpleNamespace(
+            users=[users[i.uid] for i in identifiers if i.uid in users],
+            not_found=[i for i in identifiers if i.uid not in users],
+        )
+
+    get_users_mock = MagicMock(side_effect=get_users)
+    with patch.object(core_auth.auth, "verify_id_token", verify), patch.object(
+        core_auth.auth, "get_users", get_users_mock
+    ):
+        yield SimpleNamespace(
+            cache=cache, verify=verify, get_users=get_users_mock, users=users, now=now
+        )
+    await core_auth.stop_revocation_refresher()
+
+
+@pytest.mark.asyncio
+async def test_verify_uses_cache_and_checks_revocation_once(firebase):
+    for _ in range(5):
+        claims = await core_auth.verify_firebase_token("token-a")
+        assert claims["uid"] == "u1"
+
+    assert firebase.verify.call_count == 1
+    assert firebase.verify.call_args.kwargs["check_revoked"] is False
+    assert firebase.get_users.call_count == 1
+    assert firebase.cache.get_stats()["hits"] == 4
+
+
+@pytest.mark.asyncio
+async def test_periodic_refresh_drops_revoked_tokens(firebase):
+    assert await core_auth.verify_firebase_token("token-a") is not None
+
+    # ユーザーのトークンを失効させる（iatより後）
+    firebase.users["u1"].tokens_valid_after_timestamp = int(firebase.now * 1000)
+    await core_auth.refresh_revocation_states(["u1"])
+
+    assert await core_auth.verify_firebase_token("token-a") is None
+
+
+@pytest.mark.asyncio
+async def test_disabled_user_is_rejected(firebase):
+    firebase.users["u1"].disabled = True
+
+    assert await core_auth.verify_firebase_token("token-a") is None
+    assert firebase.cache.get_stats()["size"] == 0
+
+
+def test_prefetch_certs_goes_through_verify_id_token(monkeypatch):
+    firebase_app = SimpleNamespace(project_id="demo-project")
+    monkeypatch.setattr(core_auth, "get_firebase_app", lambda: firebase_app)
+    verify = MagicMock(side_effect=core_auth.auth.InvalidIdTokenError("bad signature"))
+
+    with patch.object(core_auth.auth, "verify_id_token", verify):
+        assert core_auth.prefetch_firebase_certs() is True
+
+    token = verify.call_args.args[0]
+    assert verify.call_args.kwargs["app"] is firebase_app
+    claims = core_auth.jwt.get_unverified_claims(token)
+    assert claims["aud"] == "demo-project"
+    assert claims["iss"] == "https://securetoken.google.com/demo-project"
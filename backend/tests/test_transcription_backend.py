@@ -0,0 +1,173 @@
+"""
+転写バックエンドのテスト
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.integrations.transcription_backend import (
+    LocalTranscriptionBackend,
+    OpenAITranscriptionBackend,
+    decode_audio,
+)
+from app.services.transcription_service import RealtimeTranscriptionManager
+from app.services.utterance_segmenter import Utterance
+
+
+class FakeLocalModel:
+    """ワーカーでの呼び出しを記録するローカル転写器"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, requests):
+        self.release.wait(timeout=1.0)
+        self.batches.append(len(requests))
+        results = []
+        for audio, language, partial in requests:
+            if audio == b"bad!":
+                results.append({"error": "decode failed"})
+                continue
+            results.append(
+                {
+                    "text": f"{'partial' if partial else 'final'}:{len(audio)}",
+                    "language": language,
+                    "words": [{"word": "x", "start": 0.0, "end": 0.1}],
+                    "confidence": 0.9,
+                }
+            )
+        return results
+
+
+@pytest_asyncio.fixture
+async def local_backend():
+    model = FakeLocalModel()
+    executor = ThreadPoolExecutor(max_workers=1)
+    backend = LocalTranscriptionBackend(
+        workers=1, max_batch_size=4, batch_window=0.05, executor=executor, batch_fn=model
+    )
+    await backend.start()
+    yield backend, model
+    await backend.stop()
+    executor.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_local_backend_batches_concurrent_requests(local_backend):
+    backend, model = local_backend
+
+    results = await asyncio.gather(
+        *(backend.transcribe_audio_data(b"\x00\x00" * (i + 1)) for i in range(6))
+    )
+
+    # 同じ形の結果が呼び出し順に返る
+    assert [r["text"] for r in results] == [f"final:{2 * (i + 1)}" for i in range(6)]
+    assert all(r["language"] == "ja" and r["words"] for r in results)
+    # 最大4件ずつまとめてワーカーへ渡す
+    assert model.batches == [4, 2]
+    stats = backend.get_stats()
+    assert stats["batches"] == 2
+    assert stats["requests"] == 6
+
+
+@pytest.mark.asyncio
+async def test_local_backend_errors_are_isolated(local_backend):
+    backend, _ = local_backend
+
+    good, bad = await asyncio.gather(
+        backend.transcribe_chunk(b"\x00\x00", "en"),
+        backend.transcribe_audio_data(b"bad!"),
+        return_exceptions=True,
+    )
+
+    assert good["text"] == "partial:2"
+    assert good["language"] == "en"
+    assert isinstance(bad, RuntimeError)
+    # 部分転写の失敗はNoneになる
+    assert await backend.transcribe_chunk(b"bad!") is None
+    assert backend.get_stats()["errors"] == 2
+
+
+@pytest.mark.asyncio
+async def test_local_backend_stop_fails_pending_requests():
+    model = FakeLocalModel()
+    model.release.clear()
+    executor = ThreadPoolExecutor(max_workers=1)
+    backend = LocalTranscriptionBackend(
+        workers=1, max_batch_size=1, batch_window=0.0, executor=executor, batch_fn=model
+    )
+    await backend.start()
+
+    running = asyncio.create_task(backend.transcribe_audio_data(b"\x00\x00"))
+    queued = asyncio.create_task(backend.transcribe_audio_data(b"\x00\x00\x00\x00"))
+    await asyncio.sleep(0.01)
+    model.release.set()
+    await backend.stop()
+    executor.shutdown(wait=True)
+
+    assert (await running)["text"] == "final:2"
+    with pytest.raises(RuntimeError):
+        await queued
+
+
+@pytest.mark.asyncio
+async def test_openai_backend_delegates_to_client():
+    client = AsyncMock()
+    client.transcribe_audio_data.return_value = {"text": "a", "language": "ja"}
+    client.transcribe_chunk.return_value = None
+    backend = OpenAITranscriptionBackend(client)
+
+    assert (await backend.transcribe_audio_data(b"x"))["text"] == "a"
+    assert await backend.transcribe_chunk(b"x") is None
+    client.transcribe_audio_data.assert_awaited_once_with(b"x", "ja")
+    assert backend.get_stats()["errors"] == 1
+
+
+def test_decode_audio_accepts_pcm_and_wav():
+    import io
+    import wave
+
+    pcm = (np.array([0, 16384, -16384], dtype=np.int16)).tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(pcm)
+
+    expected = [0.0, 0.5, -0.5]
+    assert decode_audio(pcm).tolist() == expected
+    assert decode_audio(buffer.getvalue()).tolist() == expected
+
+
+@pytest.mark.asyncio
+async def test_manager_uses_injected_backend(local_backend):
+    backend, model = local_backend
+    manager = RealtimeTranscriptionManager(backend=backend)
+
+    async def no_save(session_id, chunk):
+        return None
+
+    manager._save_transcription = no_save
+    await manager.start_session("backend_session", "en")
+
+    utterance = Utterance(
+        user_id=7,
+        audio=b"\x00\x00" * 800,
+        start_time=0.0,
+        end_time=0.1,
+        is_final=True,
+    )
+    chunk = await manager._transcribe_utterance("backend_session", utterance)
+
+    assert chunk.text == "final:1600"
+    assert chunk.language == "en"
+    assert model.batches == [1]
@@ -0,0 +1,230 @@
+"""
+転写ジョブのスケジューラーのテスト
+"""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.services.transcription_scheduler import (
+    TranscriptionJobKind,
+    TranscriptionJobStatus,
+    TranscriptionScheduler,
+)
+from app.services.transcription_service import RealtimeTranscriptionManager
+
+FINAL = TranscriptionJobKind.FINAL
+PARTIAL = TranscriptionJobKind.PARTIAL
+
+
+class FakeTranscriber:
+    """呼び出しを記録し、同時実行数を計測するローカル転写器"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def _run(self, kind: str, audio: bytes):
+        self.calls.append((kind, audio))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.gate.wait()
+            await asyncio.sleep(self.delay)
+            return {"text": f"{kind}:{len(audio)}", "confidence": 0.9, "language": "ja"}
+        finally:
+            self.running -= 1
+
+    async def transcribe_audio_data(self, audio: bytes, language: str = "ja"):
+        return await self._run("final", audio)
+
+    async def transcribe_chunk(self, audio: bytes, language: str = "ja"):
+        return await self._run("partial", audio)
+
+
+@pytest_asyncio.fixture
+async def scheduler():
+    scheduler = TranscriptionScheduler(
+        max_concurrency=2, per_session_concurrency=1, max_pending=4
+    )
+    await scheduler.start()
+    yield scheduler
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limits(scheduler):
+    transcriber = FakeTranscriber()
+    per_session_peak = {}
+
+    def job(session_id):
+        async def run():
+            per_session_peak[session_id] = max(
+                per_session_peak.get(session_id, 0),
+                scheduler.get_stats()["running_sessions"].get(session_id, 0),
+            )
+            return await transcriber.transcribe_audio_data(session_id.encode())
+
+        return run
+
+    jobs = [
+        scheduler.submit(session_id, user_id, FINAL, job(session_id))
+        for session_id in ("s1", "s2")
+        for user_id in (1, 2)
+    ]
+    await scheduler.join()
+
+    assert all(j.status == TranscriptionJobStatus.COMPLETED for j in jobs)
+    # 全体2並列、セッションごとには1並列
+    assert transcriber.max_running == 2
+    assert per_session_peak == {"s1": 1, "s2": 1}
+
+
+@pytest.mark.asyncio
+async def test_newest_partial_wins_and_final_supersedes(scheduler):
+    transcriber = FakeTranscriber()
+    transcriber.gate.clear()
+    # セッションs1の枠をふさいでおき、後続のジョブを待機させる
+    blocker = scheduler.submit(
+        "s1", 9, FINAL, lambda: transcriber.transcribe_audio_data(b"x")
+    )
+    await asyncio.sleep(0)
+
+    first = scheduler.submit(
+        "s1", 1, PARTIAL, lambda: transcriber.transcribe_chunk(b"a")
+    )
+    second = scheduler.submit(
+        "s1", 1, PARTIAL, lambda: transcriber.transcribe_chunk(b"ab")
+    )
+    assert first.status == TranscriptionJobStatus.SUPERSEDED
+    assert scheduler.pending_count == 1
+
+    final = scheduler.submit(
+        "s1", 1, FINAL, lambda: transcriber.transcribe_audio_data(b"abc")
+    )
+    assert second.status == TranscriptionJobStatus.SUPERSEDED
+
+    transcriber.gate.set()
+    await scheduler.join()
+
+    assert blocker.status == final.status == TranscriptionJobStatus.COMPLETED
+    assert transcriber.calls == [("final", b"x"), ("final", b"abc")]
+    assert scheduler.stats["superseded"] == 2
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_evicts_partials_then_rejects(scheduler):
+    transcriber = FakeTranscriber()
+    transcriber.gate.clear()
+    for session_id in ("busy1", "busy2"):
+        scheduler.submit(
+            session_id, 1, FINAL, lambda: transcriber.transcribe_audio_data(b"x")
+        )
+    await asyncio.sleep(0)
+
+    partial = scheduler.submit(
+        "s1", 1, PARTIAL, lambda: transcriber.transcribe_chunk(b"p")
+    )
+    finals = [
+        scheduler.submit(
+            "s1", user_id, FINAL, lambda: transcriber.transcribe_audio_data(b"f")
+        )
+        for user_id in (2, 3, 4, 5, 6)
+    ]
+
+    # 部分転写を捨てて確定転写を受け付け、それでも入らない分は拒否する
+    assert partial.status == TranscriptionJobStatus.SUPERSEDED
+    assert [j.status for j in finals].count(TranscriptionJobStatus.REJECTED) == 1
+    assert scheduler.stats["evicted"] == 1
+    assert scheduler.pending_count == 4
+
+    transcriber.gate.set()
+    await scheduler.join()
+
+
+@pytest.mark.asyncio
+async def test_deadlines(scheduler):
+    async def slow():
+        await asyncio.sleep(1)
+
+    timed_out = scheduler.submit("s1", 1, FINAL, slow, timeout=0.05)
+    expired = scheduler.submit("s1", 2, FINAL, slow, timeout=0.01)
+    await scheduler.join()
+
+    # s1の枠をtimed_outが使っている間にexpiredの期限が過ぎる
+    assert timed_out.status == TranscriptionJobStatus.TIMED_OUT
+    assert expired.status == TranscriptionJobStatus.EXPIRED
+    stats = scheduler.get_stats()
+    assert stats["timed_out"] == 1 and stats["expired"] == 1
+    assert stats["service_time_ms_histograms"]["final"]["count"] == 1
+    assert stats["wait_time_ms_histograms"]["final"]["count"] == 1
+
+
+def _pcm(amplitude: float, duration: float = 0.1) -> bytes:
+    t = np.arange(int(16000 * duration)) / 16000
+    return (np.sin(2 * np.pi * 220 * t) * amplitude * 32767).astype(np.int16).tobytes()
+
+
+@pytest.mark.asyncio
+async def test_manager_pushes_results_asynchronously(scheduler):
+    transcriber = FakeTranscriber()
+    manager = RealtimeTranscriptionManager()
+    manager.attach_scheduler(scheduler)
+    received = []
+
+    async def listener(session_id, chunk):
+        received.append((session_id, chunk.is_final, chunk.speaker_id))
+
+    manager.add_result_listener(listener)
+
+    async def no_save(session_id, chunk):
+        return None
+
+    manager._save_transcription = no_save
+
+    with patch("app.services.transcription_service.transcription_backend", transcriber):
+        await manager.start_session("async_session")
+        start = manager.active_sessions["async_session"]["start_time"]
+        frames = [_pcm(0.3)] * 15 + [_pcm(0.0)] * 6 + [_pcm(0.3)] * 8
+        for i, frame in enumerate(frames):
+            result = await manager.process_audio_chunk(
+                "async_session", 1, frame, start + timedelta(seconds=(i + 1) * 0.1)
+            )
+            # 音声処理は転写を待たない
+            assert result == (None, None)
+
+        await scheduler.join()
+        assert ("async_session", True, 1) in received
+
+        # 停止時は発話途中の音声を確定させてから終わる
+        await manager.stop_session("async_session")
+
+    finals = [r for r in received if r[1]]
+    assert len(finals) == 2
+    assert manager.get_scheduler_stats()["completed"] >= 2
+
+
+def test_restart_on_new_event_loop():
+    """別のイベントループで起動し直してもジョブを処理できる（TestClientのlifespanごと）"""
+    scheduler = TranscriptionScheduler(max_concurrency=1, per_session_concurrency=1)
+    transcriber = FakeTranscriber(delay=0)
+
+    async def run_once():
+        await scheduler.start()
+        job = scheduler.submit(
+            "s1", 1, FINAL, lambda: transcriber.transcribe_audio_data(b"x")
+        )
+        await asyncio.wait_for(scheduler.join(), timeout=1)
+        await scheduler.stop()
+        return job.status
+
+    assert asyncio.run(run_once()) == TranscriptionJobStatus.COMPLETED
+    assert asyncio.run(run_once()) == TranscriptionJobStatus.COMPLETED
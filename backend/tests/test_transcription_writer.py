@@ -0,0 +1,168 @@
+"""
+転写結果の書き込みバッファのテスト
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.transcription_service import (
+    RealtimeTranscriptionManager,
+    TranscriptionChunk,
+)
+from app.services.transcription_writer import TranscriptionWriteBuffer
+
+
+class FakeStore:
+    """解決・保存の呼び出しを記録する"""
+
+    def __init__(self, voice_session_ids=None):
+        self.voice_session_ids = voice_session_ids or {"s1": 10, "s2": 20}
+        self.resolved = []
+        self.inserts = []
+        self.fail = 0
+
+    async def resolve(self, session_id):
+        self.resolved.append(session_id)
+        return self.voice_session_ids.get(session_id)
+
+    async def write(self, rows):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("database unavailable")
+        self.inserts.append(rows)
+        return len(rows)
+
+
+def _chunk(i: int, speaker_id=1) -> TranscriptionChunk:
+    return TranscriptionChunk(
+        text=f"text {i}",
+        start_time=float(i),
+        end_time=float(i) + 0.5,
+        confidence=0.9,
+        is_final=True,
+        speaker_id=speaker_id,
+    )
+
+
+def _buffer(store: FakeStore, **kwargs) -> TranscriptionWriteBuffer:
+    options = {"max_batch_size": 3, "flush_interval": 0.05}
+    options.update(kwargs)
+    return TranscriptionWriteBuffer(resolver=store.resolve, writer=store.write, **options)
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_batch_size():
+    store = FakeStore()
+    buffer = _buffer(store, flush_interval=60.0)
+
+    buffer.add("s1", _chunk(0))
+    buffer.add("s1", _chunk(1))
+    await asyncio.sleep(0.01)
+    assert store.inserts == []
+
+    buffer.add("s1", _chunk(2))
+    await asyncio.sleep(0.01)
+    assert [len(rows) for rows in store.inserts] == [3]
+    assert store.inserts[0][0].voice_session_id == 10
+    assert store.inserts[0][0].content == "text 0"
+
+    # 溜まった分は1回の保存で最大3件ずつINSERTする
+    for i in range(3, 10):
+        buffer.add("s1", _chunk(i))
+    await asyncio.sleep(0.01)
+    assert [len(rows) for rows in store.inserts] == [3, 3, 3, 1]
+    # VoiceSessionのIDは一度だけ解決する
+    assert store.resolved == ["s1"]
+
+    stats = buffer.get_stats()
+    assert stats["written"] == 10
+    assert stats["batch_size_histogram"]["count"] == 4
+    assert buffer.buffered_count == 0
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_interval():
+    store = FakeStore()
+    buffer = _buffer(store)
+    await buffer.start()
+    try:
+        buffer.add("s1", _chunk(0))
+        buffer.add("s2", _chunk(1, speaker_id=2))
+        await asyncio.sleep(0.01)
+        assert store.inserts == []
+
+        await asyncio.sleep(0.1)
+        assert sorted(rows[0].voice_session_id for rows in store.inserts) == [10, 20]
+        assert buffer.get_stats()["flush_latency_ms_histogram"]["count"] == 2
+    finally:
+        await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried_in_order():
+    store = FakeStore()
+    store.fail = 1
+    buffer = _buffer(store, flush_interval=60.0)
+
+    buffer.add("s1", _chunk(0))
+    with pytest.raises(RuntimeError):
+        await buffer.flush_session("s1")
+    buffer.add("s1", _chunk(1))
+
+    # 停止時に残りを保存する
+    await buffer.stop()
+    assert [row.content for row in store.inserts[0]] == ["text 0", "text 1"]
+    assert buffer.get_stats()["failed_flushes"] == 1
+    assert buffer.buffered_count == 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_session_is_dropped():
+    store = FakeStore()
+    buffer = _buffer(store)
+
+    buffer.add("missing", _chunk(0))
+    buffer.add("missing", _chunk(1, speaker_id=None))
+    await buffer.flush_session("missing")
+
+    assert store.inserts == []
+    assert buffer.get_stats()["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_manager_flushes_on_stop_session():
+    store = FakeStore()
+    buffer = _buffer(store, flush_interval=60.0)
+    manager = RealtimeTranscriptionManager(writer=buffer)
+
+    await manager.start_session("s1")
+    await manager._save_transcription("s1", _chunk(0))
+    await manager._save_transcription("s1", _chunk(1))
+    assert store.inserts == []
+
+    await manager.stop_session("s1")
+    assert [len(rows) for rows in store.inserts] == [2]
+
+
+def test_restart_on_new_event_loop():
+    """別のイベントループで起動し直しても時間しきい値で保存できる"""
+    store = FakeStore()
+    buffer = _buffer(store)
+
+    async def run_once(i):
+        await buffer.start()
+        buffer.add("s1", _chunk(i))
+        await asyncio.sleep(0.1)
+        stats = buffer.get_stats()
+        await buffer.stop()
+        return stats
+
+    with patch("app.services.transcription_writer.logger") as logger:
+        for i in range(2):
+            stats = asyncio.run(run_once(i))
+            assert stats["written"] == i + 1
+            assert stats["flushes"] == i + 1
+    # 前のループに結び付いたイベントを待ってエラーになっていない
+    logger.error.assert_not_called()
@@ -0,0 +1,39 @@
+"""
+件数上限つきTTLキャッシュのテスト
+"""
+
+from types import SimpleNamespace
+
+from app.core.ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    clock = SimpleNamespace(now=0.0)
+    cache = TTLCache(ttl=10.0, clock=lambda: clock.now)
+    cache.put("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.get_stats()["expired"] == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=10.0, max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_zero_ttl_disables_caching():
+    cache = TTLCache(ttl=0.0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
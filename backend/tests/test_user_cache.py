@@ -0,0 +1,172 @@
+"""
+認証済みユーザーキャッシュのテスト
+"""
+
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import user_cache
+from app.core.user_cache import (
+    UserIdentityCache,
+    _decode_snapshot,
+    _encode_snapshot,
+    get_user_by_firebase_uid,
+    get_user_by_id,
+    snapshot_user,
+)
+from app.models.user import User
+
+
+class FakeRedis:
+    """get/set/delete/pipeline だけを持つ最小のRedisフェイク"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, key, value, ex=None):
+                self.ops.append((key, str(value)))
+
+            async def execute(self):
+                redis.data.update(self.ops)
+
+        return Pipeline()
+
+
+def _user(user_id=1, uid="fb-1", **kwargs):
+    return User(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        username=f"user{user_id}",
+        firebase_uid=uid,
+        join_date=date(2024, 4, 1),
+        is_active=True,
+        **kwargs,
+    )
+
+
+@pytest_asyncio.fixture
+async def db(monkeypatch, tmp_path):
+    """users テーブルだけを持つSQLiteデータベースと、クエリ数のカウンタ"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(User.__table__.create)
+
+    queries = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: queries.append(statement),
+    )
+    monkeypatch.setattr(user_cache, "user_identity_cache", UserIdentityCache())
+
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with session_factory() as session:
+        session.add(_user())
+        await session.commit()
+    queries.clear()
+
+    yield session_factory, queries
+    await engine.dispose()
+
+
+def test_lru_ttl_and_uid_index(fake_clock):
+    clock = fake_clock()
+    cache = UserIdentityCache(max_size=2, ttl=60, clock=clock)
+    cache._put_local(snapshot_user(_user(1, "a")))
+    cache._put_local(snapshot_user(_user(2, "b")))
+    cache._get_local(1)
+    cache._put_local(snapshot_user(_user(3, "c")))
+
+    # 2 が追い出され、UIDインデックスからも消える
+    assert cache._get_local(2) is None
+    assert "b" not in cache._uid_index
+    assert cache.get_stats()["evicted"] == 1
+
+    clock.now += 61
+    assert cache._get_local(1) is None
+
+
+def test_snapshot_roundtrip_through_json():
+    snapshot = snapshot_user(_user())
+    decoded = _decode_snapshot(_encode_snapshot(snapshot))
+    assert decoded == snapshot
+
+
+@pytest.mark.asyncio
+async def test_second_lookup_issues_no_query(db):
+    session_factory, queries = db
+
+    async with session_factory() as session:
+        user = await get_user_by_id(session, 1)
+        assert user.username == "user1"
+    assert len(queries) == 1
+
+    async with session_factory() as session:
+        user = await get_user_by_firebase_uid(session, "fb-1")
+        assert user.id == 1
+        assert user in session
+    assert len(queries) == 1
+
+    stats = user_cache.user_identity_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_cached_user_can_be_updated_and_is_invalidated(db):
+    session_factory, queries = db
+
+    async with session_factory() as session:
+        await get_user_by_id(session, 1)
+
+    # キャッシュから得たユーザーを更新してコミットできる
+    async with session_factory() as session:
+        user = await get_user_by_id(session, 1)
+        user.nickname = "Nick"
+        await session.commit()
+
+    assert user_cache.user_identity_cache.get_stats()["invalidations"] >= 1
+
+    async with session_factory() as session:
+        user = await get_user_by_firebase_uid(session, "fb-1")
+        assert user.nickname == "Nick"
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_between_processes():
+    redis = FakeRedis()
+    writer = UserIdentityCache(redis_client=redis)
+    reader = UserIdentityCache(redis_client=redis)
+
+    await writer.put(_user())
+    snapshot = await reader.get_by_firebase_uid("fb-1")
+
+    assert snapshot["id"] == 1
+    assert snapshot["join_date"] == date(2024, 4, 1)
+    assert reader.get_stats()["redis_hits"] == 1
+
+    writer.invalidate(1)
+    await next(iter(writer._pending))
+    reader.clear()
+    assert await reader.get_by_id(1) is None
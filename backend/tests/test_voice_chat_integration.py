@@ -178,7 +178,7 @@ class TestVoiceChatIntegration:
             transcription_manager.chunk_buffers[session_id].append(mock_audio_data)
         
         # 転写の実行
-        with patch("app.services.transcription_service.openai_client") as mock_client:
+        with patch("app.services.transcription_service.transcription_backend") as mock_client:
             mock_client.transcribe_audio_data.return_value = {
                 "text": "テスト転写結果",
                 "confidence": 0.95,